@@ -0,0 +1,173 @@
+"""
+Бенчмарк накладных расходов логирования Graph API на одну публикацию.
+
+Одна публикация — это те же вызовы логирования, что делает _graph_request:
+создание контейнера (POST), --polls опросов статуса (GET) и media_publish
+(POST), с готовыми ответами, без сети. --threads потоков публикуют
+параллельно, как исполнитель публикаций. Режимы:
+
+- legacy — синхронная запись текстом, все ответы на INFO (как было);
+- sync-json — синхронная запись JSON, ответы на чтение выборочно;
+- queue-json — очередь и поток-слушатель, JSON, выборка (по умолчанию);
+- off — LOG_LEVEL=WARNING: цена проверок уровня.
+
+Считает время логирования в потоке публикации (мкс на публикацию), объём
+лога на публикацию и число отброшенных записей (переполнение очереди).
+
+Пример:
+    python -m benchmarks.bench_logging --publishes 2000 --threads 8 --polls 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Настройки нужно выставить до импорта src.*
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+MODES = {
+    "legacy": {"log_format": "text", "log_queue_size": 0, "graph_log_read_sample_rate": 1.0, "log_level": "INFO"},
+    "sync-json": {"log_format": "json", "log_queue_size": 0, "graph_log_read_sample_rate": 0.01, "log_level": "INFO"},
+    "queue-json": {"log_format": "json", "log_queue_size": 10000, "graph_log_read_sample_rate": 0.01, "log_level": "INFO"},
+    "off": {"log_format": "json", "log_queue_size": 10000, "graph_log_read_sample_rate": 0.01, "log_level": "WARNING"},
+}
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--publishes", type=int, default=2000, help="публикаций на режим")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--polls", type=int, default=5, help="опросов статуса на публикацию")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    parser.add_argument("--json", dest="json_path", default=None, help="куда сохранить результаты в JSON")
+    return parser.parse_args()
+
+
+def _publish_calls(polls: int) -> list[tuple]:
+    """(method, url, kwargs, response) — вызовы Graph одной публикации."""
+    import httpx
+
+    from src.integrations.instagram import GRAPH_BASE_URL
+
+    token = "EAAG" + "x" * 180
+    create_url = f"{GRAPH_BASE_URL}/17841400000000000/media"
+    status_url = f"{GRAPH_BASE_URL}/17900000000000000"
+    publish_url = f"{GRAPH_BASE_URL}/17841400000000000/media_publish"
+
+    def response(method: str, url: str, body: dict) -> httpx.Response:
+        return httpx.Response(200, json=body, request=httpx.Request(method, url))
+
+    calls = [(
+        "POST",
+        create_url,
+        {"data": {
+            "media_type": "REELS",
+            "video_url": "https://example.com/media/reels/1/reel.mp4",
+            "caption": "",
+            "share_to_feed": "true",
+            "access_token": token,
+        }},
+        response("POST", create_url, {"id": "17900000000000000"}),
+    )]
+    calls += [(
+        "GET",
+        status_url,
+        {"params": {"fields": "status_code", "access_token": token}},
+        response("GET", status_url, {"status_code": "IN_PROGRESS", "id": "17900000000000000"}),
+    )] * polls
+    calls.append((
+        "POST",
+        publish_url,
+        {"data": {"creation_id": "17900000000000000", "access_token": token}},
+        response("POST", publish_url, {"id": "17950000000000000"}),
+    ))
+    return calls
+
+
+def _run_mode(name: str, args: argparse.Namespace, calls: list[tuple], workdir: Path) -> dict:
+    from src.core.config import settings
+    from src.core.logs import configure_logging, log_context, shutdown_logging
+    from src.integrations.instagram import _log_http_request, _log_http_response
+
+    for key, value in MODES[name].items():
+        setattr(settings, key, value)
+
+    log_path = workdir / f"{name}.log"
+    per_thread = max(args.publishes // args.threads, 1)
+    timings: list[float] = []
+    lock = threading.Lock()
+
+    with open(log_path, "w", encoding="utf-8") as stream:
+        handler = configure_logging(stream)
+
+        def worker(thread_index: int) -> None:
+            local = []
+            for i in range(per_thread):
+                started = time.perf_counter()
+                with log_context(assignment_id=thread_index * per_thread + i, account_id=thread_index):
+                    for method, url, kwargs, resp in calls:
+                        read_only = method == "GET"
+                        _log_http_request(method, url, read_only=read_only, **kwargs)
+                        _log_http_response(resp, read_only=read_only, elapsed_ms=1.0)
+                local.append((time.perf_counter() - started) * 1_000_000)
+            with lock:
+                timings.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+        wall_started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_started
+
+        dropped = getattr(handler, "dropped", 0)
+        # дописываем очередь до замера объёма
+        shutdown_logging()
+
+    publishes = len(timings)
+    size = log_path.stat().st_size
+    ordered = sorted(timings)
+    return {
+        "mode": name,
+        "publishes": publishes,
+        "caller_us_p50": round(statistics.median(ordered), 1),
+        "caller_us_p99": round(ordered[min(int(publishes * 0.99), publishes - 1)], 1),
+        "caller_us_mean": round(statistics.fmean(ordered), 1),
+        "bytes_per_publish": round(size / publishes, 1),
+        "publishes_per_second": round(publishes / wall, 1),
+        "dropped_records": dropped,
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    calls = _publish_calls(args.polls)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_logging_") as tmp:
+        for name in args.modes:
+            results.append(_run_mode(name, args, calls, Path(tmp)))
+
+    header = f"{'mode':<12}{'p50 мкс':>10}{'p99 мкс':>10}{'среднее':>10}{'байт/публ.':>12}{'публ./с':>12}{'отброшено':>11}"
+    print(header)
+    for row in results:
+        print(
+            f"{row['mode']:<12}{row['caller_us_p50']:>10}{row['caller_us_p99']:>10}{row['caller_us_mean']:>10}"
+            f"{row['bytes_per_publish']:>12}{row['publishes_per_second']:>12}{row['dropped_records']:>11}"
+        )
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
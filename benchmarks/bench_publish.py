@@ -0,0 +1,198 @@
+"""
+Сквозной бенчмарк публикации рилсов на локальной заглушке Graph API.
+
+Поднимает benchmarks/fake_graph.py в отдельном потоке, направляет на него
+GRAPH_BASE_URL, создаёт пользователя с N аккаунтами и прогоняет несколько
+раундов publish_reels. Считает:
+- publishes/minute;
+- p50/p99 длительности раунда;
+- количество SQL-запросов и Graph-вызовов на одну публикацию.
+
+По умолчанию используется временная SQLite-база; для замеров на Postgres
+передайте --database-url.
+
+Пример:
+    python -m benchmarks.bench_publish --accounts 10 100 1000 --rounds 3
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--processing-delay", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--poll-interval", type=float, default=0.02)
+    parser.add_argument("--json", dest="json_path", default=None, help="куда сохранить результаты в JSON")
+    return parser.parse_args()
+
+
+def _start_fake_graph(args: argparse.Namespace) -> tuple[str, object]:
+    import uvicorn
+
+    from benchmarks.fake_graph import FakeGraphConfig, create_app
+
+    fake_app = create_app(
+        FakeGraphConfig(
+            processing_delay=args.processing_delay,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            latency=args.latency,
+        )
+    )
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="fake-graph", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v18.0", fake_app
+
+
+def main() -> int:
+    args = _parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="bench_publish_"))
+
+    graph_url, fake_app = _start_fake_graph(args)
+
+    # Настройки нужно выставить до импорта src.*
+    os.environ["GRAPH_BASE_URL"] = graph_url
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'bench.sqlite'}"
+    os.environ["INSTAGRAM_STATUS_POLL_INTERVAL_SECONDS"] = str(args.poll_interval)
+    os.environ["INSTAGRAM_STATUS_POLL_MAX_ATTEMPTS"] = "1000"
+
+    from sqlalchemy import event
+
+    import src.models  # noqa: F401
+    from src.api.reels import publish_reels
+    from src.db.base import Base
+    from src.db.session import SessionLocal, engine
+    from src.models.business_account import BusinessAccount
+    from src.models.reel import Reel
+    from src.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+
+    query_count = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_queries(*_):
+        nonlocal query_count
+        query_count += 1
+
+    graph_state = fake_app.state.graph
+    results = []
+
+    for accounts_count in args.accounts:
+        with SessionLocal() as db:
+            user = User(
+                email=f"bench-{accounts_count}-{time.time_ns()}@example.com",
+                hashed_password="-",
+                is_active=True,
+            )
+            db.add(user)
+            db.flush()
+            db.add_all(
+                BusinessAccount(
+                    user_id=user.id,
+                    name=f"bench-{i}",
+                    external_id=str(17840000000000000 + i),
+                    access_token=f"EAAbench{i:08d}token",
+                    is_active=True,
+                )
+                for i in range(accounts_count)
+            )
+            db.commit()
+            user_id = user.id
+
+        round_latencies: list[float] = []
+        published_total = 0
+        queries_total = 0
+        graph_calls_total = 0
+
+        for _ in range(args.rounds):
+            with SessionLocal() as db:
+                db.add_all(
+                    Reel(
+                        user_id=user_id,
+                        file_path=str(workdir / f"{user_id}-{time.time_ns()}-{i}.mp4"),
+                        original_filename=f"reel-{i}.mp4",
+                        is_used=False,
+                    )
+                    for i in range(accounts_count)
+                )
+                db.commit()
+
+            with graph_state.lock:
+                graph_calls_before = sum(graph_state.calls.values())
+            queries_before = query_count
+            started = time.perf_counter()
+
+            with SessionLocal() as db:
+                user = db.get(User, user_id)
+                result = publish_reels(strategy=None, wait_for_result=True, db=db, current_user=user)
+
+            round_latencies.append(time.perf_counter() - started)
+            published_total += result.total_published
+            queries_total += query_count - queries_before
+            with graph_state.lock:
+                graph_calls_total += sum(graph_state.calls.values()) - graph_calls_before
+
+        total_time = sum(round_latencies)
+        row = {
+            "accounts": accounts_count,
+            "rounds": args.rounds,
+            "published": published_total,
+            "publishes_per_minute": round(published_total / total_time * 60, 1) if total_time else 0.0,
+            "round_p50_s": round(_percentile(round_latencies, 50), 3),
+            "round_p99_s": round(_percentile(round_latencies, 99), 3),
+            "db_queries_per_publish": round(queries_total / published_total, 2) if published_total else None,
+            "graph_calls_per_publish": round(graph_calls_total / published_total, 2) if published_total else None,
+        }
+        results.append(row)
+        print(
+            f"accounts={row['accounts']:>5} published={row['published']:>6} "
+            f"publishes/min={row['publishes_per_minute']:>9} "
+            f"round p50={row['round_p50_s']:>8}s p99={row['round_p99_s']:>8}s "
+            f"db/publish={row['db_queries_per_publish']} graph/publish={row['graph_calls_per_publish']}",
+            flush=True,
+        )
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
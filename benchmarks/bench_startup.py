@@ -0,0 +1,163 @@
+"""
+Бенчмарк холодного старта API.
+
+Считает в свежих процессах (без прогретого кэша модулей текущего):
+- время импорта src.main (медиана по --runs);
+- время от запуска uvicorn до первого ответа 200 на /health (медиана).
+
+По умолчанию используется временная SQLite-база; для замеров на Postgres
+передайте --database-url. Бюджеты --import-budget-ms / --startup-budget-ms
+и сравнение с --baseline (допуск --tolerance) превращают бенчмарк в
+проверку для CI: при регрессии он завершается с кодом 1.
+
+Пример:
+    python -m benchmarks.bench_startup --runs 5 --baseline benchmarks/startup_baseline.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import src.main; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--timeout", type=float, default=30.0, help="предел ожидания /health, с")
+    parser.add_argument("--import-budget-ms", type=float, default=None)
+    parser.add_argument("--startup-budget-ms", type=float, default=None)
+    parser.add_argument("--baseline", default=None, help="JSON с прошлыми результатами для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение относительно baseline")
+    parser.add_argument("--write-baseline", action="store_true", help="записать результаты в --baseline")
+    parser.add_argument("--json", dest="json_path", default=None, help="куда сохранить результаты в JSON")
+    return parser.parse_args()
+
+
+def _env(database_url: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=database_url,
+        PYTHONPATH=str(ROOT),
+        # фоновые задачи и экспорт спанов не должны влиять на замер
+        SCHEDULER_ENABLED="false",
+        PUBLISH_RECOVERY_ENABLED="false",
+        MEDIA_GC_ENABLED="false",
+        INSIGHTS_SYNC_ENABLED="false",
+        ACCOUNT_HEALTH_REFRESH_ENABLED="false",
+        TRACING_EXPORTER="none",
+    )
+    return env
+
+
+def measure_import(env: dict) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(env: dict, timeout: float) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn завершился с кодом {process.returncode}: {process.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        raise RuntimeError(f"/health не ответил за {timeout} с")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _check(name: str, value: float, budget: float | None, baseline: float | None, tolerance: float) -> list[str]:
+    failures = []
+    if budget is not None and value > budget:
+        failures.append(f"{name}: {value:.0f} мс > бюджета {budget:.0f} мс")
+    if baseline is not None and value > baseline * (1 + tolerance):
+        failures.append(f"{name}: {value:.0f} мс > baseline {baseline:.0f} мс + {tolerance:.0%}")
+    return failures
+
+
+def main() -> int:
+    args = _parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        env = _env(database_url)
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        startups = [measure_startup(env, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "import_ms": round(statistics.median(imports), 1),
+        "import_max_ms": round(max(imports), 1),
+        "startup_ms": round(statistics.median(startups), 1),
+        "startup_max_ms": round(max(startups), 1),
+        "runs": args.runs,
+    }
+    print(f"import src.main: медиана {results['import_ms']} мс, максимум {results['import_max_ms']} мс")
+    print(f"старт до /health: медиана {results['startup_ms']} мс, максимум {results['startup_max_ms']} мс")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    baseline = {}
+    if args.baseline and args.write_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"baseline записан в {args.baseline}")
+    elif args.baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text())
+
+    failures = _check("import", results["import_ms"], args.import_budget_ms, baseline.get("import_ms"), args.tolerance)
+    failures += _check("startup", results["startup_ms"], args.startup_budget_ms, baseline.get("startup_ms"), args.tolerance)
+    for failure in failures:
+        print(f"РЕГРЕССИЯ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Локальная заглушка Instagram Graph API для нагрузочных тестов публикации.
+
+Реализует:
+- POST /{ig_user}/media                — создание media container;
+- GET  /{creation_id}?fields=status_code — статус контейнера;
+- POST /{ig_user}/media_publish        — публикация контейнера;
+- GET  /?ids=a,b&fields=...            — пакетное чтение объектов;
+- GET  /{ig_user}?fields=id            — проверка токена (токены с префиксом
+                                         REVOKED считаются отозванными);
+- POST /  batch=[...]                  — Graph batch: до 50 под-запросов
+                                         со своими access_token.
+
+Префикс версии (/v18.0/...) игнорируется, поэтому GRAPH_BASE_URL можно
+направить как на http://127.0.0.1:8900, так и на http://127.0.0.1:8900/v18.0.
+
+Поведение настраивается через FakeGraphConfig или переменные окружения
+FAKE_GRAPH_PROCESSING_DELAY, FAKE_GRAPH_ERROR_RATE, FAKE_GRAPH_RATE_LIMIT_RATE.
+
+Запуск: uvicorn benchmarks.fake_graph:app --port 8900
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlsplit
+from uuid import uuid4
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse
+
+_VERSION_PREFIX_RE = re.compile(r"^/v\d+(\.\d+)?(?=/|$)")
+REVOKED_TOKEN_PREFIX = "REVOKED"
+
+
+@dataclass
+class FakeGraphConfig:
+    # Сколько секунд контейнер находится в IN_PROGRESS
+    processing_delay: float = 0.05
+    # Доля запросов, на которые отвечаем временной ошибкой (code=2, HTTP 500)
+    error_rate: float = 0.0
+    # Доля запросов, на которые отвечаем превышением лимита (code=4)
+    rate_limit_rate: float = 0.0
+    # Задержка ответа на любой запрос (имитация сети)
+    latency: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "FakeGraphConfig":
+        return cls(
+            processing_delay=float(os.getenv("FAKE_GRAPH_PROCESSING_DELAY", "0.05")),
+            error_rate=float(os.getenv("FAKE_GRAPH_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("FAKE_GRAPH_RATE_LIMIT_RATE", "0")),
+            latency=float(os.getenv("FAKE_GRAPH_LATENCY", "0")),
+        )
+
+
+@dataclass
+class _Container:
+    id: str
+    ig_user: str
+    video_url: str
+    created_at: float
+    media_id: str | None = None
+
+
+@dataclass
+class FakeGraphState:
+    containers: dict[str, _Container] = field(default_factory=dict)
+    media: dict[str, str] = field(default_factory=dict)
+    calls: Counter = field(default_factory=Counter)
+    # Под-запросы внутри /batch (в calls попадает только сам batch)
+    batched_calls: Counter = field(default_factory=Counter)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _graph_error(status_code: int, code: int, message: str, subcode: int | None = None) -> JSONResponse:
+    error = {
+        "message": message,
+        "type": "OAuthException",
+        "code": code,
+        "fbtrace_id": uuid4().hex[:12],
+    }
+    if subcode is not None:
+        error["error_subcode"] = subcode
+    return JSONResponse(status_code=status_code, content={"error": error})
+
+
+def create_app(config: FakeGraphConfig | None = None) -> FastAPI:
+    config = config or FakeGraphConfig.from_env()
+    state = FakeGraphState()
+
+    fake = FastAPI(title="Fake Graph API")
+    fake.state.config = config
+    fake.state.graph = state
+
+    @fake.middleware("http")
+    async def strip_version_and_inject_faults(request: Request, call_next):
+        path = request.scope["path"]
+        request.scope["path"] = _VERSION_PREFIX_RE.sub("", path) or "/"
+
+        if config.latency:
+            await asyncio.sleep(config.latency)
+
+        with state.lock:
+            state.calls[f"{request.method} {request.scope['path']}"] += 1
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return _graph_error(400, 4, "Application request limit reached")
+        if roll < config.rate_limit_rate + config.error_rate:
+            return _graph_error(500, 2, "An unexpected error has occurred. Please retry your request later.")
+
+        return await call_next(request)
+
+    def _status_of(container: _Container) -> str:
+        if container.media_id:
+            return "PUBLISHED"
+        if time.monotonic() - container.created_at < config.processing_delay:
+            return "IN_PROGRESS"
+        return "FINISHED"
+
+    def _read_object(object_id: str, fields: str | None) -> dict | None:
+        container = state.containers.get(object_id)
+        if container is not None:
+            obj = {"id": container.id}
+            if fields and "status_code" in fields:
+                obj["status_code"] = _status_of(container)
+            return obj
+        if object_id in state.media:
+            return {"id": object_id}
+        if fields == "id" and object_id.isdigit():
+            # IG-аккаунты не регистрируем: любой числовой id считаем существующим
+            return {"id": object_id}
+        return None
+
+    @fake.get("/_stats")
+    def stats() -> dict:
+        with state.lock:
+            return {
+                "calls": dict(state.calls),
+                "batched_calls": dict(state.batched_calls),
+                "containers": len(state.containers),
+                "published": len(state.media),
+            }
+
+    @fake.get("/")
+    def read_many(ids: str, fields: str | None = None, access_token: str | None = None):
+        if not access_token:
+            return _graph_error(400, 190, "An active access token must be used")
+        result = {}
+        for object_id in ids.split(","):
+            obj = _read_object(object_id, fields)
+            if obj is None:
+                return _graph_error(400, 100, f"Unsupported get request. Object with ID '{object_id}' does not exist")
+            result[object_id] = obj
+        return result
+
+    @fake.post("/{ig_user}/media")
+    def create_container(
+        ig_user: str,
+        video_url: str = Form(...),
+        media_type: str = Form("REELS"),
+        access_token: str | None = Form(None),
+    ):
+        if not access_token:
+            return _graph_error(400, 190, "An active access token must be used")
+        if media_type != "REELS":
+            return _graph_error(400, 100, "Invalid parameter", subcode=2207023)
+
+        container = _Container(
+            id=str(random.randint(10**16, 10**17)),
+            ig_user=ig_user,
+            video_url=video_url,
+            created_at=time.monotonic(),
+        )
+        with state.lock:
+            state.containers[container.id] = container
+        return {"id": container.id}
+
+    @fake.post("/{ig_user}/media_publish")
+    def publish_container(
+        ig_user: str,
+        creation_id: str = Form(...),
+        access_token: str | None = Form(None),
+    ):
+        if not access_token:
+            return _graph_error(400, 190, "An active access token must be used")
+
+        with state.lock:
+            container = state.containers.get(creation_id)
+            if container is None or container.ig_user != ig_user:
+                return _graph_error(400, 100, "Invalid parameter", subcode=2207020)
+            if container.media_id:
+                return _graph_error(400, 9007, "The media has already been published", subcode=2207006)
+            if _status_of(container) != "FINISHED":
+                return _graph_error(400, 9007, "Media ID is not available", subcode=2207027)
+
+            container.media_id = str(random.randint(10**16, 10**17))
+            state.media[container.media_id] = container.id
+            return {"id": container.media_id}
+
+    @fake.get("/oauth/access_token")
+    def exchange_token(
+        grant_type: str,
+        fb_exchange_token: str,
+        client_id: str | None = None,
+        client_secret: str | None = None,
+    ):
+        if not client_id or not client_secret:
+            return _graph_error(400, 101, "Error validating application")
+        if fb_exchange_token.startswith(REVOKED_TOKEN_PREFIX):
+            return _graph_error(400, 190, "Error validating access token: The session has been invalidated", subcode=460)
+        return {
+            "access_token": f"{fb_exchange_token.split(':', 1)[0]}:{random.randint(10**8, 10**9)}",
+            "token_type": "bearer",
+            "expires_in": 60 * 24 * 3600,
+        }
+
+    @fake.get("/{object_id}")
+    def read_object(object_id: str, fields: str | None = None, access_token: str | None = None):
+        if not access_token:
+            return _graph_error(400, 190, "An active access token must be used")
+        if access_token.startswith(REVOKED_TOKEN_PREFIX):
+            return _graph_error(400, 190, "Error validating access token: The session has been invalidated", subcode=460)
+        obj = _read_object(object_id, fields)
+        if obj is None:
+            return _graph_error(400, 100, f"Unsupported get request. Object with ID '{object_id}' does not exist")
+        return obj
+
+    def _dispatch_batch_item(item: dict):
+        method = item.get("method", "GET").upper()
+        url = urlsplit(item.get("relative_url", ""))
+        path = _VERSION_PREFIX_RE.sub("", "/" + url.path.lstrip("/"))
+        params = dict(parse_qsl(url.query))
+        params.update(parse_qsl(item.get("body", "")))
+
+        with state.lock:
+            state.batched_calls[f"{method} {path}"] += 1
+
+        # сбои под-запросов независимы — так проверяется частичный отказ пачки
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return _graph_error(400, 4, "Application request limit reached")
+        if roll < config.rate_limit_rate + config.error_rate:
+            return _graph_error(500, 2, "An unexpected error has occurred. Please retry your request later.")
+
+        parts = path.strip("/").split("/")
+        if method == "POST" and len(parts) == 2 and parts[1] == "media":
+            return create_container(
+                parts[0],
+                video_url=params.get("video_url", ""),
+                media_type=params.get("media_type", "REELS"),
+                access_token=params.get("access_token"),
+            )
+        if method == "POST" and len(parts) == 2 and parts[1] == "media_publish":
+            return publish_container(
+                parts[0],
+                creation_id=params.get("creation_id", ""),
+                access_token=params.get("access_token"),
+            )
+        if method == "GET" and len(parts) == 1:
+            return read_object(parts[0], fields=params.get("fields"), access_token=params.get("access_token"))
+        return _graph_error(400, 100, f"Unsupported {method} request: {path}")
+
+    @fake.post("/")
+    def batch(batch: str = Form(...), access_token: str | None = Form(None)):
+        if not access_token:
+            return _graph_error(400, 190, "An active access token must be used")
+        try:
+            items = json.loads(batch)
+        except ValueError:
+            return _graph_error(400, 100, "Invalid batch parameter")
+        if not isinstance(items, list) or len(items) > 50:
+            return _graph_error(400, 100, "Too many requests in batch message. Maximum batch size is 50")
+
+        responses = []
+        for item in items:
+            result = _dispatch_batch_item(item)
+            if isinstance(result, JSONResponse):
+                responses.append({"code": result.status_code, "body": result.body.decode()})
+            else:
+                responses.append({"code": 200, "body": json.dumps(result)})
+        return responses
+
+    return fake
+
+
+app = create_app()
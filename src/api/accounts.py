@@ -1,23 +1,146 @@
+import csv
+import io
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
+from pydantic import ValidationError
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
-from src.api.deps import get_current_user, get_db
+from src.api.deps import get_current_user, get_current_user_read, get_db, get_read_db
+from src.core.config import settings
 from src.models.business_account import BusinessAccount
 from src.models.user import User
+from src.schemas.bulk import BulkItemResult, BulkResult
 from src.schemas.business_account import (
     BusinessAccountCreate,
+    BusinessAccountIds,
     BusinessAccountRead,
 )
+from src.services.account_health import (
+    check_account_by_id,
+    check_accounts,
+    check_accounts_by_ids,
+)
 
 router = APIRouter()
 
+# Колонки CSV для импорта; обязательна только name
+CSV_COLUMNS = ("name", "external_id", "access_token", "is_active")
+_CSV_TRUE = {"1", "true", "yes", "y", "да"}
+_CSV_FALSE = {"0", "false", "no", "n", "нет"}
+
+
+def _check_bulk_size(count: int) -> None:
+    if count > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {settings.bulk_max_items} элементов за запрос",
+        )
+
+
+def _create_accounts_bulk(
+    db: Session,
+    user: User,
+    items: list[tuple[int, BusinessAccountCreate]],
+    results: list[BulkItemResult],
+    background_tasks: BackgroundTasks,
+) -> BulkResult:
+    """
+    Создаёт аккаунты одним INSERT ... RETURNING. Аккаунты с external_id,
+    который у пользователя уже есть (или повторяется в запросе), пропускаем.
+    """
+    external_ids = {item.external_id for _, item in items if item.external_id}
+    taken = set()
+    if external_ids:
+        taken = {
+            external_id
+            for (external_id,) in db.query(BusinessAccount.external_id).filter(
+                BusinessAccount.user_id == user.id,
+                BusinessAccount.external_id.in_(external_ids),
+            )
+        }
+
+    to_create: list[tuple[int, BusinessAccountCreate]] = []
+    for index, item in items:
+        if item.external_id and item.external_id in taken:
+            results.append(
+                BulkItemResult(
+                    index=index,
+                    status="duplicate",
+                    detail=f"Аккаунт с external_id {item.external_id} уже есть",
+                )
+            )
+            continue
+        if item.external_id:
+            taken.add(item.external_id)
+        to_create.append((index, item))
+
+    created_ids: list[int] = []
+    if to_create:
+        created_ids = list(
+            db.scalars(
+                insert(BusinessAccount).returning(BusinessAccount.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "user_id": user.id,
+                        "name": item.name,
+                        "external_id": item.external_id,
+                        "access_token": item.access_token,
+                        "is_active": item.is_active,
+                    }
+                    for _, item in to_create
+                ],
+            )
+        )
+        db.commit()
+        # токены проверяем после ответа, как и при создании по одному
+        background_tasks.add_task(check_accounts_by_ids, created_ids)
+
+    for (index, _), account_id in zip(to_create, created_ids):
+        results.append(BulkItemResult(id=account_id, index=index, status="created"))
+    results.sort(key=lambda result: result.index)
+    return BulkResult(total=len(results), succeeded=len(created_ids), results=results)
+
+
+def _parse_csv_bool(value: str) -> bool:
+    normalized = value.strip().lower()
+    if normalized in _CSV_TRUE:
+        return True
+    if normalized in _CSV_FALSE:
+        return False
+    raise ValueError(f"Некорректное значение is_active: {value!r}")
+
+
+def _set_accounts_active(db: Session, user: User, ids: list[int], is_active: bool) -> BulkResult:
+    _check_bulk_size(len(ids))
+    updated = set(
+        db.scalars(
+            update(BusinessAccount)
+            .where(
+                BusinessAccount.user_id == user.id,
+                BusinessAccount.id.in_(ids),
+            )
+            .values(is_active=is_active)
+            .returning(BusinessAccount.id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+    db.commit()
+
+    results = [
+        BulkItemResult(id=account_id, index=index, status="updated")
+        if account_id in updated
+        else BulkItemResult(id=account_id, index=index, status="not_found", detail="Бизнес-аккаунт не найден")
+        for index, account_id in enumerate(dict.fromkeys(ids))
+    ]
+    return BulkResult(total=len(results), succeeded=len(updated), results=results)
+
 
 @router.get("/", response_model=List[BusinessAccountRead])
 def list_business_accounts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
 ) -> list[BusinessAccount]:
     accounts = (
         db.query(BusinessAccount)
@@ -35,6 +158,7 @@ def list_business_accounts(
 )
 def create_business_account(
     account_in: BusinessAccountCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> BusinessAccount:
@@ -48,14 +172,121 @@ def create_business_account(
     db.add(account)
     db.commit()
     db.refresh(account)
+    # токен проверяем после ответа, чтобы не задерживать создание
+    background_tasks.add_task(check_account_by_id, account.id)
     return account
 
 
+@router.post("/bulk", response_model=BulkResult)
+def create_business_accounts_bulk(
+    accounts_in: List[BusinessAccountCreate],
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkResult:
+    _check_bulk_size(len(accounts_in))
+    return _create_accounts_bulk(
+        db,
+        current_user,
+        list(enumerate(accounts_in)),
+        [],
+        background_tasks,
+    )
+
+
+@router.post("/import", response_model=BulkResult)
+def import_business_accounts_csv(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkResult:
+    """
+    Импорт из CSV с заголовком: name, external_id, access_token, is_active.
+    index в результате — номер строки данных (с 1).
+    """
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV должен быть в кодировке UTF-8",
+        )
+
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or "name" not in reader.fieldnames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"В CSV нет колонки name; ожидаются колонки: {', '.join(CSV_COLUMNS)}",
+        )
+
+    rows = list(reader)
+    _check_bulk_size(len(rows))
+
+    items: list[tuple[int, BusinessAccountCreate]] = []
+    results: list[BulkItemResult] = []
+    for index, row in enumerate(rows, start=1):
+        values = {
+            column: (row.get(column) or "").strip() or None
+            for column in CSV_COLUMNS
+        }
+        try:
+            is_active = values.pop("is_active")
+            if is_active is not None:
+                values["is_active"] = _parse_csv_bool(is_active)
+            items.append((index, BusinessAccountCreate(**values)))
+        except ValidationError as exc:
+            detail = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+            )
+            results.append(BulkItemResult(index=index, status="invalid", detail=detail))
+        except ValueError as exc:
+            results.append(BulkItemResult(index=index, status="invalid", detail=str(exc)))
+
+    return _create_accounts_bulk(db, current_user, items, results, background_tasks)
+
+
+@router.post("/bulk/activate", response_model=BulkResult)
+def activate_business_accounts(
+    payload: BusinessAccountIds,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkResult:
+    return _set_accounts_active(db, current_user, payload.ids, True)
+
+
+@router.post("/bulk/deactivate", response_model=BulkResult)
+def deactivate_business_accounts(
+    payload: BusinessAccountIds,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkResult:
+    return _set_accounts_active(db, current_user, payload.ids, False)
+
+
+@router.post("/health/check", response_model=List[BusinessAccountRead])
+def check_business_accounts_health(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[BusinessAccount]:
+    accounts = (
+        db.query(BusinessAccount)
+        .filter(
+            BusinessAccount.user_id == current_user.id,
+            BusinessAccount.is_active.is_(True),
+        )
+        .order_by(BusinessAccount.id)
+        .all()
+    )
+    check_accounts(db, accounts)
+    return accounts
+
+
 @router.get("/{account_id}", response_model=BusinessAccountRead)
 def get_business_account(
     account_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
 ) -> BusinessAccount:
     account = (
         db.query(BusinessAccount)
@@ -73,6 +304,17 @@ def get_business_account(
     return account
 
 
+@router.post("/{account_id}/health/check", response_model=BusinessAccountRead)
+def check_business_account_health(
+    account_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BusinessAccount:
+    account = get_business_account(account_id, db=db, current_user=current_user)
+    check_accounts(db, [account])
+    return account
+
+
 @router.delete(
     "/{account_id}",
     status_code=status.HTTP_204_NO_CONTENT,
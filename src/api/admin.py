@@ -0,0 +1,134 @@
+import re
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from src.api.deps import get_db, require_admin
+from src.core.admission import admission_stats
+from src.core.config import settings
+from src.core.profiling import list_profiles
+from src.db.pool import all_pool_metrics
+from src.db.replicas import replica_set
+from src.integrations.circuit_breaker import all_breakers
+from src.models.user import User
+from src.schemas.admin import (
+    AdmissionClassStats,
+    CircuitBreakerState,
+    PoolStats,
+    ProfileInfo,
+    ReplicaState,
+    TenantQueueStats,
+    UserPlanUpdate,
+    UserStorageQuotaUpdate,
+)
+from src.schemas.user import UserRead
+from src.services.executor import publish_executor
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+_PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.json$")
+
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+def get_profiles() -> list[ProfileInfo]:
+    profiles = []
+    for path in list_profiles():
+        stat = path.stat()
+        profiles.append(
+            ProfileInfo(
+                name=path.name,
+                size_bytes=stat.st_size,
+                created_at=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            )
+        )
+    return profiles
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str) -> FileResponse:
+    if not _PROFILE_NAME_RE.match(name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректное имя профиля",
+        )
+
+    path = next((p for p in list_profiles() if p.name == name), None)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Профиль не найден",
+        )
+    return FileResponse(path, media_type="application/json", filename=name)
+
+
+@router.get("/graph/circuits", response_model=List[CircuitBreakerState])
+def get_circuit_breakers() -> list[CircuitBreakerState]:
+    return [CircuitBreakerState(**breaker.snapshot()) for breaker in all_breakers()]
+
+
+@router.get("/db/replicas", response_model=List[ReplicaState])
+def get_db_replicas() -> list[ReplicaState]:
+    """Здоровье и отставание реплик по последней проверке."""
+    return [ReplicaState(**row) for row in replica_set.stats()]
+
+
+@router.get("/db/pool", response_model=List[PoolStats])
+def get_db_pool() -> list[PoolStats]:
+    """Пулы соединений: ожидание checkout, таймауты, утечки и время удержания по ручкам."""
+    return [PoolStats(**metrics.snapshot()) for metrics in all_pool_metrics()]
+
+
+@router.get("/publish/queue", response_model=List[TenantQueueStats])
+def get_publish_queue() -> list[TenantQueueStats]:
+    """Глубина очереди и ожидание по каждому тенанту (user_id)."""
+    return [TenantQueueStats(**row) for row in publish_executor.stats()]
+
+
+@router.get("/admission", response_model=List[AdmissionClassStats])
+def get_admission() -> list[AdmissionClassStats]:
+    """Слоты, очереди и отказы admission control по классам ручек (этого процесса)."""
+    return [AdmissionClassStats(**row) for row in admission_stats()]
+
+
+@router.put("/users/{user_id}/plan", response_model=UserRead)
+def set_user_plan(
+    user_id: int,
+    plan_in: UserPlanUpdate,
+    db: Session = Depends(get_db),
+) -> User:
+    if plan_in.plan not in settings.publish_plan_weights:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестный тариф: {plan_in.plan}",
+        )
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден",
+        )
+    user.plan = plan_in.plan
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@router.put("/users/{user_id}/storage-quota", response_model=UserRead)
+def set_user_storage_quota(
+    user_id: int,
+    quota_in: UserStorageQuotaUpdate,
+    db: Session = Depends(get_db),
+) -> User:
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден",
+        )
+    user.storage_quota_bytes = quota_in.storage_quota_bytes
+    db.commit()
+    db.refresh(user)
+    return user
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from src.api.deps import get_db, get_current_user
+from src.api.deps import get_current_user_read, get_db
 from src.core.config import settings
 from src.core.security import (
     create_access_token,
@@ -84,6 +84,6 @@ def login(
 
 @router.get("/me", response_model=UserRead)
 def read_current_user(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_read),
 ) -> User:
     return current_user
@@ -1,12 +1,13 @@
 from typing import Generator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from src.core.config import settings
-from src.db.session import get_db
+from src.core.security import admin_token_matches, user_id_from_token
+from src.db.replicas import reads_own_writes, replica_set
+from src.db.session import SessionLocal, get_db
 from src.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -23,10 +24,23 @@ def get_db_dep() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Сессия для read-only ручек: здоровая реплика, если она есть и клиент
+    недавно ничего не записывал, иначе основная база.
+    В такой сессии ничего не пишем.
+    """
+    bind = None
+    if not reads_own_writes(request.headers, request.cookies):
+        bind = replica_set.choose()
+    db = SessionLocal(bind=bind) if bind is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _user_from_token(db: Session, token: str) -> User:
     """
     Достаём текущего пользователя из JWT-токена.
     """
@@ -36,20 +50,45 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.jwt_secret_key,          # <--- ВАЖНО: используем jwt_secret_key
-            algorithms=[settings.jwt_algorithm],
-        )
-        sub = payload.get("sub")
-        if sub is None:
-            raise credentials_exception
-        user_id = int(sub)
-    except (JWTError, ValueError):
+    user_id = user_id_from_token(token)
+    if user_id is None:
         raise credentials_exception
 
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
     return user
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    return _user_from_token(db, token)
+
+
+def get_current_user_read(
+    db: Session = Depends(get_read_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """Как get_current_user, но в сессии get_read_db — для read-only ручек."""
+    return _user_from_token(db, token)
+
+
+def require_admin(
+    x_admin_token: str | None = Header(default=None),
+) -> None:
+    """
+    Доступ к служебным ручкам по X-Admin-Token.
+    Если ADMIN_TOKEN не задан, ручки считаем выключенными.
+    """
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found",
+        )
+    if not admin_token_matches(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав",
+        )
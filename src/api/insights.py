@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Query as SAQuery, Session
+
+from src.api.deps import get_current_user_read, get_read_db
+from src.core.config import settings
+from src.models.business_account import BusinessAccount
+from src.models.media_insight import MediaInsight
+from src.models.reel import Reel
+from src.models.user import User
+from src.schemas.insight import MediaInsightPage
+
+router = APIRouter()
+
+
+def _page(query: SAQuery, cursor: int | None, limit: int) -> MediaInsightPage:
+    """Keyset-пагинация от новых публикаций к старым: cursor — id последней строки прошлой страницы."""
+    if cursor is not None:
+        query = query.filter(MediaInsight.id < cursor)
+    rows = query.order_by(MediaInsight.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return MediaInsightPage(
+        items=rows,
+        next_cursor=rows[-1].id if has_more else None,
+    )
+
+
+def _limit_query():
+    return Query(default=50, ge=1, le=settings.insights_page_max_size)
+
+
+@router.get("/accounts/{account_id}", response_model=MediaInsightPage)
+def list_account_insights(
+    account_id: int,
+    cursor: int | None = Query(default=None),
+    limit: int = _limit_query(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
+) -> MediaInsightPage:
+    """Статистика всех рилсов, опубликованных на бизнес-аккаунт."""
+    account = (
+        db.query(BusinessAccount.id)
+        .filter(
+            BusinessAccount.id == account_id,
+            BusinessAccount.user_id == current_user.id,
+        )
+        .first()
+    )
+    if account is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Бизнес-аккаунт не найден",
+        )
+    query = db.query(MediaInsight).filter(MediaInsight.business_account_id == account_id)
+    return _page(query, cursor, limit)
+
+
+@router.get("/reels/{reel_id}", response_model=MediaInsightPage)
+def list_reel_insights(
+    reel_id: int,
+    cursor: int | None = Query(default=None),
+    limit: int = _limit_query(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
+) -> MediaInsightPage:
+    """Статистика публикаций рилса по всем аккаунтам."""
+    reel = (
+        db.query(Reel.id)
+        .filter(Reel.id == reel_id, Reel.user_id == current_user.id)
+        .first()
+    )
+    if reel is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Рилс не найден",
+        )
+    query = db.query(MediaInsight).filter(MediaInsight.reel_id == reel_id)
+    return _page(query, cursor, limit)
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import wait
 from pathlib import Path
 from typing import List
 from uuid import uuid4
@@ -7,32 +11,103 @@ from fastapi import (
     Depends,
     File,
     HTTPException,
+    Query,
     UploadFile,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete
 from sqlalchemy.orm import Session, selectinload
 
-from src.api.deps import get_current_user, get_db
-from src.core.paths import REELS_ROOT
-from src.integrations.instagram import (
-    InstagramPublishError,
-    publish_reel_to_instagram,
-)
+from src.api.deps import get_current_user, get_current_user_read, get_db, get_read_db
+from src.core.config import settings
+from src.core.shutdown import is_draining
+from src.db.locks import lock_user_reels
+from src.db.session import SessionLocal
 from src.models.business_account import BusinessAccount
 from src.models.reel import Reel
 from src.models.reel_assignment import ReelAssignment
 from src.models.user import User
-from src.schemas.reel import ReelRead
+from src.schemas.bulk import BulkItemResult, BulkResult
+from src.schemas.reel import ReelBulkDelete, ReelRead
 from src.schemas.reel_assignment import ReelAssignmentRead
-from src.schemas.reels_publish import PublishedPair, ReelsPublishResult
+from src.schemas.reels_publish import (
+    FanOutTarget,
+    PublishedPair,
+    ReelFanOutRequest,
+    ReelFanOutResult,
+    ReelsPublishResult,
+)
+from src.services.account_health import UNHEALTHY
+from src.services.events import assignment_event_payload, event_broker, format_sse
+from src.services.executor import publish_executor, tenant_weight
+from src.services.media import (
+    delete_stored_file,
+    release_reel_storage,
+    release_storage,
+    reserve_storage,
+    schedule_file_deletes,
+    storage_quota,
+)
+from src.services.planner import get_strategy, load_account_slots, plan_assignments
+from src.services.publisher import (
+    ACTIVE_STATUSES,
+    FINAL_STATUSES,
+    RESERVED_STATUSES,
+    create_assignment,
+)
+from src.storage import StorageError, get_storage, reel_key
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _quota_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Превышена квота хранилища",
+    )
+
+
+async def _store_upload(db: Session, upload: UploadFile, user: User) -> tuple[str, int]:
+    """
+    Сохраняет загруженный файл в хранилище и списывает его размер с квоты
+    пользователя (в текущей транзакции). Возвращает ключ и размер файла.
+    """
+    # размер части multipart известен заранее — заведомо лишнее не пишем
+    if upload.size is not None and user.storage_used_bytes + upload.size > storage_quota(user):
+        await upload.close()
+        raise _quota_exceeded()
+
+    ext = Path(upload.filename or "reel.mp4").suffix.lower()
+    if not ext:
+        ext = ".mp4"
+    key = reel_key(user.id, f"{uuid4().hex}{ext}")
+
+    try:
+        # запись (или multipart-загрузка в S3) блокирующая — в пуле потоков
+        size = await run_in_threadpool(get_storage().save, key, upload.file)
+    except StorageError as exc:
+        logger.error("Не удалось сохранить рилс пользователя %s: %s", user.id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Не удалось сохранить файл, попробуйте позже",
+        )
+    finally:
+        await upload.close()
+
+    if not reserve_storage(db, user.id, size):
+        await run_in_threadpool(delete_stored_file, key)
+        raise _quota_exceeded()
+    return key, size
+
+
 @router.get("/", response_model=List[ReelRead])
 def list_reels(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
 ) -> list[Reel]:
     reels = (
         db.query(Reel)
@@ -54,30 +129,12 @@ async def upload_reel(
     current_user: User = Depends(get_current_user),
 ) -> Reel:
     original_name = file.filename or "reel.mp4"
-    ext = Path(original_name).suffix.lower()
-    if not ext:
-        ext = ".mp4"
-
-    new_filename = f"{uuid4().hex}{ext}"
-
-    user_dir = REELS_ROOT / str(current_user.id)
-    user_dir.mkdir(parents=True, exist_ok=True)
-
-    dest_path = user_dir / new_filename
-
-    try:
-        with dest_path.open("wb") as out_file:
-            while True:
-                chunk = await file.read(1024 * 1024)
-                if not chunk:
-                    break
-                out_file.write(chunk)
-    finally:
-        await file.close()
+    key, size = await _store_upload(db, file, current_user)
 
     reel = Reel(
         user_id=current_user.id,
-        file_path=str(dest_path),
+        file_path=key,
+        size_bytes=size,
         original_filename=original_name,
         caption=None,
         is_used=False,
@@ -104,33 +161,24 @@ async def upload_reels_bulk(
             detail="Не передано ни одного файла",
         )
 
-    user_dir = REELS_ROOT / str(current_user.id)
-    user_dir.mkdir(parents=True, exist_ok=True)
-
     created_reels: list[Reel] = []
 
     for upload in files:
         original_name = upload.filename or "reel.mp4"
-        ext = Path(original_name).suffix.lower()
-        if not ext:
-            ext = ".mp4"
-
-        new_filename = f"{uuid4().hex}{ext}"
-        dest_path = user_dir / new_filename
-
         try:
-            with dest_path.open("wb") as out_file:
-                while True:
-                    chunk = await upload.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    out_file.write(chunk)
-        finally:
-            await upload.close()
+            key, size = await _store_upload(db, upload, current_user)
+        except HTTPException:
+            # пачка не сохранится: откатываем списание квоты, а уже
+            # загруженные файлы без записей в БД удаляем
+            db.rollback()
+            for reel in created_reels:
+                await run_in_threadpool(delete_stored_file, reel.file_path)
+            raise
 
         reel = Reel(
             user_id=current_user.id,
-            file_path=str(dest_path),
+            file_path=key,
+            size_bytes=size,
             original_filename=original_name,
             caption=None,
             is_used=False,
@@ -169,14 +217,116 @@ def delete_reel(
             detail="Рилс не найден",
         )
 
-    file_path = Path(reel.file_path)
-    try:
-        file_path.unlink(missing_ok=True)
-    except Exception:
-        pass
-
+    file_path = reel.file_path
+    release_reel_storage(db, reel)
     db.delete(reel)
     db.commit()
+    schedule_file_deletes([file_path])
+
+
+@router.post("/bulk-delete", response_model=BulkResult)
+def delete_reels_bulk(
+    payload: ReelBulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> BulkResult:
+    """
+    Удаляет рилсы по списку id и/или фильтру одним DELETE ... RETURNING.
+    Рилсы, которые сейчас публикуются или запланированы, не трогаем.
+    Файлы удаляются в фоновом пуле уже после ответа.
+    """
+    if payload.ids is not None and len(payload.ids) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {settings.bulk_max_items} id за запрос",
+        )
+
+    # та же блокировка, что у раунда публикации и расписания: рилс не
+    # может быть удалён, пока его резервируют
+    lock_user_reels(db, current_user.id)
+
+    conditions = [
+        Reel.user_id == current_user.id,
+        ~Reel.assignments.any(ReelAssignment.status.in_(RESERVED_STATUSES)),
+    ]
+    if payload.ids is not None:
+        conditions.append(Reel.id.in_(payload.ids))
+    if payload.is_used is not None:
+        conditions.append(Reel.is_used.is_(payload.is_used))
+    if payload.created_before is not None:
+        conditions.append(Reel.created_at < payload.created_before)
+
+    # назначения удаляет ON DELETE CASCADE
+    deleted = db.execute(
+        delete(Reel)
+        .where(*conditions)
+        .returning(Reel.id, Reel.file_path, Reel.size_bytes)
+        .execution_options(synchronize_session=False)
+    ).all()
+    release_storage(db, current_user.id, sum(row.size_bytes or 0 for row in deleted))
+
+    deleted_ids = {row.id for row in deleted}
+    if payload.ids is None:
+        results = [BulkItemResult(id=row.id, status="deleted") for row in deleted]
+    else:
+        requested = list(dict.fromkeys(payload.ids))
+        missing = [reel_id for reel_id in requested if reel_id not in deleted_ids]
+        existing = set()
+        if missing:
+            existing = {
+                reel_id
+                for (reel_id,) in db.query(Reel.id).filter(
+                    Reel.user_id == current_user.id,
+                    Reel.id.in_(missing),
+                )
+            }
+        results = []
+        for index, reel_id in enumerate(requested):
+            if reel_id in deleted_ids:
+                results.append(BulkItemResult(id=reel_id, index=index, status="deleted"))
+            elif reel_id in existing:
+                results.append(
+                    BulkItemResult(
+                        id=reel_id,
+                        index=index,
+                        status="skipped",
+                        detail="Рилс публикуется, запланирован или не подходит под фильтр",
+                    )
+                )
+            else:
+                results.append(
+                    BulkItemResult(id=reel_id, index=index, status="not_found", detail="Рилс не найден")
+                )
+    db.commit()
+
+    schedule_file_deletes([row.file_path for row in deleted])
+    return BulkResult(total=len(results), succeeded=len(deleted), results=results)
+
+
+def _reject_if_draining() -> None:
+    if is_draining():
+        # процесс останавливается (деплой) — раунд запустит следующий
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перезапускается, повторите запрос",
+            headers={"Retry-After": "5"},
+        )
+
+
+def _wait_for_round(futures) -> None:
+    """
+    Ждём раунд не дольше PUBLISH_ROUND_WAIT_SECONDS. При drain перестаём
+    ждать: недоделанное продолжит новый процесс, а клиент следит за
+    раундом по job_id.
+    """
+    deadline = time.monotonic() + settings.publish_round_wait_seconds
+    while not is_draining():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        _, not_done = wait(futures, timeout=min(remaining, 1.0))
+        if not not_done:
+            break
 
 
 @router.post(
@@ -184,17 +334,46 @@ def delete_reel(
     response_model=ReelsPublishResult,
 )
 def publish_reels(
+    strategy: str | None = Query(
+        default=None,
+        description="Стратегия планировщика: round_robin / least_recent / weighted",
+    ),
+    wait_for_result: bool = Query(
+        default=True,
+        alias="wait",
+        description=(
+            "false — вернуть job_id сразу после постановки раунда в очередь "
+            "и следить за ним через GET /reels/publish/{job_id}/events"
+        ),
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> ReelsPublishResult:
-    # Берём все НЕИСПОЛЬЗОВАННЫЕ рилсы
+    _reject_if_draining()
+
+    try:
+        planner_strategy = get_strategy(strategy)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
+
+    # Параллельные раунды одного пользователя (двойной клик, две вкладки,
+    # разные воркеры) резервируют рилсы по очереди — до коммита назначений
+    lock_user_reels(db, current_user.id)
+
+    # Берём все НЕИСПОЛЬЗОВАННЫЕ рилсы, которые сейчас не публикуются и не запланированы
+    # (активные назначения дотянет recovery sweep, новый контейнер не нужен)
     reels = (
         db.query(Reel)
         .filter(
             Reel.user_id == current_user.id,
             Reel.is_used.is_(False),
+            ~Reel.assignments.any(ReelAssignment.status.in_(RESERVED_STATUSES)),
         )
         .order_by(Reel.id)
+        .with_for_update(of=Reel, skip_locked=True)
         .all()
     )
 
@@ -204,6 +383,9 @@ def publish_reels(
         .filter(
             BusinessAccount.user_id == current_user.id,
             BusinessAccount.is_active.is_(True),
+            # вердикт проверки закэширован в строке — заведомо битые токены
+            # не тратят контейнеры и попытки
+            BusinessAccount.health_status != UNHEALTHY,
         )
         .order_by(BusinessAccount.id)
         .all()
@@ -217,80 +399,354 @@ def publish_reels(
             accounts_without_reels=len(accounts),
         )
 
-    pairs_count = min(len(reels), len(accounts))
-    published_pairs: list[PublishedPair] = []
+    # Раздаём рилсы с учётом остатка суточной квоты каждого аккаунта
+    plan = plan_assignments(reels, load_account_slots(db, accounts), planner_strategy)
 
-    for index in range(pairs_count):
-        reel = reels[index]
-        account = accounts[index]
+    # Пары, которые уже успешно публиковались, — одним запросом, а не на каждую пару
+    already_published = set(
+        db.query(ReelAssignment.reel_id, ReelAssignment.business_account_id)
+        .filter(
+            ReelAssignment.user_id == current_user.id,
+            ReelAssignment.reel_id.in_([reel.id for reel, _ in plan.pairs]),
+            ReelAssignment.status == "published",
+        )
+        .all()
+    )
+
+    job_id = uuid4().hex
+    assignments = [
+        create_assignment(db, reel=reel, account=account, job_id=job_id)
+        for reel, account in plan.pairs
+        # уже публиковали этот рилс на этот аккаунт – не создаём новую попытку
+        if (reel.id, account.id) not in already_published
+    ]
+    # Назначения коммитим до первого вызова Graph API: дальше каждый шаг
+    # сохраняется, и после падения публикация продолжится с того же места
+    db.commit()
+
+    # Раунд выполняет общий исполнитель: его потоки делятся между пользователями
+    # по весу тарифа, а шаги назначений идут в Graph общими /batch-запросами
+    assignment_ids = [assignment.id for assignment in assignments]
+    futures = publish_executor.submit_assignments(
+        current_user.id,
+        assignment_ids,
+        weight=tenant_weight(current_user.plan),
+    )
+    published_rows = []
+    if wait_for_result:
+        _wait_for_round(futures)
 
-        # ⬇️ НОВОЕ: если уже есть успешная публикация этого рилса на этот аккаунт – пропускаем
-        existing_published = (
-            db.query(ReelAssignment)
+        # Назначения меняли потоки исполнителя — берём итоговые статусы из БД
+        published_rows = (
+            db.query(ReelAssignment.reel_id, ReelAssignment.business_account_id)
             .filter(
-                ReelAssignment.user_id == current_user.id,
-                ReelAssignment.reel_id == reel.id,
-                ReelAssignment.business_account_id == account.id,
+                ReelAssignment.id.in_(assignment_ids),
                 ReelAssignment.status == "published",
             )
-            .first()
+            .order_by(ReelAssignment.id)
+            .all()
         )
-        if existing_published:
-            # уже публиковали этот рилс на этот аккаунт – не создаём новую попытку
-            continue
 
-        assignment = ReelAssignment(
-            user_id=current_user.id,
-            reel_id=reel.id,
-            business_account_id=account.id,
-            status="pending",
+    published_pairs = [
+        PublishedPair(
+            reel_id=reel_id,
+            business_account_id=business_account_id,
         )
-        db.add(assignment)
-        db.flush()
+        for reel_id, business_account_id in published_rows
+    ]
 
-        try:
-            ig_media_id = publish_reel_to_instagram(reel=reel, account=account)
+    # Важно: reels_left_unassigned / accounts_without_reels считаем по плану,
+    # а не по тому, что реально опубликовалось.
+    accounts_with_reels = {account.id for _, account in plan.pairs}
+    return ReelsPublishResult(
+        job_id=job_id if assignment_ids else None,
+        published=published_pairs,
+        total_published=len(published_pairs),
+        reels_left_unassigned=plan.reels_left_unassigned,
+        accounts_without_reels=len(accounts) - len(accounts_with_reels),
+    )
 
-            assignment.instagram_media_id = ig_media_id
-            assignment.status = "published"
-            assignment.error_message = None
 
-            # отмечаем рилс как использованный
-            reel.is_used = True
+def _fan_out_result(db: Session, reel_id: int, job_id: str | None, skipped: list[BulkItemResult]) -> ReelFanOutResult:
+    assignments = (
+        db.query(ReelAssignment)
+        .filter(
+            ReelAssignment.reel_id == reel_id,
+            ReelAssignment.job_id == job_id,
+        )
+        .order_by(ReelAssignment.id)
+        .all()
+        if job_id is not None
+        else []
+    )
+    targets = [
+        FanOutTarget(
+            business_account_id=assignment.business_account_id,
+            assignment_id=assignment.id,
+            status=assignment.status,
+            container_status=assignment.container_status,
+            instagram_media_id=assignment.instagram_media_id,
+            error_message=assignment.error_message,
+            attempt_count=assignment.attempt_count,
+        )
+        for assignment in assignments
+    ]
+    return ReelFanOutResult(
+        job_id=job_id,
+        reel_id=reel_id,
+        total_targets=len(targets),
+        total_published=sum(1 for target in targets if target.status == "published"),
+        targets=targets,
+        skipped=skipped,
+    )
 
-            try:
-                Path(reel.file_path).unlink(missing_ok=True)
-            except Exception:
-                pass
-
-            published_pairs.append(
-                PublishedPair(
-                    reel_id=reel.id,
-                    business_account_id=account.id,
-                )
-            )
-        except InstagramPublishError as exc:
-            assignment.status = "error"
-            assignment.error_message = str(exc)
 
+@router.post(
+    "/{reel_id}/fan-out",
+    response_model=ReelFanOutResult,
+)
+def fan_out_reel(
+    reel_id: int,
+    payload: ReelFanOutRequest,
+    wait_for_result: bool = Query(
+        default=True,
+        alias="wait",
+        description=(
+            "false — вернуть job_id сразу после постановки целей в очередь "
+            "и следить за ними через GET /reels/{reel_id}/fan-out/{job_id}"
+        ),
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ReelFanOutResult:
+    """
+    Публикует один рилс на выбранные аккаунты (fan-out). Каждая цель — своё
+    назначение с общим job_id; цели идут параллельно через исполнитель и
+    общие /batch-запросы. Файл рилса хранится, пока все цели не дойдут
+    до финального статуса.
+    """
+    _reject_if_draining()
+
+    account_ids = list(dict.fromkeys(payload.account_ids))
+    if len(account_ids) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {settings.bulk_max_items} аккаунтов за запрос",
+        )
+
+    # см. publish_reels: резервирование рилсов пользователя — по очереди
+    lock_user_reels(db, current_user.id)
+
+    reel = (
+        db.query(Reel)
+        .filter(
+            Reel.id == reel_id,
+            Reel.user_id == current_user.id,
+        )
+        .with_for_update(of=Reel)
+        .first()
+    )
+    if reel is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Рилс не найден",
+        )
+    if reel.is_used:
+        # после публикации файл удалён — публиковать нечего
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Рилс уже опубликован, загрузите видео заново",
+        )
+    reserved = (
+        db.query(ReelAssignment.id)
+        .filter(
+            ReelAssignment.reel_id == reel.id,
+            ReelAssignment.status.in_(RESERVED_STATUSES),
+        )
+        .first()
+    )
+    if reserved is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Рилс уже публикуется или запланирован",
+        )
+
+    accounts = {
+        account.id: account
+        for account in db.query(BusinessAccount).filter(
+            BusinessAccount.user_id == current_user.id,
+            BusinessAccount.id.in_(account_ids),
+        )
+    }
+    usable = [
+        account
+        for account in accounts.values()
+        if account.is_active and account.health_status != UNHEALTHY
+    ]
+    slots = {slot.account.id: slot for slot in load_account_slots(db, usable)}
+
+    skipped = []
+    targets = []
+    for index, account_id in enumerate(account_ids):
+        account = accounts.get(account_id)
+        slot = slots.get(account_id)
+        if account is None:
+            skipped.append(BulkItemResult(id=account_id, index=index, status="not_found", detail="Бизнес-аккаунт не найден"))
+        elif not account.is_active:
+            skipped.append(BulkItemResult(id=account_id, index=index, status="skipped", detail="Аккаунт выключен"))
+        elif account.health_status == UNHEALTHY:
+            skipped.append(
+                BulkItemResult(id=account_id, index=index, status="skipped", detail=account.health_error or "Токен аккаунта недействителен")
+            )
+        elif slot is None:
+            skipped.append(BulkItemResult(id=account_id, index=index, status="skipped", detail="Аккаунт недавно подряд падал"))
+        elif slot.available <= 0:
+            skipped.append(BulkItemResult(id=account_id, index=index, status="skipped", detail="Исчерпан суточный лимит публикаций"))
+        else:
+            targets.append(account)
+
+    if not targets:
+        return _fan_out_result(db, reel.id, None, skipped)
+
+    job_id = uuid4().hex
+    assignments = [create_assignment(db, reel=reel, account=account, job_id=job_id) for account in targets]
+    # см. publish_reels: назначения коммитим до первого вызова Graph API
     db.commit()
 
-    # Важно: reels_left_unassigned / accounts_without_reels считаем по исходным спискам,
-    # а не по тому, что реально опубликовалось.
-    return ReelsPublishResult(
-        published=published_pairs,
-        total_published=len(published_pairs),
-        reels_left_unassigned=len(reels) - pairs_count,
-        accounts_without_reels=len(accounts) - pairs_count,
+    # Цели делятся на пачки по GRAPH_BATCH_SIZE: пачки идут в потоках
+    # исполнителя параллельно, шаги внутри пачки — общими /batch
+    futures = publish_executor.submit_assignments(
+        current_user.id,
+        [assignment.id for assignment in assignments],
+        weight=tenant_weight(current_user.plan),
     )
+    if wait_for_result:
+        _wait_for_round(futures)
+        # назначения меняли потоки исполнителя — берём итоговые статусы из БД
+        db.expire_all()
+    return _fan_out_result(db, reel.id, job_id, skipped)
+
+
+@router.get(
+    "/{reel_id}/fan-out/{job_id}",
+    response_model=ReelFanOutResult,
+)
+def get_fan_out(
+    reel_id: int,
+    job_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
+) -> ReelFanOutResult:
+    """Прогресс fan-out: статус каждой цели."""
+    owned = (
+        db.query(Reel.id)
+        .filter(
+            Reel.id == reel_id,
+            Reel.user_id == current_user.id,
+        )
+        .first()
+    )
+    result = _fan_out_result(db, reel_id, job_id, []) if owned is not None else None
+    if result is None or not result.targets:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fan-out не найден",
+        )
+    return result
+
+
+def _assignment_snapshot(user_id: int, job_id: str | None) -> list[dict]:
+    """Текущее состояние: все назначения раунда или идущие публикации пользователя."""
+    with SessionLocal() as db:
+        query = db.query(ReelAssignment).filter(ReelAssignment.user_id == user_id)
+        if job_id is not None:
+            query = query.filter(ReelAssignment.job_id == job_id)
+        else:
+            query = query.filter(ReelAssignment.status.in_(ACTIVE_STATUSES))
+        return [assignment_event_payload(assignment) for assignment in query.order_by(ReelAssignment.id)]
+
+
+async def _assignment_events(user_id: int, job_id: str | None = None):
+    # Подписываемся до снимка, чтобы не потерять изменения между ними
+    async with event_broker.subscribe(user_id=user_id, job_id=job_id) as queue:
+        statuses: dict[int, str] = {}
+
+        def job_done() -> bool:
+            return job_id is not None and all(s in FINAL_STATUSES for s in statuses.values())
+
+        for payload in await run_in_threadpool(_assignment_snapshot, user_id, job_id):
+            statuses[payload["assignment_id"]] = payload["status"]
+            yield format_sse("assignment", payload)
+
+        while not job_done():
+            if is_draining():
+                # процесс останавливается — клиент переподключится к другому
+                return
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # комментарий-пинг, чтобы прокси не закрывали «тихое» соединение
+                yield ": ping\n\n"
+                continue
+            statuses[payload["assignment_id"]] = payload["status"]
+            yield format_sse("assignment", payload)
+
+        published = sum(1 for s in statuses.values() if s == "published")
+        yield format_sse(
+            "done",
+            {"job_id": job_id, "published": published, "failed": len(statuses) - published},
+        )
+
+
+def _sse_response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/publish/{job_id}/events")
+def publish_job_events(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    SSE-поток статусов назначений раунда: сначала текущее состояние,
+    затем изменения по мере публикации; в конце — событие done.
+    """
+    exists = (
+        db.query(ReelAssignment.id)
+        .filter(
+            ReelAssignment.user_id == current_user.id,
+            ReelAssignment.job_id == job_id,
+        )
+        .first()
+    )
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Раунд публикации не найден",
+        )
+    return _sse_response(_assignment_events(current_user.id, job_id))
+
+
+@router.get("/events")
+def user_assignment_events(
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """SSE-поток всех изменений назначений пользователя (раунды и расписание)."""
+    return _sse_response(_assignment_events(current_user.id))
+
 
 @router.get(
     "/assignments",
     response_model=List[ReelAssignmentRead],
 )
 def list_reel_assignments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
 ) -> list[ReelAssignment]:
     """
     Лог всех попыток отправки рилсов текущего пользователя:
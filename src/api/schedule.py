@@ -0,0 +1,236 @@
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session, selectinload
+
+from src.api.deps import get_current_user, get_current_user_read, get_db, get_read_db
+from src.db.locks import lock_user_reels
+from src.core.config import settings
+from src.models.business_account import BusinessAccount
+from src.models.reel import Reel
+from src.models.reel_assignment import ReelAssignment
+from src.models.user import User
+from src.schemas.reel_assignment import ReelAssignmentRead
+from src.schemas.schedule import (
+    ScheduleCreate,
+    ScheduleShift,
+    ScheduleShiftResult,
+    ScheduleUpdate,
+)
+from src.services.account_health import UNHEALTHY
+from src.services.events import announce_schedule_change
+from src.services.planner import get_strategy, load_account_slots, load_daily_usage, plan_assignments
+from src.services.publisher import RESERVED_STATUSES, SCHEDULED_STATUS
+from src.services.scheduler import as_utc, assign_schedule_times, schedule_capacity
+
+router = APIRouter()
+
+
+def _get_scheduled_or_404(db: Session, assignment_id: int, user_id: int) -> ReelAssignment:
+    assignment = (
+        db.query(ReelAssignment)
+        .filter(
+            ReelAssignment.id == assignment_id,
+            ReelAssignment.user_id == user_id,
+            ReelAssignment.status == SCHEDULED_STATUS,
+        )
+        .with_for_update()
+        .first()
+    )
+    if assignment is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Запланированная публикация не найдена",
+        )
+    return assignment
+
+
+@router.get("/", response_model=List[ReelAssignmentRead])
+def list_schedule(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read),
+) -> list[ReelAssignment]:
+    return (
+        db.query(ReelAssignment)
+        .options(
+            selectinload(ReelAssignment.reel),
+            selectinload(ReelAssignment.business_account),
+        )
+        .filter(
+            ReelAssignment.user_id == current_user.id,
+            ReelAssignment.status == SCHEDULED_STATUS,
+        )
+        .order_by(ReelAssignment.scheduled_at)
+        .all()
+    )
+
+
+@router.post(
+    "/",
+    response_model=List[ReelAssignmentRead],
+    status_code=status.HTTP_201_CREATED,
+)
+def create_schedule(
+    schedule_in: ScheduleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[ReelAssignment]:
+    start_at = as_utc(schedule_in.start_at)
+    end_at = as_utc(schedule_in.end_at) if schedule_in.end_at else None
+    if end_at is not None and end_at <= start_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_at должен быть позже start_at",
+        )
+
+    try:
+        planner_strategy = get_strategy(schedule_in.strategy)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
+
+    # см. publish_reels: резервирование рилсов пользователя — по очереди
+    lock_user_reels(db, current_user.id)
+
+    reels_query = db.query(Reel).filter(
+        Reel.user_id == current_user.id,
+        Reel.is_used.is_(False),
+        ~Reel.assignments.any(ReelAssignment.status.in_(RESERVED_STATUSES)),
+    )
+    if schedule_in.reel_ids is not None:
+        reels_query = reels_query.filter(Reel.id.in_(schedule_in.reel_ids))
+    reels = reels_query.order_by(Reel.id).with_for_update(of=Reel, skip_locked=True).all()
+
+    accounts = (
+        db.query(BusinessAccount)
+        .filter(
+            BusinessAccount.user_id == current_user.id,
+            BusinessAccount.is_active.is_(True),
+            # вердикт проверки закэширован в строке — заведомо битые токены
+            # не тратят контейнеры и попытки
+            BusinessAccount.health_status != UNHEALTHY,
+        )
+        .order_by(BusinessAccount.id)
+        .all()
+    )
+
+    # квота — по дням окна расписания, а не по сегодняшним 24 часам:
+    # аккаунт, исчерпавший лимит сегодня, получает рилсы на следующие дни
+    daily_limit = settings.instagram_daily_publish_limit
+    daily_used = load_daily_usage(
+        db,
+        [account.id for account in accounts],
+        since=datetime.combine(start_at.date(), time.min, tzinfo=timezone.utc),
+    )
+    slots = load_account_slots(db, accounts)
+    for slot in slots:
+        if end_at is None:
+            # окно не ограничено: лишнее уедет на следующие дни
+            slot.remaining_quota = len(reels)
+        else:
+            slot.remaining_quota = schedule_capacity(
+                daily_used.get(slot.account.id),
+                start_at=start_at,
+                end_at=end_at,
+                daily_limit=daily_limit,
+            )
+
+    plan = plan_assignments(reels, slots, planner_strategy)
+    if not plan.pairs:
+        return []
+
+    if schedule_in.interval_minutes is not None:
+        interval = timedelta(minutes=schedule_in.interval_minutes)
+    elif end_at is not None:
+        # укладываем самый загруженный аккаунт в окно [start_at, end_at)
+        max_per_account = max(Counter(account.id for _, account in plan.pairs).values())
+        interval = (end_at - start_at) / max_per_account
+    else:
+        interval = timedelta(minutes=settings.schedule_default_interval_minutes)
+
+    assignments = []
+    for reel, account, scheduled_at in assign_schedule_times(
+        plan.pairs,
+        start_at=start_at,
+        interval=interval,
+        end_at=end_at,
+        daily_used=daily_used,
+        daily_limit=daily_limit,
+    ):
+        assignment = ReelAssignment(
+            user_id=current_user.id,
+            reel_id=reel.id,
+            business_account_id=account.id,
+            status=SCHEDULED_STATUS,
+            scheduled_at=scheduled_at,
+            attempt_count=0,
+        )
+        assignment.reel = reel
+        assignment.business_account = account
+        assignments.append(assignment)
+
+    db.add_all(assignments)
+    announce_schedule_change(db)
+    db.commit()
+    return assignments
+
+
+@router.post("/shift", response_model=ScheduleShiftResult)
+def shift_schedule(
+    shift_in: ScheduleShift,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ScheduleShiftResult:
+    stmt = (
+        update(ReelAssignment)
+        .where(
+            ReelAssignment.user_id == current_user.id,
+            ReelAssignment.status == SCHEDULED_STATUS,
+        )
+        .values(scheduled_at=ReelAssignment.scheduled_at + timedelta(minutes=shift_in.delta_minutes))
+        .execution_options(synchronize_session=False)
+    )
+    if shift_in.assignment_ids is not None:
+        stmt = stmt.where(ReelAssignment.id.in_(shift_in.assignment_ids))
+    if shift_in.business_account_id is not None:
+        stmt = stmt.where(ReelAssignment.business_account_id == shift_in.business_account_id)
+
+    result = db.execute(stmt)
+    announce_schedule_change(db)
+    db.commit()
+    return ScheduleShiftResult(shifted=result.rowcount)
+
+
+@router.patch("/{assignment_id}", response_model=ReelAssignmentRead)
+def update_scheduled(
+    assignment_id: int,
+    update_in: ScheduleUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> ReelAssignment:
+    assignment = _get_scheduled_or_404(db, assignment_id, current_user.id)
+    assignment.scheduled_at = as_utc(update_in.scheduled_at)
+    announce_schedule_change(db)
+    db.commit()
+    db.refresh(assignment)
+    return assignment
+
+
+@router.delete(
+    "/{assignment_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+def cancel_scheduled(
+    assignment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> None:
+    assignment = _get_scheduled_or_404(db, assignment_id, current_user.id)
+    db.delete(assignment)
+    announce_schedule_change(db)
+    db.commit()
@@ -0,0 +1,254 @@
+"""
+Admission control и сброс нагрузки.
+
+Каждый запрос относится к классу ручек (auth, uploads, publish, writes,
+reads, media). У класса свой лимит одновременных запросов, очередь
+ограниченной длины и предельное время ожидания в ней:
+
+* есть свободный слот — запрос идёт сразу;
+* слотов нет — ждёт в очереди класса, но не дольше таймаута, потом 503;
+* очередь заполнена — сразу 503, не занимая ни потока, ни соединения с БД;
+* у пользователя уже ADMISSION_PER_USER_CONCURRENCY запросов класса — 429.
+
+Отказы — с Retry-After. Так массовые загрузки и раунды публикации
+упираются в лимиты своих классов, а /health, логин и чтение получают свои
+слоты и потоки. /health и SSE-потоки (долгие, без потока на время жизни)
+не ограничиваются. Лимиты — на процесс: у каждого воркера uvicorn свои.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from src.core.config import settings
+from src.core.security import user_id_from_token
+
+logger = logging.getLogger(__name__)
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Не ограничиваются: проверка живости и SSE-потоки
+_EXEMPT_PATHS = {"/health"}
+_STREAM_SUFFIX = "/events"
+
+
+def classify_request(method: str, path: str) -> str | None:
+    """Класс ручки по методу и пути; None — без ограничений."""
+    if path in _EXEMPT_PATHS or method == "OPTIONS":
+        return None
+    if path.startswith("/media/"):
+        return "media"
+    api = settings.api_v1_prefix
+    if not path.startswith(api):
+        return "reads" if method in _SAFE_METHODS else "writes"
+    route = path[len(api):].rstrip("/")
+    if method in _SAFE_METHODS and route.endswith(_STREAM_SUFFIX):
+        return None
+    if route.startswith("/auth"):
+        return "auth"
+    if method == "POST" and route in ("/reels", "/reels/bulk"):
+        return "uploads"
+    if method == "POST" and (route == "/reels/publish" or route.endswith("/fan-out")):
+        return "publish"
+    return "reads" if method in _SAFE_METHODS else "writes"
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)], 2)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass(eq=False)
+class RouteClass:
+    """Слоты и очередь одного класса ручек. Живёт в event loop процесса."""
+
+    name: str
+    limit: int
+    queue_size: int
+    queue_timeout: float
+    per_user_limit: int | None = None
+    active: int = 0
+    waiters: deque = field(default_factory=deque)
+    active_by_user: dict[int, int] = field(default_factory=dict)
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    rejected_per_user: int = 0
+    waits_ms: deque = field(default_factory=lambda: deque(maxlen=500))
+
+    @property
+    def retry_after(self) -> int:
+        return max(math.ceil(self.queue_timeout), 1)
+
+    async def acquire(self, user_id: int | None) -> None:
+        if self.per_user_limit is not None and user_id is not None:
+            if self.active_by_user.get(user_id, 0) >= self.per_user_limit:
+                self.rejected_per_user += 1
+                raise AdmissionRejected(
+                    429,
+                    "Слишком много одновременных запросов этого типа, дождитесь завершения предыдущих",
+                    self.retry_after,
+                )
+
+        started = time.monotonic()
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+        else:
+            await self._wait_in_queue()
+
+        self.admitted += 1
+        self.waits_ms.append((time.monotonic() - started) * 1000)
+        if user_id is not None:
+            self.active_by_user[user_id] = self.active_by_user.get(user_id, 0) + 1
+
+    async def _wait_in_queue(self) -> None:
+        if len(self.waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(503, "Сервис перегружен, повторите запрос позже", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # слот передали в момент таймаута — берём его
+                return
+            waiter.cancel()
+            self.rejected_timeout += 1
+            raise AdmissionRejected(503, "Сервис перегружен, повторите запрос позже", self.retry_after)
+        except BaseException:
+            # клиент отключился, пока ждал: отданный слот возвращаем
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self, user_id: int | None) -> None:
+        if user_id is not None:
+            count = self.active_by_user.get(user_id, 0) - 1
+            if count > 0:
+                self.active_by_user[user_id] = count
+            else:
+                self.active_by_user.pop(user_id, None)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        # слот переходит первому живому ожидающему, не освобождаясь
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        waits = list(self.waits_ms)
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "active": self.active,
+            "queued": sum(1 for waiter in self.waiters if not waiter.done()),
+            "queue_size": self.queue_size,
+            "queue_timeout_seconds": self.queue_timeout,
+            "per_user_limit": self.per_user_limit,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rejected_per_user": self.rejected_per_user,
+            "wait_p50_ms": _percentile(waits, 50),
+            "wait_p95_ms": _percentile(waits, 95),
+            "wait_max_ms": round(max(waits, default=0.0), 2),
+        }
+
+
+def _build_classes() -> dict[str, RouteClass]:
+    classes = {}
+    for name, limit in settings.admission_concurrency.items():
+        classes[name] = RouteClass(
+            name=name,
+            limit=max(limit, 1),
+            queue_size=max(settings.admission_queue_size.get(name, 0), 0),
+            queue_timeout=settings.admission_queue_timeout_seconds.get(name, 0),
+            per_user_limit=settings.admission_per_user_concurrency.get(name),
+        )
+    return classes
+
+
+route_classes = _build_classes()
+
+
+def admission_stats() -> list[dict]:
+    return [route_class.snapshot() for route_class in route_classes.values()]
+
+
+def _bearer_user_id(scope) -> int | None:
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return user_id_from_token(token)
+
+
+class AdmissionMiddleware:
+    """ASGI-middleware: слот класса ручки на время запроса или быстрый отказ."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = route_classes.get(classify_request(scope["method"], scope["path"]))
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = _bearer_user_id(scope) if route_class.per_user_limit is not None else None
+        try:
+            await route_class.acquire(user_id)
+        except AdmissionRejected as exc:
+            logger.warning(
+                "Admission: отказ %s для %s %s (класс %s, активно %s, в очереди %s)",
+                exc.status_code,
+                scope["method"],
+                scope["path"],
+                route_class.name,
+                route_class.active,
+                len(route_class.waiters),
+            )
+            response = JSONResponse(
+                {"detail": exc.detail},
+                status_code=exc.status_code,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release(user_id)
@@ -16,6 +16,103 @@ class Settings(BaseSettings):
         alias="DATABASE_URL",
     )
 
+    # Пул соединений основной базы
+    db_pool_size: int = Field(
+        default=10,
+        alias="DB_POOL_SIZE",
+    )
+    db_max_overflow: int = Field(
+        default=20,
+        alias="DB_MAX_OVERFLOW",
+    )
+    db_pool_timeout_seconds: float = Field(
+        default=30,
+        alias="DB_POOL_TIMEOUT_SECONDS",
+    )
+    db_pool_recycle_seconds: int = Field(
+        default=1800,
+        alias="DB_POOL_RECYCLE_SECONDS",
+    )
+    db_connect_timeout_seconds: int = Field(
+        default=10,
+        alias="DB_CONNECT_TIMEOUT_SECONDS",
+    )
+    # Проверять соединение перед выдачей из пула (лишний round-trip, зато
+    # не получаем соединения, оборванные базой или балансировщиком)
+    db_pool_pre_ping: bool = Field(
+        default=True,
+        alias="DB_POOL_PRE_PING",
+    )
+    # Режим для PgBouncer (transaction pooling): своего пула нет (NullPool),
+    # стартовые параметры соединения (options) не передаются
+    db_pgbouncer_mode: bool = Field(
+        default=False,
+        alias="DB_PGBOUNCER_MODE",
+    )
+    # Прямое подключение к Postgres в обход PgBouncer — для LISTEN событий
+    # (в transaction pooling LISTEN не работает). Не задано — DATABASE_URL
+    database_direct_url: str | None = Field(
+        default=None,
+        alias="DATABASE_DIRECT_URL",
+    )
+    # Соединение, которое держат дольше, считается утечкой (пишем в лог)
+    db_pool_leak_threshold_seconds: float = Field(
+        default=60,
+        alias="DB_POOL_LEAK_THRESHOLD_SECONDS",
+    )
+    db_pool_leak_check_interval_seconds: float = Field(
+        default=30,
+        alias="DB_POOL_LEAK_CHECK_INTERVAL_SECONDS",
+    )
+    # Сохранять стек каждого checkout, чтобы показать место утечки (дорого)
+    db_pool_leak_tracebacks: bool = Field(
+        default=False,
+        alias="DB_POOL_LEAK_TRACEBACKS",
+    )
+
+    # Реплики для чтения (JSON-список URL). Пусто — всё читается с основной базы
+    database_replica_urls: List[str] = Field(
+        default=[],
+        alias="DATABASE_REPLICA_URLS",
+    )
+    # Пул каждой реплики
+    db_replica_pool_size: int = Field(
+        default=10,
+        alias="DB_REPLICA_POOL_SIZE",
+    )
+    db_replica_max_overflow: int = Field(
+        default=10,
+        alias="DB_REPLICA_MAX_OVERFLOW",
+    )
+    # Реплика не должна задерживать запрос: ждём меньше, чем основную базу
+    db_replica_pool_timeout_seconds: float = Field(
+        default=5,
+        alias="DB_REPLICA_POOL_TIMEOUT_SECONDS",
+    )
+    db_replica_connect_timeout_seconds: int = Field(
+        default=3,
+        alias="DB_REPLICA_CONNECT_TIMEOUT_SECONDS",
+    )
+    db_replica_statement_timeout_ms: int = Field(
+        default=10_000,
+        alias="DB_REPLICA_STATEMENT_TIMEOUT_MS",
+    )
+    # Реплика с отставанием больше этого выводится из ротации
+    db_replica_max_lag_seconds: float = Field(
+        default=5,
+        alias="DB_REPLICA_MAX_LAG_SECONDS",
+    )
+    db_replica_health_interval_seconds: float = Field(
+        default=5,
+        alias="DB_REPLICA_HEALTH_INTERVAL_SECONDS",
+    )
+    # После своей записи клиент столько секунд читает с основной базы
+    # (read-your-writes; отметка по id пользователя в процессе и в cookie)
+    db_read_your_writes_seconds: int = Field(
+        default=10,
+        alias="DB_READ_YOUR_WRITES_SECONDS",
+    )
+
     # Секрет для JWT (можно переопределить через переменную окружения JWT_SECRET_KEY)
     jwt_secret_key: str = Field(
         default="dev_super_secret_jwt_key_change_me",  # для разработки ок, в проде обязательно поменять
@@ -37,12 +134,643 @@ class Settings(BaseSettings):
         alias="BACKEND_BASE_URL",
     )
 
+    # Хранилище видео: local (REELS_ROOT, раздаётся самим приложением)
+    # или s3 (S3-совместимое: AWS, MinIO; Instagram получает presigned URL)
+    media_storage_backend: str = Field(
+        default="local",
+        alias="MEDIA_STORAGE_BACKEND",
+    )
+    s3_bucket: str | None = Field(
+        default=None,
+        alias="S3_BUCKET",
+    )
+    # Для MinIO: http://minio:9000
+    s3_endpoint_url: str | None = Field(
+        default=None,
+        alias="S3_ENDPOINT_URL",
+    )
+    # Адрес, с которым подписываются presigned URL, если снаружи хранилище
+    # доступно по другому хосту (Instagram должен до него достучаться)
+    s3_public_endpoint_url: str | None = Field(
+        default=None,
+        alias="S3_PUBLIC_ENDPOINT_URL",
+    )
+    s3_region: str | None = Field(
+        default=None,
+        alias="S3_REGION",
+    )
+    s3_access_key_id: str | None = Field(
+        default=None,
+        alias="S3_ACCESS_KEY_ID",
+    )
+    s3_secret_access_key: str | None = Field(
+        default=None,
+        alias="S3_SECRET_ACCESS_KEY",
+    )
+    # Префикс ключей в бакете
+    s3_key_prefix: str = Field(
+        default="reels/",
+        alias="S3_KEY_PREFIX",
+    )
+    # MinIO и большинство S3-совместимых хранилищ требуют path-style адреса
+    s3_force_path_style: bool = Field(
+        default=False,
+        alias="S3_FORCE_PATH_STYLE",
+    )
+    # Размер части multipart-загрузки (S3 требует минимум 5 МБ)
+    s3_multipart_chunk_size: int = Field(
+        default=8 * 1024 * 1024,
+        alias="S3_MULTIPART_CHUNK_SIZE",
+    )
+    # Сколько живёт presigned GET URL, который получает Instagram:
+    # с запасом на обработку контейнера и повторы
+    s3_presigned_url_ttl_seconds: int = Field(
+        default=6 * 3600,
+        alias="S3_PRESIGNED_URL_TTL_SECONDS",
+    )
+
+    # Квота хранилища на пользователя по умолчанию (User.storage_quota_bytes
+    # переопределяет её для конкретного пользователя)
+    user_storage_quota_bytes: int = Field(
+        default=20 * 1024**3,
+        alias="USER_STORAGE_QUOTA_BYTES",
+    )
+
+    # Потоки, в которых удаляются файлы после удаления рилсов
+    media_delete_workers: int = Field(
+        default=4,
+        alias="MEDIA_DELETE_WORKERS",
+    )
+    # Максимум элементов в одном bulk-запросе (id, строки CSV)
+    bulk_max_items: int = Field(
+        default=5000,
+        alias="BULK_MAX_ITEMS",
+    )
+
+    # Сборщик мусора медиа: сверяет хранилище с reels.file_path пачками
+    # и удаляет файлы без записи, которые старше grace-периода
+    media_gc_enabled: bool = Field(
+        default=True,
+        alias="MEDIA_GC_ENABLED",
+    )
+    media_gc_interval_seconds: int = Field(
+        default=300,
+        alias="MEDIA_GC_INTERVAL_SECONDS",
+    )
+    media_gc_batch_size: int = Field(
+        default=1000,
+        alias="MEDIA_GC_BATCH_SIZE",
+    )
+    media_gc_batches_per_run: int = Field(
+        default=20,
+        alias="MEDIA_GC_BATCHES_PER_RUN",
+    )
+    # Файл без записи моложе этого срока может быть ещё загружающимся рилсом
+    media_gc_grace_seconds: int = Field(
+        default=24 * 3600,
+        alias="MEDIA_GC_GRACE_SECONDS",
+    )
+
     # Версия Instagram Graph API
     instagram_graph_api_version: str = Field(
         default="v18.0",
         alias="INSTAGRAM_GRAPH_API_VERSION",
     )
 
+    # Базовый URL Graph API; можно направить на локальный fake-сервер (benchmarks/fake_graph.py).
+    # По умолчанию https://graph.facebook.com/{instagram_graph_api_version}
+    graph_base_url: str | None = Field(
+        default=None,
+        alias="GRAPH_BASE_URL",
+    )
+
+    # Ожидание обработки media container
+    instagram_status_poll_interval_seconds: float = Field(
+        default=5.0,
+        alias="INSTAGRAM_STATUS_POLL_INTERVAL_SECONDS",
+    )
+    instagram_status_poll_max_attempts: int = Field(
+        default=10,
+        alias="INSTAGRAM_STATUS_POLL_MAX_ATTEMPTS",
+    )
+
+    # Повторы временных ошибок Graph API (экспоненциальная пауза с джиттером)
+    graph_retry_max_attempts: int = Field(
+        default=3,
+        alias="GRAPH_RETRY_MAX_ATTEMPTS",
+    )
+    graph_retry_base_delay_seconds: float = Field(
+        default=0.5,
+        alias="GRAPH_RETRY_BASE_DELAY_SECONDS",
+    )
+    graph_retry_max_delay_seconds: float = Field(
+        default=8.0,
+        alias="GRAPH_RETRY_MAX_DELAY_SECONDS",
+    )
+
+    # Graph /batch: сколько под-запросов в одном вызове (Graph принимает до 50)
+    graph_batch_size: int = Field(
+        default=50,
+        alias="GRAPH_BATCH_SIZE",
+    )
+    # Токен верхнего уровня для /batch (например, app token "app_id|app_secret").
+    # Под-запросы всё равно идут со своими токенами; если не задан —
+    # берём токен первого аккаунта в пачке, а пачки собираются отдельно
+    # по каждому пользователю
+    graph_batch_access_token: str | None = Field(
+        default=None,
+        alias="GRAPH_BATCH_ACCESS_TOKEN",
+    )
+
+    # Circuit breaker на приложение и на каждый аккаунт
+    circuit_breaker_failure_ratio: float = Field(
+        default=0.5,
+        alias="CIRCUIT_BREAKER_FAILURE_RATIO",
+    )
+    circuit_breaker_min_calls: int = Field(
+        default=10,
+        alias="CIRCUIT_BREAKER_MIN_CALLS",
+    )
+    circuit_breaker_window_seconds: float = Field(
+        default=60.0,
+        alias="CIRCUIT_BREAKER_WINDOW_SECONDS",
+    )
+    circuit_breaker_open_seconds: float = Field(
+        default=30.0,
+        alias="CIRCUIT_BREAKER_OPEN_SECONDS",
+    )
+    circuit_breaker_half_open_max_calls: int = Field(
+        default=1,
+        alias="CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS",
+    )
+
+    # Проверка здоровья аккаунтов (токен + external_id): сколько живёт вердикт,
+    # сколько проверок параллельно и сколько аккаунтов за проход фоновой задачи
+    account_health_ttl_seconds: int = Field(
+        default=6 * 3600,
+        alias="ACCOUNT_HEALTH_TTL_SECONDS",
+    )
+    account_health_concurrency: int = Field(
+        default=10,
+        alias="ACCOUNT_HEALTH_CONCURRENCY",
+    )
+    account_health_batch_size: int = Field(
+        default=200,
+        alias="ACCOUNT_HEALTH_BATCH_SIZE",
+    )
+    account_health_refresh_enabled: bool = Field(
+        default=True,
+        alias="ACCOUNT_HEALTH_REFRESH_ENABLED",
+    )
+    account_health_refresh_interval_seconds: int = Field(
+        default=300,
+        alias="ACCOUNT_HEALTH_REFRESH_INTERVAL_SECONDS",
+    )
+    # Аренда аккаунтов, взятых в проход перепроверки: другие процессы их не
+    # возьмут, а после временной ошибки Graph это пауза до повтора
+    account_health_lease_seconds: int = Field(
+        default=300,
+        alias="ACCOUNT_HEALTH_LEASE_SECONDS",
+    )
+
+    # Фоновое обновление долгоживущих токенов аккаунтов
+    # (GET /oauth/access_token?grant_type=fb_exchange_token). Без
+    # INSTAGRAM_APP_ID / INSTAGRAM_APP_SECRET задача не запускается
+    instagram_app_id: str | None = Field(
+        default=None,
+        alias="INSTAGRAM_APP_ID",
+    )
+    instagram_app_secret: str | None = Field(
+        default=None,
+        alias="INSTAGRAM_APP_SECRET",
+    )
+    token_refresh_enabled: bool = Field(
+        default=True,
+        alias="TOKEN_REFRESH_ENABLED",
+    )
+    token_refresh_interval_seconds: int = Field(
+        default=600,
+        alias="TOKEN_REFRESH_INTERVAL_SECONDS",
+    )
+    # Сколько токенов за проход и сколько обменов параллельно
+    token_refresh_batch_size: int = Field(
+        default=100,
+        alias="TOKEN_REFRESH_BATCH_SIZE",
+    )
+    token_refresh_concurrency: int = Field(
+        default=5,
+        alias="TOKEN_REFRESH_CONCURRENCY",
+    )
+    # Обновляем за TOKEN_REFRESH_LEAD_SECONDS до истечения, раньше ещё на
+    # случайные 0..TOKEN_REFRESH_JITTER_SECONDS — чтобы токены, выданные
+    # в один день, не обновлялись в один проход
+    token_refresh_lead_seconds: int = Field(
+        default=10 * 24 * 3600,
+        alias="TOKEN_REFRESH_LEAD_SECONDS",
+    )
+    token_refresh_jitter_seconds: int = Field(
+        default=3 * 24 * 3600,
+        alias="TOKEN_REFRESH_JITTER_SECONDS",
+    )
+    # Токены без срока (Graph не вернул expires_in) перепроверяем обменом раз в этот срок
+    token_refresh_recheck_seconds: int = Field(
+        default=7 * 24 * 3600,
+        alias="TOKEN_REFRESH_RECHECK_SECONDS",
+    )
+    # Неудачный обмен повторяется с экспоненциальной паузой от этой величины;
+    # после TOKEN_REFRESH_MAX_FAILURES подряд аккаунт помечается unhealthy
+    token_refresh_retry_seconds: int = Field(
+        default=1800,
+        alias="TOKEN_REFRESH_RETRY_SECONDS",
+    )
+    token_refresh_max_failures: int = Field(
+        default=5,
+        alias="TOKEN_REFRESH_MAX_FAILURES",
+    )
+    # Аренда взятых в проход аккаунтов (другие процессы их не возьмут)
+    token_refresh_lease_seconds: int = Field(
+        default=300,
+        alias="TOKEN_REFRESH_LEASE_SECONDS",
+    )
+
+    # Idempotency-Key для загрузок и раундов публикации: сколько хранить
+    # ответ для повтора
+    idempotency_ttl_seconds: int = Field(
+        default=24 * 3600,
+        alias="IDEMPOTENCY_TTL_SECONDS",
+    )
+    # Аренда ключа выполняющимся запросом (продлевается, пока он идёт);
+    # истекла — владелец упал, повтор выполнит запрос заново
+    idempotency_lease_seconds: int = Field(
+        default=120,
+        alias="IDEMPOTENCY_LEASE_SECONDS",
+    )
+    # Сколько повтор ждёт завершения исходного запроса (чуть больше
+    # PUBLISH_ROUND_WAIT_SECONDS), потом 409
+    idempotency_wait_seconds: float = Field(
+        default=660,
+        alias="IDEMPOTENCY_WAIT_SECONDS",
+    )
+    idempotency_poll_interval_seconds: float = Field(
+        default=0.5,
+        alias="IDEMPOTENCY_POLL_INTERVAL_SECONDS",
+    )
+    # Ответ больше этого не сохраняется (повтор выполнит запрос заново)
+    idempotency_max_response_bytes: int = Field(
+        default=1024 * 1024,
+        alias="IDEMPOTENCY_MAX_RESPONSE_BYTES",
+    )
+    # Тело запроса с Idempotency-Key (для хеша в отпечатке) держим в памяти
+    # до этого размера, больше — во временном файле
+    idempotency_body_spool_bytes: int = Field(
+        default=1024 * 1024,
+        alias="IDEMPOTENCY_BODY_SPOOL_BYTES",
+    )
+    idempotency_compaction_interval_seconds: int = Field(
+        default=3600,
+        alias="IDEMPOTENCY_COMPACTION_INTERVAL_SECONDS",
+    )
+    idempotency_compaction_batch_size: int = Field(
+        default=5000,
+        alias="IDEMPOTENCY_COMPACTION_BATCH_SIZE",
+    )
+
+    # Статистика опубликованных рилсов (insights)
+    insights_sync_enabled: bool = Field(
+        default=True,
+        alias="INSIGHTS_SYNC_ENABLED",
+    )
+    insights_sync_interval_seconds: int = Field(
+        default=300,
+        alias="INSIGHTS_SYNC_INTERVAL_SECONDS",
+    )
+    # Сколько медиа обновляем за один проход (бюджет запросов к Graph)
+    insights_sync_batch_size: int = Field(
+        default=2000,
+        alias="INSIGHTS_SYNC_BATCH_SIZE",
+    )
+    # Медиа одного аккаунта в одном multi-id запросе (?ids=..., не больше 50)
+    insights_ids_per_request: int = Field(
+        default=50,
+        alias="INSIGHTS_IDS_PER_REQUEST",
+    )
+    insights_concurrency: int = Field(
+        default=4,
+        alias="INSIGHTS_CONCURRENCY",
+    )
+    # Метрики рилса; в новых версиях Graph API plays называется views
+    insights_metrics: List[str] = Field(
+        default=["plays", "reach", "likes", "comments", "shares", "saved", "total_interactions"],
+        alias="INSIGHTS_METRICS",
+    )
+    # Ярусы обновления, JSON: [[возраст публикации до, с; интервал, с], ...].
+    # Свежие публикации обновляем часто, старые — редко
+    insights_refresh_tiers: List[tuple[int, int]] = Field(
+        default=[
+            (24 * 3600, 3600),
+            (7 * 24 * 3600, 6 * 3600),
+            (30 * 24 * 3600, 24 * 3600),
+        ],
+        alias="INSIGHTS_REFRESH_TIERS",
+    )
+    # Публикации старше последнего яруса
+    insights_archive_interval_seconds: int = Field(
+        default=7 * 24 * 3600,
+        alias="INSIGHTS_ARCHIVE_INTERVAL_SECONDS",
+    )
+    # Первое обновление после публикации: Instagram считает статистику не сразу
+    insights_first_fetch_delay_seconds: int = Field(
+        default=600,
+        alias="INSIGHTS_FIRST_FETCH_DELAY_SECONDS",
+    )
+    # Повтор после временной ошибки / лимитов
+    insights_retry_delay_seconds: int = Field(
+        default=900,
+        alias="INSIGHTS_RETRY_DELAY_SECONDS",
+    )
+    # Аренда взятых в работу медиа (чтобы другой процесс их не взял)
+    insights_lease_seconds: int = Field(
+        default=600,
+        alias="INSIGHTS_LEASE_SECONDS",
+    )
+    # Сколько назначений за проход просматривает поиск уже опубликованных медиа
+    insights_discovery_batch_size: int = Field(
+        default=5000,
+        alias="INSIGHTS_DISCOVERY_BATCH_SIZE",
+    )
+    insights_page_max_size: int = Field(
+        default=200,
+        alias="INSIGHTS_PAGE_MAX_SIZE",
+    )
+
+    # SSE-потоки статусов назначений: пинг для прокси, размер очереди
+    # подписчика и пауза перед переподключением LISTEN
+    sse_heartbeat_seconds: float = Field(
+        default=15,
+        alias="SSE_HEARTBEAT_SECONDS",
+    )
+    sse_queue_size: int = Field(
+        default=1000,
+        alias="SSE_QUEUE_SIZE",
+    )
+    events_reconnect_delay_seconds: float = Field(
+        default=5,
+        alias="EVENTS_RECONNECT_DELAY_SECONDS",
+    )
+
+    # Суточный лимит публикаций через API на один IG-аккаунт
+    instagram_daily_publish_limit: int = Field(
+        default=50,
+        alias="INSTAGRAM_DAILY_PUBLISH_LIMIT",
+    )
+
+    # Планировщик назначения рилсов: round_robin / least_recent / weighted
+    publish_planner_strategy: str = Field(
+        default="round_robin",
+        alias="PUBLISH_PLANNER_STRATEGY",
+    )
+    # Аккаунты с таким числом ошибок за окно пропускаются в раунде
+    planner_max_recent_failures: int = Field(
+        default=3,
+        alias="PLANNER_MAX_RECENT_FAILURES",
+    )
+    planner_failure_window_minutes: int = Field(
+        default=60,
+        alias="PLANNER_FAILURE_WINDOW_MINUTES",
+    )
+
+    # Возобновляемая публикация: срок «аренды» назначения воркером,
+    # пауза перед повтором и максимум попыток
+    publish_lease_seconds: int = Field(
+        default=300,
+        alias="PUBLISH_LEASE_SECONDS",
+    )
+    publish_retry_delay_seconds: int = Field(
+        default=60,
+        alias="PUBLISH_RETRY_DELAY_SECONDS",
+    )
+    # Пауза перед повтором после ошибки лимитов (throttled)
+    publish_throttle_delay_seconds: int = Field(
+        default=900,
+        alias="PUBLISH_THROTTLE_DELAY_SECONDS",
+    )
+    publish_max_attempts: int = Field(
+        default=5,
+        alias="PUBLISH_MAX_ATTEMPTS",
+    )
+    # Фоновый sweep, который дотягивает зависшие публикации
+    publish_recovery_enabled: bool = Field(
+        default=True,
+        alias="PUBLISH_RECOVERY_ENABLED",
+    )
+    publish_recovery_interval_seconds: int = Field(
+        default=60,
+        alias="PUBLISH_RECOVERY_INTERVAL_SECONDS",
+    )
+    publish_recovery_batch_size: int = Field(
+        default=50,
+        alias="PUBLISH_RECOVERY_BATCH_SIZE",
+    )
+
+    # Пул потоков, в котором выполняются публикации раундов и планировщика
+    publish_executor_workers: int = Field(
+        default=8,
+        alias="PUBLISH_EXECUTOR_WORKERS",
+    )
+    # Справедливая очередь перед пулом (deficit round-robin по user_id):
+    # сколько назначений тенант с весом 1 получает за один заход
+    publish_fair_quantum: int = Field(
+        default=50,
+        alias="PUBLISH_FAIR_QUANTUM",
+    )
+    # Веса тарифов (User.plan), JSON: {"basic": 1, "pro": 2, "agency": 4}.
+    # Неизвестный тариф — вес 1
+    publish_plan_weights: dict[str, int] = Field(
+        default={"basic": 1, "pro": 2, "agency": 4},
+        alias="PUBLISH_PLAN_WEIGHTS",
+    )
+    # Сколько назначений планировщик может держать в очереди исполнителя
+    publish_executor_max_queued: int = Field(
+        default=2000,
+        alias="PUBLISH_EXECUTOR_MAX_QUEUED",
+    )
+    # Сколько POST /reels/publish ждёт свой раунд; недоделанное
+    # исполнитель доведёт уже после ответа
+    publish_round_wait_seconds: float = Field(
+        default=600,
+        alias="PUBLISH_ROUND_WAIT_SECONDS",
+    )
+
+    # Сколько после SIGTERM ждём идущие шаги публикаций, прежде чем выйти
+    # (меньше stop_grace_period в docker-compose)
+    shutdown_drain_seconds: float = Field(
+        default=30,
+        alias="SHUTDOWN_DRAIN_SECONDS",
+    )
+
+    # Отложенные публикации
+    scheduler_enabled: bool = Field(
+        default=True,
+        alias="SCHEDULER_ENABLED",
+    )
+    # Максимальный сон планировщика: потолок задержки, если сигнал об
+    # изменении расписания (pg_notify) не дошёл — обрыв LISTEN, PgBouncer
+    scheduler_max_sleep_seconds: float = Field(
+        default=30.0,
+        alias="SCHEDULER_MAX_SLEEP_SECONDS",
+    )
+    scheduler_batch_size: int = Field(
+        default=200,
+        alias="SCHEDULER_BATCH_SIZE",
+    )
+    schedule_default_interval_minutes: int = Field(
+        default=60,
+        alias="SCHEDULE_DEFAULT_INTERVAL_MINUTES",
+    )
+
+    # Токен администратора (заголовок X-Admin-Token); если не задан — админские ручки выключены
+    admin_token: str | None = Field(
+        default=None,
+        alias="ADMIN_TOKEN",
+    )
+
+    # Профилирование запросов: доля случайно профилируемых запросов (0 — только по заголовку)
+    profiling_sample_rate: float = Field(
+        default=0.0,
+        alias="PROFILING_SAMPLE_RATE",
+    )
+    # Какие пути участвуют в случайном сэмплировании
+    profiling_paths: List[str] = ["/api/reels/publish", "/api/reels/bulk"]
+    # Интервал снятия стеков, мс
+    profiling_sample_interval_ms: float = Field(
+        default=5.0,
+        alias="PROFILING_SAMPLE_INTERVAL_MS",
+    )
+    # Куда складывать профили и сколько их хранить
+    profiling_dir: Path = Field(
+        default=BASE_DIR / "profiles",
+        alias="PROFILING_DIR",
+    )
+    profiling_max_files: int = Field(
+        default=50,
+        alias="PROFILING_MAX_FILES",
+    )
+    profiling_max_age_hours: int = Field(
+        default=24,
+        alias="PROFILING_MAX_AGE_HOURS",
+    )
+
+    # Трассировка (спаны запросов, SQL, Graph API и фоновых публикаций):
+    # none — выключена, otlp — OTLP/HTTP JSON в коллектор, file — JSON-строки в файл
+    tracing_exporter: str = Field(
+        default="none",
+        alias="TRACING_EXPORTER",
+    )
+    tracing_service_name: str = Field(
+        default="insta-poster-backend",
+        alias="TRACING_SERVICE_NAME",
+    )
+    tracing_otlp_endpoint: str = Field(
+        default="http://localhost:4318/v1/traces",
+        alias="TRACING_OTLP_ENDPOINT",
+    )
+    tracing_file_path: Path = Field(
+        default=BASE_DIR / "traces" / "spans.jsonl",
+        alias="TRACING_FILE_PATH",
+    )
+    # Доля трасс, которые экспортируются (решение принимает корневой спан)
+    tracing_sample_ratio: float = Field(
+        default=1.0,
+        alias="TRACING_SAMPLE_RATIO",
+    )
+    tracing_export_interval_seconds: float = Field(
+        default=5.0,
+        alias="TRACING_EXPORT_INTERVAL_SECONDS",
+    )
+    tracing_export_batch_size: int = Field(
+        default=512,
+        alias="TRACING_EXPORT_BATCH_SIZE",
+    )
+    # Спаны сверх очереди отбрасываются — экспорт не тормозит запросы
+    tracing_max_queue_size: int = Field(
+        default=10000,
+        alias="TRACING_MAX_QUEUE_SIZE",
+    )
+
+    # Admission control: классы ручек (auth, uploads, publish, writes, reads,
+    # media) ограничены каждый своим числом одновременных запросов, чтобы
+    # тяжёлые ручки не занимали весь пул потоков и /health, логин и чтение
+    # продолжали обслуживаться. Сверх лимита запрос ждёт в очереди класса
+    # (не дольше таймаута), а сверх очереди сразу получает 503. Класс, которого
+    # нет в ADMISSION_CONCURRENCY, не ограничивается
+    admission_enabled: bool = Field(
+        default=True,
+        alias="ADMISSION_ENABLED",
+    )
+    admission_concurrency: dict[str, int] = Field(
+        default={"auth": 8, "uploads": 4, "publish": 4, "writes": 8, "reads": 16, "media": 8},
+        alias="ADMISSION_CONCURRENCY",
+    )
+    admission_queue_size: dict[str, int] = Field(
+        default={"auth": 32, "uploads": 8, "publish": 8, "writes": 16, "reads": 64, "media": 32},
+        alias="ADMISSION_QUEUE_SIZE",
+    )
+    admission_queue_timeout_seconds: dict[str, float] = Field(
+        default={"auth": 2, "uploads": 10, "publish": 5, "writes": 5, "reads": 2, "media": 5},
+        alias="ADMISSION_QUEUE_TIMEOUT_SECONDS",
+    )
+    # Сколько запросов класса одновременно у одного пользователя; сверх — 429.
+    # Классы без записи не ограничены по пользователю
+    admission_per_user_concurrency: dict[str, int] = Field(
+        default={"uploads": 2, "publish": 2},
+        alias="ADMISSION_PER_USER_CONCURRENCY",
+    )
+    # Пул потоков для sync-ручек (по умолчанию в anyio — 40). Должен быть
+    # больше суммы ADMISSION_CONCURRENCY, иначе лимиты классов не спасут
+    # дешёвые ручки от ожидания потока
+    api_threadpool_size: int = Field(
+        default=64,
+        alias="API_THREADPOOL_SIZE",
+    )
+
+    # Миграции схемы (alembic upgrade head) на старте процесса: удобно для
+    # разработки, но каждый старт воркера API тратит на них round-trip'ы к
+    # базе. В проде — false, а миграции применяет python -m src.worker
+    # --create-schema (или alembic upgrade head)
+    db_create_schema_on_startup: bool = Field(
+        default=True,
+        alias="DB_CREATE_SCHEMA_ON_STARTUP",
+    )
+    # Выполнять задачи воркера (планировщик, recovery sweep, GC медиа,
+    # инсайты, проверка аккаунтов, компактизация ключей) в процессах API.
+    # false — их выполняет отдельный процесс python -m src.worker
+    api_run_worker_tasks: bool = Field(
+        default=True,
+        alias="API_RUN_WORKER_TASKS",
+    )
+
+    # Логи (src/core/logs.py): уровень, формат json / text и размер очереди
+    # до потока записи (0 — писать синхронно в вызывающем потоке)
+    log_level: str = Field(
+        default="INFO",
+        alias="LOG_LEVEL",
+    )
+    log_format: str = Field(
+        default="json",
+        alias="LOG_FORMAT",
+    )
+    log_queue_size: int = Field(
+        default=10000,
+        alias="LOG_QUEUE_SIZE",
+    )
+    # Доля успешных ответов Graph на чтение (опрос статуса контейнеров,
+    # проверка аккаунтов, инсайты), которые пишутся на INFO; остальные — DEBUG.
+    # Ошибки пишутся всегда
+    graph_log_read_sample_rate: float = Field(
+        default=0.01,
+        alias="GRAPH_LOG_READ_SAMPLE_RATE",
+    )
+
     # Настройки загрузки env
     model_config = SettingsConfigDict(
         env_file=ENV_FILE,
@@ -0,0 +1,172 @@
+"""
+Структурные логи через очередь.
+
+Поток, который пишет в лог (запрос, публикация), только кладёт запись в
+очередь: форматирование, JSON и запись в stdout — в отдельном потоке
+QueueListener. Очередь ограничена LOG_QUEUE_SIZE; если она заполнена,
+запись отбрасывается (счётчик dropped), а не блокирует публикацию.
+LOG_QUEUE_SIZE=0 — старое поведение, запись синхронно в вызывающем потоке.
+
+Каждая запись получает поля корреляции: trace_id / span_id текущей трассы
+и поля log_context (user_id, assignment_id, reel_id, account_id, ...) —
+они снимаются в вызывающем потоке, пока контекст ещё на месте.
+
+Аргументы сообщения форматируются в потоке-слушателе, только если это
+неизменяемые значения или LazyLogArg (например, маскирование токенов в
+src.integrations.instagram). Остальное — ORM-объекты, словари —
+форматируется сразу: их нельзя читать из другого потока.
+"""
+
+import copy
+import json
+import logging
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from src.core.config import settings
+from src.core.tracing import current_context
+
+_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+# Атрибуты LogRecord, которые не попадают в JSON как поля extra
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class LazyLogArg:
+    """Аргумент лога, который вычисляет своё представление только при записи."""
+
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        raise NotImplementedError
+
+
+_DEFERRABLE = (str, int, float, bool, type(None), LazyLogArg)
+
+
+@contextmanager
+def log_context(**fields):
+    """Поля корреляции для всех записей внутри блока (и в этом потоке)."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись trace_id, span_id и поля log_context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span_context = current_context()
+        if span_context is not None:
+            record.trace_id = span_context.trace_id
+            record.span_id = span_context.span_id
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """Неблокирующая постановка в очередь с отложенным форматированием."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        args = record.args if isinstance(record.args, tuple) else (record.args,)
+        if record.args and not all(isinstance(arg, _DEFERRABLE) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # кадры стека другому потоку не передаём — только текст
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: logging.Handler | None = None
+_listener: QueueListener | None = None
+
+
+def _formatter() -> logging.Formatter:
+    if settings.log_format.lower() == "json":
+        return JsonFormatter()
+    return logging.Formatter(_TEXT_FORMAT)
+
+
+def configure_logging(stream=None) -> logging.Handler:
+    """
+    Ставит обработчик на корневой логгер (один раз на процесс).
+    Логгеры uvicorn со своими обработчиками не трогаем.
+    """
+    global _handler, _listener
+    if _handler is not None:
+        return _handler
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(_formatter())
+    if settings.log_queue_size > 0:
+        handler = _QueueHandler(queue.Queue(settings.log_queue_size))
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = output
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+    # httpx пишет на INFO полный URL запроса, с access_token и client_secret
+    # в query; запросы к Graph и так логируются с маскированием (instagram.py)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    _handler = handler
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и снимает обработчик."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
@@ -9,5 +9,11 @@ MEDIA_ROOT = BASE_DIR / "media"
 # Папка specifically для рилсов
 REELS_ROOT = MEDIA_ROOT / "reels"
 
-# Гарантируем, что директории существуют
-REELS_ROOT.mkdir(parents=True, exist_ok=True)
+
+def ensure_media_dirs() -> None:
+    """
+    Создаёт папки медиа. Вызывается на старте процесса (lifespan, воркер),
+    а не при импорте: импорт не трогает файловую систему, и образ с
+    MEDIA_STORAGE_BACKEND=s3 не заводит пустых папок.
+    """
+    REELS_ROOT.mkdir(parents=True, exist_ok=True)
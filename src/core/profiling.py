@@ -0,0 +1,313 @@
+"""
+Профилирование отдельных запросов.
+
+Включается заголовком X-Profile (только вместе с правильным X-Admin-Token)
+или случайным сэмплированием по settings.profiling_sample_rate.
+
+Для профилируемого запроса собираем:
+- стеки потоков (stack sampling) — работает и для sync-ручек, которые
+  FastAPI выполняет в threadpool, в отличие от cProfile;
+- тайминги SQL-запросов (через события SQLAlchemy);
+- тайминги вызовов Graph API (через record_timing в интеграции).
+
+Профили пишутся JSON-файлами в settings.profiling_dir и чистятся
+по количеству и возрасту.
+"""
+
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import settings
+from src.core.security import admin_token_matches
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+# Сколько символов SQL сохраняем в профиле
+_MAX_STATEMENT_LEN = 300
+
+_current_profile: ContextVar["RequestProfile | None"] = ContextVar(
+    "current_profile",
+    default=None,
+)
+
+
+@dataclass(eq=False)
+class RequestProfile:
+    method: str
+    path: str
+    started_at: datetime
+    status_code: int | None = None
+    duration_ms: float | None = None
+    timings: list[dict] = field(default_factory=list)
+    # Потоки, в которых выполнялась работа этого запроса
+    thread_ids: set[int] = field(default_factory=set)
+    # Стеки этих потоков: поток -> collapsed stack -> число сэмплов
+    samples: dict[int, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    thread_names: dict[int, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, kind: str, name: str, duration_ms: float, **extra) -> None:
+        item = {"kind": kind, "name": name, "duration_ms": round(duration_ms, 3)}
+        item.update(extra)
+        with self._lock:
+            self.timings.append(item)
+            self.thread_ids.add(threading.get_ident())
+
+    def add_sample(self, thread_id: int, thread_name: str, stack: str) -> None:
+        with self._lock:
+            self.samples[thread_id][stack] += 1
+            self.thread_names.setdefault(thread_id, thread_name)
+
+    def collapsed(self) -> list[str]:
+        with self._lock:
+            return sorted(
+                f"{self.thread_names.get(thread_id, str(thread_id))};{stack} {count}"
+                for thread_id, counter in self.samples.items()
+                for stack, count in counter.items()
+            )
+
+
+def record_timing(kind: str, name: str, duration_ms: float, **extra) -> None:
+    """
+    Записать тайминг в профиль текущего запроса.
+    Если запрос не профилируется — ничего не делает.
+    """
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(kind, name, duration_ms, **extra)
+
+
+def is_profiling() -> bool:
+    return _current_profile.get() is not None
+
+
+class StackSampler:
+    """
+    Один поток на процесс: пока есть профилируемые запросы, снимает стеки
+    только их потоков (RequestProfile.thread_ids) и раскладывает сэмплы
+    по профилям в формате collapsed stacks (для flamegraph/speedscope).
+    Без профилируемых запросов поток спит и стеков не снимает.
+    """
+
+    def __init__(self) -> None:
+        self._profiles: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.add(profile)
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def discard(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+            if not self._profiles:
+                self._active.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            time.sleep(settings.profiling_sample_interval_ms / 1000)
+            with self._lock:
+                profiles = list(self._profiles)
+            if profiles:
+                self._sample(profiles)
+
+    @staticmethod
+    def _sample(profiles: list[RequestProfile]) -> None:
+        wanted: dict[int, list[RequestProfile]] = defaultdict(list)
+        for profile in profiles:
+            for thread_id in list(profile.thread_ids):
+                wanted[thread_id].append(profile)
+
+        frames = sys._current_frames()
+        names = None
+        for thread_id, owners in wanted.items():
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.reverse()
+            if names is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            collapsed = ";".join(stack)
+            for profile in owners:
+                profile.add_sample(thread_id, names.get(thread_id, str(thread_id)), collapsed)
+
+
+stack_sampler = StackSampler()
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers") or []:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _should_profile(scope) -> bool:
+    if _header(scope, PROFILE_HEADER) in ("1", "true", "yes"):
+        return admin_token_matches(_header(scope, ADMIN_TOKEN_HEADER))
+
+    if settings.profiling_sample_rate <= 0:
+        return False
+    path = scope.get("path", "")
+    if not any(path.startswith(prefix) for prefix in settings.profiling_paths):
+        return False
+    return random.random() < settings.profiling_sample_rate
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: решает, профилировать ли запрос, и сохраняет результат.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            method=scope.get("method", ""),
+            path=scope.get("path", ""),
+            started_at=datetime.now(timezone.utc),
+        )
+        # Поток event loop'а — здесь работают async-ручки
+        profile.thread_ids.add(threading.get_ident())
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        stack_sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            stack_sampler.discard(profile)
+            _current_profile.reset(token)
+            try:
+                await run_in_threadpool(save_profile, profile)
+            except Exception:
+                logger.exception("Не удалось сохранить профиль запроса %s", profile.path)
+
+
+def _profiles_dir() -> Path:
+    directory = Path(settings.profiling_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def save_profile(profile: RequestProfile) -> Path:
+    slug = profile.path.strip("/").replace("/", "_") or "root"
+    file_name = (
+        f"{profile.started_at.strftime('%Y%m%dT%H%M%S')}"
+        f"-{profile.method.lower()}-{slug}-{uuid4().hex[:8]}.json"
+    )
+
+    sql_ms = sum(t["duration_ms"] for t in profile.timings if t["kind"] == "sql")
+    graph_ms = sum(t["duration_ms"] for t in profile.timings if t["kind"] == "graph")
+
+    data = {
+        "method": profile.method,
+        "path": profile.path,
+        "status_code": profile.status_code,
+        "started_at": profile.started_at.isoformat(),
+        "duration_ms": round(profile.duration_ms or 0.0, 3),
+        "summary": {
+            "sql_count": sum(1 for t in profile.timings if t["kind"] == "sql"),
+            "sql_ms": round(sql_ms, 3),
+            "graph_count": sum(1 for t in profile.timings if t["kind"] == "graph"),
+            "graph_ms": round(graph_ms, 3),
+        },
+        "timings": profile.timings,
+        "sample_interval_ms": settings.profiling_sample_interval_ms,
+        "stacks": profile.collapsed(),
+    }
+
+    path = _profiles_dir() / file_name
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    prune_profiles()
+    return path
+
+
+def list_profiles() -> list[Path]:
+    """Профили от новых к старым."""
+    directory = Path(settings.profiling_dir)
+    if not directory.is_dir():
+        return []
+    files = [p for p in directory.glob("*.json") if p.is_file()]
+    return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def prune_profiles() -> None:
+    """Оставляем не больше profiling_max_files файлов и не старше profiling_max_age_hours."""
+    max_age_s = settings.profiling_max_age_hours * 3600
+    now = time.time()
+    for index, path in enumerate(list_profiles()):
+        try:
+            too_many = index >= settings.profiling_max_files
+            too_old = now - path.stat().st_mtime > max_age_s
+            if too_many or too_old:
+                path.unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Не удалось удалить старый профиль %s", path, exc_info=True)
+
+
+def install_sqlalchemy_hooks(engine: Engine) -> None:
+    """
+    Подписываемся на события движка, чтобы писать тайминги SQL
+    в профиль текущего запроса.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if is_profiling():
+            conn.info.setdefault("profiling_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("profiling_query_start")
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        record_timing("sql", statement[:_MAX_STATEMENT_LEN], duration_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("profiling_query_start") if conn is not None else None
+        if starts:
+            starts.pop()
@@ -1,7 +1,8 @@
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from jose import jwt
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
 
@@ -55,3 +56,26 @@ def create_access_token(*, subject: str, expires_minutes: int | None = None) ->
         algorithm=settings.jwt_algorithm,
     )
     return encoded_jwt
+
+
+def user_id_from_token(token: str) -> int | None:
+    """
+    id пользователя (sub) из JWT-токена.
+    None — подпись/срок не прошли проверку или sub не число.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.jwt_secret_key,
+            algorithms=[settings.jwt_algorithm],
+        )
+        return int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+def admin_token_matches(value: str | None) -> bool:
+    """X-Admin-Token совпадает с ADMIN_TOKEN (сравнение за постоянное время)."""
+    if not settings.admin_token or value is None:
+        return False
+    return hmac.compare_digest(value.encode(), settings.admin_token.encode())
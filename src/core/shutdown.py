@@ -0,0 +1,80 @@
+"""
+Плавная остановка процесса (деплой, рестарт контейнера).
+
+По SIGTERM (и SIGINT) процесс переходит в режим drain, не дожидаясь, пока
+uvicorn закроет соединения:
+
+* новые раунды публикации получают 503, планировщик и recovery sweep
+  перестают забирать назначения;
+* ждущие раунды отвечают сразу (с job_id), SSE-потоки закрываются —
+  клиенты переподключатся к другому процессу;
+* идущий шаг Graph (создание контейнера, media_publish) доделывается и
+  коммитится, после чего назначение отпускается: аренда снимается, и новый
+  процесс продолжает его сразу, а не после её истечения.
+
+На всё это есть SHUTDOWN_DRAIN_SECONDS с момента сигнала. Обработчик
+uvicorn вызывается после нашего, так что остановка сервера не меняется.
+"""
+
+import logging
+import signal
+import threading
+import time
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_draining = threading.Event()
+_deadline: float | None = None
+
+
+def begin_drain(reason: str) -> None:
+    global _deadline
+    if _draining.is_set():
+        return
+    _deadline = time.monotonic() + settings.shutdown_drain_seconds
+    _draining.set()
+    logger.info("Drain (%s): новые публикации не принимаются, ждём идущие шаги до %s с", reason, settings.shutdown_drain_seconds)
+
+
+def is_draining() -> bool:
+    return _draining.is_set()
+
+
+def drain_remaining() -> float:
+    """Сколько ещё секунд можно ждать идущие шаги; без drain — весь срок."""
+    if _deadline is None:
+        return settings.shutdown_drain_seconds
+    return max(_deadline - time.monotonic(), 0.0)
+
+
+def sleep_unless_draining(seconds: float) -> bool:
+    """Пауза, которую прерывает drain. True — начался drain."""
+    return _draining.wait(seconds)
+
+
+def install_signal_handlers() -> None:
+    """
+    Ставит обработчики SIGTERM/SIGINT поверх уже установленных (uvicorn)
+    и вызывает их следом. Работает только из главного потока.
+    """
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            previous = signal.getsignal(signum)
+            signal.signal(signum, _chained(signum, previous))
+        except ValueError:
+            # не главный поток (например, TestClient) — drain начнётся на shutdown
+            return
+
+
+def _chained(signum: int, previous):
+    def handler(received, frame) -> None:
+        begin_drain(signal.Signals(received).name)
+        if callable(previous):
+            previous(received, frame)
+        elif previous == signal.SIG_DFL:
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
+
+    return handler
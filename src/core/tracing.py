@@ -0,0 +1,439 @@
+"""
+Распределённая трассировка в духе OpenTelemetry.
+
+Спаны пишутся для каждого HTTP-запроса, SQL-запроса, вызова Graph API,
+фаз публикации и отдачи видео из /media/reels. Контекст трассы:
+
+* приходит с запросом в заголовке traceparent (W3C Trace Context);
+* переносится в задачи исполнителя публикаций (FairJob.trace_context),
+  так что фоновая публикация раунда — часть трассы POST /reels/publish;
+* уходит в URL видео для Instagram (параметр traceparent, только для
+  local-хранилища: у presigned URL S3 лишний параметр сломал бы подпись) —
+  скачивание видео Instagram'ом попадает в ту же трассу.
+
+Экспорт — пачками из фонового потока: OTLP/HTTP JSON в коллектор
+(TRACING_EXPORTER=otlp) или те же пачки JSON-строками в файл (file), их
+читает receiver otlpjsonfile коллектора. При TRACING_EXPORTER=none спаны
+не создаются вовсе.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+
+# SpanKind OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_MAX_STATEMENT_LEN = 500
+
+_MEDIA_PREFIX = "/media/reels/"
+
+
+def _enabled() -> bool:
+    return settings.tracing_exporter.lower() != "none"
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+
+_current: ContextVar[SpanContext | None] = ContextVar("trace_context", default=None)
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    """00-{trace_id}-{span_id}-{flags}; некорректное значение — None."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1], parts[2], sampled=bool(flags & 1))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    __slots__ = ("name", "context", "parent_id", "kind", "attributes", "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: str | None, kind: int, attributes: dict | None) -> None:
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.status = 0
+        self.status_message: str | None = None
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = _STATUS_ERROR
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.attributes["exception.type"] = type(exc).__name__
+        self.set_error(str(exc)[:1000])
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.context.sampled:
+            span_exporter.submit(self)
+
+
+class _NoopSpan:
+    context = None
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def start_span(
+    name: str,
+    *,
+    kind: int = KIND_INTERNAL,
+    attributes: dict | None = None,
+    parent: SpanContext | None = None,
+) -> Span | _NoopSpan:
+    """
+    Спан — потомок parent или текущего спана (без них — корень новой трассы).
+    Текущим не становится: для этого span().
+    """
+    if not _enabled():
+        return _NOOP_SPAN
+    parent = parent or _current.get()
+    if parent is None:
+        context = SpanContext(_new_id(16), _new_id(8), random.random() < settings.tracing_sample_ratio)
+        parent_id = None
+    else:
+        context = SpanContext(parent.trace_id, _new_id(8), parent.sampled)
+        parent_id = parent.span_id
+    return Span(name, context, parent_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, *, kind: int = KIND_INTERNAL, attributes: dict | None = None, parent: SpanContext | None = None):
+    """Спан на время блока; внутри он текущий, исключение помечает его ошибкой."""
+    current = start_span(name, kind=kind, attributes=attributes, parent=parent)
+    if current.context is None:
+        yield current
+        return
+    token = _current.set(current.context)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+@contextmanager
+def use_context(context: SpanContext | None):
+    """Продолжить трассу в другом потоке (контекст сохранён при постановке задачи)."""
+    if context is None:
+        yield
+        return
+    token = _current.set(context)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_context() -> SpanContext | None:
+    return _current.get()
+
+
+def current_trace_id() -> str | None:
+    context = _current.get()
+    return context.trace_id if context is not None else None
+
+
+def current_traceparent() -> str | None:
+    context = _current.get()
+    return format_traceparent(context) if context is not None else None
+
+
+# ---------------------------------------------------------------------------
+# HTTP и SQL
+# ---------------------------------------------------------------------------
+
+
+class TracingMiddleware:
+    """
+    ASGI-middleware: серверный спан на запрос. Имя — шаблон маршрута
+    (GET /api/reels/{reel_id}), у отдачи видео — GET /media/reels.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not _enabled():
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        is_media = path.startswith(_MEDIA_PREFIX)
+        parent = parse_traceparent(Headers(scope=scope).get(TRACEPARENT))
+        if is_media and parent is None:
+            # Instagram скачивает видео по URL, в который мы положили traceparent
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            parent = parse_traceparent((query.get(TRACEPARENT) or [None])[0])
+
+        method = scope.get("method", "")
+        request_span = start_span(
+            f"{method} {_MEDIA_PREFIX.rstrip('/')}" if is_media else f"{method} {path}",
+            kind=KIND_SERVER,
+            attributes={"http.method": method, "url.path": path},
+            parent=parent,
+        )
+        if is_media:
+            request_span.set_attribute("media.key", path[len(_MEDIA_PREFIX):])
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                request_span.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    request_span.set_error(f"HTTP {status_code}")
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Trace-Id", request_span.context.trace_id)
+            await send(message)
+
+        token = _current.set(request_span.context)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            request_span.record_exception(exc)
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                request_span.name = f"{method} {route.path}"
+                request_span.set_attribute("http.route", route.path)
+            request_span.end()
+
+
+def install_tracing_hooks(engine: Engine) -> None:
+    """Клиентский спан на каждый SQL-запрос движка."""
+    db_system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is None:
+            # вне трассы (фоновые задачи без спана) — не плодим корневые спаны
+            return
+        query_span = start_span(
+            statement.split(None, 1)[0].upper() if statement else "SQL",
+            kind=KIND_CLIENT,
+            attributes={"db.system": db_system, "db.statement": statement[:_MAX_STATEMENT_LEN]},
+        )
+        conn.info.setdefault("tracing_spans", []).append(query_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("tracing_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("tracing_spans") if conn is not None else None
+        if spans:
+            query_span = spans.pop()
+            query_span.record_exception(exception_context.original_exception)
+            query_span.end()
+
+
+# ---------------------------------------------------------------------------
+# Экспорт
+# ---------------------------------------------------------------------------
+
+
+def _attribute_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> dict:
+    data = {
+        "traceId": item.context.trace_id,
+        "spanId": item.context.span_id,
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [{"key": key, "value": _attribute_value(value)} for key, value in item.attributes.items()],
+        "status": {"code": item.status or _STATUS_OK},
+    }
+    if item.parent_id:
+        data["parentSpanId"] = item.parent_id
+    if item.status_message:
+        data["status"]["message"] = item.status_message
+    return data
+
+
+def _otlp_payload(spans: list[Span]) -> dict:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": settings.tracing_service_name}},
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [_otlp_span(item) for item in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """Фоновый экспорт законченных спанов пачками (BackgroundTask)."""
+
+    def __init__(self) -> None:
+        self.name = "tracing-export"
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=settings.tracing_max_queue_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._client: httpx.Client | None = None
+        self.dropped = 0
+
+    def submit(self, item: Span) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._thread is not None or not _enabled():
+            return
+        exporter = settings.tracing_exporter.lower()
+        if exporter == "otlp":
+            self._client = httpx.Client(timeout=10)
+        elif exporter == "file":
+            Path(settings.tracing_file_path).parent.mkdir(parents=True, exist_ok=True)
+        else:
+            logger.warning("Неизвестный TRACING_EXPORTER=%s, спаны не экспортируются", settings.tracing_exporter)
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.tracing_export_interval_seconds):
+            self._flush()
+        # остановка: отправляем то, что накопилось
+        self._flush()
+
+    def _flush(self) -> None:
+        while True:
+            batch = []
+            while len(batch) < settings.tracing_export_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self._export(batch)
+            except Exception:
+                logger.warning("Не удалось экспортировать спанов: %s", len(batch), exc_info=True)
+                return
+            if len(batch) < settings.tracing_export_batch_size:
+                return
+
+    def _export(self, batch: list[Span]) -> None:
+        payload = _otlp_payload(batch)
+        if self._client is not None:
+            resp = self._client.post(settings.tracing_otlp_endpoint, json=payload)
+            resp.raise_for_status()
+            return
+        with open(settings.tracing_file_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+span_exporter = SpanExporter()
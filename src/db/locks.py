@@ -0,0 +1,65 @@
+"""
+Advisory-блокировки Postgres.
+
+Работают между всеми процессами и нодами, которые ходят в одну базу.
+Используются транзакционные блокировки (pg_advisory_xact_lock): они
+снимаются сами при commit/rollback, поэтому забыть их отпустить нельзя.
+
+На других СУБД (SQLite в локальной разработке) блокировки — no-op:
+там запись и так сериализована самой базой.
+"""
+
+from enum import IntEnum
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+class LockNamespace(IntEnum):
+    """Первый ключ pg_advisory_xact_lock(int, int) — чтобы разные блокировки не пересекались."""
+
+    # Резервирование рилсов пользователя (раунд публикации, расписание)
+    USER_REELS = 1
+    # Один проход сборщика мусора медиа на все процессы
+    MEDIA_GC = 2
+    # Поиск опубликованных медиа для статистики (двигает общий курсор)
+    INSIGHTS_DISCOVERY = 3
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def advisory_xact_lock(db: Session, namespace: LockNamespace, key: int) -> None:
+    """Ждём блокировку (namespace, key) до конца текущей транзакции."""
+    if not _is_postgres(db):
+        return
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+        {"namespace": int(namespace), "key": key},
+    )
+
+
+def try_advisory_xact_lock(db: Session, namespace: LockNamespace, key: int) -> bool:
+    """Берём блокировку (namespace, key) без ожидания; False — она занята."""
+    if not _is_postgres(db):
+        return True
+    return bool(
+        db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:namespace, :key)"),
+            {"namespace": int(namespace), "key": key},
+        ).scalar()
+    )
+
+
+def lock_user_reels(db: Session, user_id: int) -> None:
+    """
+    Сериализует резервирование рилсов одного пользователя.
+
+    Внутри транзакции под этой блокировкой каждый следующий запрос видит
+    назначения, закоммиченные предыдущим держателем, поэтому два
+    параллельных раунда не возьмут один и тот же рилс. Держать её нужно
+    только на время выборки рилсов и создания назначений — сама публикация
+    идёт уже после коммита.
+    """
+    advisory_xact_lock(db, LockNamespace.USER_REELS, user_id)
@@ -0,0 +1,65 @@
+"""
+Миграции схемы (Alembic, src/db/migrations) при старте процесса.
+
+Базы, созданные create_all до появления миграций, не знают своей ревизии.
+Если таблицы alembic_version нет, а users есть: схема, уже совпадающая с
+моделями, помечается последней ревизией, любая другая — ревизией
+0001_baseline (схема до миграций) и получает все миграции после неё.
+Несколько процессов, стартующих разом, применяют миграции по очереди под
+advisory-блокировкой.
+"""
+
+import logging
+import warnings
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+
+from src.db.base import Base
+from src.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+BASELINE_REVISION = "0001_baseline"
+
+# Имя advisory-блокировки, под которой процессы по очереди применяют миграции
+_MIGRATION_LOCK = "alembic_upgrade"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def _unversioned_revision(connection) -> str:
+    import src.models  # noqa: F401  (все модели в metadata для сравнения)
+
+    context = MigrationContext.configure(connection, opts={"compare_type": False})
+    with warnings.catch_warnings():
+        # индексы по выражениям SQLite не отражает — сравниваем без них
+        warnings.simplefilter("ignore", UserWarning)
+        diff = compare_metadata(context, Base.metadata)
+    if diff:
+        return BASELINE_REVISION
+    return "head"
+
+
+def upgrade_schema(revision: str = "head") -> None:
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": _MIGRATION_LOCK})
+        config = alembic_config(connection)
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            revision_to_stamp = _unversioned_revision(connection)
+            logger.info("Схема без ревизии Alembic: помечаем её как %s", revision_to_stamp)
+            command.stamp(config, revision_to_stamp)
+        command.upgrade(config, revision)
@@ -0,0 +1,63 @@
+"""
+Окружение Alembic. Соединение берётся из config.attributes["connection"]
+(src/db/migrate.py), а при запуске из CLI — движок приложения по DATABASE_URL.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+import src.models  # noqa: F401  (все модели в metadata для autogenerate)
+from src.db.base import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _configure(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite (локальная разработка) не умеет ALTER COLUMN — autogenerate
+        # пишет такие изменения через batch-пересоздание таблицы
+        render_as_batch=connection.dialect.name == "sqlite",
+        compare_type=True,
+    )
+
+
+def run_migrations_offline() -> None:
+    from src.core.config import settings
+
+    context.configure(
+        url=settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    from src.db.session import engine
+
+    with engine.connect() as connection:
+        _configure(connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,80 @@
+"""Схема до появления миграций (как её создавал create_all)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+Базы, созданные create_all этой версии, src/db/migrate.py помечает этой
+ревизией (stamp) и дальше только накатывает новые.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "business_accounts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("external_id", sa.String(), nullable=True),
+        sa.Column("access_token", sa.Text(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_business_accounts_id", "business_accounts", ["id"])
+
+    op.create_table(
+        "reels",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("original_filename", sa.String(), nullable=False),
+        sa.Column("caption", sa.String(), nullable=True),
+        sa.Column("is_used", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_reels_id", "reels", ["id"])
+
+    op.create_table(
+        "reel_assignments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("reel_id", sa.Integer(), sa.ForeignKey("reels.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "business_account_id",
+            sa.Integer(),
+            sa.ForeignKey("business_accounts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("instagram_media_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_reel_assignments_id", "reel_assignments", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("reel_assignments")
+    op.drop_table("reels")
+    op.drop_table("business_accounts")
+    op.drop_table("users")
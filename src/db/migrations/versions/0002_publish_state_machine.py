@@ -0,0 +1,40 @@
+"""Состояние шагов публикации в reel_assignments
+
+Revision ID: 0002_publish_state_machine
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002_publish_state_machine"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # batch: SQLite не добавляет NOT NULL-колонку с DEFAULT now() через
+    # ALTER TABLE — таблица пересоздаётся; на Postgres это обычный ALTER
+    with op.batch_alter_table("reel_assignments") as batch:
+        batch.add_column(sa.Column("creation_id", sa.String(), nullable=True))
+        batch.add_column(sa.Column("container_status", sa.String(), nullable=True))
+        batch.add_column(sa.Column("attempt_count", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True))
+        batch.add_column(sa.Column("published_at", sa.DateTime(timezone=True), nullable=True))
+        batch.add_column(
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False)
+        )
+    op.create_index(
+        "ix_reel_assignments_status_next_attempt_at",
+        "reel_assignments",
+        ["status", "next_attempt_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reel_assignments_status_next_attempt_at", table_name="reel_assignments")
+    with op.batch_alter_table("reel_assignments") as batch:
+        for column in ("updated_at", "published_at", "next_attempt_at", "attempt_count", "container_status", "creation_id"):
+            batch.drop_column(column)
@@ -0,0 +1,41 @@
+"""Индексы окон квоты и ошибок аккаунтов для планировщика
+
+Revision ID: 0003_planner_windows
+Revises: 0002_publish_state_machine
+Create Date: 2026-10-19
+
+Опубликованным до появления published_at проставляется время создания:
+суточный лимит и «последняя публикация» считаются только по published_at.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003_planner_windows"
+down_revision = "0002_publish_state_machine"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.text(
+            "UPDATE reel_assignments SET published_at = created_at "
+            "WHERE status = 'published' AND published_at IS NULL"
+        )
+    )
+    op.create_index(
+        "ix_reel_assignments_account_published_at",
+        "reel_assignments",
+        ["business_account_id", "published_at"],
+    )
+    op.create_index(
+        "ix_reel_assignments_account_created_at",
+        "reel_assignments",
+        ["business_account_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reel_assignments_account_created_at", table_name="reel_assignments")
+    op.drop_index("ix_reel_assignments_account_published_at", table_name="reel_assignments")
@@ -0,0 +1,29 @@
+"""Запланированные публикации: reel_assignments.scheduled_at
+
+Revision ID: 0004_scheduled_publishing
+Revises: 0003_planner_windows
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004_scheduled_publishing"
+down_revision = "0003_planner_windows"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reel_assignments", sa.Column("scheduled_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        "ix_reel_assignments_status_scheduled_at",
+        "reel_assignments",
+        ["status", "scheduled_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reel_assignments_status_scheduled_at", table_name="reel_assignments")
+    with op.batch_alter_table("reel_assignments") as batch:
+        batch.drop_column("scheduled_at")
@@ -0,0 +1,30 @@
+"""Кэш проверки аккаунтов: business_accounts.health_*
+
+Revision ID: 0005_account_health
+Revises: 0004_scheduled_publishing
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005_account_health"
+down_revision = "0004_scheduled_publishing"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "business_accounts",
+        sa.Column("health_status", sa.String(), nullable=False, server_default="unknown"),
+    )
+    op.add_column("business_accounts", sa.Column("health_checked_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("business_accounts", sa.Column("health_error", sa.Text(), nullable=True))
+    op.add_column("business_accounts", sa.Column("health_lease_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("business_accounts") as batch:
+        for column in ("health_lease_until", "health_error", "health_checked_at", "health_status"):
+            batch.drop_column(column)
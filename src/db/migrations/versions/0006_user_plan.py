@@ -0,0 +1,23 @@
+"""Тариф пользователя для весов очереди публикаций: users.plan
+
+Revision ID: 0006_user_plan
+Revises: 0005_account_health
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006_user_plan"
+down_revision = "0005_account_health"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("plan", sa.String(), nullable=False, server_default="basic"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("plan")
@@ -0,0 +1,25 @@
+"""Раунд публикации назначения для SSE-прогресса: reel_assignments.job_id
+
+Revision ID: 0007_assignment_job_id
+Revises: 0006_user_plan
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007_assignment_job_id"
+down_revision = "0006_user_plan"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reel_assignments", sa.Column("job_id", sa.String(32), nullable=True))
+    op.create_index("ix_reel_assignments_job_id", "reel_assignments", ["job_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reel_assignments_job_id", table_name="reel_assignments")
+    with op.batch_alter_table("reel_assignments") as batch:
+        batch.drop_column("job_id")
@@ -0,0 +1,115 @@
+"""Учёт места в хранилище: reels.size_bytes, users.storage_*
+
+Revision ID: 0008_storage_quotas
+Revises: 0007_assignment_job_id
+Create Date: 2026-10-19
+
+До этой ревизии файлы лежали только на локальном диске, а reels.file_path —
+полный путь к файлу. Размеры неопубликованных рилсов берутся с диска (файла
+нет — размер 0, его потом допишет сборщик мусора), счётчик пользователя —
+сумма размеров его рилсов, как его дальше ведёт src/services/media.py.
+"""
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+from src.core.paths import REELS_ROOT
+
+revision = "0008_storage_quotas"
+down_revision = "0007_assignment_job_id"
+branch_labels = None
+depends_on = None
+
+_BATCH_SIZE = 1000
+
+reels = sa.table(
+    "reels",
+    sa.column("id", sa.Integer),
+    sa.column("user_id", sa.Integer),
+    sa.column("file_path", sa.String),
+    sa.column("size_bytes", sa.BigInteger),
+    sa.column("is_used", sa.Boolean),
+)
+users = sa.table(
+    "users",
+    sa.column("id", sa.Integer),
+    sa.column("storage_used_bytes", sa.BigInteger),
+)
+
+
+def _file_size(file_path: str) -> int:
+    path = file_path if os.path.isabs(file_path) else os.path.join(REELS_ROOT, file_path)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _backfill_reel_sizes(connection) -> None:
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(reels.c.id, reels.c.file_path)
+            .where(reels.c.id > last_id, reels.c.is_used.is_(False))
+            .order_by(reels.c.id)
+            .limit(_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        sizes = [
+            {"reel_id": row.id, "size": size}
+            for row in rows
+            if (size := _file_size(row.file_path))
+        ]
+        if sizes:
+            connection.execute(
+                reels.update()
+                .where(reels.c.id == sa.bindparam("reel_id"))
+                .values(size_bytes=sa.bindparam("size")),
+                sizes,
+            )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    op.add_column(
+        "reels",
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "users",
+        sa.Column("storage_used_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.add_column("users", sa.Column("storage_quota_bytes", sa.BigInteger(), nullable=True))
+
+    connection = op.get_bind()
+    if connection.dialect.name == "postgresql":
+        # сборщик мусора сверяет file_path с ключами хранилища в побайтовом порядке
+        op.create_index("ix_reels_file_path_c", "reels", [sa.text('file_path COLLATE "C"')])
+    else:
+        op.create_index("ix_reels_file_path", "reels", ["file_path"])
+
+    if op.get_context().as_sql:
+        # offline (--sql): размеры с диска не прочитать — их допишет сборщик мусора
+        return
+    _backfill_reel_sizes(connection)
+    used = (
+        sa.select(sa.func.coalesce(sa.func.sum(reels.c.size_bytes), 0))
+        .where(reels.c.user_id == users.c.id)
+        .scalar_subquery()
+    )
+    connection.execute(users.update().values(storage_used_bytes=used))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_reels_file_path_c", table_name="reels")
+    else:
+        op.drop_index("ix_reels_file_path", table_name="reels")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("storage_quota_bytes")
+        batch.drop_column("storage_used_bytes")
+    with op.batch_alter_table("reels") as batch:
+        batch.drop_column("size_bytes")
@@ -0,0 +1,65 @@
+"""Статистика опубликованных рилсов: media_insights, sync_cursors
+
+Revision ID: 0009_media_insights
+Revises: 0008_storage_quotas
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009_media_insights"
+down_revision = "0008_storage_quotas"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_insights",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "assignment_id",
+            sa.Integer(),
+            sa.ForeignKey("reel_assignments.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("reel_id", sa.Integer(), sa.ForeignKey("reels.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "business_account_id",
+            sa.Integer(),
+            sa.ForeignKey("business_accounts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("instagram_media_id", sa.String(), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("plays", sa.BigInteger(), nullable=True),
+        sa.Column("reach", sa.BigInteger(), nullable=True),
+        sa.Column("likes", sa.BigInteger(), nullable=True),
+        sa.Column("comments", sa.BigInteger(), nullable=True),
+        sa.Column("shares", sa.BigInteger(), nullable=True),
+        sa.Column("saved", sa.BigInteger(), nullable=True),
+        sa.Column("total_interactions", sa.BigInteger(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("next_fetch_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("fetch_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_media_insights_user_id", "media_insights", ["user_id"])
+    op.create_index("ix_media_insights_next_fetch_at", "media_insights", ["next_fetch_at"])
+    op.create_index("ix_media_insights_account_id_id", "media_insights", ["business_account_id", "id"])
+    op.create_index("ix_media_insights_reel_id_id", "media_insights", ["reel_id", "id"])
+
+    op.create_table(
+        "sync_cursors",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sync_cursors")
+    op.drop_table("media_insights")
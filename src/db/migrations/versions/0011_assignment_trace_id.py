@@ -0,0 +1,23 @@
+"""Трасса последней попытки публикации: reel_assignments.trace_id
+
+Revision ID: 0011_assignment_trace_id
+Revises: 0010_idempotency_keys
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0011_assignment_trace_id"
+down_revision = "0010_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reel_assignments", sa.Column("trace_id", sa.String(32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("reel_assignments") as batch:
+        batch.drop_column("trace_id")
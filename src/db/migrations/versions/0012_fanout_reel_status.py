@@ -0,0 +1,21 @@
+"""Цели fan-out одного рилса: индекс reel_assignments (reel_id, status)
+
+Revision ID: 0012_fanout_reel_status
+Revises: 0011_assignment_trace_id
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0012_fanout_reel_status"
+down_revision = "0011_assignment_trace_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_reel_assignments_reel_id_status", "reel_assignments", ["reel_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reel_assignments_reel_id_status", table_name="reel_assignments")
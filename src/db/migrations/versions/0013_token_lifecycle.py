@@ -0,0 +1,44 @@
+"""Жизненный цикл токенов аккаунтов: business_accounts.token_*
+
+Revision ID: 0013_token_lifecycle
+Revises: 0012_fanout_reel_status
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0013_token_lifecycle"
+down_revision = "0012_fanout_reel_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("business_accounts", sa.Column("token_expires_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("business_accounts", sa.Column("token_refresh_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("business_accounts", sa.Column("token_refreshed_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column(
+        "business_accounts",
+        sa.Column("token_status", sa.String(), nullable=False, server_default="unknown"),
+    )
+    op.add_column("business_accounts", sa.Column("token_error", sa.Text(), nullable=True))
+    op.add_column(
+        "business_accounts",
+        sa.Column("token_refresh_failures", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_business_accounts_token_refresh_at", "business_accounts", ["token_refresh_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_business_accounts_token_refresh_at", table_name="business_accounts")
+    with op.batch_alter_table("business_accounts") as batch:
+        for column in (
+            "token_refresh_failures",
+            "token_error",
+            "token_status",
+            "token_refreshed_at",
+            "token_refresh_at",
+            "token_expires_at",
+        ):
+            batch.drop_column(column)
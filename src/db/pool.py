@@ -0,0 +1,262 @@
+"""
+Метрики пулов соединений.
+
+Для каждого движка (основная база, реплики) считаем:
+
+* ожидание соединения при checkout (включая создание нового) и таймауты
+  пула — по ним видно исчерпание пула;
+* сколько соединение было на руках, по ручкам (имя функции эндпоинта) и
+  фоновым потокам;
+* утечки: соединение держат дольше DB_POOL_LEAK_THRESHOLD_SECONDS.
+  Фоновая задача находит ещё не возвращённые соединения, при checkin
+  ловятся уже вернувшиеся. С DB_POOL_LEAK_TRACEBACKS в лог пишется стек
+  места, где соединение взяли.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ASGI scope текущего запроса: после роутинга в нём есть endpoint
+_current_scope: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "db_pool_scope", default=None
+)
+
+_SAMPLE_SIZE = 1000
+_CHECKOUT_KEY = "pool_checkout"
+
+
+def _summary(values) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def _label(scope: dict | None, thread_name: str) -> str:
+    if scope is not None:
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            return getattr(endpoint, "__name__", str(endpoint))
+        return f"{scope.get('method', '')} {scope.get('path', '')}".strip()
+    # фоновые потоки: publish-3 -> publish
+    return "thread:" + re.sub(r"[-_]\d+$", "", thread_name)
+
+
+@dataclass(eq=False)
+class _Checkout:
+    started: float
+    scope: dict | None
+    thread_name: str
+    stack: list | None = None
+    reported: bool = False
+
+    def label(self) -> str:
+        # endpoint появляется в scope только после роутинга — считаем на месте
+        return _label(self.scope, self.thread_name)
+
+
+@dataclass
+class _EndpointStats:
+    checkouts: int = 0
+    total_ms: float = 0.0
+    held_ms: deque = field(default_factory=lambda: deque(maxlen=_SAMPLE_SIZE))
+
+
+class PoolMetrics:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.leaks = 0
+        self.wait_ms: deque = deque(maxlen=_SAMPLE_SIZE)
+        self.endpoints: dict[str, _EndpointStats] = {}
+        self._checked_out: dict[int, _Checkout] = {}
+        self.pool = None
+
+    def record_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.wait_ms.append(wait_ms)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        checkout = _Checkout(
+            started=time.monotonic(),
+            scope=_current_scope.get(),
+            thread_name=threading.current_thread().name,
+            stack=traceback.extract_stack()[:-3] if settings.db_pool_leak_tracebacks else None,
+        )
+        connection_record.info[_CHECKOUT_KEY] = checkout
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out[id(connection_record)] = checkout
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        checkout = connection_record.info.pop(_CHECKOUT_KEY, None)
+        if checkout is None:
+            return
+        held_ms = (time.monotonic() - checkout.started) * 1000
+        label = checkout.label()
+        with self._lock:
+            self._checked_out.pop(id(connection_record), None)
+            stats = self.endpoints.setdefault(label, _EndpointStats())
+            stats.checkouts += 1
+            stats.total_ms += held_ms
+            stats.held_ms.append(held_ms)
+        if held_ms / 1000 > settings.db_pool_leak_threshold_seconds and not checkout.reported:
+            self._report_leak(checkout, held_ms / 1000, label, returned=True)
+
+    def find_leaks(self) -> int:
+        """Соединения, которые держат дольше порога прямо сейчас."""
+        now = time.monotonic()
+        with self._lock:
+            suspects = [
+                checkout
+                for checkout in self._checked_out.values()
+                if not checkout.reported
+                and now - checkout.started > settings.db_pool_leak_threshold_seconds
+            ]
+        for checkout in suspects:
+            self._report_leak(checkout, now - checkout.started, checkout.label(), returned=False)
+        return len(suspects)
+
+    def _report_leak(self, checkout: _Checkout, held_seconds: float, label: str, *, returned: bool) -> None:
+        checkout.reported = True
+        with self._lock:
+            self.leaks += 1
+        stack = "".join(traceback.format_list(checkout.stack)) if checkout.stack else ""
+        logger.warning(
+            "Пул %s: соединение %s %.1f с (%s, поток %s)%s",
+            self.name,
+            "держали" if returned else "держат уже",
+            held_seconds,
+            label,
+            checkout.thread_name,
+            f"\nВзято здесь:\n{stack}" if stack else "",
+        )
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            endpoints = [
+                {
+                    "endpoint": label,
+                    "checkouts": stats.checkouts,
+                    "avg_held_ms": round(stats.total_ms / stats.checkouts, 2) if stats.checkouts else 0.0,
+                    **{f"held_{key}": value for key, value in _summary(stats.held_ms).items() if key != "count"},
+                }
+                for label, stats in self.endpoints.items()
+            ]
+            wait = _summary(self.wait_ms)
+            result = {
+                "name": self.name,
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "size": pool.size() if isinstance(pool, QueuePool) else None,
+                "checked_out": len(self._checked_out),
+                "overflow": pool.overflow() if isinstance(pool, QueuePool) else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "leaks": self.leaks,
+                "wait_p50_ms": wait["p50_ms"],
+                "wait_p95_ms": wait["p95_ms"],
+                "wait_max_ms": wait["max_ms"],
+            }
+        endpoints.sort(key=lambda row: row["avg_held_ms"] * row["checkouts"], reverse=True)
+        result["endpoints"] = endpoints
+        return result
+
+
+class _InstrumentedPoolMixin:
+    """Замеряет, сколько ждали соединение (в т.ч. при исчерпанном пуле)."""
+
+    metrics: PoolMetrics | None = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+    def recreate(self):
+        # пул пересоздаётся (например, после dispose) — метрики переносим
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = new_pool
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPoolMixin, NullPool):
+    pass
+
+
+_registry: dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    metrics = PoolMetrics(name)
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.metrics = metrics
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    _registry[name] = metrics
+    return metrics
+
+
+def all_pool_metrics() -> list[PoolMetrics]:
+    return list(_registry.values())
+
+
+def find_pool_leaks() -> int:
+    """Для фоновой задачи: проверить все пулы."""
+    return sum(metrics.find_leaks() for metrics in all_pool_metrics())
+
+
+class PoolContextMiddleware:
+    """ASGI-middleware: связывает checkout соединений с текущей ручкой."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
@@ -0,0 +1,242 @@
+"""
+Чтение с реплик.
+
+Безопасные read-only ручки получают сессию через get_read_db: она идёт на
+одну из здоровых реплик (по кругу), а если реплик нет, все отстают больше
+DB_REPLICA_MAX_LAG_SECONDS или недоступны — на основную базу.
+
+Read-your-writes: после успешного изменяющего запроса пользователь (id из
+Bearer-токена) DB_READ_YOUR_WRITES_SECONDS читает с основной базы — сразу
+видит то, что сам только что записал, даже если реплика ещё не догнала.
+Отметка хранится в процессе по id пользователя, так что работает и для
+клиентов без cookie; дополнительно ставится cookie с тем же сроком — она
+переносит отметку на другие процессы API для клиентов, которые её хранят.
+
+Здоровье и отставание реплик проверяет фоновая задача; у каждой реплики
+свой пул со своими размером и таймаутами.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from starlette.datastructures import Headers
+
+from src.core.config import settings
+from src.core.security import user_id_from_token
+from src.db.session import create_db_engine
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "db_rw_until"
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Отставание реплики: 0, если всё полученное уже применено (простаивающий
+# primary не должен выглядеть как отставание)
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: Engine
+    healthy: bool = False
+    lag_seconds: float | None = None
+    last_error: str | None = None
+    checked_at: datetime | None = field(default=None)
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+
+class ReplicaSet:
+    def __init__(self, replicas: list[Replica]) -> None:
+        self.name = "db-replicas"
+        self.replicas = replicas
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def choose(self) -> Engine | None:
+        """Движок здоровой реплики по кругу; None — читать с основной базы."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    if replica.engine.dialect.name == "postgresql":
+                        lag = float(connection.execute(_LAG_QUERY).scalar() or 0)
+                    else:
+                        connection.execute(text("SELECT 1"))
+                        lag = 0.0
+            except Exception as exc:
+                if replica.healthy:
+                    logger.warning("Реплика %s недоступна: %s", replica.name, exc)
+                replica.healthy = False
+                replica.lag_seconds = None
+                replica.last_error = str(exc)
+            else:
+                healthy = lag <= settings.db_replica_max_lag_seconds
+                if replica.healthy and not healthy:
+                    logger.warning("Реплика %s отстаёт на %.1f с, читаем с основной базы", replica.name, lag)
+                replica.healthy = healthy
+                replica.lag_seconds = lag
+                replica.last_error = None
+            replica.checked_at = datetime.now(timezone.utc)
+
+    def stats(self) -> list[dict]:
+        return [replica.snapshot() for replica in self.replicas]
+
+    # Фоновая проверка (BackgroundTask): запускается только если реплики заданы
+
+    def start(self) -> None:
+        if self._thread is not None or not self.replicas:
+            return
+        # до первого запроса уже знаем, какие реплики живы
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.db_replica_health_interval_seconds):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Ошибка проверки реплик")
+
+
+def _create_replicas() -> list[Replica]:
+    replicas = []
+    for index, url in enumerate(settings.database_replica_urls):
+        host = make_url(url).host or "local"
+        name = f"replica-{index}-{host}"
+        replica_engine = create_db_engine(
+            url,
+            name=name,
+            pool_size=settings.db_replica_pool_size,
+            max_overflow=settings.db_replica_max_overflow,
+            pool_timeout=settings.db_replica_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            connect_timeout=settings.db_replica_connect_timeout_seconds,
+            statement_timeout_ms=settings.db_replica_statement_timeout_ms,
+        )
+        replicas.append(Replica(name=name, engine=replica_engine))
+    return replicas
+
+
+replica_set = ReplicaSet(_create_replicas())
+
+
+class RecentWrites:
+    """Пользователи, которые недавно писали: id -> до какого момента (monotonic)."""
+
+    def __init__(self) -> None:
+        self._until: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= 1024:
+                # истёкшие отметки чистим при записи, а не отдельной задачей
+                self._until = {uid: until for uid, until in self._until.items() if until > now}
+            self._until[user_id] = now + settings.db_read_your_writes_seconds
+
+    def active(self, user_id: int) -> bool:
+        with self._lock:
+            until = self._until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+
+recent_writes = RecentWrites()
+
+
+def bearer_user_id(headers: Headers) -> int | None:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return user_id_from_token(token)
+
+
+def reads_own_writes(headers: Headers, cookies: dict[str, str]) -> bool:
+    """Пользователь запроса недавно писал — читаем с основной базы."""
+    user_id = bearer_user_id(headers)
+    if user_id is not None and recent_writes.active(user_id):
+        return True
+    try:
+        return float(cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI-middleware: на успешный изменяющий запрос отмечает пользователя в
+    recent_writes и ставит cookie — get_read_db ещё
+    DB_READ_YOUR_WRITES_SECONDS читает для него с основной базы.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope.get("method") in _SAFE_METHODS
+            or not replica_set.replicas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = bearer_user_id(Headers(scope=scope))
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                if user_id is not None:
+                    recent_writes.mark(user_id)
+                window = settings.db_read_your_writes_seconds
+                cookie = SimpleCookie()
+                cookie[READ_YOUR_WRITES_COOKIE] = str(int(time.time() + window))
+                cookie[READ_YOUR_WRITES_COOKIE]["max-age"] = window
+                cookie[READ_YOUR_WRITES_COOKIE]["path"] = "/"
+                cookie[READ_YOUR_WRITES_COOKIE]["httponly"] = True
+                cookie[READ_YOUR_WRITES_COOKIE]["samesite"] = "Lax"
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.output(header="").strip().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,28 +1,82 @@
 from sqlalchemy import create_engine
-from sqlalchemy.engine.url import make_url
+from sqlalchemy.engine.url import URL, make_url
 from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
+from src.db.pool import InstrumentedNullPool, InstrumentedQueuePool, instrument_engine
 
-# Берём URL из настроек
-raw_url = settings.database_url
 
-# Разбираем URL, чтобы можно было безопасно поменять драйвер
-url_obj = make_url(raw_url)
+def _normalize_url(raw_url: str) -> URL:
+    """
+    Если вдруг в URL указан async-драйвер (postgresql+asyncpg),
+    принудительно переключаем на обычный sync-драйвер postgresql (psycopg2)
+    """
+    url_obj = make_url(raw_url)
+    if url_obj.drivername.startswith("postgresql+"):
+        url_obj = url_obj.set(drivername="postgresql")
+    return url_obj
+
+
+def create_db_engine(
+    raw_url: str,
+    *,
+    name: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: int,
+    connect_timeout: int,
+    statement_timeout_ms: int | None = None,
+    use_pool: bool = True,
+):
+    """
+    Синхронный движок со своими размером пула и таймаутами; checkout'ы
+    пула попадают в метрики (src.db.pool) под именем name.
+
+    use_pool=False (или DB_PGBOUNCER_MODE) — без своего пула: соединения
+    держит PgBouncer. psycopg2 не использует серверные prepared statements,
+    так что transaction pooling ему не мешает; стартовый параметр options
+    PgBouncer не принимает, поэтому statement_timeout тогда не задаём.
+    """
+    url_obj = _normalize_url(raw_url)
+    engine_kwargs = {"future": True}
+    # у SQLite (локальная разработка) свой пул без этих параметров
+    if url_obj.get_backend_name() == "postgresql":
+        connect_args = {"connect_timeout": connect_timeout}
+        if not use_pool or settings.db_pgbouncer_mode:
+            engine_kwargs["poolclass"] = InstrumentedNullPool
+        else:
+            if statement_timeout_ms:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+            engine_kwargs.update(
+                poolclass=InstrumentedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=settings.db_pool_pre_ping,
+            )
+        engine_kwargs["connect_args"] = connect_args
+    else:
+        engine_kwargs["pool_pre_ping"] = settings.db_pool_pre_ping
+
+    db_engine = create_engine(url_obj, **engine_kwargs)
+    instrument_engine(db_engine, name)
+    return db_engine
 
-# Если вдруг в URL указан async-драйвер (postgresql+asyncpg),
-# принудительно переключаем на обычный sync-драйвер postgresql (psycopg2)
-if url_obj.drivername.startswith("postgresql+"):
-    url_obj = url_obj.set(drivername="postgresql")
 
-# Создаём обычный синхронный движок
-engine = create_engine(
-    url_obj,
-    pool_pre_ping=True,
-    future=True,
+# Основная база: все записи и чтения, которым нужна свежесть
+engine = create_db_engine(
+    settings.database_url,
+    name="primary",
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    connect_timeout=settings.db_connect_timeout_seconds,
 )
 
-# Фабрика сессий
+# Фабрика сессий; для чтения с реплики — SessionLocal(bind=replica_engine)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -0,0 +1,153 @@
+"""
+Circuit breaker для вызовов Graph API.
+
+closed    — запросы идут, результаты копятся в скользящем окне;
+open      — доля ошибок в окне превысила порог: запросы сразу отклоняются;
+half_open — после паузы пропускаем несколько пробных запросов:
+            успех закрывает breaker, ошибка снова открывает.
+
+Каждый allow() == True завершается record_success, record_failure или
+release (вызов не состоялся / непредвиденное исключение) — в try/finally.
+
+Состояние хранится в памяти процесса: у каждого воркера свой breaker.
+"""
+
+import threading
+import time
+from collections import deque
+
+from src.core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_ratio: float,
+        min_calls: int,
+        window_seconds: float,
+        open_seconds: float,
+        half_open_max_calls: int,
+    ) -> None:
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        # (monotonic time, успех?)
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def retry_after(self) -> float:
+        """Через сколько секунд breaker перейдёт в half_open."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        """
+        Разрешённый allow() вызов не состоялся или упал непредвиденно, и его
+        итог неизвестен: возвращаем пробный слот half_open, иначе breaker
+        навсегда останется в half_open без свободных проб.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._calls.clear()
+            self._calls.append((now, True))
+            self._prune(now)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._calls.append((now, False))
+            self._prune(now)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_ratio:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls_in_window": len(self._calls),
+                "failures_in_window": sum(1 for _, ok in self._calls if not ok),
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_ratio=settings.circuit_breaker_failure_ratio,
+                min_calls=settings.circuit_breaker_min_calls,
+                window_seconds=settings.circuit_breaker_window_seconds,
+                open_seconds=settings.circuit_breaker_open_seconds,
+                half_open_max_calls=settings.circuit_breaker_half_open_max_calls,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def all_breakers() -> list[CircuitBreaker]:
+    with _breakers_lock:
+        return list(_breakers.values())
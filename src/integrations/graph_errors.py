@@ -0,0 +1,54 @@
+"""
+Классификация ошибок Graph API по code / error_subcode.
+
+transient     — временный сбой на стороне Meta или сети, можно повторить сразу;
+throttled     — упёрлись в лимиты, повторять только после паузы;
+token_invalid — токен аккаунта истёк или отозван, повтор не поможет;
+permanent     — ошибка в запросе/данных, повтор не поможет.
+"""
+
+from enum import Enum
+
+
+class GraphErrorKind(str, Enum):
+    TRANSIENT = "transient"
+    THROTTLED = "throttled"
+    TOKEN_INVALID = "token_invalid"
+    PERMANENT = "permanent"
+
+
+# https://developers.facebook.com/docs/graph-api/guides/error-handling
+_TRANSIENT_CODES = {1, 2}
+_THROTTLED_CODES = {4, 17, 32, 341, 613, 80001, 80002, 80004}
+_TOKEN_INVALID_CODES = {102, 190}
+_TOKEN_INVALID_SUBCODES = {458, 459, 460, 463, 464, 467}
+
+# Instagram Content Publishing
+_MEDIA_NOT_READY_SUBCODE = 2207027
+_PUBLISH_LIMIT_SUBCODE = 2207042
+
+
+def parse_graph_error(body) -> tuple[int | None, int | None, bool]:
+    """Достаём (code, error_subcode, is_transient) из тела ответа."""
+    if not isinstance(body, dict):
+        return None, None, False
+    error = body.get("error")
+    if not isinstance(error, dict):
+        return None, None, False
+    return error.get("code"), error.get("error_subcode"), bool(error.get("is_transient"))
+
+
+def classify_graph_error(status_code: int | None, body) -> GraphErrorKind:
+    code, subcode, is_transient = parse_graph_error(body)
+
+    if subcode == _MEDIA_NOT_READY_SUBCODE:
+        return GraphErrorKind.TRANSIENT
+    if subcode == _PUBLISH_LIMIT_SUBCODE or code in _THROTTLED_CODES or status_code == 429:
+        return GraphErrorKind.THROTTLED
+    if code in _TOKEN_INVALID_CODES or subcode in _TOKEN_INVALID_SUBCODES:
+        return GraphErrorKind.TOKEN_INVALID
+    if is_transient or code in _TRANSIENT_CODES:
+        return GraphErrorKind.TRANSIENT
+    if status_code is None or status_code >= 500:
+        return GraphErrorKind.TRANSIENT
+    return GraphErrorKind.PERMANENT
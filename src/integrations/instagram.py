@@ -1,84 +1,591 @@
+import json
 import logging
+import random
+import re
 import time
-from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Sequence
+from urllib.parse import urlencode
 
 import httpx
 
 from src.core.config import settings
+from src.core.logs import LazyLogArg
+from src.core.profiling import record_timing
+from src.core.tracing import KIND_CLIENT, TRACEPARENT, current_traceparent, start_span
+from src.integrations.circuit_breaker import get_breaker
+from src.integrations.graph_errors import GraphErrorKind, classify_graph_error, parse_graph_error
+from src.storage import get_storage
 
 logger = logging.getLogger(__name__)
 
+# Лимит Graph API на число под-запросов в одном /batch
+GRAPH_BATCH_MAX_SIZE = 50
+
+_BATCH_TOKEN_RE = re.compile(r"(access_token=)([^&\"]{6})[^&\"]*([^&\"]{4})")
+
 
 class InstagramPublishError(Exception):
     """Ошибка при публикации рилса в Instagram."""
 
+    def __init__(
+        self,
+        message: str,
+        *,
+        kind: GraphErrorKind = GraphErrorKind.PERMANENT,
+        code: int | None = None,
+        subcode: int | None = None,
+    ) -> None:
+        super().__init__(message)
+        self.kind = kind
+        self.code = code
+        self.subcode = subcode
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in (GraphErrorKind.TRANSIENT, GraphErrorKind.THROTTLED)
+
+
+class ContainerNotReadyError(InstagramPublishError):
+    """Контейнер не успел обработаться за отведённое число проверок статуса."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, kind=GraphErrorKind.TRANSIENT)
+
 
-GRAPH_BASE_URL = f"https://graph.facebook.com/{settings.instagram_graph_api_version}"
+class CircuitOpenError(InstagramPublishError):
+    """Circuit breaker открыт — запрос в Graph API даже не отправляли."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, kind=GraphErrorKind.TRANSIENT)
+
+
+@lru_cache
+def graph_base_url() -> str:
+    """Адрес Graph API; считается при первом запросе, а не при импорте."""
+    return (
+        settings.graph_base_url
+        or f"https://graph.facebook.com/{settings.instagram_graph_api_version}"
+    ).rstrip("/")
 
 
 def _graph_url(path: str) -> str:
-    return f"{GRAPH_BASE_URL}/{path.lstrip('/')}"
+    return f"{graph_base_url()}/{path.lstrip('/')}"
 
 
-def build_video_url_for_reel(*, reel, backend_base_url: str | None = None) -> str:
+def build_video_url_for_reel(*, reel) -> str:
     """
-    Собираем публичный URL вида:
-    {backend_base_url}/media/reels/{user_id}/{filename}
+    URL, по которому Instagram заберёт видео: для local —
+    {backend_base_url}/media/reels/{user_id}/{filename}, для s3 — presigned GET.
+
+    В local-URL добавляется traceparent: скачивание видео Instagram'ом
+    попадает в трассу публикации. Presigned URL не трогаем — сломается подпись.
     """
-    base_url = (backend_base_url or settings.backend_base_url).rstrip("/")
-    file_name = Path(reel.file_path).name
-    return f"{base_url}/media/reels/{reel.user_id}/{file_name}"
+    url = get_storage().public_url(reel.file_path, user_id=reel.user_id)
+    traceparent = current_traceparent()
+    if traceparent and settings.media_storage_backend.lower() == "local":
+        url = f"{url}?{urlencode({TRACEPARENT: traceparent})}"
+    return url
 
 
-def _log_http_request(method: str, url: str, **kwargs) -> None:
-    # Логируем без токена целиком (чтобы не светить его полностью)
-    safe_kwargs = dict(kwargs)
-    data = safe_kwargs.get("data")
-    params = safe_kwargs.get("params")
+# Параметры и поля ответа, которые в логах маскируются
+_SECRET_KEYS = ("access_token", "fb_exchange_token", "client_secret")
+# Маскируются целиком: по началу и концу токена его можно найти в отладке,
+# а секрет приложения не должен попадать в лог ни в каком виде
+_HIDDEN_KEYS = ("client_secret",)
 
-    def _mask_token(obj):
-        if not isinstance(obj, dict):
-            return obj
-        masked = dict(obj)
-        token = masked.get("access_token")
-        if isinstance(token, str) and len(token) > 10:
-            masked["access_token"] = token[:6] + "..." + token[-4:]
-        return masked
 
-    if data:
-        safe_kwargs["data"] = _mask_token(data)
-    if params:
-        safe_kwargs["params"] = _mask_token(params)
+def _mask_secrets(obj: dict) -> dict:
+    masked = dict(obj)
+    for key in _SECRET_KEYS:
+        value = masked.get(key)
+        if value is None:
+            continue
+        if key in _HIDDEN_KEYS:
+            masked[key] = "***"
+        elif isinstance(value, str) and len(value) > 10:
+            masked[key] = value[:6] + "..." + value[-4:]
+        elif isinstance(value, str):
+            masked[key] = "***"
+    return masked
 
-    logger.info("Instagram API request: %s %s %s", method, url, safe_kwargs)
 
+def _mask_params(obj):
+    if not isinstance(obj, dict):
+        return obj
+    masked = _mask_secrets(obj)
+    batch = masked.get("batch")
+    if isinstance(batch, str):
+        # токены под-запросов лежат внутри JSON в relative_url / body
+        masked["batch"] = _BATCH_TOKEN_RE.sub(r"\1\2...\3", batch)
+    return masked
 
-def _log_http_response(resp: httpx.Response) -> None:
-    try:
-        json_body = resp.json()
-    except Exception:
-        json_body = resp.text
-    logger.info(
+
+class _MaskedKwargs(LazyLogArg):
+    """Параметры запроса для лога: копируются и маскируются, только если запись пишется."""
+
+    __slots__ = ("kwargs",)
+
+    def __init__(self, kwargs: dict) -> None:
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        safe_kwargs = dict(self.kwargs)
+        for key in ("data", "params"):
+            if safe_kwargs.get(key):
+                safe_kwargs[key] = _mask_params(safe_kwargs[key])
+        return str(safe_kwargs)
+
+
+class _ResponseBody(LazyLogArg):
+    """Тело ответа для лога: JSON разбирается, только если запись пишется."""
+
+    __slots__ = ("resp",)
+
+    def __init__(self, resp: httpx.Response) -> None:
+        self.resp = resp
+
+    def __str__(self) -> str:
+        try:
+            json_body = self.resp.json()
+        except Exception:
+            return self.resp.text
+        if isinstance(json_body, dict):
+            # ответ обмена токена содержит новый access_token
+            json_body = _mask_secrets(json_body)
+        return str(json_body)
+
+
+def _log_http_request(method: str, url: str, *, read_only: bool, **kwargs) -> None:
+    # чтения (опрос статуса и т.п.) — на DEBUG: их ответ и так попадёт в выборку
+    level = logging.DEBUG if read_only else logging.INFO
+    if logger.isEnabledFor(level):
+        logger.log(level, "Instagram API request: %s %s %s", method, url, _MaskedKwargs(kwargs))
+
+
+def _log_http_response(resp: httpx.Response, *, read_only: bool, elapsed_ms: float) -> None:
+    if resp.status_code >= 400:
+        level = logging.WARNING
+    elif read_only and random.random() >= settings.graph_log_read_sample_rate:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
         "Instagram API response: status=%s body=%s",
         resp.status_code,
-        json_body,
+        _ResponseBody(resp),
+        extra={
+            "graph_method": resp.request.method,
+            "graph_path": resp.request.url.path,
+            "graph_status": resp.status_code,
+            "graph_ms": round(elapsed_ms, 1),
+        },
     )
 
 
-def publish_reel_to_instagram(*, reel, account) -> str:
+def _graph_request(
+    method: str,
+    url: str,
+    *,
+    timeout: float,
+    read_only: bool | None = None,
+    **kwargs,
+) -> httpx.Response:
     """
-    Полный цикл публикации рилса в Instagram:
-    1. Создаём media container (media_type=REELS, video_url=...).
-    2. Ждём, пока status_code станет FINISHED.
-    3. Делаем media_publish и получаем ig_media_id.
-    Возвращает ig_media_id.
+    Единая точка вызова Graph API: логирование запроса/ответа, тайминг
+    и клиентский спан трассы. read_only (по умолчанию — GET) — запрос
+    только читает: успешные ответы пишутся в лог выборочно.
+    Сетевые ошибки (httpx.RequestError) пробрасываются вызывающему.
+    """
+    if read_only is None:
+        read_only = method == "GET"
+    _log_http_request(method, url, read_only=read_only, **kwargs)
+
+    path = httpx.URL(url).path
+    graph_span = start_span(
+        f"graph {method} {path}",
+        kind=KIND_CLIENT,
+        attributes={"http.method": method, "url.path": path, "peer.service": "instagram-graph"},
+    )
+    started = time.perf_counter()
+    status_code = None
+    try:
+        resp = httpx.request(method, url, timeout=timeout, **kwargs)
+        status_code = resp.status_code
+    except Exception as exc:
+        graph_span.record_exception(exc)
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        record_timing(
+            "graph",
+            f"{method} {path}",
+            elapsed_ms,
+            status_code=status_code,
+        )
+        graph_span.set_attribute("http.status_code", status_code)
+        if status_code is not None and status_code >= 400:
+            graph_span.set_error(f"HTTP {status_code}")
+        graph_span.end()
+
+    _log_http_response(resp, read_only=read_only, elapsed_ms=elapsed_ms)
+    return resp
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full jitter: случайная пауза от 0 до base * 2^attempt, но не больше max."""
+    cap = min(
+        settings.graph_retry_max_delay_seconds,
+        settings.graph_retry_base_delay_seconds * 2 ** attempt,
+    )
+    return random.uniform(0, cap)
+
+
+def _breakers_for(account) -> list:
+    breakers = [get_breaker("app")]
+    if account is not None:
+        breakers.append(get_breaker(f"account:{account.id}"))
+    return breakers
+
+
+def _graph_call(
+    method: str,
+    url: str,
+    *,
+    action: str,
+    account=None,
+    timeout: float,
+    retry: bool = True,
+    **kwargs,
+) -> dict:
     """
+    Вызов Graph API с circuit breaker'ом (на приложение и на аккаунт)
+    и повтором временных ошибок с экспоненциальной паузой и джиттером.
+
+    Возвращает JSON успешного ответа. Ошибки — InstagramPublishError
+    с kind: transient / throttled / token_invalid / permanent.
+    retry=False — для неидемпотентных вызовов (media_publish).
+    """
+    breakers = _breakers_for(account)
+    max_attempts = settings.graph_retry_max_attempts if retry else 1
+
+    for attempt in range(1, max_attempts + 1):
+        allowed = []
+        for breaker in breakers:
+            if not breaker.allow():
+                # пробный слот, уже взятый у предыдущего breaker'а, не пропадает
+                for taken in allowed:
+                    taken.release()
+                raise CircuitOpenError(
+                    f"Graph API временно отключён circuit breaker'ом {breaker.name} ({action}), "
+                    f"повтор через {breaker.retry_after():.0f}с"
+                )
+            allowed.append(breaker)
+
+        cause = None
+        recorded = False
+        try:
+            try:
+                resp = _graph_request(method, url, timeout=timeout, **kwargs)
+            except httpx.RequestError as exc:
+                logger.warning("Ошибка сети при запросе к Graph API (%s): %s", action, exc)
+                cause = exc
+                error = InstagramPublishError(
+                    f"Ошибка сети ({action}): {exc}",
+                    kind=GraphErrorKind.TRANSIENT,
+                )
+            else:
+                try:
+                    body = resp.json()
+                except Exception:
+                    body = {"raw": resp.text}
+
+                if resp.status_code == 200:
+                    for breaker in breakers:
+                        breaker.record_success()
+                    recorded = True
+                    return body
+
+                code, subcode, _ = parse_graph_error(body)
+                error = InstagramPublishError(
+                    f"Ошибка Graph API ({action}): status={resp.status_code}, body={body}",
+                    kind=classify_graph_error(resp.status_code, body),
+                    code=code,
+                    subcode=subcode,
+                )
+
+            if error.retryable:
+                for breaker in breakers:
+                    breaker.record_failure()
+            else:
+                # Graph ответил осмысленной ошибкой на наш запрос — сам сервис жив
+                for breaker in breakers:
+                    breaker.record_success()
+            recorded = True
+        finally:
+            if not recorded:
+                # непредвиденное исключение: итог вызова неизвестен
+                for breaker in breakers:
+                    breaker.release()
+
+        if error.kind != GraphErrorKind.TRANSIENT or attempt == max_attempts:
+            raise error from cause
+
+        delay = _backoff_delay(attempt)
+        logger.warning(
+            "Временная ошибка Graph API (%s), повтор %s/%s через %.2fс: %s",
+            action,
+            attempt + 1,
+            max_attempts,
+            delay,
+            error,
+        )
+        time.sleep(delay)
+
+    raise AssertionError("unreachable")
+
+
+@dataclass
+class GraphRequest:
+    """
+    Один запрос к Graph API от имени аккаунта. Может уйти как отдельный
+    HTTP-запрос или как под-запрос /batch — со своим access_token.
+    """
+
+    method: str
+    path: str
+    account: object
+    params: dict = field(default_factory=dict)
+
+    def call_kwargs(self) -> dict:
+        params = {**self.params, "access_token": self.account.access_token}
+        if self.method == "GET":
+            return {"params": params}
+        return {"data": params}
+
+    def to_batch_item(self) -> dict:
+        encoded = urlencode({**self.params, "access_token": self.account.access_token})
+        if self.method == "GET":
+            return {"method": "GET", "relative_url": f"{self.path}?{encoded}"}
+        return {"method": self.method, "relative_url": self.path, "body": encoded}
+
+
+# Результат элемента пачки: JSON успешного ответа или ошибка именно этого элемента
+BatchResult = dict | InstagramPublishError
+
+
+def _batch_item_result(response, *, action: str) -> BatchResult:
+    if response is None:
+        # Graph не успел выполнить под-запрос в рамках batch — можно повторить
+        return InstagramPublishError(
+            f"Graph API не выполнил под-запрос batch ({action})",
+            kind=GraphErrorKind.TRANSIENT,
+        )
+
+    raw_body = response.get("body")
+    try:
+        body = json.loads(raw_body) if raw_body else {}
+    except ValueError:
+        body = {"raw": raw_body}
+
+    status_code = response.get("code")
+    if status_code == 200:
+        return body
+
+    code, subcode, _ = parse_graph_error(body)
+    return InstagramPublishError(
+        f"Ошибка Graph API ({action}): status={status_code}, body={body}",
+        kind=classify_graph_error(status_code, body),
+        code=code,
+        subcode=subcode,
+    )
+
+
+def _send_individually(requests: Sequence[GraphRequest], *, action: str, timeout: float) -> list[BatchResult]:
+    results: list[BatchResult] = []
+    for request in requests:
+        try:
+            body = _graph_call(
+                request.method,
+                _graph_url(request.path),
+                action=action,
+                # circuit breaker аккаунта обновляет graph_batch
+                retry=False,
+                timeout=timeout,
+                **request.call_kwargs(),
+            )
+        except InstagramPublishError as exc:
+            results.append(exc)
+        else:
+            results.append(body)
+    return results
+
+
+def _send_batch(requests: Sequence[GraphRequest], *, action: str, timeout: float) -> list[BatchResult]:
+    """Один POST /batch. Ошибка самого batch-запроса — ошибка каждого элемента."""
+    top_level_token = settings.graph_batch_access_token or requests[0].account.access_token
+    try:
+        responses = _graph_call(
+            "POST",
+            graph_base_url() + "/",
+            action=f"batch из {len(requests)}: {action}",
+            retry=False,
+            # опрос статусов пачкой — тоже чтение, хоть и POST
+            read_only=all(request.method == "GET" for request in requests),
+            data={
+                "batch": json.dumps([request.to_batch_item() for request in requests]),
+                "include_headers": "false",
+                "access_token": top_level_token,
+            },
+            timeout=timeout,
+        )
+    except InstagramPublishError as exc:
+        if exc.kind == GraphErrorKind.TOKEN_INVALID and settings.graph_batch_access_token is None:
+            # Не принят токен первого аккаунта, которым подписан сам batch, —
+            # это не повод ронять остальные аккаунты пачки
+            return _send_individually(requests, action=action, timeout=timeout)
+        return [exc] * len(requests)
+
+    if not isinstance(responses, list) or len(responses) != len(requests):
+        error = InstagramPublishError(
+            f"Неожиданный ответ Graph API на batch ({action}): {responses}",
+            kind=GraphErrorKind.TRANSIENT,
+        )
+        return [error] * len(requests)
+
+    return [_batch_item_result(response, action=action) for response in responses]
+
+
+def _batch_chunks(requests: Sequence[GraphRequest], indices: list[int], batch_size: int) -> list[list[int]]:
+    """
+    Пачки для /batch. Без GRAPH_BATCH_ACCESS_TOKEN сам batch подписывается
+    токеном первого аккаунта пачки, поэтому в одну пачку попадают только
+    аккаунты одного пользователя: чужой токен не подписывает его запросы.
+    """
+    if settings.graph_batch_access_token:
+        groups = [indices]
+    else:
+        by_user: dict[int, list[int]] = {}
+        for index in indices:
+            by_user.setdefault(requests[index].account.user_id, []).append(index)
+        groups = list(by_user.values())
+    return [
+        group[start:start + batch_size]
+        for group in groups
+        for start in range(0, len(group), batch_size)
+    ]
+
+
+def graph_batch(
+    requests: Sequence[GraphRequest],
+    *,
+    action: str,
+    retry: bool = True,
+    timeout: float = 120,
+) -> list[BatchResult]:
+    """
+    Выполняет запросы через Graph /batch пачками по graph_batch_size
+    (не больше 50). Возвращает результаты в порядке запросов; ошибка
+    одного элемента не влияет на остальные.
+
+    Элементы с временной ошибкой повторяются следующими пачками с той же
+    паузой, что и в _graph_call; retry=False — для media_publish.
+    Circuit breaker аккаунта проверяется и обновляется по каждому элементу.
+    """
+    batch_size = max(1, min(settings.graph_batch_size, GRAPH_BATCH_MAX_SIZE))
+    max_attempts = settings.graph_retry_max_attempts if retry else 1
+
+    results: list[BatchResult | None] = [None] * len(requests)
+    pending = list(range(len(requests)))
+
+    for attempt in range(1, max_attempts + 1):
+        to_send = []
+        for index in pending:
+            breaker = get_breaker(f"account:{requests[index].account.id}")
+            if breaker.allow():
+                to_send.append(index)
+            else:
+                results[index] = CircuitOpenError(
+                    f"Graph API временно отключён circuit breaker'ом {breaker.name} ({action}), "
+                    f"повтор через {breaker.retry_after():.0f}с"
+                )
+
+        unrecorded = set(to_send)
+        try:
+            for chunk in _batch_chunks(requests, to_send, batch_size):
+                chunk_results = _send_batch([requests[index] for index in chunk], action=action, timeout=timeout)
+                for index, result in zip(chunk, chunk_results):
+                    results[index] = result
+                    breaker = get_breaker(f"account:{requests[index].account.id}")
+                    if isinstance(result, CircuitOpenError):
+                        # открыт breaker приложения: запрос не отправлялся,
+                        # об аккаунте он ничего не говорит
+                        breaker.release()
+                    elif isinstance(result, InstagramPublishError) and result.retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    unrecorded.discard(index)
+        finally:
+            # непредвиденное исключение: пробные слоты неотправленных элементов возвращаем
+            for index in unrecorded:
+                get_breaker(f"account:{requests[index].account.id}").release()
+
+        pending = [
+            index
+            for index in to_send
+            if isinstance(results[index], InstagramPublishError)
+            and results[index].kind == GraphErrorKind.TRANSIENT
+        ]
+        if not pending or attempt == max_attempts:
+            break
+
+        delay = _backoff_delay(attempt)
+        logger.warning(
+            "Временные ошибки в batch (%s): %s шт., повтор %s/%s через %.2fс",
+            action,
+            len(pending),
+            attempt + 1,
+            max_attempts,
+            delay,
+        )
+        time.sleep(delay)
+
+    return results
+
+
+def _ensure_account_ready(account) -> None:
     if not account.external_id:
         raise InstagramPublishError("У бизнес-аккаунта не заполнен external_id (IG user id)")
 
     if not account.access_token:
-        raise InstagramPublishError("У бизнес-аккаунта не заполнен access_token")
+        raise InstagramPublishError(
+            "У бизнес-аккаунта не заполнен access_token",
+            kind=GraphErrorKind.TOKEN_INVALID,
+        )
 
+    # срок известен и прошёл — Graph всё равно ответит 190, не тратим запрос
+    expires_at = getattr(account, "token_expires_at", None)
+    if expires_at is not None:
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= datetime.now(timezone.utc):
+            raise InstagramPublishError(
+                f"Срок действия access_token истёк {expires_at.isoformat()}",
+                kind=GraphErrorKind.TOKEN_INVALID,
+            )
+
+
+def _account_check_request(account) -> GraphRequest:
+    return GraphRequest("GET", account.external_id, account, {"fields": "id"})
+
+
+def _create_container_request(reel, account) -> GraphRequest:
     video_url = build_video_url_for_reel(reel=reel)
     logger.info(
         "Старт публикации рилса: reel_id=%s user_id=%s account_id=%s ig_user_id=%s video_url=%s",
@@ -86,42 +593,124 @@ def publish_reel_to_instagram(*, reel, account) -> str:
         reel.user_id,
         account.id,
         account.external_id,
-        video_url,
+        # подпись presigned URL в лог не пишем
+        video_url.split("?", 1)[0],
+    )
+    return GraphRequest(
+        "POST",
+        f"{account.external_id}/media",
+        account,
+        {
+            "media_type": "REELS",
+            "video_url": video_url,
+            "caption": "",
+            "share_to_feed": "true",
+        },
     )
 
-    # 1. Создание media container
-    create_url = _graph_url(f"{account.external_id}/media")
-    create_data = {
-        "media_type": "REELS",
-        "video_url": video_url,
-        "caption": "",
-        "share_to_feed": "true",
-        "access_token": account.access_token,
-    }
 
-    _log_http_request("POST", create_url, data=create_data)
+def _container_status_request(creation_id: str, account) -> GraphRequest:
+    return GraphRequest("GET", creation_id, account, {"fields": "status_code"})
 
-    try:
-        create_resp = httpx.post(create_url, data=create_data, timeout=60)
-    except httpx.RequestError as exc:
-        logger.exception("Ошибка сети при создании media container: %s", exc)
-        raise InstagramPublishError(f"Ошибка сети при создании media container: {exc}") from exc
 
-    _log_http_response(create_resp)
+def _publish_request(creation_id: str, account) -> GraphRequest:
+    return GraphRequest(
+        "POST",
+        f"{account.external_id}/media_publish",
+        account,
+        {"creation_id": creation_id},
+    )
 
-    try:
-        create_body = create_resp.json()
-    except Exception:
-        create_body = {"raw": create_resp.text}
 
-    if create_resp.status_code != 200:
+def _call(request: GraphRequest, *, action: str, timeout: float, retry: bool = True) -> dict:
+    return _graph_call(
+        request.method,
+        _graph_url(request.path),
+        action=action,
+        account=request.account,
+        retry=retry,
+        timeout=timeout,
+        **request.call_kwargs(),
+    )
+
+
+def _verify_account_body(account, body: dict) -> None:
+    if str(body.get("id")) != str(account.external_id):
         raise InstagramPublishError(
-            f"Ошибка создания media container: status={create_resp.status_code}, body={create_body}"
+            f"Токен выдан не для аккаунта {account.external_id}: {body}"
         )
 
-    creation_id = create_body.get("id")
+
+def _creation_id_from(body: dict) -> str:
+    creation_id = body.get("id")
     if not creation_id:
-        raise InstagramPublishError(f"В ответе на создание контейнера нет id: {create_body}")
+        raise InstagramPublishError(f"В ответе на создание контейнера нет id: {body}")
+    return creation_id
+
+
+def _media_id_from(body: dict) -> str:
+    ig_media_id = body.get("id")
+    if not ig_media_id:
+        raise InstagramPublishError(f"В ответе media_publish нет id: {body}")
+    return ig_media_id
+
+
+def check_account_token(account) -> None:
+    """
+    Проверка аккаунта без публикации: GET /{ig_user_id}?fields=id.
+    Токен должен быть рабочим и иметь доступ именно к этому IG-аккаунту.
+    """
+    _ensure_account_ready(account)
+
+    body = _call(
+        _account_check_request(account),
+        action=f"проверка аккаунта {account.external_id}",
+        timeout=30,
+    )
+    _verify_account_body(account, body)
+
+
+def exchange_long_lived_token(account) -> tuple[str, int | None]:
+    """
+    Обмен действующего долгоживущего токена на новый:
+    GET /oauth/access_token?grant_type=fb_exchange_token.
+    Возвращает (токен, срок жизни в секундах); срок None — Graph его не
+    вернул (бессрочный токен страницы).
+    """
+    body = _graph_call(
+        "GET",
+        _graph_url("oauth/access_token"),
+        action=f"обновление токена аккаунта {account.id}",
+        account=account,
+        timeout=30,
+        params={
+            "grant_type": "fb_exchange_token",
+            "client_id": settings.instagram_app_id,
+            "client_secret": settings.instagram_app_secret,
+            "fb_exchange_token": account.access_token,
+        },
+    )
+    token = body.get("access_token")
+    if not token:
+        raise InstagramPublishError("В ответе обмена токена нет access_token")
+    expires_in = body.get("expires_in")
+    return token, int(expires_in) if expires_in else None
+
+
+def create_media_container(*, reel, account) -> str:
+    """
+    Шаг 1: создаём media container (media_type=REELS, video_url=...).
+    Возвращает creation_id. Повтор безопасен: лишний неопубликованный
+    контейнер просто протухнет.
+    """
+    _ensure_account_ready(account)
+
+    create_body = _call(
+        _create_container_request(reel, account),
+        action="создание media container",
+        timeout=60,
+    )
+    creation_id = _creation_id_from(create_body)
 
     logger.info(
         "Media container создан: creation_id=%s reel_id=%s account_id=%s",
@@ -129,102 +718,242 @@ def publish_reel_to_instagram(*, reel, account) -> str:
         reel.id,
         account.id,
     )
+    return creation_id
 
-    # 2. Ожидание обработки контейнера
-    status_url = _graph_url(creation_id)
-    max_attempts = 10
 
-    for attempt in range(1, max_attempts + 1):
-        params = {
-            "fields": "status_code",
-            "access_token": account.access_token,
-        }
-        _log_http_request("GET", status_url, params=params)
-
-        try:
-            status_resp = httpx.get(status_url, params=params, timeout=30)
-        except httpx.RequestError as exc:
-            logger.exception(
-                "Ошибка сети при проверке статуса контейнера %s: %s",
-                creation_id,
-                exc,
-            )
-            raise InstagramPublishError(
-                f"Ошибка сети при проверке статуса контейнера {creation_id}: {exc}"
-            ) from exc
+def get_container_status(*, creation_id: str, account) -> str | None:
+    """
+    Один запрос статуса контейнера.
+    Возвращает status_code: IN_PROGRESS / FINISHED / PUBLISHED / ERROR / EXPIRED.
+    """
+    status_body = _call(
+        _container_status_request(creation_id, account),
+        action=f"проверка статуса контейнера {creation_id}",
+        timeout=30,
+    )
+    return status_body.get("status_code")
 
-        _log_http_response(status_resp)
 
-        try:
-            status_body = status_resp.json()
-        except Exception:
-            status_body = {"raw": status_resp.text}
+def wait_for_container(*, creation_id: str, account) -> str:
+    """
+    Шаг 2: ждём, пока контейнер обработается.
+    Возвращает FINISHED, PUBLISHED или EXPIRED.
+    ERROR -> InstagramPublishError, таймаут -> ContainerNotReadyError.
+    """
+    max_attempts = settings.instagram_status_poll_max_attempts
 
-        status_code = status_body.get("status_code")
+    for attempt in range(1, max_attempts + 1):
+        status_code = get_container_status(creation_id=creation_id, account=account)
         logger.info(
-            "Статус контейнера %s: попытка=%s status_code=%s body=%s",
+            "Статус контейнера %s: попытка=%s status_code=%s",
             creation_id,
             attempt,
             status_code,
-            status_body,
         )
 
-        if status_code == "FINISHED":
-            break
+        if status_code in ("FINISHED", "PUBLISHED", "EXPIRED"):
+            return status_code
         if status_code == "ERROR":
             raise InstagramPublishError(
-                f"Instagram вернул статус ERROR для контейнера {creation_id}: {status_body}"
+                f"Instagram вернул статус ERROR для контейнера {creation_id}"
             )
 
-        time.sleep(5)
-    else:
-        # цикл закончился без break
-        raise InstagramPublishError(
-            f"Таймаут ожидания обработки контейнера {creation_id}"
-        )
+        if attempt < max_attempts:
+            time.sleep(settings.instagram_status_poll_interval_seconds)
 
-    # 3. Публикация контейнера
-    publish_url = _graph_url(f"{account.external_id}/media_publish")
-    publish_data = {
-        "creation_id": creation_id,
-        "access_token": account.access_token,
-    }
+    raise ContainerNotReadyError(
+        f"Таймаут ожидания обработки контейнера {creation_id}"
+    )
 
-    _log_http_request("POST", publish_url, data=publish_data)
 
-    try:
-        publish_resp = httpx.post(publish_url, data=publish_data, timeout=60)
-    except httpx.RequestError as exc:
-        logger.exception(
-            "Ошибка сети при media_publish для контейнера %s: %s",
-            creation_id,
-            exc,
-        )
-        raise InstagramPublishError(
-            f"Ошибка сети при media_publish для контейнера {creation_id}: {exc}"
-        ) from exc
+def publish_media_container(*, creation_id: str, account) -> str:
+    """
+    Шаг 3: media_publish. Возвращает ig_media_id.
+    Не повторяется автоматически: при потерянном ответе рилс мог уже выйти,
+    это разруливает src.services.publisher по статусу контейнера.
+    """
+    _ensure_account_ready(account)
+
+    publish_body = _call(
+        _publish_request(creation_id, account),
+        action=f"media_publish для контейнера {creation_id}",
+        retry=False,
+        timeout=60,
+    )
+    ig_media_id = _media_id_from(publish_body)
+
+    logger.info(
+        "Успешная публикация контейнера: creation_id=%s account_id=%s ig_media_id=%s",
+        creation_id,
+        account.id,
+        ig_media_id,
+    )
+    return ig_media_id
+
 
-    _log_http_response(publish_resp)
+# ---------------------------------------------------------------------------
+# Пакетные варианты шагов: один /batch на до 50 аккаунтов.
+# Возвращают по результату на каждый входной элемент, в том же порядке:
+# значение или InstagramPublishError этого элемента.
+# ---------------------------------------------------------------------------
 
+
+def _run_batch(requests, convert, *, action: str, retry: bool = True) -> list:
+    """
+    requests — GraphRequest или уже готовая ошибка (аккаунт не заполнен).
+    convert превращает JSON ответа в результат и может сам бросить ошибку.
+    """
+    to_send = [request for request in requests if isinstance(request, GraphRequest)]
+    responses = iter(graph_batch(to_send, action=action, retry=retry))
+
+    results = []
+    for request in requests:
+        if not isinstance(request, GraphRequest):
+            results.append(request)
+            continue
+        response = next(responses)
+        if isinstance(response, InstagramPublishError):
+            results.append(response)
+            continue
+        try:
+            results.append(convert(request, response))
+        except InstagramPublishError as exc:
+            results.append(exc)
+    return results
+
+
+def _prepare(account, build, *args):
     try:
-        publish_body = publish_resp.json()
-    except Exception:
-        publish_body = {"raw": publish_resp.text}
+        _ensure_account_ready(account)
+    except InstagramPublishError as exc:
+        return exc
+    return build(*args)
 
-    if publish_resp.status_code != 200:
-        raise InstagramPublishError(
-            f"Ошибка media_publish: status={publish_resp.status_code}, body={publish_body}"
-        )
 
-    ig_media_id = publish_body.get("id")
-    if not ig_media_id:
-        raise InstagramPublishError(f"В ответе media_publish нет id: {publish_body}")
+def check_account_tokens(accounts: Sequence) -> list[None | InstagramPublishError]:
+    """Пакетный check_account_token: None — аккаунт в порядке."""
+    requests = [_prepare(account, _account_check_request, account) for account in accounts]
+
+    def convert(request: GraphRequest, body: dict) -> None:
+        _verify_account_body(request.account, body)
+
+    return _run_batch(requests, convert, action="проверка аккаунтов")
+
+
+def create_media_containers(pairs: Sequence[tuple]) -> list[str | InstagramPublishError]:
+    """Пакетный create_media_container для пар (reel, account)."""
+    requests = [
+        _prepare(account, _create_container_request, reel, account)
+        for reel, account in pairs
+    ]
+
+    def convert(request: GraphRequest, body: dict) -> str:
+        return _creation_id_from(body)
 
+    results = _run_batch(requests, convert, action="создание media container")
     logger.info(
-        "Успешная публикация рилса: reel_id=%s account_id=%s ig_media_id=%s",
-        reel.id,
-        account.id,
-        ig_media_id,
+        "Media containers созданы batch-запросом: %s из %s",
+        sum(isinstance(result, str) for result in results),
+        len(results),
     )
+    return results
 
-    return ig_media_id
+
+def get_container_statuses(items: Sequence[tuple]) -> list[str | None | InstagramPublishError]:
+    """Пакетный get_container_status для пар (creation_id, account)."""
+    requests = [_container_status_request(creation_id, account) for creation_id, account in items]
+
+    def convert(request: GraphRequest, body: dict) -> str | None:
+        return body.get("status_code")
+
+    return _run_batch(requests, convert, action="проверка статуса контейнеров")
+
+
+def publish_media_containers(items: Sequence[tuple]) -> list[str | InstagramPublishError]:
+    """
+    Пакетный publish_media_container для пар (creation_id, account).
+    Как и одиночный вызов, не повторяется автоматически.
+    """
+    requests = [
+        _prepare(account, _publish_request, creation_id, account)
+        for creation_id, account in items
+    ]
+
+    def convert(request: GraphRequest, body: dict) -> str:
+        return _media_id_from(body)
+
+    return _run_batch(requests, convert, action="media_publish", retry=False)
+
+
+def _media_insights_request(media_ids: Sequence[str], account, metrics: Sequence[str]) -> GraphRequest:
+    # multi-id: статистика нескольких медиа одного аккаунта одним запросом
+    return GraphRequest(
+        "GET",
+        "",
+        account,
+        {"ids": ",".join(media_ids), "fields": f"insights.metric({','.join(metrics)})"},
+    )
+
+
+def _metric_value(item: dict) -> int | None:
+    values = item.get("values")
+    if values:
+        return values[0].get("value")
+    total = item.get("total_value")
+    if total:
+        return total.get("value")
+    return None
+
+
+def _insights_from(body: dict, media_ids: Sequence[str]) -> dict[str, dict[str, int | None]]:
+    result = {}
+    for media_id in media_ids:
+        media = body.get(media_id)
+        if not isinstance(media, dict):
+            raise InstagramPublishError(f"В ответе insights нет медиа {media_id}: {body}")
+        items = (media.get("insights") or {}).get("data") or []
+        result[media_id] = {item.get("name"): _metric_value(item) for item in items}
+    return result
+
+
+def get_media_insights(
+    items: Sequence[tuple[Sequence[str], object]],
+    metrics: Sequence[str],
+) -> list[dict[str, dict[str, int | None]] | InstagramPublishError]:
+    """
+    Статистика медиа для пар (media_ids, account): каждая пара — один
+    multi-id запрос (до 50 медиа одного аккаунта), пары уходят через /batch.
+    Результат пары — {media_id: {metric: value}} или ошибка всего запроса
+    (Graph не отдаёт multi-id частично: одно удалённое медиа — ошибка всех).
+    """
+    requests = [
+        _prepare(account, _media_insights_request, media_ids, account, metrics)
+        for media_ids, account in items
+    ]
+
+    def convert(request: GraphRequest, body: dict) -> dict:
+        return _insights_from(body, request.params["ids"].split(","))
+
+    return _run_batch(requests, convert, action="статистика медиа")
+
+
+def publish_reel_to_instagram(*, reel, account) -> str:
+    """
+    Полный цикл публикации рилса в Instagram за один вызов:
+    1. Создаём media container (media_type=REELS, video_url=...).
+    2. Ждём, пока status_code станет FINISHED.
+    3. Делаем media_publish и получаем ig_media_id.
+    Возвращает ig_media_id.
+
+    Промежуточные шаги нигде не сохраняются — для публикации с
+    возобновлением после падения используйте src.services.publisher.
+    """
+    creation_id = create_media_container(reel=reel, account=account)
+
+    container_status = wait_for_container(creation_id=creation_id, account=account)
+    if container_status != "FINISHED":
+        raise InstagramPublishError(
+            f"Контейнер {creation_id} в неожиданном статусе {container_status}"
+        )
+
+    return publish_media_container(creation_id=creation_id, account=account)
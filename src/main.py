@@ -1,14 +1,68 @@
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
+from src.api.admin import router as admin_router
 from src.api.auth import router as auth_router
+from src.api.insights import router as insights_router
 from src.api.accounts import router as accounts_router
 from src.api.reels import router as reels_router
+from src.api.schedule import router as schedule_router
+from src.core.admission import AdmissionMiddleware
 from src.core.config import settings
-from src.db.base import Base
-from src.db.session import engine
-from fastapi.staticfiles import StaticFiles
-from src.core.paths import REELS_ROOT
+from src.core.logs import configure_logging, shutdown_logging
+from src.core.paths import REELS_ROOT, ensure_media_dirs
+from src.core.profiling import ProfilingMiddleware
+from src.core.shutdown import begin_drain, drain_remaining, install_signal_handlers
+from src.core.tracing import TracingMiddleware
+from src.db.pool import PoolContextMiddleware
+from src.db.replicas import ReadYourWritesMiddleware, replica_set
+from src.services.background import register_task, start_background_tasks, stop_background_tasks
+from src.services.executor import publish_executor
+from src.services.idempotency import IdempotencyMiddleware
+from src.services.media import shutdown_file_deleter
+from src.services.tasks import (
+    create_schema,
+    install_process_hooks,
+    register_event_broker,
+    register_process_tasks,
+    register_worker_tasks,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Всё, что трогает базу, файловую систему или запускает потоки, — здесь,
+    # а не при импорте: импорт src.main остаётся дешёвым
+    configure_logging()
+    if settings.media_storage_backend.lower() == "local":
+        ensure_media_dirs()
+    if settings.db_create_schema_on_startup:
+        create_schema()
+    # sync-ручки выполняются в этом пуле; лимиты admission control — внутри него
+    to_thread.current_default_thread_limiter().total_tokens = settings.api_threadpool_size
+    install_process_hooks()
+    register_process_tasks()
+    # Изменения назначений от любого процесса -> SSE-подписчики этого процесса
+    register_event_broker()
+    # Здоровье и отставание реплик (если DATABASE_REPLICA_URLS задан)
+    register_task(replica_set)
+    if settings.api_run_worker_tasks:
+        register_worker_tasks()
+    # SIGTERM сразу переводит процесс в drain, ещё до закрытия соединений
+    install_signal_handlers()
+    start_background_tasks()
+    yield
+    # остановка без сигнала (reload, тесты) — тоже через drain
+    begin_drain("shutdown")
+    stop_background_tasks()
+    publish_executor.shutdown(wait=True, timeout=drain_remaining())
+    shutdown_file_deleter(wait=True)
+    shutdown_logging()
+
 
 app = FastAPI(
     title=settings.project_name,
@@ -17,6 +71,7 @@ app = FastAPI(
         "Бэкенд-сервис для рекламного агентства "
         "для выкладки рилсов по аккаунтам."
     ),
+    lifespan=lifespan,
 )
 
 # Разрешаем запросы с нашего фронта
@@ -25,6 +80,21 @@ origins = [
     "http://localhost:5173",
 ]
 
+# Idempotency-Key: повтор загрузки или раунда отдаёт сохранённый ответ.
+# Внутри CORS, чтобы повторённые ответы тоже получали CORS-заголовки
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=[
+        f"{settings.api_v1_prefix}/reels/",
+        f"{settings.api_v1_prefix}/reels/bulk",
+        f"{settings.api_v1_prefix}/reels/publish",
+    ],
+)
+
+# Admission control: лимиты и очереди по классам ручек, быстрые 503/429.
+# Внутри CORS — отказы тоже получают CORS-заголовки и видны фронту
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -33,10 +103,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# После изменяющего запроса клиент какое-то время читает с основной базы
+app.add_middleware(ReadYourWritesMiddleware)
 
-@app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+# Checkout'ы соединений привязываются к ручке — метрики пула по эндпоинтам
+app.add_middleware(PoolContextMiddleware)
+
+# Профилирование отдельных запросов (по заголовку админа или сэмплированию)
+app.add_middleware(ProfilingMiddleware)
+
+# Трассировка — самой внешней: серверный спан покрывает все middleware
+app.add_middleware(TracingMiddleware)
 
 
 app.include_router(
@@ -56,12 +133,34 @@ app.include_router(
     prefix=f"{settings.api_v1_prefix}/reels",
     tags=["reels"],
 )
-app.mount(
-    "/media/reels",
-    StaticFiles(directory=REELS_ROOT, check_dir=True),
-    name="reels",
+
+app.include_router(
+    schedule_router,
+    prefix=f"{settings.api_v1_prefix}/schedule",
+    tags=["schedule"],
 )
 
+app.include_router(
+    insights_router,
+    prefix=f"{settings.api_v1_prefix}/insights",
+    tags=["insights"],
+)
+
+app.include_router(
+    admin_router,
+    prefix=f"{settings.api_v1_prefix}/admin",
+    tags=["admin"],
+)
+
+# С S3 видео раздаёт само хранилище (presigned URL), приложение его не отдаёт
+if settings.media_storage_backend.lower() == "local":
+    app.mount(
+        "/media/reels",
+        # папку создаёт lifespan, при импорте её может ещё не быть
+        StaticFiles(directory=REELS_ROOT, check_dir=False),
+        name="reels",
+    )
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
@@ -2,3 +2,6 @@ from src.models.user import User  # noqa: F401
 from src.models.business_account import BusinessAccount  # noqa: F401
 from src.models.reel import Reel  # noqa: F401
 from src.models.reel_assignment import ReelAssignment  # noqa: F401
+from src.models.media_insight import MediaInsight  # noqa: F401
+from src.models.sync_cursor import SyncCursor  # noqa: F401
+from src.models.idempotency_key import IdempotencyKey  # noqa: F401
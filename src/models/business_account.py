@@ -21,6 +21,24 @@ class BusinessAccount(Base):
 
     is_active = Column(Boolean, nullable=False, default=True)
 
+    # Кэш проверки токена/external_id: unknown / healthy / unhealthy
+    health_status = Column(String, nullable=False, default="unknown", server_default="unknown")
+    health_checked_at = Column(DateTime(timezone=True), nullable=True)
+    health_error = Column(Text, nullable=True)
+    # Аренда фоновой перепроверки: пока не истекла, другие процессы аккаунт не берут
+    health_lease_until = Column(DateTime(timezone=True), nullable=True)
+
+    # Жизненный цикл токена (src/services/tokens.py): когда истекает
+    # (None — неизвестно или бессрочный), когда его пора обновить
+    # (None — как можно скорее) и чем закончилось последнее обновление:
+    # unknown / valid / refresh_failed / invalid
+    token_expires_at = Column(DateTime(timezone=True), nullable=True)
+    token_refresh_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    token_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+    token_status = Column(String, nullable=False, default="unknown", server_default="unknown")
+    token_error = Column(Text, nullable=True)
+    token_refresh_failures = Column(Integer, nullable=False, default=0, server_default="0")
+
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
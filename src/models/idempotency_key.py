@@ -0,0 +1,45 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+    func,
+)
+
+from src.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """Idempotency-Key запроса пользователя и сохранённый ответ для повторов."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    # sha256 метода, пути и query: тот же ключ с другим запросом — ошибка клиента
+    fingerprint = Column(String(64), nullable=False)
+
+    # in_progress -> completed
+    status = Column(String(16), nullable=False)
+    # Аренда выполняющегося запроса
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
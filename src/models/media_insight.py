@@ -0,0 +1,63 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, Text, func
+
+from src.db.base import Base
+
+
+class MediaInsight(Base):
+    """Последний снимок статистики опубликованного рилса (одна строка на назначение)."""
+
+    __tablename__ = "media_insights"
+    __table_args__ = (
+        Index("ix_media_insights_next_fetch_at", "next_fetch_at"),
+        Index("ix_media_insights_account_id_id", "business_account_id", "id"),
+        Index("ix_media_insights_reel_id_id", "reel_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    assignment_id = Column(
+        Integer,
+        ForeignKey("reel_assignments.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    reel_id = Column(
+        Integer,
+        ForeignKey("reels.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    business_account_id = Column(
+        Integer,
+        ForeignKey("business_accounts.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    instagram_media_id = Column(String, nullable=False)
+    # От него считается ярус обновления
+    published_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Метрики; None — ещё не получены (или Graph их не отдаёт)
+    plays = Column(BigInteger, nullable=True)
+    reach = Column(BigInteger, nullable=True)
+    likes = Column(BigInteger, nullable=True)
+    comments = Column(BigInteger, nullable=True)
+    shares = Column(BigInteger, nullable=True)
+    saved = Column(BigInteger, nullable=True)
+    total_interactions = Column(BigInteger, nullable=True)
+
+    fetched_at = Column(DateTime(timezone=True), nullable=True)
+    # Когда обновить снова; пока медиа в работе — срок аренды
+    next_fetch_at = Column(DateTime(timezone=True), nullable=True)
+    fetch_error = Column(Text, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from src.db.base import Base
@@ -10,9 +10,13 @@ class Reel(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
-    # Полный путь к файлу на диске
+    # Ключ объекта в хранилище ("{user_id}/{uuid}.mp4"); у старых записей —
+    # полный путь к файлу на диске
     file_path = Column(String, nullable=False)
 
+    # Размер файла: списывается с квоты пользователя при удалении файла
+    size_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+
     # Имя файла, которое было у пользователя при загрузке
     original_filename = Column(String, nullable=False)
 
@@ -38,3 +42,9 @@ class Reel(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Сборщик мусора сверяет хранилище с file_path диапазонами в побайтовом
+        # порядке (COLLATE "C") — индекс должен быть в той же сортировке
+        Index("ix_reels_file_path_c", file_path.collate("C")).ddl_if(dialect="postgresql"),
+        Index("ix_reels_file_path", file_path).ddl_if(dialect="sqlite"),
+    )
@@ -1,11 +1,27 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import relationship
 
 from src.db.base import Base
 
+ACTIVE_STATUSES = ("pending", "container_created", "finished", "publishing")
+FINAL_STATUSES = ("published", "error")
+SCHEDULED_STATUS = "scheduled"
+# Рилс с назначением в одном из этих статусов занят и в новый раунд не идёт,
+# а его файл нельзя удалять
+RESERVED_STATUSES = (SCHEDULED_STATUS, *ACTIVE_STATUSES)
+
 
 class ReelAssignment(Base):
     __tablename__ = "reel_assignments"
+    __table_args__ = (
+        Index("ix_reel_assignments_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_reel_assignments_status_scheduled_at", "status", "scheduled_at"),
+        # Окна суточной квоты и ошибок аккаунта, последняя публикация (planner)
+        Index("ix_reel_assignments_account_published_at", "business_account_id", "published_at"),
+        Index("ix_reel_assignments_account_created_at", "business_account_id", "created_at"),
+        # цели fan-out одного рилса: файл удаляется, когда все они финальны
+        Index("ix_reel_assignments_reel_id_status", "reel_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -26,14 +42,37 @@ class ReelAssignment(Base):
     )
 
     instagram_media_id = Column(String, nullable=True)
+    # [scheduled ->] pending -> container_created -> finished -> publishing -> published / error
     status = Column(String, nullable=False, default="pending")
     error_message = Column(Text, nullable=True)
 
+    # Состояние шагов публикации, чтобы после падения воркера продолжить,
+    # а не создавать новый контейнер
+    creation_id = Column(String, nullable=True)
+    container_status = Column(String, nullable=True)
+    attempt_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Когда назначение можно (снова) брать в работу; пока шаг выполняется —
+    # это срок «аренды», после которого его подхватит recovery sweep
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    # Время запланированной публикации (для status="scheduled")
+    scheduled_at = Column(DateTime(timezone=True), nullable=True)
+    # Раунд POST /reels/publish, которым создано назначение (для SSE-прогресса)
+    job_id = Column(String(32), nullable=True, index=True)
+    # Трасса последней попытки публикации (W3C trace id, hex)
+    trace_id = Column(String(32), nullable=True)
+
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False,
     )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
 
     # ВАЖНО: это то самое свойство, которого не хватало
     owner = relationship("User", back_populates="assignments")
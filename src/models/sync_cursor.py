@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, String, func
+
+from src.db.base import Base
+
+
+class SyncCursor(Base):
+    """Позиция фоновой синхронизации, чтобы после рестарта продолжить с места."""
+
+    __tablename__ = "sync_cursors"
+
+    name = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
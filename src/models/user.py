@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from src.db.base import Base
@@ -13,6 +13,15 @@ class User(Base):
     full_name = Column(String, nullable=True)
     is_active = Column(Boolean, nullable=False, default=True)
 
+    # Тариф: задаёт вес пользователя в очереди публикаций (PUBLISH_PLAN_WEIGHTS)
+    plan = Column(String, nullable=False, default="basic", server_default="basic")
+
+    # Учёт места в хранилище: счётчик меняется атомарным UPDATE при загрузке
+    # и удалении файлов, поэтому проверка квоты — O(1).
+    # Квота NULL — действует USER_STORAGE_QUOTA_BYTES
+    storage_used_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    storage_quota_bytes = Column(BigInteger, nullable=True)
+
     # Бизнес-аккаунты пользователя
     business_accounts = relationship(
         "BusinessAccount",
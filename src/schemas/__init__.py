@@ -2,11 +2,37 @@ from src.schemas.user import UserCreate, UserRead  # noqa: F401
 from src.schemas.auth import Token  # noqa: F401
 from src.schemas.business_account import (  # noqa: F401
     BusinessAccountCreate,
+    BusinessAccountIds,
     BusinessAccountRead,
 )
-from src.schemas.reel import ReelRead  # noqa: F401
+from src.schemas.bulk import BulkItemResult, BulkResult  # noqa: F401
+from src.schemas.insight import MediaInsightPage, MediaInsightRead  # noqa: F401
+from src.schemas.reel import ReelBulkDelete, ReelRead  # noqa: F401
 from src.schemas.reels_publish import (  # noqa: F401
+    FanOutTarget,
     PublishedPair,
+    ReelFanOutRequest,
+    ReelFanOutResult,
     ReelsPublishResult,
 )
-from src.schemas.reel_assignment import ReelAssignmentRead  # noqa: F401
+from src.schemas.reel_assignment import (  # noqa: F401
+    ReelAssignmentEvent,
+    ReelAssignmentRead,
+)
+from src.schemas.admin import (  # noqa: F401
+    AdmissionClassStats,
+    CircuitBreakerState,
+    PoolEndpointStats,
+    PoolStats,
+    ProfileInfo,
+    ReplicaState,
+    TenantQueueStats,
+    UserPlanUpdate,
+    UserStorageQuotaUpdate,
+)
+from src.schemas.schedule import (  # noqa: F401
+    ScheduleCreate,
+    ScheduleShift,
+    ScheduleShiftResult,
+    ScheduleUpdate,
+)
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ProfileInfo(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+
+class CircuitBreakerState(BaseModel):
+    name: str
+    state: str
+    calls_in_window: int
+    failures_in_window: int
+
+
+class TenantQueueStats(BaseModel):
+    user_id: int
+    weight: int
+    queued_jobs: int
+    queued_assignments: int
+    running_assignments: int
+    started_jobs: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
+
+
+class UserPlanUpdate(BaseModel):
+    plan: str
+
+
+class UserStorageQuotaUpdate(BaseModel):
+    # None — вернуть квоту по умолчанию
+    storage_quota_bytes: int | None = Field(default=None, ge=0)
+
+
+class ReplicaState(BaseModel):
+    name: str
+    healthy: bool
+    lag_seconds: float | None = None
+    last_error: str | None = None
+    checked_at: datetime | None = None
+
+
+class PoolEndpointStats(BaseModel):
+    endpoint: str
+    checkouts: int
+    avg_held_ms: float
+    held_p50_ms: float
+    held_p95_ms: float
+    held_max_ms: float
+
+
+class PoolStats(BaseModel):
+    name: str
+    pool_class: str | None = None
+    size: int | None = None
+    checked_out: int
+    overflow: int | None = None
+    checkouts: int
+    timeouts: int
+    leaks: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
+    endpoints: list[PoolEndpointStats]
+
+
+class AdmissionClassStats(BaseModel):
+    name: str
+    limit: int
+    active: int
+    queued: int
+    queue_size: int
+    queue_timeout_seconds: float
+    per_user_limit: int | None = None
+    admitted: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    rejected_per_user: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+
+class BulkItemResult(BaseModel):
+    # id объекта (если он есть) и номер элемента запроса / строки CSV
+    id: int | None = None
+    index: int | None = None
+    status: str
+    detail: str | None = None
+
+
+class BulkResult(BaseModel):
+    total: int
+    succeeded: int
+    results: list[BulkItemResult]
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class BusinessAccountBase(BaseModel):
@@ -24,5 +26,20 @@ class BusinessAccountRead(BaseModel):
     external_id: str | None = None
     is_active: bool
 
+    # Результат последней проверки токена
+    health_status: str = "unknown"
+    health_checked_at: datetime | None = None
+    health_error: str | None = None
+
+    # Срок и состояние токена (фоновое обновление)
+    token_status: str = "unknown"
+    token_expires_at: datetime | None = None
+    token_refreshed_at: datetime | None = None
+    token_error: str | None = None
+
     # Токен в ответе не возвращаем, чтобы его лишний раз не светить
     model_config = ConfigDict(from_attributes=True)
+
+
+class BusinessAccountIds(BaseModel):
+    ids: list[int] = Field(min_length=1)
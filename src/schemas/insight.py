@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class MediaInsightRead(BaseModel):
+    id: int
+    assignment_id: int
+    reel_id: int
+    business_account_id: int
+    instagram_media_id: str
+    published_at: datetime
+
+    plays: int | None = None
+    reach: int | None = None
+    likes: int | None = None
+    comments: int | None = None
+    shares: int | None = None
+    saved: int | None = None
+    total_interactions: int | None = None
+
+    fetched_at: datetime | None = None
+    fetch_error: str | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MediaInsightPage(BaseModel):
+    items: list[MediaInsightRead]
+    # Передать как cursor, чтобы получить следующую страницу; None — это последняя
+    next_cursor: int | None = None
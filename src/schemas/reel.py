@@ -1,9 +1,25 @@
-from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, model_validator
 
 
 class ReelRead(BaseModel):
     id: int
     original_filename: str
     is_used: bool
+    size_bytes: int = 0
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ReelBulkDelete(BaseModel):
+    # Список id и/или фильтр; условия объединяются через И
+    ids: list[int] | None = None
+    is_used: bool | None = None
+    created_before: datetime | None = None
+
+    @model_validator(mode="after")
+    def _require_criteria(self) -> "ReelBulkDelete":
+        if self.ids is None and self.is_used is None and self.created_before is None:
+            raise ValueError("Нужно передать ids или хотя бы один фильтр")
+        return self
@@ -23,9 +23,31 @@ class ReelAssignmentRead(BaseModel):
     status: str
     instagram_media_id: str | None = None
     error_message: str | None = None
+    creation_id: str | None = None
+    container_status: str | None = None
+    attempt_count: int = 0
+    next_attempt_at: datetime | None = None
+    published_at: datetime | None = None
+    scheduled_at: datetime | None = None
+    job_id: str | None = None
+    trace_id: str | None = None
     created_at: datetime
 
     reel: ReelShort
     business_account: BusinessAccountShort
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ReelAssignmentEvent(BaseModel):
+    """Изменение статуса назначения — отдаётся в SSE-потоках."""
+
+    assignment_id: int
+    user_id: int
+    job_id: str | None = None
+    reel_id: int
+    business_account_id: int
+    status: str
+    instagram_media_id: str | None = None
+    error_message: str | None = None
+    at: datetime
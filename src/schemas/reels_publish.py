@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.schemas.bulk import BulkItemResult
 
 
 class PublishedPair(BaseModel):
@@ -7,7 +9,36 @@ class PublishedPair(BaseModel):
 
 
 class ReelsPublishResult(BaseModel):
+    # Идентификатор раунда: прогресс — в GET /reels/publish/{job_id}/events
+    job_id: str | None = None
     published: list[PublishedPair]
     total_published: int
     reels_left_unassigned: int
     accounts_without_reels: int
+
+
+class ReelFanOutRequest(BaseModel):
+    # Аккаунты, на которые публикуется рилс
+    account_ids: list[int] = Field(min_length=1)
+
+
+class FanOutTarget(BaseModel):
+    business_account_id: int
+    assignment_id: int
+    status: str
+    container_status: str | None = None
+    instagram_media_id: str | None = None
+    error_message: str | None = None
+    attempt_count: int = 0
+
+
+class ReelFanOutResult(BaseModel):
+    # Идентификатор раунда: прогресс — в GET /reels/publish/{job_id}/events
+    # и GET /reels/{reel_id}/fan-out/{job_id}
+    job_id: str | None = None
+    reel_id: int
+    total_targets: int
+    total_published: int
+    targets: list[FanOutTarget]
+    # Аккаунты из запроса, на которые рилс не ставился, и почему
+    skipped: list[BulkItemResult] = []
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ScheduleCreate(BaseModel):
+    # С какого момента начинать публикации (наивное время считается UTC)
+    start_at: datetime
+    # Либо конец окна — тогда интервал рассчитывается, чтобы уложиться в него
+    end_at: datetime | None = None
+    # Либо явный интервал между рилсами одного аккаунта
+    interval_minutes: int | None = Field(default=None, gt=0)
+    # Какие рилсы планировать; по умолчанию — все свободные
+    reel_ids: list[int] | None = None
+    strategy: str | None = None
+
+
+class ScheduleUpdate(BaseModel):
+    scheduled_at: datetime
+
+
+class ScheduleShift(BaseModel):
+    # На сколько минут сдвинуть (может быть отрицательным)
+    delta_minutes: int
+    # Какие назначения сдвигать; по умолчанию — все запланированные
+    assignment_ids: list[int] | None = None
+    business_account_id: int | None = None
+
+
+class ScheduleShiftResult(BaseModel):
+    shifted: int
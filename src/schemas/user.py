@@ -13,5 +13,9 @@ class UserCreate(UserBase):
 class UserRead(UserBase):
     id: int
     is_active: bool
+    plan: str = "basic"
+    storage_used_bytes: int = 0
+    # None — действует квота по умолчанию (USER_STORAGE_QUOTA_BYTES)
+    storage_quota_bytes: int | None = None
 
     model_config = ConfigDict(from_attributes=True)
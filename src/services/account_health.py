@@ -0,0 +1,227 @@
+"""
+Проверка здоровья бизнес-аккаунтов до создания контейнеров.
+
+Вердикт (healthy / unhealthy) кэшируется в строке аккаунта вместе с
+временем проверки. publish_reels просто отфильтровывает unhealthy-аккаунты
+в SQL, а фоновая задача перепроверяет устаревшие вердикты пачками,
+выполняя Graph-запросы параллельно.
+
+Проход фоновой задачи: аккаунты забираются с арендой (SKIP LOCKED, коммит —
+процессы не берут одни и те же), Graph-запросы идут без открытой
+транзакции, вердикты пишутся новой короткой транзакцией.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.db.session import SessionLocal
+from src.integrations.instagram import (
+    GRAPH_BATCH_MAX_SIZE,
+    InstagramPublishError,
+    check_account_tokens,
+)
+from src.models.business_account import BusinessAccount
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+UNKNOWN = "unknown"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def mark_account_unhealthy(account: BusinessAccount, error: str) -> None:
+    """Помечаем аккаунт сразу, без похода в Graph (коммит — на вызывающем)."""
+    account.health_status = UNHEALTHY
+    account.health_error = error
+    account.health_checked_at = _utcnow()
+
+
+def _verdict(account, error: InstagramPublishError | None) -> tuple[str | None, str | None]:
+    """
+    Возвращает (статус, ошибка). Статус None — проверить не удалось
+    (временная ошибка / лимиты), прежний вердикт не трогаем.
+    """
+    if error is None:
+        return HEALTHY, None
+    if error.retryable:
+        logger.warning("Не удалось проверить аккаунт %s: %s", account.id, error)
+        return None, str(error)
+    return UNHEALTHY, str(error)
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    То, что нужно Graph-запросам от имени аккаунта, — без ORM-объекта:
+    сессию можно закрыть до запросов, и транзакция не висит открытой,
+    пока ждём Graph.
+    """
+
+    id: int
+    user_id: int
+    external_id: str | None
+    access_token: str | None
+    token_expires_at: datetime | None = None
+
+    @classmethod
+    def of(cls, account: BusinessAccount) -> "AccountSnapshot":
+        return cls(
+            id=account.id,
+            user_id=account.user_id,
+            external_id=account.external_id,
+            access_token=account.access_token,
+            token_expires_at=account.token_expires_at,
+        )
+
+
+_SNAPSHOT_COLUMNS = (
+    BusinessAccount.id,
+    BusinessAccount.user_id,
+    BusinessAccount.external_id,
+    BusinessAccount.access_token,
+    BusinessAccount.token_expires_at,
+)
+
+
+def load_account_snapshots(db: Session, account_ids: Sequence[int]) -> list[AccountSnapshot]:
+    rows = (
+        db.query(*_SNAPSHOT_COLUMNS)
+        .filter(BusinessAccount.id.in_(account_ids))
+        .order_by(BusinessAccount.id)
+        .all()
+    )
+    return [AccountSnapshot(*row) for row in rows]
+
+
+def _check_snapshots(accounts: Sequence[AccountSnapshot]) -> list[InstagramPublishError | None]:
+    """
+    Graph /batch-запросы по 50, до account_health_concurrency пачек
+    параллельно. База здесь не нужна.
+    """
+    chunks = [
+        accounts[start:start + GRAPH_BATCH_MAX_SIZE]
+        for start in range(0, len(accounts), GRAPH_BATCH_MAX_SIZE)
+    ]
+    with ThreadPoolExecutor(
+        max_workers=min(settings.account_health_concurrency, len(chunks)),
+        thread_name_prefix="account-health",
+    ) as pool:
+        return [error for chunk_errors in pool.map(check_account_tokens, chunks) for error in chunk_errors]
+
+
+def _save_verdicts(
+    db: Session,
+    accounts: Sequence[AccountSnapshot],
+    errors: Sequence[InstagramPublishError | None],
+) -> None:
+    """Вердикты одной короткой транзакцией, по id (аккаунт могли удалить)."""
+    now = _utcnow()
+    for account, error in zip(accounts, errors):
+        health_status, health_error = _verdict(account, error)
+        if health_status is None:
+            # прежний вердикт остаётся, аренда — пауза до повтора
+            continue
+        db.execute(
+            update(BusinessAccount)
+            .where(BusinessAccount.id == account.id)
+            .values(
+                health_status=health_status,
+                health_error=health_error,
+                health_checked_at=now,
+                health_lease_until=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+def check_accounts(db: Session, accounts: Sequence[BusinessAccount]) -> None:
+    """
+    Проверяем аккаунты и сохраняем вердикты. Транзакция db завершается до
+    Graph-запросов: объекты аккаунтов после вызова перечитываются из базы.
+    """
+    if not accounts:
+        return
+    snapshots = [AccountSnapshot.of(account) for account in accounts]
+    db.commit()
+    _save_verdicts(db, snapshots, _check_snapshots(snapshots))
+
+
+def stale_accounts_query(db: Session):
+    expires_before = _utcnow() - timedelta(seconds=settings.account_health_ttl_seconds)
+    return db.query(BusinessAccount).filter(
+        BusinessAccount.is_active.is_(True),
+        or_(
+            BusinessAccount.health_checked_at.is_(None),
+            BusinessAccount.health_checked_at < expires_before,
+        ),
+    )
+
+
+def claim_stale_accounts(db: Session, limit: int) -> list[int]:
+    """Забираем аккаунты с протухшим вердиктом, продлевая им аренду (SKIP LOCKED)."""
+    now = _utcnow()
+    accounts = (
+        stale_accounts_query(db)
+        .filter(
+            or_(
+                BusinessAccount.health_lease_until.is_(None),
+                BusinessAccount.health_lease_until <= now,
+            )
+        )
+        .order_by(BusinessAccount.health_checked_at.asc().nulls_first(), BusinessAccount.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = now + timedelta(seconds=settings.account_health_lease_seconds)
+    account_ids = []
+    for account in accounts:
+        account.health_lease_until = lease
+        account_ids.append(account.id)
+    db.commit()
+    return account_ids
+
+
+def refresh_stale_accounts() -> int:
+    """Фоновая перепроверка аккаунтов с протухшим вердиктом. Возвращает их число."""
+    with SessionLocal() as db:
+        account_ids = claim_stale_accounts(db, settings.account_health_batch_size)
+        if not account_ids:
+            return 0
+        accounts = load_account_snapshots(db, account_ids)
+
+    errors = _check_snapshots(accounts)
+
+    with SessionLocal() as db:
+        _save_verdicts(db, accounts, errors)
+    return len(accounts)
+
+
+def check_accounts_by_ids(account_ids: Sequence[int]) -> None:
+    """Для BackgroundTasks: проверить аккаунты, созданные пачкой (или один)."""
+    with SessionLocal() as db:
+        accounts = load_account_snapshots(db, account_ids)
+    if not accounts:
+        return
+
+    errors = _check_snapshots(accounts)
+
+    with SessionLocal() as db:
+        _save_verdicts(db, accounts, errors)
+
+
+def check_account_by_id(account_id: int) -> None:
+    """Для BackgroundTasks: проверить только что созданный аккаунт."""
+    check_accounts_by_ids([account_id])
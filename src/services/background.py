@@ -0,0 +1,81 @@
+"""
+Простые периодические фоновые задачи на потоках.
+
+Каждый процесс API поднимает свои задачи на старте и останавливает
+на shutdown. Задачи должны быть безопасны при запуске в нескольких
+процессах одновременно (берут работу через FOR UPDATE SKIP LOCKED и т.п.).
+"""
+
+import logging
+import threading
+from typing import Callable, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], object],
+        interval_seconds: float,
+        *,
+        run_at_start: bool = True,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.run_at_start = run_at_start
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        if not self.run_at_start and self._stop.wait(self.interval_seconds):
+            return
+        while True:
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Ошибка в фоновой задаче %s", self.name)
+            if self._stop.wait(self.interval_seconds):
+                return
+
+
+class BackgroundTask(Protocol):
+    name: str
+
+    def start(self) -> None: ...
+
+    def stop(self, timeout: float | None = None) -> None: ...
+
+
+_tasks: list[BackgroundTask] = []
+
+
+def register_task(task: BackgroundTask) -> BackgroundTask:
+    _tasks.append(task)
+    return task
+
+
+def start_background_tasks() -> None:
+    for task in _tasks:
+        logger.info("Запуск фоновой задачи %s", task.name)
+        task.start()
+
+
+def stop_background_tasks(timeout: float = 10.0) -> None:
+    for task in _tasks:
+        task.stop(timeout)
@@ -0,0 +1,267 @@
+"""
+События изменения статуса ReelAssignment для SSE-потоков.
+
+Каждое изменение status, попавшее во flush, превращается в событие.
+На Postgres оно отправляется через pg_notify в той же транзакции:
+NOTIFY доставляется только после коммита (и пропадает при откате),
+а получают его все процессы API — у каждого свой LISTEN-поток
+(EventBroker). Так событие дойдёт до клиента, к какому бы воркеру или
+ноде он ни был подключён.
+
+На других СУБД (SQLite в локальной разработке) события раздаются
+подписчикам текущего процесса после коммита.
+
+Тем же путём идёт сигнал «расписание изменилось» (announce_schedule_change):
+планировщик, работающий в другом процессе (python -m src.worker), будит
+LISTEN-поток его процесса, а не только notify() в процессе API.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from src.core.config import settings
+from src.db.session import _normalize_url, engine
+from src.models.reel_assignment import ReelAssignment
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "reel_assignment_events"
+SCHEDULE_CHANNEL = "publish_schedule_changed"
+
+# NOTIFY ограничен 8000 байт — длинные ошибки обрезаем
+_MAX_ERROR_LENGTH = 1000
+
+_SESSION_EVENTS_KEY = "reel_assignment_events"
+_SESSION_SCHEDULE_KEY = "publish_schedule_changed"
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def assignment_event_payload(assignment: ReelAssignment) -> dict:
+    error_message = assignment.error_message
+    if error_message and len(error_message) > _MAX_ERROR_LENGTH:
+        error_message = error_message[:_MAX_ERROR_LENGTH] + "…"
+    return {
+        "assignment_id": assignment.id,
+        "user_id": assignment.user_id,
+        "job_id": assignment.job_id,
+        "reel_id": assignment.reel_id,
+        "business_account_id": assignment.business_account_id,
+        "status": assignment.status,
+        "instagram_media_id": assignment.instagram_media_id,
+        "error_message": error_message,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def format_sse(event_name: str, data: dict) -> str:
+    """Одно сообщение text/event-stream."""
+    return f"event: {event_name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    events = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, ReelAssignment):
+            continue
+        if obj not in session.new and not inspect(obj).attrs.status.history.has_changes():
+            continue
+        events.append(assignment_event_payload(obj))
+    if not events:
+        return
+
+    if _is_postgres():
+        connection = session.connection()
+        for payload in events:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": json.dumps(payload)},
+            )
+    else:
+        session.info.setdefault(_SESSION_EVENTS_KEY, []).extend(events)
+
+
+def announce_schedule_change(db: Session) -> None:
+    """
+    Расписание изменилось: после коммита db проснутся планировщики всех
+    процессов. Вызывать до commit — при откате сигнала не будет.
+    """
+    if _is_postgres():
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": SCHEDULE_CHANNEL})
+    else:
+        # открываем транзакцию, чтобы откат сбросил сигнал (after_rollback)
+        db.connection()
+        db.info[_SESSION_SCHEDULE_KEY] = True
+
+
+def _after_commit(session: Session) -> None:
+    for payload in session.info.pop(_SESSION_EVENTS_KEY, []):
+        event_broker.dispatch(payload)
+    if session.info.pop(_SESSION_SCHEDULE_KEY, False):
+        event_broker.dispatch_schedule_change()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_EVENTS_KEY, None)
+    session.info.pop(_SESSION_SCHEDULE_KEY, None)
+
+
+def install_event_hooks() -> None:
+    """Подписываемся на flush/commit всех сессий (идемпотентно)."""
+    if event.contains(Session, "after_flush", _after_flush):
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+@dataclass(eq=False)
+class _Subscription:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    user_id: int
+    job_id: str | None = None
+    dropped: int = field(default=0)
+
+    def matches(self, payload: dict) -> bool:
+        if payload.get("user_id") != self.user_id:
+            return False
+        return self.job_id is None or payload.get("job_id") == self.job_id
+
+
+class EventBroker:
+    """
+    Раздаёт события подписчикам SSE этого процесса, а сигнал об изменении
+    расписания — слушателям (планировщику). На Postgres держит отдельное
+    соединение с LISTEN и переподключается при обрыве.
+    """
+
+    def __init__(self) -> None:
+        self.name = "assignment-events"
+        self._subscriptions: set[_Subscription] = set()
+        self._schedule_listeners: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @asynccontextmanager
+    async def subscribe(self, *, user_id: int, job_id: str | None = None) -> AsyncIterator[asyncio.Queue]:
+        subscription = _Subscription(
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(maxsize=settings.sse_queue_size),
+            user_id=user_id,
+            job_id=job_id,
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription.queue
+        finally:
+            with self._lock:
+                self._subscriptions.discard(subscription)
+
+    def dispatch(self, payload: dict) -> None:
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(payload)]
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(self._deliver, subscription, payload)
+
+    def add_schedule_listener(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            if listener not in self._schedule_listeners:
+                self._schedule_listeners.append(listener)
+
+    def dispatch_schedule_change(self) -> None:
+        with self._lock:
+            listeners = list(self._schedule_listeners)
+        for listener in listeners:
+            listener()
+
+    @staticmethod
+    def _deliver(subscription: _Subscription, payload: dict) -> None:
+        try:
+            subscription.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # медленный клиент: пропускаем событие, при переподключении
+            # он получит актуальный снимок
+            subscription.dropped += 1
+
+    def start(self) -> None:
+        if self._thread is not None or not _is_postgres():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("LISTEN %s оборвался, переподключаемся", CHANNEL)
+                self._stop.wait(settings.events_reconnect_delay_seconds)
+
+    @staticmethod
+    def _listen_engine():
+        # за PgBouncer (transaction pooling) LISTEN не работает — идём напрямую
+        if settings.database_direct_url:
+            return create_engine(_normalize_url(settings.database_direct_url), poolclass=NullPool)
+        return engine
+
+    def _listen(self) -> None:
+        # отдельное соединение вне пула: LISTEN живёт, пока живёт соединение
+        listen_engine = self._listen_engine()
+        pooled = listen_engine.raw_connection()
+        pooled.detach()
+        connection = pooled.driver_connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.execute(f"LISTEN {SCHEDULE_CHANNEL}")
+            logger.info("Слушаем события назначений: LISTEN %s, %s", CHANNEL, SCHEDULE_CHANNEL)
+            # за время обрыва сигналы могли потеряться — пусть планировщик пересчитает сон
+            self.dispatch_schedule_change()
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([connection], [], [], 1.0)
+                if not readable:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    if notify.channel == SCHEDULE_CHANNEL:
+                        self.dispatch_schedule_change()
+                        continue
+                    try:
+                        payload = json.loads(notify.payload)
+                    except ValueError:
+                        logger.warning("Некорректное событие в %s: %s", CHANNEL, notify.payload)
+                        continue
+                    self.dispatch(payload)
+        finally:
+            pooled.close()
+            if listen_engine is not engine:
+                listen_engine.dispose()
+
+
+event_broker = EventBroker()
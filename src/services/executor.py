@@ -0,0 +1,233 @@
+"""
+Исполнитель публикаций: пул потоков, в котором назначения доводятся
+до финального статуса (advance_assignments) вне HTTP-запроса.
+
+Перед пулом стоит справедливая очередь (src.services.fair_queue): задачи
+разных пользователей чередуются по deficit round-robin с весами тарифов
+(PUBLISH_PLAN_WEIGHTS), так что один крупный клиент не занимает все потоки.
+Пока задача ждёт в очереди, её назначениям продлевается аренда — иначе
+их подхватил бы recovery sweep.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Sequence
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, selectinload
+
+from src.core.config import settings
+from src.core.shutdown import is_draining
+from src.core.logs import log_context
+from src.core.tracing import current_context, span, use_context
+from src.db.session import SessionLocal
+from src.models.reel_assignment import ReelAssignment
+from src.models.user import User
+from src.services.fair_queue import FairJob, FairQueue
+from src.services.publisher import ACTIVE_STATUSES, advance_assignments, lease_until
+
+logger = logging.getLogger(__name__)
+
+
+def tenant_weight(plan: str | None) -> int:
+    return settings.publish_plan_weights.get(plan or "", 1)
+
+
+def load_tenant_weights(db: Session, user_ids: Sequence[int]) -> dict[int, int]:
+    rows = db.query(User.id, User.plan).filter(User.id.in_(set(user_ids))).all()
+    return {user_id: tenant_weight(plan) for user_id, plan in rows}
+
+
+def _run_assignments(assignment_ids: Sequence[int]) -> dict[int, str]:
+    with SessionLocal() as db:
+        assignments = (
+            db.query(ReelAssignment)
+            .options(
+                selectinload(ReelAssignment.reel),
+                selectinload(ReelAssignment.business_account),
+            )
+            .filter(ReelAssignment.id.in_(assignment_ids))
+            .order_by(ReelAssignment.id)
+            .all()
+        )
+        advance_assignments(db, assignments)
+        return {assignment.id: assignment.status for assignment in assignments}
+
+
+def release_leases(assignment_ids: Sequence[int]) -> int:
+    """
+    Назначения так и не начаты (drain) — снимаем аренду, чтобы их сразу
+    подхватил recovery sweep другого процесса.
+    """
+    if not assignment_ids:
+        return 0
+    with SessionLocal() as db:
+        result = db.execute(
+            update(ReelAssignment)
+            .where(
+                ReelAssignment.id.in_(assignment_ids),
+                ReelAssignment.status.in_(ACTIVE_STATUSES),
+            )
+            .values(next_attempt_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
+
+class PublishExecutor:
+    def __init__(self, max_workers: int, quantum: int) -> None:
+        self.max_workers = max_workers
+        self.queue = FairQueue(quantum)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self.queue.reopen()
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._worker, name=f"publish-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def available_capacity(self) -> int:
+        """
+        Сколько назначений фоновые источники (планировщик) могут добавить
+        в очередь сейчас. Раунды publish_reels этим лимитом не ограничены.
+        """
+        return max(settings.publish_executor_max_queued - self.queue.queued_cost(), 0)
+
+    def submit_assignments(
+        self,
+        user_id: int,
+        assignment_ids: Sequence[int],
+        *,
+        weight: int = 1,
+    ) -> list[Future]:
+        """
+        Ставит назначения пользователя в очередь пачками по graph_batch_size
+        (одна пачка — один общий /batch на каждом шаге).
+        Результат Future — {assignment_id: status}.
+        """
+        self._ensure_started()
+        chunk_size = max(settings.graph_batch_size, 1)
+        futures = []
+        for start in range(0, len(assignment_ids), chunk_size):
+            chunk = tuple(assignment_ids[start:start + chunk_size])
+            job = FairJob(
+                user_id=user_id,
+                cost=len(chunk),
+                func=_run_assignments,
+                args=(chunk,),
+                assignment_ids=chunk,
+                trace_context=current_context(),
+            )
+            self.queue.put(job, weight=weight)
+            futures.append(job.future)
+        return futures
+
+    def _worker(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            try:
+                if is_draining():
+                    # процесс останавливается — не начинаем новых публикаций
+                    self._cancel(job)
+                    self._release(job.assignment_ids)
+                    continue
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    # публикация продолжает трассу запроса, который её поставил
+                    with use_context(job.trace_context), span(
+                        "publish.job",
+                        attributes={
+                            "user.id": job.user_id,
+                            "publish.assignments": len(job.assignment_ids),
+                            "queue.wait_ms": round((time.monotonic() - job.enqueued_at) * 1000, 1),
+                        },
+                    ), log_context(user_id=job.user_id):
+                        result = job.func(*job.args)
+                    job.future.set_result(result)
+                except Exception as exc:
+                    logger.error(
+                        "Ошибка при публикации назначений %s (user_id=%s)",
+                        job.assignment_ids,
+                        job.user_id,
+                        exc_info=exc,
+                    )
+                    job.future.set_exception(exc)
+            finally:
+                self.queue.task_done(job)
+
+    def renew_queued_leases(self) -> int:
+        """Продлеваем аренду назначениям, которые ещё ждут в очереди."""
+        assignment_ids = self.queue.queued_assignment_ids()
+        if not assignment_ids:
+            return 0
+        with SessionLocal() as db:
+            result = db.execute(
+                update(ReelAssignment)
+                .where(
+                    ReelAssignment.id.in_(assignment_ids),
+                    ReelAssignment.status.in_(ACTIVE_STATUSES),
+                )
+                .values(next_attempt_at=lease_until())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return result.rowcount
+
+    def stats(self) -> list[dict]:
+        return self.queue.stats()
+
+    @staticmethod
+    def _cancel(job: FairJob) -> bool:
+        # cancel() сам не будит concurrent.futures.wait — это делает
+        # set_running_or_notify_cancel
+        if not job.future.cancel():
+            return False
+        job.future.set_running_or_notify_cancel()
+        return True
+
+    @staticmethod
+    def _release(assignment_ids: Sequence[int]) -> None:
+        try:
+            release_leases(assignment_ids)
+        except Exception:
+            # аренда истечёт сама, назначения доведёт recovery sweep
+            logger.exception("Не удалось отпустить назначения %s", assignment_ids)
+
+    def shutdown(self, wait: bool = True, timeout: float | None = None) -> None:
+        """
+        Не начатые задачи отменяем и отпускаем их назначения. Идущие
+        задачи при drain доделывают текущий шаг и сами отпускают остальное;
+        ждём их не дольше timeout.
+        """
+        cancelled = []
+        for job in self.queue.close():
+            if self._cancel(job):
+                cancelled.extend(job.assignment_ids)
+        self._release(cancelled)
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not wait:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if thread.is_alive():
+                logger.warning("Публикации не завершились за отведённое время, выходим")
+                return
+
+publish_executor = PublishExecutor(
+    settings.publish_executor_workers,
+    settings.publish_fair_quantum,
+)
@@ -0,0 +1,448 @@
+"""
+Idempotency-Key для загрузок рилсов и раундов публикации.
+
+Ключ хранится в idempotency_keys вместе с отпечатком запроса (метод, путь,
+query, sha256 тела) и, когда запрос завершён, — с его ответом. Всё решается
+в ASGI-middleware до вызова ручки, поэтому повтор с тем же ключом не
+сохраняет файлы и не запускает раунд заново:
+
+* ключ уже завершён — отдаём сохранённый ответ (Idempotent-Replayed: true);
+* запрос с этим ключом ещё выполняется — ждём его результата (до
+  IDEMPOTENCY_WAIT_SECONDS, потом 409);
+* выполнявший процесс упал (аренда ключа истекла) — выполняем заново.
+
+Чтобы посчитать хеш тела, middleware сначала читает его во временный файл
+(до IDEMPOTENCY_BODY_SPOOL_BYTES в памяти, дальше на диске), а ручка потом
+читает тело оттуда. Boundary multipart в хеш не входит: клиент при повторе
+генерирует новый. Тот же ключ с другим файлом или другим JSON — 422.
+Ответы 5xx, 401/403/409/429 не сохраняются —
+повтор с тем же ключом выполнит запрос снова. Просроченные ключи удаляет
+фоновая задача.
+"""
+
+import asyncio
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from src.core.config import settings
+from src.core.security import user_id_from_token
+from src.db.session import SessionLocal
+from src.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+_MAX_KEY_LENGTH = 255
+_BODY_CHUNK_SIZE = 1024 * 1024
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# Ответы, которые зависят не от запроса, а от момента: их не повторяем
+_NOT_STORED_STATUSES = {401, 403, 408, 409, 429}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite отдаёт время без зоны
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def request_fingerprint(scope, body_digest: str) -> str:
+    query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"))))
+    raw = f"{scope['method']} {scope['path']}?{query} {body_digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SpooledBody:
+    file: tempfile.SpooledTemporaryFile
+    digest: str
+
+
+def multipart_boundary(headers: Headers) -> bytes | None:
+    content_type, _, params = headers.get("content-type", "").partition(";")
+    if content_type.strip().lower() != "multipart/form-data":
+        return None
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary" and value:
+            return value.strip('"').encode("latin-1")
+    return None
+
+
+class _BodyDigest:
+    """sha256 тела без вхождений boundary (в том числе разрезанных между кусками)."""
+
+    def __init__(self, boundary: bytes | None) -> None:
+        self._hash = hashlib.sha256()
+        self._boundary = boundary
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        if not self._boundary:
+            self._hash.update(chunk)
+            return
+        data = (self._tail + chunk).replace(self._boundary, b"")
+        # конец может оказаться началом boundary — досчитаем со следующим куском
+        keep = len(self._boundary) - 1
+        self._hash.update(data[:-keep] if keep else data)
+        self._tail = data[-keep:] if keep else b""
+
+    def hexdigest(self) -> str:
+        self._hash.update(self._tail)
+        self._tail = b""
+        return self._hash.hexdigest()
+
+
+async def spool_body(receive, boundary: bytes | None = None) -> SpooledBody | None:
+    """
+    Читает тело запроса целиком во временный файл, считая его sha256
+    (без boundary multipart). None — клиент отключился, не дослав тело.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.idempotency_body_spool_bytes)
+    digest = _BodyDigest(boundary)
+
+    def write(chunk: bytes) -> None:
+        digest.update(chunk)
+        spool.write(chunk)
+
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                spool.close()
+                return None
+            chunk = message.get("body", b"")
+            if chunk:
+                await run_in_threadpool(write, chunk)
+            if not message.get("more_body", False):
+                break
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledBody(spool, digest.hexdigest())
+
+
+def _body_receive(body: SpooledBody, receive):
+    """receive для ручки: сначала тело из временного файла, потом исходный канал (disconnect)."""
+    done = False
+
+    async def receive_spooled():
+        nonlocal done
+        if done:
+            return await receive()
+        chunk = await run_in_threadpool(body.file.read, _BODY_CHUNK_SIZE)
+        done = len(chunk) < _BODY_CHUNK_SIZE
+        return {"type": "http.request", "body": chunk, "more_body": not done}
+
+    return receive_spooled
+
+
+@dataclass
+class Claim:
+    # new — выполняем запрос сами; completed — повтор готового ответа;
+    # in_progress — его выполняет другой запрос; mismatch — ключ от другого запроса;
+    # skip — ключ не записать (например, пользователя уже нет), выполняем без него
+    outcome: str
+    record_id: int | None = None
+    status_code: int | None = None
+    content_type: str | None = None
+    body: bytes | None = None
+
+
+def _lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.idempotency_lease_seconds)
+
+
+def claim_key(user_id: int, key: str, fingerprint: str) -> Claim:
+    """Занимаем ключ или узнаём, что с ним уже происходит."""
+    with SessionLocal() as db:
+        for _ in range(3):
+            now = _utcnow()
+            record = IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                status=IN_PROGRESS,
+                locked_until=_lease_until(now),
+                expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds),
+            )
+            db.add(record)
+            try:
+                db.commit()
+                return Claim("new", record_id=record.id)
+            except IntegrityError:
+                db.rollback()
+
+            existing = db.scalars(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                )
+            ).one_or_none()
+            if existing is None:
+                # ключ только что удалили (брошенный запрос, компактизация) — заново
+                continue
+            if existing.fingerprint != fingerprint:
+                return Claim("mismatch")
+            if existing.status == COMPLETED and _as_utc(existing.expires_at) > now:
+                return Claim(
+                    "completed",
+                    record_id=existing.id,
+                    status_code=existing.response_status,
+                    content_type=existing.response_content_type,
+                    body=existing.response_body,
+                )
+            if _take_over(db, existing.id, now):
+                return Claim("new", record_id=existing.id)
+            return Claim("in_progress", record_id=existing.id)
+    return Claim("skip")
+
+
+def _take_over(db, record_id: int, now: datetime) -> bool:
+    """Ключ просрочен или его владелец упал (аренда истекла) — забираем себе."""
+    result = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.id == record_id,
+            or_(
+                IdempotencyKey.expires_at < now,
+                IdempotencyKey.status == IN_PROGRESS,
+            ),
+            or_(
+                IdempotencyKey.locked_until.is_(None),
+                IdempotencyKey.locked_until < now,
+            ),
+        )
+        .values(
+            status=IN_PROGRESS,
+            locked_until=_lease_until(now),
+            expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds),
+            response_status=None,
+            response_content_type=None,
+            response_body=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def renew_key(record_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record_id, IdempotencyKey.status == IN_PROGRESS)
+            .values(locked_until=_lease_until(_utcnow()))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def complete_key(record_id: int, status_code: int, content_type: str | None, body: bytes) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record_id)
+            .values(
+                status=COMPLETED,
+                locked_until=None,
+                response_status=status_code,
+                response_content_type=content_type,
+                response_body=body,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def release_key(record_id: int) -> None:
+    """Запрос не дал сохраняемого ответа — повтор с этим ключом выполнится заново."""
+    with SessionLocal() as db:
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+        db.commit()
+
+
+def compact_idempotency_keys() -> int:
+    """Удаляет просроченные ключи пачками. Возвращает их число."""
+    removed = 0
+    batch_size = settings.idempotency_compaction_batch_size
+    while True:
+        with SessionLocal() as db:
+            now = _utcnow()
+            ids = select(IdempotencyKey.id).where(
+                IdempotencyKey.expires_at < now,
+                or_(
+                    IdempotencyKey.locked_until.is_(None),
+                    IdempotencyKey.locked_until < now,
+                ),
+            ).limit(batch_size)
+            result = db.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.id.in_(ids.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    if removed:
+        logger.info("Удалено просроченных Idempotency-Key: %s", removed)
+    return removed
+
+
+def _replay(claim: Claim) -> Response:
+    return Response(
+        content=claim.body or b"",
+        status_code=claim.status_code,
+        media_type=claim.content_type,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _error(status_code: int, detail: str, headers: dict | None = None) -> Response:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+
+
+def _bearer_token(headers: Headers) -> str | None:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI-middleware: Idempotency-Key для POST на перечисленные пути.
+    Ключи у каждого пользователя свои; без ключа или без токена запрос
+    проходит как обычно (ручка сама ответит 401).
+    """
+
+    def __init__(self, app, paths: list[str]) -> None:
+        self.app = app
+        self.paths = {path.rstrip("/") or "/" for path in paths}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or (scope["path"].rstrip("/") or "/") not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_HEADER)
+        token = _bearer_token(headers)
+        user_id = user_id_from_token(token) if key and token else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > _MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key длиннее {_MAX_KEY_LENGTH} символов")(scope, receive, send)
+            return
+
+        body = await spool_body(receive, multipart_boundary(headers))
+        if body is None:
+            return
+        try:
+            await self._handle(user_id, key, body, scope, receive, send)
+        finally:
+            body.file.close()
+
+    async def _handle(self, user_id: int, key: str, body: SpooledBody, scope, receive, send) -> None:
+        fingerprint = request_fingerprint(scope, body.digest)
+        deadline = asyncio.get_running_loop().time() + settings.idempotency_wait_seconds
+        while True:
+            claim = await run_in_threadpool(claim_key, user_id, key, fingerprint)
+            if claim.outcome != "in_progress":
+                break
+            # тот же ключ сейчас выполняется — ждём его ответ
+            if asyncio.get_running_loop().time() >= deadline:
+                await _error(
+                    409,
+                    "Запрос с этим Idempotency-Key ещё выполняется",
+                    headers={"Retry-After": str(int(settings.idempotency_poll_interval_seconds) + 1)},
+                )(scope, receive, send)
+                return
+            await asyncio.sleep(settings.idempotency_poll_interval_seconds)
+
+        if claim.outcome == "mismatch":
+            await _error(422, "Idempotency-Key уже использован для другого запроса")(scope, receive, send)
+            return
+        if claim.outcome == "completed":
+            await _replay(claim)(scope, receive, send)
+            return
+        if claim.outcome == "skip":
+            await self.app(scope, _body_receive(body, receive), send)
+            return
+
+        await self._execute(claim.record_id, scope, _body_receive(body, receive), send)
+
+    async def _execute(self, record_id: int, scope, receive, send) -> None:
+        response = {"status": None, "content_type": None, "body": bytearray(), "complete": False}
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                body = response["body"]
+                if body is not None:
+                    body.extend(message.get("body", b""))
+                    if len(body) > settings.idempotency_max_response_bytes:
+                        response["body"] = None
+                if not message.get("more_body", False):
+                    response["complete"] = True
+            await send(message)
+
+        renewal = asyncio.create_task(self._renew(record_id))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            renewal.cancel()
+            status_code = response["status"]
+            storable = (
+                response["complete"]
+                and response["body"] is not None
+                and status_code is not None
+                and status_code < 500
+                and status_code not in _NOT_STORED_STATUSES
+            )
+            try:
+                if storable:
+                    await run_in_threadpool(
+                        complete_key, record_id, status_code, response["content_type"], bytes(response["body"])
+                    )
+                else:
+                    await run_in_threadpool(release_key, record_id)
+            except Exception:
+                # ключ останется in_progress до конца аренды, потом повтор выполнится заново
+                logger.exception("Не удалось сохранить результат Idempotency-Key %s", record_id)
+
+    @staticmethod
+    async def _renew(record_id: int) -> None:
+        interval = settings.idempotency_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(renew_key, record_id)
+            except Exception:
+                logger.warning("Не удалось продлить аренду Idempotency-Key %s", record_id, exc_info=True)
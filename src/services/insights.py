@@ -0,0 +1,305 @@
+"""
+Статистика опубликованных рилсов (insights).
+
+На каждое опубликованное назначение с instagram_media_id заводится строка
+MediaInsight: при публикации — в той же транзакции, а опубликованные до
+появления статистики находит поиск по reel_assignments.id, курсор которого
+хранится в sync_cursors (после рестарта поиск продолжается с места).
+
+Синхронизация забирает строки с наступившим next_fetch_at (SKIP LOCKED и
+аренда, как recovery sweep публикаций), группирует медиа по аккаунтам в
+multi-id запросы до 50 медиа и отправляет их через Graph /batch по 50 —
+до 2500 медиа за один HTTP-запрос. Следующее обновление назначается по
+ярусу: чем старше публикация, тем реже (INSIGHTS_REFRESH_TIERS).
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.db.locks import LockNamespace, try_advisory_xact_lock
+from src.db.session import SessionLocal
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import GRAPH_BATCH_MAX_SIZE, InstagramPublishError, get_media_insights
+from src.models.business_account import BusinessAccount
+from src.models.media_insight import MediaInsight
+from src.models.reel_assignment import ReelAssignment
+from src.models.sync_cursor import SyncCursor
+from src.services.account_health import UNHEALTHY, AccountSnapshot, load_account_snapshots, mark_account_unhealthy
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_CURSOR = "insights-discovery"
+
+# Метрика Graph -> колонка MediaInsight
+_METRIC_COLUMNS = {
+    "plays": "plays",
+    "views": "plays",
+    "reach": "reach",
+    "likes": "likes",
+    "comments": "comments",
+    "shares": "shares",
+    "saved": "saved",
+    "total_interactions": "total_interactions",
+}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite отдаёт время без зоны
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def refresh_interval(published_at: datetime, now: datetime) -> timedelta:
+    """Интервал обновления по возрасту публикации."""
+    age = (now - _as_utc(published_at)).total_seconds()
+    for max_age, interval in settings.insights_refresh_tiers:
+        if age < max_age:
+            return timedelta(seconds=interval)
+    return timedelta(seconds=settings.insights_archive_interval_seconds)
+
+
+def _new_insight(assignment, now: datetime) -> MediaInsight:
+    return MediaInsight(
+        assignment_id=assignment.id,
+        user_id=assignment.user_id,
+        reel_id=assignment.reel_id,
+        business_account_id=assignment.business_account_id,
+        instagram_media_id=assignment.instagram_media_id,
+        published_at=assignment.published_at or now,
+        next_fetch_at=now + timedelta(seconds=settings.insights_first_fetch_delay_seconds),
+    )
+
+
+def track_published_media(db: Session, assignment: ReelAssignment) -> None:
+    """
+    Рилс опубликован — заводим строку статистики в транзакции публикации.
+    Без instagram_media_id (публикация подтверждена только статусом
+    контейнера) статистику получить не по чему.
+    """
+    if assignment.instagram_media_id:
+        db.add(_new_insight(assignment, _utcnow()))
+
+
+def discover_published_media() -> int:
+    """
+    Одна пачка поиска по назначениям после курсора. Неопубликованные
+    назначения курсор тоже проходит: когда они опубликуются, строку
+    заведёт track_published_media. Возвращает число новых строк.
+    """
+    with SessionLocal() as db:
+        if not try_advisory_xact_lock(db, LockNamespace.INSIGHTS_DISCOVERY, 0):
+            return 0
+        cursor = db.get(SyncCursor, DISCOVERY_CURSOR)
+        if cursor is None:
+            cursor = SyncCursor(name=DISCOVERY_CURSOR, value="0")
+            db.add(cursor)
+        rows = (
+            db.query(
+                ReelAssignment.id,
+                ReelAssignment.user_id,
+                ReelAssignment.reel_id,
+                ReelAssignment.business_account_id,
+                ReelAssignment.instagram_media_id,
+                ReelAssignment.published_at,
+                ReelAssignment.status,
+            )
+            .filter(ReelAssignment.id > int(cursor.value or 0))
+            .order_by(ReelAssignment.id)
+            .limit(settings.insights_discovery_batch_size)
+            .all()
+        )
+        if not rows:
+            db.commit()
+            return 0
+
+        published = [row for row in rows if row.status == "published" and row.instagram_media_id]
+        known = set()
+        if published:
+            known = set(
+                db.scalars(
+                    select(MediaInsight.assignment_id).where(
+                        MediaInsight.assignment_id.in_([row.id for row in published])
+                    )
+                )
+            )
+        now = _utcnow()
+        added = [_new_insight(row, now) for row in published if row.id not in known]
+        db.add_all(added)
+        cursor.value = str(rows[-1].id)
+        db.commit()
+
+    if added:
+        logger.info("Найдено опубликованных медиа для статистики: %s", len(added))
+    return len(added)
+
+
+def claim_due_media(db: Session, limit: int) -> list[int]:
+    """Забираем медиа, которым пора обновиться, продлевая им аренду (SKIP LOCKED)."""
+    now = _utcnow()
+    rows = (
+        db.query(MediaInsight)
+        .filter(MediaInsight.next_fetch_at <= now)
+        .order_by(MediaInsight.next_fetch_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = now + timedelta(seconds=settings.insights_lease_seconds)
+    media_ids = []
+    for row in rows:
+        row.next_fetch_at = lease
+        media_ids.append(row.id)
+    db.commit()
+    return media_ids
+
+
+@dataclass(frozen=True)
+class _FetchError:
+    error: str
+    retryable: bool
+
+
+def _fetch(requests: list[tuple[list, AccountSnapshot]]) -> list:
+    """Multi-id запросы через /batch, до INSIGHTS_CONCURRENCY пачек параллельно."""
+    metrics = settings.insights_metrics
+    items = [([media.instagram_media_id for media in group], account) for group, account in requests]
+    chunks = [
+        items[start:start + GRAPH_BATCH_MAX_SIZE]
+        for start in range(0, len(items), GRAPH_BATCH_MAX_SIZE)
+    ]
+    with ThreadPoolExecutor(
+        max_workers=min(settings.insights_concurrency, len(chunks)),
+        thread_name_prefix="insights",
+    ) as pool:
+        return [
+            result
+            for chunk_results in pool.map(lambda chunk: get_media_insights(chunk, metrics), chunks)
+            for result in chunk_results
+        ]
+
+
+def _apply_metrics(media: MediaInsight, values: dict, now: datetime) -> None:
+    for name, value in values.items():
+        column = _METRIC_COLUMNS.get(name)
+        if column is not None and value is not None:
+            setattr(media, column, value)
+    media.fetched_at = now
+    media.fetch_error = None
+    media.next_fetch_at = now + refresh_interval(media.published_at, now)
+
+
+def _apply_error(media: MediaInsight, error: str, now: datetime, *, retryable: bool) -> None:
+    media.fetch_error = str(error)
+    # временная ошибка — скоро повторим; постоянная (медиа удалено, нет
+    # прав на insights) — редко, как архивные публикации
+    delay = settings.insights_retry_delay_seconds if retryable else settings.insights_archive_interval_seconds
+    media.next_fetch_at = now + timedelta(seconds=delay)
+
+
+def _save_outcomes(db: Session, outcomes: dict[int, dict | _FetchError], broken_accounts: dict[int, str]) -> int:
+    """Результаты прохода одной короткой транзакцией. Возвращает число обновлённых медиа."""
+    now = _utcnow()
+    updated = 0
+    for media in db.query(MediaInsight).filter(MediaInsight.id.in_(outcomes)):
+        outcome = outcomes[media.id]
+        if isinstance(outcome, _FetchError):
+            _apply_error(media, outcome.error, now, retryable=outcome.retryable)
+            continue
+        _apply_metrics(media, outcome, now)
+        updated += 1
+    if broken_accounts:
+        for account in db.query(BusinessAccount).filter(BusinessAccount.id.in_(broken_accounts)):
+            mark_account_unhealthy(account, broken_accounts[account.id])
+    db.commit()
+    return updated
+
+
+def sync_insights() -> int:
+    """
+    Один проход синхронизации. Возвращает число обновлённых медиа.
+
+    Graph-запросы идут без открытой транзакции: после аренды нужные поля
+    копируются в строки и AccountSnapshot, сессия закрывается, а
+    результаты пишутся новой короткой транзакцией (_save_outcomes).
+    """
+    discover_published_media()
+
+    with SessionLocal() as db:
+        media_ids = claim_due_media(db, settings.insights_sync_batch_size)
+        if not media_ids:
+            return 0
+        media = (
+            db.query(MediaInsight.id, MediaInsight.business_account_id, MediaInsight.instagram_media_id)
+            .filter(MediaInsight.id.in_(media_ids))
+            .order_by(MediaInsight.id)
+            .all()
+        )
+        account_ids = {item.business_account_id for item in media}
+        accounts = {account.id: account for account in load_account_snapshots(db, account_ids)}
+        unhealthy = set(
+            db.scalars(
+                select(BusinessAccount.id).where(
+                    BusinessAccount.id.in_(account_ids),
+                    BusinessAccount.health_status == UNHEALTHY,
+                )
+            )
+        )
+
+    outcomes: dict[int, dict | _FetchError] = {}
+    broken_accounts: dict[int, str] = {}
+    by_account: dict[int, list] = defaultdict(list)
+    for item in media:
+        if item.business_account_id not in accounts or item.business_account_id in unhealthy:
+            # токен не работает — не тратим запросы, ждём перепроверки аккаунта
+            outcomes[item.id] = _FetchError("Бизнес-аккаунт недоступен", retryable=True)
+            continue
+        by_account[item.business_account_id].append(item)
+
+    per_request = max(1, min(settings.insights_ids_per_request, 50))
+    requests = [
+        (group[start:start + per_request], accounts[account_id])
+        for account_id, group in by_account.items()
+        for start in range(0, len(group), per_request)
+    ]
+    results = _fetch(requests) if requests else []
+
+    # multi-id падает целиком из-за одного удалённого медиа —
+    # такие запросы повторяем по одному медиа
+    singles = []
+    for (group, account), result in zip(requests, results):
+        if isinstance(result, InstagramPublishError):
+            if result.kind == GraphErrorKind.PERMANENT and len(group) > 1:
+                singles.extend(([item], account) for item in group)
+                continue
+            if result.kind == GraphErrorKind.TOKEN_INVALID:
+                broken_accounts[account.id] = str(result)
+            for item in group:
+                outcomes[item.id] = _FetchError(str(result), retryable=result.retryable)
+            continue
+        for item in group:
+            outcomes[item.id] = result[item.instagram_media_id]
+
+    for (group, account), result in zip(singles, _fetch(singles) if singles else []):
+        item = group[0]
+        if isinstance(result, InstagramPublishError):
+            outcomes[item.id] = _FetchError(str(result), retryable=result.retryable)
+        else:
+            outcomes[item.id] = result[item.instagram_media_id]
+
+    with SessionLocal() as db:
+        updated = _save_outcomes(db, outcomes, broken_accounts)
+
+    logger.info("Статистика медиа обновлена: %s из %s", updated, len(media_ids))
+    return updated
@@ -0,0 +1,319 @@
+"""
+Файлы рилсов: учёт места пользователя и сборщик мусора.
+
+Учёт места: User.storage_used_bytes меняется атомарным UPDATE в той же
+транзакции, что и запись Reel (загрузка, удаление, публикация), поэтому
+квота проверяется за O(1), без суммирования по reels.
+
+Сборщик мусора: идёт по хранилищу пачками в порядке ключей и сверяет
+каждую пачку с reels.file_path одним запросом по диапазону ключей
+(сортированное слияние двух упорядоченных списков). Файл удаляется, если
+на него нет записи и он старше MEDIA_GC_GRACE_SECONDS (моложе — может быть
+загрузкой, чья запись ещё не закоммичена), либо если его рилс уже
+опубликован и ни одна его цель (fan-out) больше не публикуется и не
+запланирована. Так подбираются и файлы, оставшиеся после каскадного
+удаления пользователей, и файлы, которые не удалось удалить сразу.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.core.paths import REELS_ROOT
+from src.db.locks import LockNamespace, try_advisory_xact_lock
+from src.db.session import SessionLocal
+from src.models.reel import Reel
+from src.models.reel_assignment import RESERVED_STATUSES, ReelAssignment
+from src.models.user import User
+from src.storage import StorageError, StoredObject, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def storage_quota(user: User) -> int:
+    if user.storage_quota_bytes is not None:
+        return user.storage_quota_bytes
+    return settings.user_storage_quota_bytes
+
+
+def _quota_expr():
+    return func.coalesce(User.storage_quota_bytes, settings.user_storage_quota_bytes)
+
+
+def reserve_storage(db: Session, user_id: int, size: int) -> bool:
+    """
+    Списывает size байт с квоты пользователя. False — квоты не хватает.
+    Строка пользователя остаётся заблокированной до конца транзакции, так
+    что параллельные загрузки одного пользователя не превысят квоту.
+    """
+    result = db.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            User.storage_used_bytes + size <= _quota_expr(),
+        )
+        .values(storage_used_bytes=User.storage_used_bytes + size)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def release_storage(db: Session, user_id: int, size: int) -> None:
+    if size <= 0:
+        return
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            storage_used_bytes=case(
+                (User.storage_used_bytes > size, User.storage_used_bytes - size),
+                else_=0,
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_reel_storage(db: Session, reel: Reel) -> None:
+    """Файл рилса больше не нужен — возвращаем его размер в квоту."""
+    release_storage(db, reel.user_id, reel.size_bytes or 0)
+    reel.size_bytes = 0
+
+
+def reel_in_flight(db: Session, reel_id: int) -> bool:
+    """Есть ли у рилса цели, которые ещё публикуются или запланированы."""
+    return db.query(
+        db.query(ReelAssignment.id)
+        .filter(
+            ReelAssignment.reel_id == reel_id,
+            ReelAssignment.status.in_(RESERVED_STATUSES),
+        )
+        .exists()
+    ).scalar()
+
+
+def settle_reel_files(reel_ids) -> list[str]:
+    """
+    Рилсы, цели которых завершались параллельно в разных транзакциях:
+    под блокировкой строки рилса проверяем, что все цели финальны, и
+    освобождаем место. Возвращает ключи файлов, которые можно удалять.
+    Каждый завершивший цель вызывает это после своего коммита, так что
+    последний из них увидит все остальные закоммиченными.
+    """
+    keys = []
+    for reel_id in sorted(reel_ids):
+        with SessionLocal() as db:
+            reel = db.query(Reel).filter(Reel.id == reel_id).with_for_update().one_or_none()
+            if reel is None or not reel.is_used or reel_in_flight(db, reel_id):
+                continue
+            release_reel_storage(db, reel)
+            db.commit()
+            keys.append(reel.file_path)
+    return keys
+
+
+def delete_stored_file(key: str) -> None:
+    """
+    Удаляет файл после коммита. Ошибка только логируется: запись уже
+    удалена или рилс опубликован, и файл подберёт сборщик мусора.
+    """
+    try:
+        get_storage().delete(key)
+    except StorageError:
+        logger.warning("Не удалось удалить файл рилса %s, его удалит сборщик мусора", key, exc_info=True)
+
+
+# Удаление файлов после коммита — вне обработки запроса. Пул создаётся
+# при первом удалении, а не при импорте
+_file_deleter: ThreadPoolExecutor | None = None
+_file_deleter_lock = threading.Lock()
+
+
+def _get_file_deleter() -> ThreadPoolExecutor:
+    global _file_deleter
+    with _file_deleter_lock:
+        if _file_deleter is None:
+            _file_deleter = ThreadPoolExecutor(
+                max_workers=settings.media_delete_workers,
+                thread_name_prefix="media-delete",
+            )
+        return _file_deleter
+
+
+def _delete_stored_files(keys: list[str]) -> None:
+    failed = get_storage().delete_many(keys)
+    if failed:
+        logger.warning(
+            "Не удалось удалить файлов рилсов: %s, их удалит сборщик мусора",
+            len(failed),
+        )
+
+
+def schedule_file_deletes(keys: list[str]) -> None:
+    """Ставит удаление файлов в фоновый пул; вызывать после коммита."""
+    if keys:
+        _get_file_deleter().submit(_delete_stored_files, list(keys))
+
+
+def shutdown_file_deleter(wait: bool = True) -> None:
+    global _file_deleter
+    with _file_deleter_lock:
+        deleter, _file_deleter = _file_deleter, None
+    if deleter is not None:
+        deleter.shutdown(wait=wait)
+
+
+def _legacy_path(key: str) -> str:
+    # старые записи хранят полный путь к файлу на диске
+    return str(REELS_ROOT / key)
+
+
+def _sort_column(db: Session):
+    # побайтовый порядок, как у хранилища, независимо от локали базы
+    if db.get_bind().dialect.name == "postgresql":
+        return Reel.file_path.collate("C")
+    return Reel.file_path
+
+
+_GC_COLUMNS = (
+    Reel.id,
+    Reel.user_id,
+    Reel.file_path,
+    Reel.size_bytes,
+    Reel.is_used,
+    # цели fan-out ещё публикуются — файл нужен, хотя рилс уже is_used
+    select(ReelAssignment.id)
+    .where(
+        ReelAssignment.reel_id == Reel.id,
+        ReelAssignment.status.in_(RESERVED_STATUSES),
+    )
+    .exists()
+    .label("in_flight"),
+)
+
+
+class MediaGarbageCollector:
+    def __init__(self) -> None:
+        # Ключ, на котором остановился прошлый проход (None — с начала)
+        self.cursor: str | None = None
+
+    def run(self) -> int:
+        """Обрабатывает до MEDIA_GC_BATCHES_PER_RUN пачек; возвращает число удалённых файлов."""
+        removed = 0
+        for _ in range(max(settings.media_gc_batches_per_run, 1)):
+            with SessionLocal() as db:
+                # один сборщик на все процессы; занят — пропускаем проход
+                if not try_advisory_xact_lock(db, LockNamespace.MEDIA_GC, 0):
+                    return removed
+                objects = get_storage().list_objects(
+                    start_after=self.cursor,
+                    limit=settings.media_gc_batch_size,
+                )
+                if objects:
+                    removed += self._reconcile(db, objects)
+                db.commit()
+
+            if len(objects) < settings.media_gc_batch_size:
+                # дошли до конца хранилища — следующий проход с начала
+                self.cursor = None
+                break
+            self.cursor = objects[-1].key
+
+        if removed:
+            logger.info("Сборщик мусора медиа удалил файлов: %s", removed)
+        return removed
+
+    def _reconcile(self, db: Session, objects: list[StoredObject]) -> int:
+        column = _sort_column(db)
+        rows = (
+            db.query(*_GC_COLUMNS)
+            .filter(column >= objects[0].key, column <= objects[-1].key)
+            .order_by(column)
+            .all()
+        )
+
+        # слияние: оба списка отсортированы по ключу
+        matched: dict[str, list] = {}
+        unmatched: list[StoredObject] = []
+        i = 0
+        for obj in objects:
+            while i < len(rows) and rows[i].file_path < obj.key:
+                i += 1
+            j = i
+            while j < len(rows) and rows[j].file_path == obj.key:
+                j += 1
+            if j > i:
+                matched[obj.key] = rows[i:j]
+            else:
+                unmatched.append(obj)
+            i = j
+
+        # старые записи с абсолютными путями — одним запросом на пачку
+        if unmatched:
+            legacy = {_legacy_path(obj.key): obj.key for obj in unmatched}
+            legacy_rows = (
+                db.query(*_GC_COLUMNS)
+                .filter(Reel.file_path.in_(legacy))
+                .all()
+            )
+            for row in legacy_rows:
+                matched.setdefault(legacy[row.file_path], []).append(row)
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.media_gc_grace_seconds)
+        garbage = []
+        size_backfill: dict[int, int] = {}
+        for obj in objects:
+            reel_rows = matched.get(obj.key)
+            if reel_rows is None:
+                if obj.modified_at < cutoff:
+                    garbage.append(obj.key)
+                continue
+            if all(row.is_used and not row.in_flight for row in reel_rows):
+                # рилс опубликован на все цели, а файл не удалился сразу
+                garbage.append(obj.key)
+                continue
+            for row in reel_rows:
+                if not row.is_used and not row.size_bytes and obj.size:
+                    size_backfill[row.id] = obj.size
+
+        if size_backfill:
+            self._backfill_sizes(db, size_backfill, rows_by_id={
+                row.id: row for reel_rows in matched.values() for row in reel_rows
+            })
+
+        if not garbage:
+            return 0
+        failed = get_storage().delete_many(garbage)
+        if failed:
+            logger.warning("Сборщик мусора не смог удалить файлов: %s", len(failed))
+        return len(garbage) - len(failed)
+
+    @staticmethod
+    def _backfill_sizes(db: Session, sizes: dict[int, int], rows_by_id: dict) -> None:
+        """Рилсы, загруженные до учёта места: записываем размер и добавляем его в счётчик."""
+        per_user: dict[int, int] = defaultdict(int)
+        for reel_id, size in sizes.items():
+            result = db.execute(
+                update(Reel)
+                .where(Reel.id == reel_id, Reel.size_bytes == 0)
+                .values(size_bytes=size)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                per_user[rows_by_id[reel_id].user_id] += size
+        for user_id, size in per_user.items():
+            db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(storage_used_bytes=User.storage_used_bytes + size)
+                .execution_options(synchronize_session=False)
+            )
+
+
+media_gc = MediaGarbageCollector()
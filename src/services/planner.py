@@ -0,0 +1,272 @@
+"""
+Планировщик назначения рилсов на бизнес-аккаунты.
+
+Держит аккаунты в куче (heapq), порядок в которой задаёт стратегия.
+Каждый аккаунт может получить за раунд столько рилсов, сколько
+позволяет его остаток суточной квоты Instagram. Итоговая сложность —
+O((R + A) log A) для R рилсов и A аккаунтов.
+
+Стратегии:
+- round_robin — раздаём по одному рилсу по кругу в порядке id аккаунтов;
+- least_recent — сначала аккаунты, которые дольше всех ничего не публиковали;
+- weighted — пропорционально остатку квоты (чем больше остаток, тем больше рилсов).
+
+Свою стратегию можно добавить через register_strategy.
+"""
+
+import heapq
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Protocol, Sequence
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models.business_account import BusinessAccount
+from src.models.reel_assignment import ReelAssignment
+from src.services.publisher import ACTIVE_STATUSES, SCHEDULED_STATUS
+
+
+@dataclass
+class AccountSlot:
+    account: object
+    # Порядок аккаунта во входном списке — для стабильных тай-брейков
+    order: int
+    remaining_quota: int
+    last_published_at: datetime | None = None
+    recent_failures: int = 0
+    # Сколько рилсов назначено в текущем раунде
+    assigned: int = 0
+
+    @property
+    def available(self) -> int:
+        return self.remaining_quota - self.assigned
+
+
+class PlannerStrategy(Protocol):
+    def key(self, slot: AccountSlot) -> tuple:
+        """Ключ кучи: аккаунт с наименьшим ключом получает следующий рилс."""
+
+
+class RoundRobinStrategy:
+    def key(self, slot: AccountSlot) -> tuple:
+        return (slot.assigned, slot.recent_failures, slot.order)
+
+
+class LeastRecentlyPostedStrategy:
+    def key(self, slot: AccountSlot) -> tuple:
+        last = slot.last_published_at.timestamp() if slot.last_published_at else float("-inf")
+        return (slot.assigned, slot.recent_failures, last, slot.order)
+
+
+class WeightedStrategy:
+    def key(self, slot: AccountSlot) -> tuple:
+        # «Виртуальное время окончания» как в weighted fair queueing:
+        # аккаунт с большим остатком квоты получает рилсы чаще
+        return ((slot.assigned + 1) / slot.remaining_quota, slot.recent_failures, slot.order)
+
+
+STRATEGIES: dict[str, PlannerStrategy] = {
+    "round_robin": RoundRobinStrategy(),
+    "least_recent": LeastRecentlyPostedStrategy(),
+    "weighted": WeightedStrategy(),
+}
+
+
+def register_strategy(name: str, strategy: PlannerStrategy) -> None:
+    STRATEGIES[name] = strategy
+
+
+def get_strategy(name: str | None) -> PlannerStrategy:
+    name = name or settings.publish_planner_strategy
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная стратегия планировщика: {name}") from None
+
+
+@dataclass
+class Plan:
+    pairs: list[tuple[object, object]] = field(default_factory=list)
+    reels_left_unassigned: int = 0
+
+
+def plan_assignments(
+    reels: Sequence[object],
+    slots: Sequence[AccountSlot],
+    strategy: PlannerStrategy,
+) -> Plan:
+    """
+    Раздаём рилсы по аккаунтам в рамках их квот.
+    Рилсы берутся в переданном порядке.
+    """
+    heap = [(strategy.key(slot), slot.order, slot) for slot in slots if slot.available > 0]
+    heapq.heapify(heap)
+
+    plan = Plan()
+    for reel in reels:
+        if not heap:
+            break
+        _, order, slot = heapq.heappop(heap)
+        plan.pairs.append((reel, slot.account))
+        slot.assigned += 1
+        if slot.available > 0:
+            heapq.heappush(heap, (strategy.key(slot), order, slot))
+
+    plan.reels_left_unassigned = len(reels) - len(plan.pairs)
+    return plan
+
+
+def _last_published_at(db: Session, account_ids: list[int]) -> dict[int, datetime]:
+    """
+    Последняя публикация каждого аккаунта: коррелированный max(published_at)
+    на аккаунт берёт одну запись с конца индекса (business_account_id,
+    published_at), а не всю историю аккаунта.
+    """
+    last_published_at = (
+        select(func.max(ReelAssignment.published_at))
+        .where(
+            ReelAssignment.business_account_id == BusinessAccount.id,
+            ReelAssignment.published_at.isnot(None),
+        )
+        .correlate(BusinessAccount)
+        .scalar_subquery()
+    )
+    rows = db.query(BusinessAccount.id, last_published_at).filter(BusinessAccount.id.in_(account_ids)).all()
+    return {account_id: value for account_id, value in rows if value is not None}
+
+
+def load_account_slots(db: Session, accounts: Sequence[object]) -> list[AccountSlot]:
+    """
+    Одним агрегирующим запросом считаем для аккаунтов:
+    - расход суточного лимита: опубликованные за последние 24 часа (по
+      published_at) плюс идущие сейчас (pending .. publishing) и
+      запланированные, чьё время уже наступило; запланированные на будущее
+      лимит сегодня не расходуют;
+    - сколько ошибок было за окно planner_failure_window_minutes.
+    Запрос читает только записи из этих окон и идущие публикации, а не всю
+    историю аккаунтов. Время последней успешной публикации — отдельным
+    запросом по индексу (_last_published_at).
+    """
+    if not accounts:
+        return []
+
+    now = datetime.now(timezone.utc)
+    quota_since = now - timedelta(hours=24)
+    failures_since = now - timedelta(minutes=settings.planner_failure_window_minutes)
+    since = min(quota_since, failures_since)
+    account_ids = [account.id for account in accounts]
+    due_scheduled = and_(
+        ReelAssignment.status == SCHEDULED_STATUS,
+        ReelAssignment.scheduled_at <= now,
+    )
+
+    rows = (
+        db.query(
+            ReelAssignment.business_account_id,
+            func.count(
+                case(
+                    (
+                        or_(
+                            and_(
+                                ReelAssignment.status == "published",
+                                ReelAssignment.published_at >= quota_since,
+                            ),
+                            ReelAssignment.status.in_(ACTIVE_STATUSES),
+                            due_scheduled,
+                        ),
+                        1,
+                    )
+                )
+            ),
+            func.count(
+                case(
+                    (
+                        and_(
+                            ReelAssignment.status == "error",
+                            ReelAssignment.created_at >= failures_since,
+                        ),
+                        1,
+                    )
+                )
+            ),
+        )
+        .filter(
+            ReelAssignment.business_account_id.in_(account_ids),
+            or_(
+                ReelAssignment.published_at >= since,
+                ReelAssignment.created_at >= since,
+                ReelAssignment.status.in_(ACTIVE_STATUSES),
+                due_scheduled,
+            ),
+        )
+        .group_by(ReelAssignment.business_account_id)
+        .all()
+    )
+    stats = {row[0]: row[1:] for row in rows}
+    last_published = _last_published_at(db, account_ids)
+
+    slots = []
+    for order, account in enumerate(accounts):
+        used, failures = stats.get(account.id, (0, 0))
+        if failures >= settings.planner_max_recent_failures:
+            # аккаунт недавно подряд падал — в этом раунде его не трогаем
+            continue
+        slots.append(
+            AccountSlot(
+                account=account,
+                order=order,
+                remaining_quota=max(settings.instagram_daily_publish_limit - used, 0),
+                last_published_at=last_published.get(account.id),
+                recent_failures=failures,
+            )
+        )
+    return slots
+
+
+def _utc_date(value: datetime) -> date:
+    # SQLite отдаёт время без зоны (оно и так в UTC)
+    if value.tzinfo is None:
+        return value.date()
+    return value.astimezone(timezone.utc).date()
+
+
+def load_daily_usage(db: Session, account_ids: Sequence[int], since: datetime) -> dict[int, Counter]:
+    """
+    Расход суточного лимита аккаунтов по дням (UTC), начиная с дня since:
+    опубликованные — в день published_at, запланированные — в день
+    scheduled_at, идущие сейчас — сегодня. Для раскладки расписания на
+    несколько дней (src.services.scheduler.assign_schedule_times).
+    """
+    if not account_ids:
+        return {}
+
+    today = datetime.now(timezone.utc).date()
+    rows = (
+        db.query(
+            ReelAssignment.business_account_id,
+            ReelAssignment.status,
+            ReelAssignment.published_at,
+            ReelAssignment.scheduled_at,
+        )
+        .filter(
+            ReelAssignment.business_account_id.in_(account_ids),
+            or_(
+                and_(ReelAssignment.status == "published", ReelAssignment.published_at >= since),
+                and_(ReelAssignment.status == SCHEDULED_STATUS, ReelAssignment.scheduled_at >= since),
+                ReelAssignment.status.in_(ACTIVE_STATUSES),
+            ),
+        )
+        .all()
+    )
+    usage: dict[int, Counter] = {}
+    for account_id, status, published_at, scheduled_at in rows:
+        day: date = today
+        if status == "published":
+            day = _utc_date(published_at)
+        elif status == SCHEDULED_STATUS:
+            day = max(_utc_date(scheduled_at), today)
+        usage.setdefault(account_id, Counter())[day] += 1
+    return usage
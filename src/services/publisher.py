@@ -0,0 +1,625 @@
+"""
+Возобновляемая публикация рилса на бизнес-аккаунт.
+
+Каждый шаг публикации сохраняется в ReelAssignment и коммитится сразу:
+
+    pending -> container_created -> finished -> publishing -> published
+                                                         \\-> error
+
+Если воркер упал посреди шага, назначение остаётся в активном статусе
+с истёкшим next_attempt_at, и recovery sweep продолжает его с последнего
+завершённого шага. Перед media_publish статус переводится в publishing,
+а при возобновлении из publishing сначала проверяется статус контейнера:
+если он уже PUBLISHED, повторный media_publish не делается — так рилс
+не выкладывается дважды.
+"""
+
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from src.core.config import settings
+from src.core.logs import log_context
+from src.core.shutdown import is_draining, sleep_unless_draining
+from src.core.tracing import current_trace_id, span
+from src.db.session import SessionLocal
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import (
+    ContainerNotReadyError,
+    InstagramPublishError,
+    create_media_container,
+    create_media_containers,
+    get_container_status,
+    get_container_statuses,
+    publish_media_container,
+    publish_media_containers,
+    wait_for_container,
+)
+from src.models.reel_assignment import (  # noqa: F401
+    ACTIVE_STATUSES,
+    FINAL_STATUSES,
+    RESERVED_STATUSES,
+    SCHEDULED_STATUS,
+    ReelAssignment,
+)
+from src.services.account_health import mark_account_unhealthy
+from src.services.insights import track_published_media
+from src.services.media import delete_stored_file, reel_in_flight, release_reel_storage, settle_reel_files
+
+logger = logging.getLogger(__name__)
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# session.info: файлы, освобождённые в транзакции, и рилсы, чьи цели
+# завершались параллельно (решение о файле — после коммита)
+_RELEASED_FILES = "publisher_released_files"
+_UNSETTLED_REELS = "publisher_unsettled_reels"
+
+
+def lease_until() -> datetime:
+    return _utcnow() + timedelta(seconds=settings.publish_lease_seconds)
+
+
+def _checkpoint(db: Session, assignment: ReelAssignment, *, status: str | None = None) -> None:
+    """Фиксируем шаг и продлеваем аренду назначения."""
+    if status is not None:
+        assignment.status = status
+    assignment.next_attempt_at = lease_until()
+    _commit(db)
+
+
+def _commit(db: Session) -> None:
+    """
+    Коммит шага. Файлы рилсов удаляем только после него: если коммит не
+    прошёл, при возобновлении файл ещё понадобится.
+    """
+    try:
+        db.commit()
+    except Exception:
+        db.info.pop(_RELEASED_FILES, None)
+        db.info.pop(_UNSETTLED_REELS, None)
+        raise
+    keys = db.info.pop(_RELEASED_FILES, [])
+    unsettled = db.info.pop(_UNSETTLED_REELS, None)
+    if unsettled:
+        keys += settle_reel_files(unsettled)
+    for key in dict.fromkeys(keys):
+        delete_stored_file(key)
+
+
+def _release_reel_file(assignment: ReelAssignment) -> None:
+    """
+    Цель рилса дошла до финального статуса. Файл и место в квоте освобождаем,
+    когда рилс опубликован и ни одна другая его цель (fan-out) больше не
+    публикуется и не запланирована.
+    """
+    reel = assignment.reel
+    if not reel.is_used:
+        # ни одной публикации — файл остаётся для следующего раунда
+        return
+    db = object_session(assignment)
+    db.flush()
+    if reel_in_flight(db, reel.id):
+        # остальные цели ещё идут; если они завершаются в других транзакциях,
+        # после коммита проверим снова под блокировкой рилса
+        db.info.setdefault(_UNSETTLED_REELS, set()).add(reel.id)
+        return
+    release_reel_storage(db, reel)
+    db.info.setdefault(_RELEASED_FILES, []).append(reel.file_path)
+
+
+def create_assignment(db: Session, *, reel, account, job_id: str | None = None) -> ReelAssignment:
+    """
+    Новое назначение рилса на аккаунт. Сразу под арендой, чтобы recovery
+    sweep не подхватил его, пока текущий воркер над ним работает.
+    """
+    assignment = ReelAssignment(
+        user_id=reel.user_id,
+        reel_id=reel.id,
+        business_account_id=account.id,
+        job_id=job_id,
+        status="pending",
+        attempt_count=0,
+        next_attempt_at=lease_until(),
+        trace_id=current_trace_id(),
+    )
+    db.add(assignment)
+    db.flush()
+    return assignment
+
+
+def _apply_published(assignment: ReelAssignment, ig_media_id: str | None) -> None:
+    newly_published = assignment.status != "published"
+    assignment.instagram_media_id = ig_media_id
+    assignment.status = "published"
+    assignment.container_status = "PUBLISHED"
+    assignment.error_message = None
+    assignment.published_at = _utcnow()
+    assignment.next_attempt_at = None
+
+    # отмечаем рилс как использованный; если других целей нет, файл больше
+    # не нужен — его размер возвращаем в квоту в той же транзакции
+    # (сам файл удаляется после коммита)
+    assignment.reel.is_used = True
+    _release_reel_file(assignment)
+    if newly_published:
+        # статистику опубликованного медиа начинаем собирать сразу
+        track_published_media(object_session(assignment), assignment)
+
+
+def _mark_published(db: Session, assignment: ReelAssignment, ig_media_id: str | None) -> None:
+    _apply_published(assignment, ig_media_id)
+    _commit(db)
+
+
+def _apply_failure(assignment: ReelAssignment, exc: Exception) -> None:
+    assignment.status = "error"
+    assignment.error_message = str(exc)
+    assignment.next_attempt_at = None
+    # последняя цель fan-out упала, остальные опубликованы — файл больше не нужен
+    _release_reel_file(assignment)
+    if isinstance(exc, InstagramPublishError) and exc.kind == GraphErrorKind.TOKEN_INVALID:
+        # токен отозван/протух — не ждём фоновой проверки, чтобы следующий
+        # раунд publish_reels уже пропустил этот аккаунт
+        mark_account_unhealthy(assignment.business_account, str(exc))
+
+
+def _fail(db: Session, assignment: ReelAssignment, exc: Exception) -> None:
+    _apply_failure(assignment, exc)
+    _commit(db)
+
+
+def _retry_delay(assignment: ReelAssignment, exc: InstagramPublishError) -> timedelta:
+    if exc.kind == GraphErrorKind.THROTTLED:
+        base = settings.publish_throttle_delay_seconds
+    else:
+        base = settings.publish_retry_delay_seconds * 2 ** max(assignment.attempt_count - 1, 0)
+    # джиттер, чтобы отложенные назначения не проснулись все разом
+    return timedelta(seconds=base * random.uniform(1.0, 1.5))
+
+
+def _apply_step_error(assignment: ReelAssignment, exc: InstagramPublishError) -> None:
+    """
+    transient / throttled (включая открытый circuit breaker и необработанный
+    вовремя контейнер) — откладываем до next_attempt_at и повторим с того
+    же места, остальное — ошибка.
+    """
+    if not exc.retryable or assignment.attempt_count >= settings.publish_max_attempts:
+        _apply_failure(assignment, exc)
+        return
+    assignment.error_message = str(exc)
+    assignment.next_attempt_at = _utcnow() + _retry_delay(assignment, exc)
+
+
+def _apply_container_created(assignment: ReelAssignment, creation_id: str) -> None:
+    assignment.creation_id = creation_id
+    assignment.container_status = None
+    assignment.status = "container_created"
+    assignment.next_attempt_at = lease_until()
+
+
+def _apply_container_status(assignment: ReelAssignment, container_status: str | None) -> bool:
+    """
+    Переход по status_code контейнера. False — контейнер ещё обрабатывается
+    (IN_PROGRESS), назначение остаётся в container_created.
+    """
+    if container_status == "ERROR":
+        raise InstagramPublishError(
+            f"Instagram вернул статус ERROR для контейнера {assignment.creation_id}"
+        )
+    if container_status not in ("FINISHED", "PUBLISHED", "EXPIRED"):
+        return False
+
+    assignment.container_status = container_status
+    if container_status == "FINISHED":
+        assignment.status = "finished"
+        assignment.next_attempt_at = lease_until()
+    elif container_status == "PUBLISHED":
+        _apply_published(assignment, assignment.instagram_media_id)
+    else:
+        # EXPIRED: контейнер протух, создаём заново
+        assignment.creation_id = None
+        assignment.status = "pending"
+        assignment.next_attempt_at = lease_until()
+    return True
+
+
+def _apply_resumed_status(assignment: ReelAssignment, container_status: str | None) -> None:
+    """Возобновление после падения во время media_publish."""
+    if container_status == "PUBLISHED":
+        logger.warning(
+            "Контейнер %s уже опубликован до падения воркера, ig_media_id неизвестен: assignment_id=%s",
+            assignment.creation_id,
+            assignment.id,
+        )
+    if not _apply_container_status(assignment, container_status):
+        raise InstagramPublishError(
+            f"Контейнер {assignment.creation_id} в статусе {container_status} при возобновлении публикации"
+        )
+
+
+def _step_create_container(db: Session, assignment: ReelAssignment) -> None:
+    creation_id = create_media_container(
+        reel=assignment.reel,
+        account=assignment.business_account,
+    )
+    _apply_container_created(assignment, creation_id)
+    _commit(db)
+
+
+def _step_wait_container(db: Session, assignment: ReelAssignment) -> None:
+    container_status = wait_for_container(
+        creation_id=assignment.creation_id,
+        account=assignment.business_account,
+    )
+    _apply_container_status(assignment, container_status)
+    _commit(db)
+
+
+def _step_publish(db: Session, assignment: ReelAssignment) -> None:
+    # Сначала фиксируем, что media_publish начат: если упадём после
+    # успешного вызова, при возобновлении не опубликуем второй раз
+    _checkpoint(db, assignment, status="publishing")
+
+    try:
+        ig_media_id = publish_media_container(
+            creation_id=assignment.creation_id,
+            account=assignment.business_account,
+        )
+    except InstagramPublishError:
+        # Ответ мог потеряться уже после публикации — перепроверяем контейнер
+        if _safe_container_status(assignment) == "PUBLISHED":
+            _mark_published(db, assignment, None)
+            return
+        raise
+
+    _mark_published(db, assignment, ig_media_id)
+
+
+def _step_resume_publishing(db: Session, assignment: ReelAssignment) -> None:
+    container_status = get_container_status(
+        creation_id=assignment.creation_id,
+        account=assignment.business_account,
+    )
+    _apply_resumed_status(assignment, container_status)
+    _commit(db)
+
+
+def _safe_container_status(assignment: ReelAssignment) -> str | None:
+    try:
+        return get_container_status(
+            creation_id=assignment.creation_id,
+            account=assignment.business_account,
+        )
+    except InstagramPublishError:
+        return None
+
+
+_STEPS = {
+    "pending": _step_create_container,
+    "container_created": _step_wait_container,
+    "finished": _step_publish,
+    "publishing": _step_resume_publishing,
+}
+
+
+def _hand_off(assignments: Sequence[ReelAssignment]) -> None:
+    """
+    Процесс останавливается (drain): шаги уже закоммичены, снимаем аренду,
+    чтобы новый процесс продолжил сразу. Прерванная попытка не засчитывается.
+    """
+    now = _utcnow()
+    for assignment in assignments:
+        if assignment.status in ACTIVE_STATUSES:
+            assignment.next_attempt_at = now
+            assignment.attempt_count = max(assignment.attempt_count - 1, 0)
+    if assignments:
+        logger.info("Drain: отпускаем назначения до рестарта: %s", [a.id for a in assignments])
+
+
+def _start_attempt(assignment: ReelAssignment) -> bool:
+    """Засчитываем попытку и продлеваем аренду. False — продолжать нечего."""
+    if assignment.status in FINAL_STATUSES:
+        return False
+    if assignment.attempt_count >= settings.publish_max_attempts:
+        _apply_failure(assignment, InstagramPublishError("Превышено число попыток публикации"))
+        return False
+    assignment.attempt_count += 1
+    assignment.next_attempt_at = lease_until()
+    # трасса последней попытки: по ней ищем, куда ушло время
+    assignment.trace_id = current_trace_id() or assignment.trace_id
+    return True
+
+
+def advance_assignment(db: Session, assignment: ReelAssignment) -> str:
+    """
+    Доводит назначение от текущего шага до финального статуса,
+    коммитя состояние после каждого шага. Возвращает статус, на котором
+    остановились (активный — если шаг отложен до next_attempt_at).
+    """
+    if assignment.status in FINAL_STATUSES:
+        return assignment.status
+
+    # Назначение под нашей арендой, никто другой его не меняет — не перечитываем
+    # assignment/reel/account из БД после каждого коммита шага
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        with log_context(**_log_fields(assignment)):
+            return _advance(db, assignment)
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def _log_fields(assignment: ReelAssignment) -> dict:
+    """Поля корреляции записей лога одной публикации."""
+    return {
+        "assignment_id": assignment.id,
+        "reel_id": assignment.reel_id,
+        "account_id": assignment.business_account_id,
+        "publish_job_id": assignment.job_id,
+    }
+
+
+def _phase_log_fields(status: str, group: Sequence[ReelAssignment]) -> dict:
+    # у пачки общая трасса (trace_id), у одиночной публикации — ещё и свои поля
+    fields = {"publish_phase": status}
+    if len(group) == 1:
+        fields.update(_log_fields(group[0]))
+    return fields
+
+
+def _advance(db: Session, assignment: ReelAssignment) -> str:
+    started = _start_attempt(assignment)
+    _commit(db)
+    if not started:
+        return assignment.status
+
+    try:
+        while assignment.status not in FINAL_STATUSES:
+            if is_draining():
+                _hand_off([assignment])
+                _commit(db)
+                break
+            _STEPS[assignment.status](db, assignment)
+    except InstagramPublishError as exc:
+        _apply_step_error(assignment, exc)
+        _commit(db)
+    return assignment.status
+
+
+class _BatchRound:
+    """
+    Продвижение набора назначений по шагам «фазами»: на каждой итерации
+    однотипные шаги всех назначений уходят в Graph общим /batch, а результат
+    каждого под-запроса применяется к своему назначению. Ошибка элемента
+    откладывает или роняет только его назначение.
+    """
+
+    def __init__(self, db: Session, assignments: Sequence[ReelAssignment]) -> None:
+        self.db = db
+        self.live = list(assignments)
+        self.stopped: set[int] = set()
+        self.polls: dict[int, int] = {}
+        self.last_poll_at: float | None = None
+
+    def run(self) -> None:
+        phases = (
+            ("pending", "publish.create_containers", self._create_containers),
+            ("container_created", "publish.poll_containers", self._poll_containers),
+            ("finished", "publish.media_publish", self._publish),
+            ("publishing", "publish.resume", self._resume_publishing),
+        )
+        while self.live:
+            progressed = False
+            for status, span_name, phase in phases:
+                if is_draining():
+                    # идущий шаг доделан, новый не начинаем
+                    break
+                group = [assignment for assignment in self.live if assignment.status == status]
+                if group:
+                    with span(span_name, attributes={"publish.assignments": len(group)}), log_context(
+                        **_phase_log_fields(status, group)
+                    ):
+                        progressed |= phase(group)
+            _commit(self.db)
+
+            self.live = [
+                assignment
+                for assignment in self.live
+                if assignment.status in ACTIVE_STATUSES and assignment.id not in self.stopped
+            ]
+            if self.live and is_draining():
+                # текущая фаза закоммичена — остальное доделает новый процесс
+                _hand_off(self.live)
+                _commit(self.db)
+                return
+            if self.live and not progressed:
+                # остались только обрабатывающиеся контейнеры
+                with span("publish.wait_containers", attributes={"publish.assignments": len(self.live)}):
+                    sleep_unless_draining(self._until_next_poll())
+
+    def _stop(self, assignment: ReelAssignment, exc: InstagramPublishError) -> None:
+        _apply_step_error(assignment, exc)
+        self.stopped.add(assignment.id)
+
+    def _published(self, assignment: ReelAssignment, ig_media_id: str | None) -> None:
+        _apply_published(assignment, ig_media_id)
+
+    def _until_next_poll(self) -> float:
+        if self.last_poll_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.last_poll_at
+        return max(settings.instagram_status_poll_interval_seconds - elapsed, 0.0)
+
+    def _create_containers(self, group: list[ReelAssignment]) -> bool:
+        results = create_media_containers(
+            [(assignment.reel, assignment.business_account) for assignment in group]
+        )
+        for assignment, result in zip(group, results):
+            if isinstance(result, InstagramPublishError):
+                self._stop(assignment, result)
+            else:
+                _apply_container_created(assignment, result)
+        return True
+
+    def _poll_containers(self, group: list[ReelAssignment]) -> bool:
+        if self._until_next_poll() > 0:
+            return False
+        self.last_poll_at = time.monotonic()
+
+        results = get_container_statuses(
+            [(assignment.creation_id, assignment.business_account) for assignment in group]
+        )
+        progressed = False
+        for assignment, result in zip(group, results):
+            try:
+                if isinstance(result, InstagramPublishError):
+                    raise result
+                if _apply_container_status(assignment, result):
+                    progressed = True
+                    continue
+
+                polls = self.polls.get(assignment.id, 0) + 1
+                self.polls[assignment.id] = polls
+                if polls >= settings.instagram_status_poll_max_attempts:
+                    raise ContainerNotReadyError(
+                        f"Таймаут ожидания обработки контейнера {assignment.creation_id}"
+                    )
+            except InstagramPublishError as exc:
+                self._stop(assignment, exc)
+                progressed = True
+        return progressed
+
+    def _publish(self, group: list[ReelAssignment]) -> bool:
+        # Сначала фиксируем, что media_publish начат (см. _step_publish)
+        for assignment in group:
+            assignment.status = "publishing"
+            assignment.next_attempt_at = lease_until()
+        _commit(self.db)
+
+        results = publish_media_containers(
+            [(assignment.creation_id, assignment.business_account) for assignment in group]
+        )
+        failed = []
+        for assignment, result in zip(group, results):
+            if isinstance(result, InstagramPublishError):
+                failed.append((assignment, result))
+            else:
+                self._published(assignment, result)
+
+        if failed:
+            # Ответ мог потеряться уже после публикации — перепроверяем контейнеры
+            statuses = get_container_statuses(
+                [(assignment.creation_id, assignment.business_account) for assignment, _ in failed]
+            )
+            for (assignment, exc), container_status in zip(failed, statuses):
+                if container_status == "PUBLISHED":
+                    self._published(assignment, None)
+                else:
+                    self._stop(assignment, exc)
+        return True
+
+    def _resume_publishing(self, group: list[ReelAssignment]) -> bool:
+        results = get_container_statuses(
+            [(assignment.creation_id, assignment.business_account) for assignment in group]
+        )
+        for assignment, result in zip(group, results):
+            try:
+                if isinstance(result, InstagramPublishError):
+                    raise result
+                _apply_resumed_status(assignment, result)
+            except InstagramPublishError as exc:
+                self._stop(assignment, exc)
+        return True
+
+
+def advance_assignments(db: Session, assignments: Sequence[ReelAssignment]) -> None:
+    """
+    Пакетный advance_assignment для раунда публикации: создание контейнеров,
+    проверки статуса и media_publish разных аккаунтов идут через Graph
+    /batch. Статусы назначений обновляются так же, как в advance_assignment,
+    но коммитятся одной транзакцией на фазу.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        started = [assignment for assignment in assignments if _start_attempt(assignment)]
+        _commit(db)
+        _BatchRound(db, started).run()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def claim_due_assignments(db: Session, limit: int) -> list[int]:
+    """
+    Забираем зависшие/отложенные назначения, продлевая им аренду.
+    SKIP LOCKED — чтобы несколько процессов не взяли одно и то же.
+    """
+    now = _utcnow()
+    assignments = (
+        db.query(ReelAssignment)
+        .filter(
+            ReelAssignment.status.in_(ACTIVE_STATUSES),
+            or_(
+                ReelAssignment.next_attempt_at.is_(None),
+                ReelAssignment.next_attempt_at <= now,
+            ),
+        )
+        .order_by(ReelAssignment.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for assignment in assignments:
+        assignment.next_attempt_at = lease_until()
+    db.commit()
+    return [assignment.id for assignment in assignments]
+
+
+def run_recovery_sweep() -> int:
+    """
+    Один проход recovery: продолжает публикации, брошенные упавшими
+    воркерами или отложенные после временной ошибки.
+    Возвращает число обработанных назначений.
+    """
+    if is_draining():
+        return 0
+    with SessionLocal() as db:
+        assignment_ids = claim_due_assignments(db, settings.publish_recovery_batch_size)
+        if not assignment_ids:
+            return 0
+
+        # своя трасса на проход; прежняя трасса назначения — в атрибуте
+        with span("publish.recovery", attributes={"publish.assignments": len(assignment_ids)}) as sweep_span:
+            assignments = (
+                db.query(ReelAssignment)
+                .options(
+                    selectinload(ReelAssignment.reel),
+                    selectinload(ReelAssignment.business_account),
+                )
+                .filter(ReelAssignment.id.in_(assignment_ids))
+                .order_by(ReelAssignment.id)
+                .all()
+            )
+            previous_traces = sorted({a.trace_id for a in assignments if a.trace_id})
+            if previous_traces:
+                sweep_span.set_attribute("publish.previous_trace_ids", ",".join(previous_traces))
+            for assignment in assignments:
+                logger.info(
+                    "Возобновляем публикацию: assignment_id=%s status=%s attempt=%s",
+                    assignment.id,
+                    assignment.status,
+                    assignment.attempt_count,
+                )
+            # все назначения прохода продвигаем вместе — через Graph /batch
+            advance_assignments(db, assignments)
+
+    return len(assignment_ids)
@@ -0,0 +1,223 @@
+"""
+Отложенная публикация рилсов.
+
+Назначения со status="scheduled" ждут своего scheduled_at. Планировщик
+не сканирует таблицу: он берёт ближайшее время из индекса
+(status, scheduled_at), спит до него (или до notify()) и передаёт
+наступившие назначения исполнителю публикаций. notify() вызывает
+EventBroker по сигналу announce_schedule_change из любого процесса API
+(pg_notify); если сигнал потерян, задержка не больше
+SCHEDULER_MAX_SLEEP_SECONDS.
+
+Несколько процессов могут работать одновременно: назначения забираются
+через FOR UPDATE SKIP LOCKED и сразу переводятся в pending под арендой.
+"""
+
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.core.shutdown import is_draining
+from src.core.tracing import span
+from src.db.session import SessionLocal
+from src.models.reel_assignment import ReelAssignment
+from src.services.executor import PublishExecutor, load_tenant_weights, publish_executor
+from src.services.publisher import SCHEDULED_STATUS, lease_until
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Наивное время от клиента считаем UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _next_day(value: datetime) -> datetime:
+    return datetime.combine(value.date() + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+
+def schedule_capacity(
+    used: Counter | None,
+    *,
+    start_at: datetime,
+    end_at: datetime,
+    daily_limit: int,
+) -> int:
+    """Сколько публикаций аккаунт ещё может сделать в окне [start_at, end_at) по дням (UTC)."""
+    used = used or Counter()
+    capacity = 0
+    day = start_at.date()
+    while datetime.combine(day, time.min, tzinfo=timezone.utc) < end_at:
+        capacity += max(daily_limit - used[day], 0)
+        day += timedelta(days=1)
+    return capacity
+
+
+def assign_schedule_times(
+    pairs: Sequence[tuple[object, object]],
+    *,
+    start_at: datetime,
+    interval: timedelta,
+    end_at: datetime | None = None,
+    daily_used: dict[int, Counter] | None = None,
+    daily_limit: int | None = None,
+) -> list[tuple[object, object, datetime]]:
+    """
+    Раскладываем пары (рилс, аккаунт) по времени: k-й рилс аккаунта
+    выходит через k * interval после start_at, а сами аккаунты сдвинуты
+    друг относительно друга равномерно внутри интервала — чтобы не
+    публиковать всё одной пачкой.
+
+    С daily_limit аккаунт получает не больше daily_limit публикаций в
+    сутки (UTC) вместе с уже занятыми (daily_used: id аккаунта -> день ->
+    число): рилс, которому в сутках не осталось места, переносится на
+    следующие. Пары, чьё время вышло за end_at, не планируются.
+    """
+    account_order: dict[int, int] = {}
+    for _, account in pairs:
+        account_order.setdefault(account.id, len(account_order))
+
+    if daily_limit is not None and daily_limit <= 0:
+        return []
+
+    accounts_count = max(len(account_order), 1)
+    next_at: dict[int, datetime] = {}
+    used: dict[int, Counter] = {}
+    result = []
+    for reel, account in pairs:
+        offset = interval * account_order[account.id] / accounts_count
+        scheduled_at = next_at.get(account.id, start_at + offset)
+        account_used = used.setdefault(account.id, Counter((daily_used or {}).get(account.id, {})))
+        if daily_limit is not None:
+            while account_used[scheduled_at.date()] >= daily_limit:
+                scheduled_at = _next_day(scheduled_at) + offset
+        if end_at is not None and scheduled_at >= end_at:
+            continue
+        account_used[scheduled_at.date()] += 1
+        next_at[account.id] = scheduled_at + interval
+        result.append((reel, account, scheduled_at))
+    return result
+
+
+def claim_due_scheduled(db: Session, limit: int) -> list[tuple[int, int]]:
+    """Наступившие назначения (id, user_id), переведённые в pending под арендой."""
+    now = _utcnow()
+    assignments = (
+        db.query(ReelAssignment)
+        .filter(
+            ReelAssignment.status == SCHEDULED_STATUS,
+            ReelAssignment.scheduled_at <= now,
+        )
+        .order_by(ReelAssignment.scheduled_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for assignment in assignments:
+        assignment.status = "pending"
+        assignment.next_attempt_at = lease_until()
+    db.commit()
+    return [(assignment.id, assignment.user_id) for assignment in assignments]
+
+
+def next_scheduled_at(db: Session) -> datetime | None:
+    value = (
+        db.query(func.min(ReelAssignment.scheduled_at))
+        .filter(ReelAssignment.status == SCHEDULED_STATUS)
+        .scalar()
+    )
+    return as_utc(value) if value is not None else None
+
+
+class PublishScheduler:
+    def __init__(self, executor: PublishExecutor) -> None:
+        self.executor = executor
+        self.name = "publish-scheduler"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def notify(self) -> None:
+        """Расписание изменилось — пересчитать, когда просыпаться."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def dispatch_due(self) -> int:
+        """Передаём исполнителю наступившие назначения. Возвращает их число."""
+        if is_draining():
+            return 0
+        limit = min(settings.scheduler_batch_size, self.executor.available_capacity())
+        if limit <= 0:
+            return 0
+        with SessionLocal() as db:
+            claimed = claim_due_scheduled(db, limit)
+            if not claimed:
+                return 0
+            weights = load_tenant_weights(db, [user_id for _, user_id in claimed])
+
+        by_user: dict[int, list[int]] = defaultdict(list)
+        for assignment_id, user_id in claimed:
+            by_user[user_id].append(assignment_id)
+        # отложенная публикация — своя трасса, задачи исполнителя её продолжают
+        with span("publish.scheduled", attributes={"publish.assignments": len(claimed)}):
+            for user_id, assignment_ids in by_user.items():
+                self.executor.submit_assignments(user_id, assignment_ids, weight=weights.get(user_id, 1))
+
+        logger.info("Планировщик запустил публикации: %s шт.", len(claimed))
+        return len(claimed)
+
+    def _sleep_seconds(self) -> float:
+        if self.executor.available_capacity() <= 0:
+            # исполнитель занят — проверим снова чуть позже
+            return 1.0
+        with SessionLocal() as db:
+            due_at = next_scheduled_at(db)
+        if due_at is None:
+            return settings.scheduler_max_sleep_seconds
+        delay = (due_at - _utcnow()).total_seconds()
+        # небольшой минимум — чтобы не крутиться, пока наступившие назначения
+        # держит под блокировкой другой процесс
+        return min(max(delay, 0.1), settings.scheduler_max_sleep_seconds)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                dispatched = self.dispatch_due()
+                if dispatched and dispatched >= settings.scheduler_batch_size:
+                    # наступивших назначений больше, чем влезло в пачку
+                    continue
+                timeout = self._sleep_seconds()
+            except Exception:
+                logger.exception("Ошибка в планировщике публикаций")
+                timeout = settings.scheduler_max_sleep_seconds
+
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+
+publish_scheduler = PublishScheduler(publish_executor)
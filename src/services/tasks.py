@@ -0,0 +1,164 @@
+"""
+Что поднимает процесс на старте: хуки движков, общие фоновые задачи и
+задачи воркера.
+
+API (src.main, в lifespan) и отдельный воркер (src.worker) собираются из
+одних и тех же частей:
+
+* install_process_hooks — тайминги SQL для профилирования, спаны SQL,
+  pg_notify об изменениях назначений;
+* register_event_broker — LISTEN-поток: события назначений для SSE и
+  сигналы об изменении расписания для планировщика;
+* register_process_tasks — то, что нужно каждому процессу с исполнителем
+  публикаций: экспорт спанов, поиск утечек пула, продление аренды
+  назначений в очереди;
+* register_worker_tasks — планировщик, recovery sweep, GC медиа, инсайты,
+  проверка аккаунтов, обновление токенов, компактизация Idempotency-Key. Их выполняет либо
+  каждый процесс API (API_RUN_WORKER_TASKS=true), либо только воркер.
+
+Все функции идемпотентны: повторный lifespan (тесты) не удваивает хуки
+и задачи.
+"""
+
+from src.core.config import settings
+from src.core.profiling import install_sqlalchemy_hooks
+from src.core.tracing import install_tracing_hooks, span_exporter
+from src.db.migrate import upgrade_schema
+from src.db.pool import find_pool_leaks
+from src.db.replicas import replica_set
+from src.db.session import engine
+from src.services.account_health import refresh_stale_accounts
+from src.services.background import PeriodicTask, register_task
+from src.services.events import event_broker, install_event_hooks
+from src.services.executor import publish_executor
+from src.services.idempotency import compact_idempotency_keys
+from src.services.insights import sync_insights
+from src.services.media import media_gc
+from src.services.publisher import run_recovery_sweep
+from src.services.scheduler import publish_scheduler
+from src.services.tokens import refresh_due_tokens, refresh_enabled
+
+_done: set[str] = set()
+
+
+def _once(name: str) -> bool:
+    if name in _done:
+        return False
+    _done.add(name)
+    return True
+
+
+def create_schema() -> None:
+    """Миграции Alembic до последней ревизии (src/db/migrate.py)."""
+    upgrade_schema()
+
+
+def install_process_hooks() -> None:
+    if not _once("hooks"):
+        return
+    install_sqlalchemy_hooks(engine)
+    install_tracing_hooks(engine)
+    for replica in replica_set.replicas:
+        install_tracing_hooks(replica.engine)
+    # Изменения статусов назначений -> pg_notify -> SSE-подписчики любого воркера
+    install_event_hooks()
+
+
+def register_event_broker() -> None:
+    """LISTEN-поток: события назначений для SSE и сигналы расписания."""
+    if not _once("event-broker"):
+        return
+    register_task(event_broker)
+
+
+def register_process_tasks() -> None:
+    if not _once("process-tasks"):
+        return
+    register_task(span_exporter)
+    # Соединения, которые держат дольше DB_POOL_LEAK_THRESHOLD_SECONDS
+    register_task(
+        PeriodicTask(
+            "db-pool-leaks",
+            find_pool_leaks,
+            settings.db_pool_leak_check_interval_seconds,
+            run_at_start=False,
+        )
+    )
+    # Аренда назначений, ждущих в очереди исполнителя, продлевается чаще,
+    # чем истекает, — чтобы recovery sweep не взял их второй раз
+    register_task(
+        PeriodicTask(
+            "publish-lease-renewal",
+            publish_executor.renew_queued_leases,
+            settings.publish_lease_seconds / 3,
+            run_at_start=False,
+        )
+    )
+
+
+def register_worker_tasks() -> None:
+    if not _once("worker-tasks"):
+        return
+    if settings.publish_recovery_enabled:
+        register_task(
+            PeriodicTask(
+                "publish-recovery",
+                run_recovery_sweep,
+                settings.publish_recovery_interval_seconds,
+            )
+        )
+
+    if settings.scheduler_enabled:
+        register_task(publish_scheduler)
+        # изменения расписания из любого процесса API будят планировщик сразу,
+        # а не через SCHEDULER_MAX_SLEEP_SECONDS
+        event_broker.add_schedule_listener(publish_scheduler.notify)
+        register_event_broker()
+
+    if settings.account_health_refresh_enabled:
+        register_task(
+            PeriodicTask(
+                "account-health",
+                refresh_stale_accounts,
+                settings.account_health_refresh_interval_seconds,
+            )
+        )
+
+    if settings.media_gc_enabled:
+        register_task(
+            PeriodicTask(
+                "media-gc",
+                media_gc.run,
+                settings.media_gc_interval_seconds,
+                run_at_start=False,
+            )
+        )
+
+    # Токены обмениваются заранее, до истечения (нужны app id и secret)
+    if refresh_enabled():
+        register_task(
+            PeriodicTask(
+                "token-refresh",
+                refresh_due_tokens,
+                settings.token_refresh_interval_seconds,
+            )
+        )
+
+    register_task(
+        PeriodicTask(
+            "idempotency-compaction",
+            compact_idempotency_keys,
+            settings.idempotency_compaction_interval_seconds,
+            run_at_start=False,
+        )
+    )
+
+    if settings.insights_sync_enabled:
+        register_task(
+            PeriodicTask(
+                "media-insights",
+                sync_insights,
+                settings.insights_sync_interval_seconds,
+                run_at_start=False,
+            )
+        )
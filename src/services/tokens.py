@@ -0,0 +1,196 @@
+"""
+Жизненный цикл токенов бизнес-аккаунтов.
+
+Долгоживущий токен живёт ~60 дней, и раньше он истекал посреди раунда
+публикации. Теперь фоновая задача заранее обменивает его на новый
+(GET /oauth/access_token?grant_type=fb_exchange_token) и записывает срок в
+строку аккаунта. Публикация просто читает access_token из базы — без
+лишних походов в Graph, а аккаунт с истёкшим сроком отсекается ещё до
+запроса (_ensure_account_ready).
+
+Расписание: следующий обмен — за TOKEN_REFRESH_LEAD_SECONDS до истечения
+минус случайный джиттер, так что токены, выданные в один день, не
+обновляются одним проходом. Проход берёт до TOKEN_REFRESH_BATCH_SIZE
+аккаунтов с арендой (SKIP LOCKED — процессы не пересекаются) и обменивает
+до TOKEN_REFRESH_CONCURRENCY токенов параллельно.
+
+Неудачи: недействительный токен (код 190) помечает аккаунт invalid и
+unhealthy — publish_reels его пропускает, пока токен не заменят. Временные
+ошибки повторяются с растущей паузой; после TOKEN_REFRESH_MAX_FAILURES
+подряд или после истечения срока аккаунт тоже помечается unhealthy.
+"""
+
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.db.session import SessionLocal
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import InstagramPublishError, exchange_long_lived_token
+from src.models.business_account import BusinessAccount
+from src.services.account_health import AccountSnapshot, load_account_snapshots, mark_account_unhealthy
+
+logger = logging.getLogger(__name__)
+
+TOKEN_UNKNOWN = "unknown"
+TOKEN_VALID = "valid"
+TOKEN_REFRESH_FAILED = "refresh_failed"
+TOKEN_INVALID = "invalid"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime | None) -> datetime | None:
+    # SQLite отдаёт DateTime(timezone=True) без зоны
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def refresh_enabled() -> bool:
+    return bool(
+        settings.token_refresh_enabled
+        and settings.instagram_app_id
+        and settings.instagram_app_secret
+    )
+
+
+def next_refresh_at(expires_at: datetime | None, now: datetime) -> datetime:
+    """Когда обновлять токен: до истечения с запасом и джиттером."""
+    jitter = timedelta(seconds=random.uniform(0, settings.token_refresh_jitter_seconds))
+    if expires_at is None:
+        return now + timedelta(seconds=settings.token_refresh_recheck_seconds) + jitter
+    planned = expires_at - timedelta(seconds=settings.token_refresh_lead_seconds) - jitter
+    if planned > now:
+        return planned
+    # короткоживущий или почти истёкший — в ближайшие проходы, но не все разом
+    return now + timedelta(seconds=random.uniform(0, settings.token_refresh_interval_seconds))
+
+
+def claim_due_accounts(db: Session, limit: int) -> list[int]:
+    """Забираем аккаунты, которым пора обновить токен, продлевая им аренду (SKIP LOCKED)."""
+    now = _utcnow()
+    accounts = (
+        db.query(BusinessAccount)
+        .filter(
+            BusinessAccount.is_active.is_(True),
+            BusinessAccount.access_token.isnot(None),
+            BusinessAccount.token_status != TOKEN_INVALID,
+            or_(
+                BusinessAccount.token_refresh_at.is_(None),
+                BusinessAccount.token_refresh_at <= now,
+            ),
+        )
+        .order_by(BusinessAccount.token_refresh_at.asc().nulls_first(), BusinessAccount.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = now + timedelta(seconds=settings.token_refresh_lease_seconds)
+    account_ids = []
+    for account in accounts:
+        account.token_refresh_at = lease
+        account_ids.append(account.id)
+    db.commit()
+    return account_ids
+
+
+def _exchange(account: AccountSnapshot) -> tuple[str, int | None] | InstagramPublishError:
+    try:
+        return exchange_long_lived_token(account)
+    except InstagramPublishError as exc:
+        return exc
+
+
+def _apply_refreshed(account: BusinessAccount, token: str, expires_in: int | None, now: datetime) -> None:
+    account.access_token = token
+    account.token_expires_at = now + timedelta(seconds=expires_in) if expires_in else None
+    account.token_refreshed_at = now
+    account.token_status = TOKEN_VALID
+    account.token_error = None
+    account.token_refresh_failures = 0
+    account.token_refresh_at = next_refresh_at(account.token_expires_at, now)
+
+
+def _apply_refresh_failure(account: BusinessAccount, error: InstagramPublishError, now: datetime) -> None:
+    account.token_error = str(error)
+    if error.kind == GraphErrorKind.TOKEN_INVALID:
+        # обменом уже не починить — нужен новый токен от пользователя
+        account.token_status = TOKEN_INVALID
+        account.token_refresh_at = None
+        mark_account_unhealthy(account, str(error))
+        logger.warning("Токен аккаунта %s недействителен: %s", account.id, error)
+        return
+
+    account.token_status = TOKEN_REFRESH_FAILED
+    account.token_refresh_failures = (account.token_refresh_failures or 0) + 1
+    delay = settings.token_refresh_retry_seconds * 2 ** min(account.token_refresh_failures - 1, 6)
+    account.token_refresh_at = now + timedelta(seconds=delay * random.uniform(1.0, 1.5))
+
+    expires_at = _aware(account.token_expires_at)
+    expired = expires_at is not None and expires_at <= now
+    if expired or account.token_refresh_failures >= settings.token_refresh_max_failures:
+        mark_account_unhealthy(account, f"Не удалось обновить токен: {error}")
+    logger.warning(
+        "Не удалось обновить токен аккаунта %s (попытка %s): %s",
+        account.id,
+        account.token_refresh_failures,
+        error,
+    )
+
+
+def refresh_due_tokens() -> int:
+    """
+    Один проход фонового обновления. Возвращает число обновлённых токенов.
+
+    Обмены идут без открытой транзакции: после аренды id и токены копируются
+    в AccountSnapshot, сессия закрывается, а результаты пишутся новой
+    короткой транзакцией.
+    """
+    with SessionLocal() as db:
+        account_ids = claim_due_accounts(db, settings.token_refresh_batch_size)
+        if not account_ids:
+            return 0
+        snapshots = load_account_snapshots(db, account_ids)
+    if not snapshots:
+        return 0
+
+    with ThreadPoolExecutor(
+        max_workers=min(settings.token_refresh_concurrency, len(snapshots)),
+        thread_name_prefix="token-refresh",
+    ) as pool:
+        results = dict(zip((snapshot.id for snapshot in snapshots), pool.map(_exchange, snapshots)))
+    exchanged_tokens = {snapshot.id: snapshot.access_token for snapshot in snapshots}
+
+    now = _utcnow()
+    refreshed = 0
+    with SessionLocal() as db:
+        accounts = (
+            db.query(BusinessAccount)
+            .filter(BusinessAccount.id.in_(results))
+            .order_by(BusinessAccount.id)
+            .with_for_update()
+            .all()
+        )
+        for account in accounts:
+            if account.access_token != exchanged_tokens[account.id]:
+                # токен заменили, пока шёл обмен, — старый результат не пишем
+                continue
+            result = results[account.id]
+            if isinstance(result, InstagramPublishError):
+                _apply_refresh_failure(account, result, now)
+                continue
+            _apply_refreshed(account, *result, now)
+            refreshed += 1
+        db.commit()
+
+    if refreshed:
+        logger.info("Обновлено токенов аккаунтов: %s из %s", refreshed, len(snapshots))
+    return refreshed
@@ -0,0 +1,40 @@
+"""
+Хранилище видео рилсов: загрузка, удаление и URL для Instagram.
+
+Бэкенд выбирается настройкой MEDIA_STORAGE_BACKEND (local / s3).
+"""
+
+from functools import lru_cache
+
+from src.core.config import settings
+from src.storage.base import MediaStorage, StorageError, StoredObject, reel_key  # noqa: F401
+
+
+@lru_cache
+def get_storage() -> MediaStorage:
+    backend = settings.media_storage_backend.lower()
+    if backend == "local":
+        from src.core.paths import REELS_ROOT
+        from src.storage.local import LocalStorage
+
+        return LocalStorage(REELS_ROOT, settings.backend_base_url)
+
+    if backend == "s3":
+        from src.storage.s3 import S3Storage
+
+        if not settings.s3_bucket:
+            raise RuntimeError("Для MEDIA_STORAGE_BACKEND=s3 нужно задать S3_BUCKET")
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            public_endpoint_url=settings.s3_public_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            key_prefix=settings.s3_key_prefix,
+            force_path_style=settings.s3_force_path_style,
+            chunk_size=settings.s3_multipart_chunk_size,
+            presigned_url_ttl_seconds=settings.s3_presigned_url_ttl_seconds,
+        )
+
+    raise RuntimeError(f"Неизвестный MEDIA_STORAGE_BACKEND: {settings.media_storage_backend}")
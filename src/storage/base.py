@@ -0,0 +1,68 @@
+"""
+Общий интерфейс хранилища видео рилсов.
+
+В Reel.file_path лежит ключ объекта вида "{user_id}/{uuid}.mp4"
+(относительно корня хранилища). Старые записи содержат абсолютный путь
+на диске — local-бэкенд понимает и их.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import BinaryIO
+
+
+class StorageError(Exception):
+    """Хранилище не смогло выполнить операцию с объектом."""
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    size: int
+    modified_at: datetime
+
+
+def reel_key(user_id: int, filename: str) -> str:
+    return f"{user_id}/{filename}"
+
+
+class MediaStorage(ABC):
+    name: str
+
+    @abstractmethod
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        """
+        Потоково записывает содержимое fileobj под ключом key.
+        Возвращает число записанных байт.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удаляет объект; отсутствие объекта ошибкой не считается."""
+
+    def delete_many(self, keys: list[str]) -> list[str]:
+        """Удаляет объекты; возвращает ключи, которые удалить не удалось."""
+        failed = []
+        for key in keys:
+            try:
+                self.delete(key)
+            except StorageError:
+                failed.append(key)
+        return failed
+
+    @abstractmethod
+    def list_objects(self, *, start_after: str | None, limit: int) -> list[StoredObject]:
+        """
+        До limit объектов с ключом строго больше start_after, по возрастанию
+        ключа в побайтовом порядке (как ORDER BY ... COLLATE "C").
+        """
+
+    @abstractmethod
+    def public_url(self, key: str, *, user_id: int) -> str:
+        """URL, по которому Instagram заберёт видео."""
+
+    @staticmethod
+    def filename(key: str) -> str:
+        return PurePosixPath(key.replace("\\", "/")).name
@@ -0,0 +1,86 @@
+"""
+Локальная файловая система (REELS_ROOT). Файлы раздаёт само приложение
+через StaticFiles на /media/reels — подходит для одной ноды и разработки.
+"""
+
+import os
+import shutil
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from src.storage.base import MediaStorage, StorageError, StoredObject
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class LocalStorage(MediaStorage):
+    name = "local"
+
+    def __init__(self, root: Path, backend_base_url: str) -> None:
+        self.root = root
+        self.backend_base_url = backend_base_url.rstrip("/")
+
+    def path(self, key: str) -> Path:
+        path = Path(key)
+        # старые записи хранят абсолютный путь
+        if path.is_absolute():
+            return path
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root.resolve()):
+            raise StorageError(f"Ключ {key!r} выходит за пределы хранилища")
+        return resolved
+
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with path.open("wb") as out_file:
+                shutil.copyfileobj(fileobj, out_file, _COPY_BUFFER_SIZE)
+                return out_file.tell()
+        except OSError as exc:
+            path.unlink(missing_ok=True)
+            raise StorageError(f"Не удалось записать {key}: {exc}") from exc
+
+    def delete(self, key: str) -> None:
+        try:
+            self.path(key).unlink(missing_ok=True)
+        except OSError as exc:
+            raise StorageError(f"Не удалось удалить {key}: {exc}") from exc
+
+    def list_objects(self, *, start_after: str | None, limit: int) -> list[StoredObject]:
+        return list(islice(self._iter_objects(self.root, "", start_after), limit))
+
+    def _iter_objects(self, directory: Path, prefix: str, start_after: str | None) -> Iterator[StoredObject]:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        # ключи файлов в подкаталоге начинаются с "name/", поэтому сортируем
+        # каталоги по "name/" — так обход совпадает с побайтовым порядком ключей
+        entries.sort(key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_prefix = f"{prefix}{entry.name}/"
+                if start_after and sub_prefix < start_after and not start_after.startswith(sub_prefix):
+                    # все ключи поддерева заведомо <= start_after
+                    continue
+                yield from self._iter_objects(Path(entry.path), sub_prefix, start_after)
+                continue
+            key = f"{prefix}{entry.name}"
+            if start_after and key <= start_after:
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            yield StoredObject(
+                key=key,
+                size=stat.st_size,
+                modified_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            )
+
+    def public_url(self, key: str, *, user_id: int) -> str:
+        """{backend_base_url}/media/reels/{user_id}/{filename}"""
+        return f"{self.backend_base_url}/media/reels/{user_id}/{self.filename(key)}"
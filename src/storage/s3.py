@@ -0,0 +1,188 @@
+"""
+S3-совместимое объектное хранилище (AWS S3, MinIO и т.п.).
+
+Загрузка идёт потоково: файл читается частями по S3_MULTIPART_CHUNK_SIZE
+и отправляется multipart-загрузкой, целиком в память не попадает.
+Instagram получает presigned GET URL и забирает видео прямо из бакета —
+байты видео через процесс API не проходят.
+
+Требует boto3 (опциональная зависимость, нужна только при
+MEDIA_STORAGE_BACKEND=s3).
+"""
+
+import logging
+from pathlib import PurePosixPath
+from typing import BinaryIO
+
+from src.storage.base import MediaStorage, StorageError, StoredObject
+
+logger = logging.getLogger(__name__)
+
+# S3 не принимает части меньше 5 МБ (кроме последней)
+MIN_MULTIPART_CHUNK_SIZE = 5 * 1024 * 1024
+
+
+class S3Storage(MediaStorage):
+    name = "s3"
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        endpoint_url: str | None = None,
+        public_endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+        key_prefix: str = "",
+        force_path_style: bool = False,
+        chunk_size: int = MIN_MULTIPART_CHUNK_SIZE,
+        presigned_url_ttl_seconds: int = 3600,
+    ) -> None:
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as exc:
+            raise RuntimeError(
+                "Для MEDIA_STORAGE_BACKEND=s3 нужен пакет boto3"
+            ) from exc
+
+        self.bucket = bucket
+        self.key_prefix = key_prefix
+        self.chunk_size = max(chunk_size, MIN_MULTIPART_CHUNK_SIZE)
+        self.presigned_url_ttl_seconds = presigned_url_ttl_seconds
+
+        config = Config(
+            signature_version="s3v4",
+            s3={"addressing_style": "path" if force_path_style else "auto"},
+            retries={"max_attempts": 5, "mode": "standard"},
+        )
+        client_kwargs = {
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+            "config": config,
+        }
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, **client_kwargs)
+        # presigned URL подписывается вместе с хостом, поэтому для внешнего
+        # адреса нужен отдельный клиент (запросов он не делает)
+        if public_endpoint_url and public_endpoint_url != endpoint_url:
+            self._presign_client = boto3.client(
+                "s3", endpoint_url=public_endpoint_url, **client_kwargs
+            )
+        else:
+            self._presign_client = self._client
+
+    def object_key(self, key: str) -> str:
+        path = PurePosixPath(key.replace("\\", "/"))
+        # старые записи хранят абсолютный путь на диске: .../{user_id}/{filename}
+        if path.is_absolute():
+            path = PurePosixPath(*path.parts[-2:])
+        return f"{self.key_prefix}{path}"
+
+    def save(self, key: str, fileobj: BinaryIO) -> int:
+        object_key = self.object_key(key)
+        first_chunk = fileobj.read(self.chunk_size)
+        try:
+            if len(first_chunk) < self.chunk_size:
+                # маленький файл — одним запросом
+                self._client.put_object(Bucket=self.bucket, Key=object_key, Body=first_chunk)
+                return len(first_chunk)
+            return self._multipart_upload(object_key, first_chunk, fileobj)
+        except StorageError:
+            raise
+        except Exception as exc:
+            raise StorageError(f"Не удалось загрузить {object_key} в S3: {exc}") from exc
+
+    def _multipart_upload(self, object_key: str, first_chunk: bytes, fileobj: BinaryIO) -> int:
+        upload = self._client.create_multipart_upload(Bucket=self.bucket, Key=object_key)
+        upload_id = upload["UploadId"]
+        parts = []
+        total = 0
+        try:
+            chunk = first_chunk
+            part_number = 1
+            while chunk:
+                response = self._client.upload_part(
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=chunk,
+                )
+                parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+                total += len(chunk)
+                part_number += 1
+                chunk = fileobj.read(self.chunk_size)
+
+            self._client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return total
+        except Exception:
+            # незавершённые части иначе так и останутся в бакете (и в счёте)
+            try:
+                self._client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id
+                )
+            except Exception:
+                logger.warning("Не удалось отменить multipart-загрузку %s", object_key, exc_info=True)
+            raise
+
+    def delete(self, key: str) -> None:
+        object_key = self.object_key(key)
+        try:
+            # DeleteObject для несуществующего ключа тоже успешен
+            self._client.delete_object(Bucket=self.bucket, Key=object_key)
+        except Exception as exc:
+            raise StorageError(f"Не удалось удалить {object_key} из S3: {exc}") from exc
+
+    def delete_many(self, keys: list[str]) -> list[str]:
+        # DeleteObjects: до 1000 ключей за запрос
+        failed = []
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start:start + 1000]
+            by_object_key = {self.object_key(key): key for key in chunk}
+            try:
+                response = self._client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in by_object_key], "Quiet": True},
+                )
+            except Exception:
+                logger.warning("Не удалось удалить пачку объектов из S3", exc_info=True)
+                failed.extend(chunk)
+                continue
+            failed.extend(by_object_key[error["Key"]] for error in response.get("Errors", []))
+        return failed
+
+    def list_objects(self, *, start_after: str | None, limit: int) -> list[StoredObject]:
+        # ListObjectsV2 отдаёт ключи в побайтовом порядке UTF-8
+        params = {
+            "Bucket": self.bucket,
+            "Prefix": self.key_prefix,
+            "MaxKeys": min(limit, 1000),
+        }
+        if start_after:
+            params["StartAfter"] = f"{self.key_prefix}{start_after}"
+        try:
+            response = self._client.list_objects_v2(**params)
+        except Exception as exc:
+            raise StorageError(f"Не удалось получить список объектов S3: {exc}") from exc
+        return [
+            StoredObject(
+                key=item["Key"][len(self.key_prefix):],
+                size=item["Size"],
+                modified_at=item["LastModified"],
+            )
+            for item in response.get("Contents", [])
+        ]
+
+    def public_url(self, key: str, *, user_id: int) -> str:
+        return self._presign_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.object_key(key)},
+            ExpiresIn=self.presigned_url_ttl_seconds,
+        )
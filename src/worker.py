@@ -0,0 +1,80 @@
+"""
+Отдельный процесс фоновых задач: планировщик, recovery sweep, GC медиа,
+инсайты, проверка аккаунтов. Без FastAPI-приложения и без uvicorn —
+образ воркера ставит только requirements/worker.txt.
+
+Запуск:
+    python -m src.worker [--create-schema]
+
+Процессы API в такой схеме запускаются с API_RUN_WORKER_TASKS=false и
+держат только исполнитель публикаций своих запросов. По SIGTERM воркер
+уходит в drain (src/core/shutdown.py) и останавливается, когда идущие
+шаги закоммичены или истёк SHUTDOWN_DRAIN_SECONDS.
+"""
+
+import argparse
+import logging
+import signal
+
+from src.core.config import settings
+from src.core.logs import configure_logging, shutdown_logging
+from src.core.paths import ensure_media_dirs
+from src.core.shutdown import begin_drain, drain_remaining, sleep_unless_draining
+from src.services.background import start_background_tasks, stop_background_tasks
+from src.services.executor import publish_executor
+from src.services.media import shutdown_file_deleter
+from src.services.tasks import (
+    create_schema,
+    install_process_hooks,
+    register_process_tasks,
+    register_worker_tasks,
+)
+
+logger = logging.getLogger("src.worker")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Фоновые задачи без HTTP-сервера")
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="применить миграции схемы (alembic upgrade head) перед стартом",
+    )
+    return parser.parse_args()
+
+
+def _install_signal_handlers() -> None:
+    # в отличие от API, передавать сигнал дальше некому: главный поток сам
+    # выйдет из цикла, когда начнётся drain
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda received, frame: begin_drain(signal.Signals(received).name))
+
+
+def main() -> None:
+    args = _parse_args()
+    configure_logging()
+
+    if settings.media_storage_backend.lower() == "local":
+        ensure_media_dirs()
+    if args.create_schema:
+        create_schema()
+    install_process_hooks()
+    register_process_tasks()
+    register_worker_tasks()
+
+    _install_signal_handlers()
+    start_background_tasks()
+    logger.info("Воркер запущен")
+
+    while not sleep_unless_draining(1.0):
+        pass
+
+    stop_background_tasks()
+    publish_executor.shutdown(wait=True, timeout=drain_remaining())
+    shutdown_file_deleter(wait=True)
+    logger.info("Воркер остановлен")
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Общие фикстуры тестов: временная база SQLite вместо Postgres.
+
+Настройки читаются при импорте src.*, поэтому окружение выставляется до
+первого импорта. SKIP LOCKED и advisory-блокировки SQLite не поддерживает —
+тесты проверяют логику переходов и аренды, а не блокировки Postgres.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="tests_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/tests.sqlite"
+
+import pytest  # noqa: E402
+
+import src.models  # noqa: E402,F401  (все модели в metadata)
+from src.db.base import Base  # noqa: E402
+from src.db.session import SessionLocal, engine  # noqa: E402
+from src.models import BusinessAccount, Reel, User  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Сессия на чистой схеме (таблицы пересоздаются для каждого теста)."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="owner@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def account(db, user):
+    account = BusinessAccount(user_id=user.id, name="main", external_id="17841400000000000", access_token="token")
+    db.add(account)
+    db.commit()
+    return account
+
+
+@pytest.fixture
+def reel(db, user):
+    reel = Reel(user_id=user.id, file_path=f"{user.id}/reel.mp4", original_filename="reel.mp4")
+    db.add(reel)
+    db.commit()
+    return reel
+
+
+
+@pytest.fixture
+def fake_graph(monkeypatch):
+    """
+    Заглушка Graph API (benchmarks/fake_graph.py) вместо сети: все вызовы
+    httpx.request уходят в её ASGI-приложение. Возвращает состояние заглушки.
+    """
+    import httpx
+    from fastapi.testclient import TestClient
+
+    from benchmarks.fake_graph import FakeGraphConfig, create_app
+    from src.core.config import settings
+
+    app = create_app(FakeGraphConfig(processing_delay=0.0))
+    client = TestClient(app)
+    monkeypatch.setattr(httpx, "request", client.request)
+    monkeypatch.setattr(settings, "instagram_status_poll_interval_seconds", 0.0)
+    return app.state
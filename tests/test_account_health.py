@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core.config import settings
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import InstagramPublishError
+from src.models import BusinessAccount
+from src.services import account_health
+from src.services.account_health import HEALTHY, UNHEALTHY, UNKNOWN
+
+
+@pytest.fixture
+def revoked(db, user):
+    account = BusinessAccount(user_id=user.id, name="revoked", external_id="17841400000000001", access_token="REVOKED-1")
+    db.add(account)
+    db.commit()
+    return account
+
+
+def test_check_accounts_stores_verdicts(db, account, revoked, fake_graph):
+    account_health.check_accounts(db, [account, revoked])
+
+    db.expire_all()
+    assert account.health_status == HEALTHY
+    assert account.health_checked_at is not None
+    assert revoked.health_status == UNHEALTHY
+    assert "invalidated" in revoked.health_error
+
+
+def test_transient_failure_keeps_previous_verdict(db, account, monkeypatch):
+    def unavailable(snapshots):
+        return [InstagramPublishError("timeout", kind=GraphErrorKind.TRANSIENT) for _ in snapshots]
+
+    monkeypatch.setattr(account_health, "check_account_tokens", unavailable)
+
+    account_health.check_accounts(db, [account])
+
+    db.expire_all()
+    assert account.health_status == UNKNOWN
+    assert account.health_checked_at is None
+
+
+def test_claim_stale_accounts_takes_lease(db, account, revoked):
+    revoked.health_status = HEALTHY
+    revoked.health_checked_at = datetime.now(timezone.utc)
+    db.commit()
+
+    assert account_health.claim_stale_accounts(db, limit=10) == [account.id]
+    # аренда не истекла — второй проход аккаунт не берёт
+    assert account_health.claim_stale_accounts(db, limit=10) == []
+
+    db.expire_all()
+    assert account.health_lease_until is not None
+
+
+def test_refresh_stale_accounts_clears_lease(db, account, fake_graph, monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(seconds=settings.account_health_ttl_seconds + 1)
+    account.health_status = UNHEALTHY
+    account.health_checked_at = old
+    db.commit()
+
+    assert account_health.refresh_stale_accounts() == 1
+    assert account_health.refresh_stale_accounts() == 0
+
+    db.expire_all()
+    assert account.health_status == HEALTHY
+    assert account.health_lease_until is None
+
+
+def test_check_account_by_id_ignores_deleted_account(db, fake_graph):
+    account_health.check_account_by_id(12345)
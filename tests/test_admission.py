@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from src.core.admission import AdmissionRejected, RouteClass
+
+
+def _route_class(**overrides) -> RouteClass:
+    params = {"name": "uploads", "limit": 1, "queue_size": 1, "queue_timeout": 1.0}
+    params.update(overrides)
+    return RouteClass(**params)
+
+
+def test_acquire_within_limit():
+    route_class = _route_class(limit=2)
+
+    async def scenario():
+        await route_class.acquire(None)
+        await route_class.acquire(None)
+
+    asyncio.run(scenario())
+    assert route_class.active == 2
+    assert route_class.admitted == 2
+
+
+def test_release_hands_slot_to_waiter():
+    route_class = _route_class()
+
+    async def scenario():
+        await route_class.acquire(None)
+        waiting = asyncio.create_task(route_class.acquire(None))
+        await asyncio.sleep(0)
+        assert len(route_class.waiters) == 1
+
+        route_class.release(None)
+        await waiting
+
+    asyncio.run(scenario())
+    # слот перешёл ожидающему, не освобождаясь
+    assert route_class.active == 1
+    assert not route_class.waiters
+
+    route_class.release(None)
+    assert route_class.active == 0
+
+
+def test_full_queue_rejects_immediately():
+    route_class = _route_class(queue_size=0)
+
+    async def scenario():
+        await route_class.acquire(None)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await route_class.acquire(None)
+        return exc_info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.retry_after == 1
+    assert route_class.rejected_queue_full == 1
+    assert route_class.active == 1
+
+
+def test_queue_timeout_rejects():
+    route_class = _route_class(queue_timeout=0.01)
+
+    async def scenario():
+        await route_class.acquire(None)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await route_class.acquire(None)
+        return exc_info.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert route_class.rejected_timeout == 1
+    assert not route_class.waiters
+
+    # отвалившийся ожидающий не получает слот при release
+    route_class.release(None)
+    assert route_class.active == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    route_class = _route_class()
+
+    async def scenario():
+        await route_class.acquire(None)
+        waiting = asyncio.create_task(route_class.acquire(None))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(scenario())
+    assert not route_class.waiters
+    route_class.release(None)
+    assert route_class.active == 0
+
+
+def test_per_user_limit():
+    route_class = _route_class(limit=5, per_user_limit=1)
+
+    async def scenario():
+        await route_class.acquire(1)
+        await route_class.acquire(2)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await route_class.acquire(1)
+        return exc_info.value
+
+    assert asyncio.run(scenario()).status_code == 429
+    assert route_class.rejected_per_user == 1
+    assert route_class.active_by_user == {1: 1, 2: 1}
+
+    route_class.release(1)
+    assert route_class.active_by_user == {2: 1}
+    asyncio.run(route_class.acquire(1))
+    assert route_class.active_by_user == {1: 1, 2: 1}
@@ -0,0 +1,155 @@
+import io
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+
+from src.api import accounts as accounts_api
+from src.api import reels as reels_api
+from src.core.config import settings
+from src.models import BusinessAccount, Reel, User
+from src.schemas.business_account import BusinessAccountCreate, BusinessAccountIds
+from src.schemas.reel import ReelBulkDelete
+from src.services import publisher
+
+
+@pytest.fixture
+def scheduled_deletes(monkeypatch):
+    keys = []
+    monkeypatch.setattr(reels_api, "schedule_file_deletes", keys.extend)
+    return keys
+
+
+def _reels(db, user, count, **values):
+    reels = [
+        Reel(user_id=user.id, file_path=f"{user.id}/{index}.mp4", original_filename="r.mp4", size_bytes=10, **values)
+        for index in range(count)
+    ]
+    db.add_all(reels)
+    user.storage_used_bytes = 10 * count
+    db.commit()
+    return reels
+
+
+def _statuses(result) -> list[tuple[int | None, str]]:
+    return [(item.id, item.status) for item in result.results]
+
+
+def test_bulk_delete_by_ids(db, user, account, scheduled_deletes):
+    first, reserved, published = (reel.id for reel in _reels(db, user, 3))
+    publisher.create_assignment(db, reel=db.get(Reel, reserved), account=account)
+    db.commit()
+
+    result = reels_api.delete_reels_bulk(
+        ReelBulkDelete(ids=[first, reserved, 999, first]),
+        db=db,
+        current_user=user,
+    )
+
+    assert _statuses(result) == [(first, "deleted"), (reserved, "skipped"), (999, "not_found")]
+    assert result.succeeded == 1
+    assert scheduled_deletes == [f"{user.id}/0.mp4"]
+    db.expire_all()
+    assert {reel.id for reel in db.query(Reel)} == {reserved, published}
+    assert db.get(User, user.id).storage_used_bytes == 20
+
+
+def test_bulk_delete_by_filter(db, user, scheduled_deletes):
+    used = [reel.id for reel in _reels(db, user, 2, is_used=True)]
+
+    db.add(Reel(user_id=user.id, file_path=f"{user.id}/new.mp4", original_filename="r.mp4"))
+    db.commit()
+
+    result = reels_api.delete_reels_bulk(ReelBulkDelete(is_used=True), db=db, current_user=user)
+
+    assert sorted(_statuses(result)) == sorted((reel_id, "deleted") for reel_id in used)
+    assert db.query(Reel).count() == 1
+
+
+def test_bulk_delete_needs_criteria():
+    with pytest.raises(ValueError):
+        ReelBulkDelete()
+
+
+def test_bulk_size_is_capped(db, user, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_items", 2)
+
+    with pytest.raises(HTTPException) as exc_info:
+        accounts_api.create_business_accounts_bulk(
+            [BusinessAccountCreate(name=str(index)) for index in range(3)],
+            BackgroundTasks(),
+            db=db,
+            current_user=user,
+        )
+
+    assert exc_info.value.status_code == 400
+
+
+def test_bulk_create_reports_duplicates(db, user, account):
+    tasks = BackgroundTasks()
+
+    result = accounts_api.create_business_accounts_bulk(
+        [
+            BusinessAccountCreate(name="a", external_id="1"),
+            BusinessAccountCreate(name="dup of main", external_id=account.external_id),
+            BusinessAccountCreate(name="dup in request", external_id="1"),
+            BusinessAccountCreate(name="b"),
+        ],
+        tasks,
+        db=db,
+        current_user=user,
+    )
+
+    assert [item.status for item in result.results] == ["created", "duplicate", "duplicate", "created"]
+    created = [item.id for item in result.results if item.status == "created"]
+    assert [task.args for task in tasks.tasks] == [(created,)]
+    assert db.query(BusinessAccount).count() == 3
+
+
+def test_csv_import(db, user):
+    content = (
+        "name,external_id,access_token,is_active\n"
+        "one,11,token,yes\n"
+        "two,12,token,maybe\n"
+        ",13,token,\n"
+        "four,14,,0\n"
+    ).encode()
+
+    result = accounts_api.import_business_accounts_csv(
+        BackgroundTasks(),
+        file=UploadFile(io.BytesIO(content), filename="accounts.csv"),
+        db=db,
+        current_user=user,
+    )
+
+    assert [(item.index, item.status) for item in result.results] == [
+        (1, "created"),
+        (2, "invalid"),
+        (3, "invalid"),
+        (4, "created"),
+    ]
+    inactive = db.query(BusinessAccount).filter(BusinessAccount.external_id == "14").one()
+    assert inactive.is_active is False
+
+
+def test_csv_import_requires_name_column(db, user):
+    with pytest.raises(HTTPException) as exc_info:
+        accounts_api.import_business_accounts_csv(
+            BackgroundTasks(),
+            file=UploadFile(io.BytesIO(b"external_id\n1\n"), filename="accounts.csv"),
+            db=db,
+            current_user=user,
+        )
+
+    assert exc_info.value.status_code == 400
+
+
+def test_bulk_deactivate(db, user, account):
+    result = accounts_api.deactivate_business_accounts(
+        BusinessAccountIds(ids=[account.id, 999]),
+        db=db,
+        current_user=user,
+    )
+
+    assert _statuses(result) == [(account.id, "updated"), (999, "not_found")]
+    db.expire_all()
+    assert account.is_active is False
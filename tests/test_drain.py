@@ -0,0 +1,141 @@
+import signal
+import threading
+from concurrent.futures import wait
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import src.services.publisher as publisher
+from src.api import reels as reels_api
+from src.core import shutdown
+from src.core.config import settings
+from src.services.executor import PublishExecutor, release_leases
+from src.services.scheduler import PublishScheduler
+
+
+def _aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _near_now(value: datetime) -> bool:
+    return abs(_aware(value) - datetime.now(timezone.utc)) < timedelta(seconds=30)
+
+
+@pytest.fixture(autouse=True)
+def drain_state(monkeypatch):
+    monkeypatch.setattr(shutdown, "_draining", threading.Event())
+    monkeypatch.setattr(shutdown, "_deadline", None)
+    monkeypatch.setattr(settings, "shutdown_drain_seconds", 30)
+
+
+@pytest.fixture
+def assignment(db, reel, account):
+    assignment = publisher.create_assignment(db, reel=reel, account=account)
+    db.commit()
+    return assignment
+
+
+def test_drain_deadline_counts_from_first_signal(monkeypatch):
+    assert not shutdown.is_draining()
+    assert shutdown.drain_remaining() == 30
+
+    shutdown.begin_drain("SIGTERM")
+    deadline = shutdown._deadline
+    shutdown.begin_drain("shutdown")
+
+    assert shutdown.is_draining()
+    assert shutdown._deadline == deadline
+    assert 0 < shutdown.drain_remaining() <= 30
+    assert shutdown.sleep_unless_draining(10) is True
+
+
+def test_signal_handler_drains_then_calls_previous():
+    calls = []
+    handler = shutdown._chained(signal.SIGTERM, lambda signum, frame: calls.append(signum))
+
+    handler(signal.SIGTERM, None)
+
+    assert shutdown.is_draining()
+    assert calls == [signal.SIGTERM]
+
+
+def test_publish_round_rejected_while_draining(db, user):
+    shutdown.begin_drain("SIGTERM")
+
+    with pytest.raises(HTTPException) as error:
+        reels_api.publish_reels(strategy=None, db=db, current_user=user)
+
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "5"
+
+
+def test_recovery_sweep_and_scheduler_stop_claiming(db):
+    shutdown.begin_drain("SIGTERM")
+
+    assert publisher.run_recovery_sweep() == 0
+    assert PublishScheduler(PublishExecutor(0, 1)).dispatch_due() == 0
+
+
+def test_advance_hands_off_after_current_step(db, assignment, monkeypatch):
+    # SIGTERM приходит, пока идёт создание контейнера: шаг доделываем и коммитим
+    def create_media_container(*, reel, account):
+        shutdown.begin_drain("SIGTERM")
+        return "creation-1"
+
+    monkeypatch.setattr(publisher, "create_media_container", create_media_container)
+
+    status = publisher.advance_assignment(db, assignment)
+
+    db.refresh(assignment)
+    assert status == assignment.status
+    assert assignment.status in publisher.ACTIVE_STATUSES
+    assert assignment.creation_id == "creation-1"
+    assert assignment.attempt_count == 0
+    assert _near_now(assignment.next_attempt_at)
+
+
+def test_release_leases_skips_final_assignments(db, assignment, reel, account):
+    done = publisher.create_assignment(db, reel=reel, account=account)
+    done.status = "published"
+    leased = datetime.now(timezone.utc) + timedelta(hours=1)
+    assignment.next_attempt_at = leased
+    done.next_attempt_at = leased
+    db.commit()
+
+    assert release_leases([assignment.id, done.id]) == 1
+
+    db.expire_all()
+    assert _near_now(assignment.next_attempt_at)
+    assert _aware(done.next_attempt_at) == leased
+
+
+def test_worker_releases_queued_jobs_while_draining(db, assignment):
+    assignment.next_attempt_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    db.commit()
+    shutdown.begin_drain("SIGTERM")
+    executor = PublishExecutor(1, 1)
+
+    futures = executor.submit_assignments(assignment.user_id, [assignment.id])
+    wait(futures, timeout=5)
+    executor.shutdown(wait=True, timeout=5)
+
+    assert futures[0].cancelled()
+    db.expire_all()
+    assert _near_now(assignment.next_attempt_at)
+
+
+def test_shutdown_cancels_and_releases_unstarted_jobs(db, assignment):
+    assignment.next_attempt_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    db.commit()
+    # без воркеров задача так и остаётся в очереди
+    executor = PublishExecutor(0, 1)
+    futures = executor.submit_assignments(assignment.user_id, [assignment.id])
+
+    executor.shutdown(wait=True, timeout=1)
+
+    assert futures[0].cancelled()
+    db.expire_all()
+    assert _near_now(assignment.next_attempt_at)
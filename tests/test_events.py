@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from src.api import reels as reels_api
+from src.db.session import SessionLocal
+from src.models import ReelAssignment
+from src.services import publisher
+from src.services.events import event_broker, format_sse, install_event_hooks
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    install_event_hooks()
+    payloads = []
+    monkeypatch.setattr(event_broker, "dispatch", payloads.append)
+    return payloads
+
+
+def _parse(message: str) -> tuple[str, dict]:
+    event_line, data_line = message.strip().split("\n")
+    return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+
+def test_status_changes_are_dispatched_after_commit(db, reel, account, dispatched):
+    assignment = publisher.create_assignment(db, reel=reel, account=account, job_id="job-1")
+    db.flush()
+    assert dispatched == []
+
+    db.commit()
+    assignment.error_message = "без смены статуса события нет"
+    db.commit()
+    assignment.status = "published"
+    db.commit()
+
+    assert [(p["status"], p["job_id"]) for p in dispatched] == [("pending", "job-1"), ("published", "job-1")]
+
+
+def test_rolled_back_changes_are_not_dispatched(db, reel, account, dispatched):
+    publisher.create_assignment(db, reel=reel, account=account)
+    db.flush()
+    db.rollback()
+
+    assert dispatched == []
+
+
+def test_subscription_filters_by_user_and_job():
+    async def receive():
+        async with event_broker.subscribe(user_id=1, job_id="job-1") as queue:
+            event_broker.dispatch({"user_id": 2, "job_id": "job-1", "status": "other user"})
+            event_broker.dispatch({"user_id": 1, "job_id": "job-2", "status": "other job"})
+            event_broker.dispatch({"user_id": 1, "job_id": "job-1", "status": "published"})
+            return await asyncio.wait_for(queue.get(), timeout=1)
+
+    assert asyncio.run(receive())["status"] == "published"
+
+
+def test_job_stream_sends_snapshot_changes_and_done(db, user, reel, account):
+    install_event_hooks()
+    assignment = publisher.create_assignment(db, reel=reel, account=account, job_id="job-1")
+    db.commit()
+    assignment_id = assignment.id
+
+    def publish() -> None:
+        with SessionLocal() as session:
+            session.get(ReelAssignment, assignment_id).status = "published"
+            session.commit()
+
+    async def collect() -> list[str]:
+        stream = reels_api._assignment_events(user.id, "job-1")
+        messages = [await stream.__anext__()]
+        await asyncio.get_running_loop().run_in_executor(None, publish)
+        messages.extend([message async for message in stream])
+        return messages
+
+    messages = [_parse(message) for message in asyncio.run(asyncio.wait_for(collect(), timeout=5))]
+
+    assert [(name, data.get("status")) for name, data in messages] == [
+        ("assignment", "pending"),
+        ("assignment", "published"),
+        ("done", None),
+    ]
+    assert messages[-1][1] == {"job_id": "job-1", "published": 1, "failed": 0}
+
+
+def test_format_sse():
+    assert format_sse("done", {"job_id": "ы"}) == 'event: done\ndata: {"job_id": "ы"}\n\n'
@@ -0,0 +1,78 @@
+from src.services.fair_queue import FairJob, FairQueue
+
+
+def _job(user_id: int, cost: int = 1, name: str = "") -> FairJob:
+    return FairJob(user_id=user_id, cost=cost, func=lambda: None, args=(name,))
+
+
+def _drain(queue: FairQueue, count: int) -> list[FairJob]:
+    jobs = []
+    for _ in range(count):
+        job = queue.get()
+        queue.task_done(job)
+        jobs.append(job)
+    return jobs
+
+
+def test_jobs_of_one_tenant_are_fifo():
+    queue = FairQueue(quantum=1)
+    for name in ("a", "b", "c"):
+        queue.put(_job(1, name=name))
+
+    assert [job.args[0] for job in _drain(queue, 3)] == ["a", "b", "c"]
+
+
+def test_tenants_take_turns():
+    queue = FairQueue(quantum=1)
+    for _ in range(3):
+        queue.put(_job(1))
+    for _ in range(3):
+        queue.put(_job(2))
+
+    # большой бэклог первого пользователя не отодвигает второго
+    assert [job.user_id for job in _drain(queue, 6)] == [1, 2, 1, 2, 1, 2]
+
+
+def test_weight_multiplies_share():
+    queue = FairQueue(quantum=1)
+    for _ in range(4):
+        queue.put(_job(1), weight=2)
+    for _ in range(2):
+        queue.put(_job(2))
+
+    assert [job.user_id for job in _drain(queue, 6)] == [1, 1, 2, 1, 1, 2]
+
+
+def test_costly_job_waits_for_credit():
+    queue = FairQueue(quantum=2)
+    queue.put(_job(1, cost=5))
+    for _ in range(3):
+        queue.put(_job(2, cost=2))
+
+    # пачке из 5 назначений нужно три захода, мелкие задачи идут между ними
+    assert [job.user_id for job in _drain(queue, 4)] == [2, 2, 1, 2]
+
+
+def test_idle_tenant_is_dropped():
+    queue = FairQueue(quantum=1)
+    queue.put(_job(1))
+    job = queue.get()
+    assert [row["running_assignments"] for row in queue.stats()] == [1]
+
+    queue.task_done(job)
+    assert queue.stats() == []
+
+
+def test_close_returns_pending_jobs():
+    queue = FairQueue(quantum=1)
+    queue.put(_job(1, name="started"))
+    queue.put(_job(1, name="pending"))
+    queue.put(_job(2, name="other"))
+    started = queue.get()
+
+    pending = queue.close()
+
+    assert started.args[0] == "started"
+    assert sorted(job.args[0] for job in pending) == ["other", "pending"]
+    assert queue.queued_cost() == 0
+    assert queue.get() is None
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_graph import FakeGraphConfig, create_app
+from src.integrations.instagram import publish_reel_to_instagram
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app(FakeGraphConfig(processing_delay=60.0)))
+
+
+def _create(client, **data) -> dict:
+    data = {"video_url": "https://example.com/reel.mp4", "access_token": "token", **data}
+    return client.post("/v18.0/17841400000000000/media", data=data).json()
+
+
+def test_container_lifecycle(client):
+    creation_id = _create(client)["id"]
+
+    status = client.get(f"/v18.0/{creation_id}", params={"fields": "status_code", "access_token": "token"})
+    assert status.json()["status_code"] == "IN_PROGRESS"
+
+    # не обработанный контейнер не публикуется
+    resp = client.post("/17841400000000000/media_publish", data={"creation_id": creation_id, "access_token": "t"})
+    assert resp.status_code == 400
+    assert resp.json()["error"]["error_subcode"] == 2207027
+
+    client.app.state.config.processing_delay = 0.0
+    resp = client.post("/17841400000000000/media_publish", data={"creation_id": creation_id, "access_token": "t"})
+    assert resp.status_code == 200
+
+    status = client.get(f"/{creation_id}", params={"fields": "status_code", "access_token": "token"})
+    assert status.json()["status_code"] == "PUBLISHED"
+    assert client.get("/_stats").json()["published"] == 1
+
+
+def test_missing_token_is_oauth_error(client):
+    resp = client.post("/17841400000000000/media", data={"video_url": "https://example.com/reel.mp4"})
+
+    assert resp.status_code == 400
+    assert resp.json()["error"]["code"] == 190
+
+
+def test_ids_read_many(client):
+    first, second = _create(client)["id"], _create(client)["id"]
+
+    body = client.get("/", params={"ids": f"{first},{second}", "fields": "status_code", "access_token": "t"}).json()
+
+    assert set(body) == {first, second}
+    assert client.get("/", params={"ids": "404", "access_token": "t"}).json()["error"]["code"] == 100
+
+
+def test_injected_faults(client):
+    client.app.state.config.error_rate = 1.0
+    resp = client.post("/17841400000000000/media", data={"video_url": "u", "access_token": "t"})
+    assert (resp.status_code, resp.json()["error"]["code"]) == (500, 2)
+
+    client.app.state.config.error_rate = 0.0
+    client.app.state.config.rate_limit_rate = 1.0
+    resp = client.post("/17841400000000000/media", data={"video_url": "u", "access_token": "t"})
+    assert resp.json()["error"]["code"] == 4
+
+
+def test_publish_reel_against_fake_graph(fake_graph):
+    reel = SimpleNamespace(id=1, user_id=1, file_path="1/reel.mp4")
+    account = SimpleNamespace(id=1, user_id=1, external_id="17841400000000000", access_token="token")
+
+    media_id = publish_reel_to_instagram(reel=reel, account=account)
+
+    assert fake_graph.graph.media[media_id]
+    assert fake_graph.graph.calls["POST /17841400000000000/media_publish"] == 1
@@ -0,0 +1,191 @@
+import io
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import src.services.publisher as publisher
+from src.api import reels as reels_api
+from src.core.config import settings
+from src.models import BusinessAccount, Reel, ReelAssignment, User
+from src.schemas.reels_publish import ReelFanOutRequest
+from src.services import media
+from src.services.account_health import UNHEALTHY
+from src.services.media import MediaGarbageCollector, settle_reel_files
+from src.storage.local import LocalStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path, "https://api.example.com")
+    monkeypatch.setattr(reels_api, "get_storage", lambda: storage)
+    monkeypatch.setattr(media, "get_storage", lambda: storage)
+    monkeypatch.setattr(media, "REELS_ROOT", tmp_path)
+    return storage
+
+
+@pytest.fixture
+def stored_reel(db, user, storage):
+    storage.save(f"{user.id}/reel.mp4", io.BytesIO(b"video"))
+    user.storage_used_bytes = 5
+    reel = Reel(user_id=user.id, file_path=f"{user.id}/reel.mp4", original_filename="reel.mp4", size_bytes=5)
+    db.add(reel)
+    db.commit()
+    return reel
+
+
+@pytest.fixture
+def accounts(db, user):
+    accounts = [
+        BusinessAccount(user_id=user.id, name=f"acc-{i}", external_id=f"1784140000000000{i}", access_token=f"t{i}")
+        for i in range(3)
+    ]
+    db.add_all(accounts)
+    db.commit()
+    return accounts
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        reels_api.publish_executor,
+        "submit_assignments",
+        lambda user_id, assignment_ids, weight=1: calls.append((user_id, list(assignment_ids))) or [],
+    )
+    return calls
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setattr(publisher, "create_media_container", lambda *, reel, account: f"creation-{account.id}")
+    monkeypatch.setattr(publisher, "wait_for_container", lambda *, creation_id, account: "FINISHED")
+    monkeypatch.setattr(publisher, "get_container_status", lambda *, creation_id, account: "FINISHED")
+    monkeypatch.setattr(publisher, "publish_media_container", lambda *, creation_id, account: f"media-{account.id}")
+
+
+def _fan_out(db, user, reel_id: int, account_ids: list[int]):
+    return reels_api.fan_out_reel(
+        reel_id,
+        ReelFanOutRequest(account_ids=account_ids),
+        wait_for_result=False,
+        db=db,
+        current_user=user,
+    )
+
+
+def _used(db, user) -> int:
+    db.expire_all()
+    return db.get(User, user.id).storage_used_bytes
+
+
+def test_fan_out_creates_one_target_per_usable_account(db, user, reel, accounts, submitted):
+    disabled, unhealthy, healthy = accounts
+    disabled.is_active = False
+    unhealthy.health_status = UNHEALTHY
+    unhealthy.health_error = "Token expired"
+    db.commit()
+
+    result = _fan_out(db, user, reel.id, [healthy.id, disabled.id, unhealthy.id, 999, healthy.id])
+
+    assert [target.business_account_id for target in result.targets] == [healthy.id]
+    assert [(item.id, item.status) for item in result.skipped] == [
+        (disabled.id, "skipped"),
+        (unhealthy.id, "skipped"),
+        (999, "not_found"),
+    ]
+    assert result.skipped[1].detail == "Token expired"
+    assignment = db.get(ReelAssignment, result.targets[0].assignment_id)
+    assert assignment.job_id == result.job_id
+    assert submitted == [(user.id, [assignment.id])]
+
+
+def test_fan_out_without_targets_has_no_job(db, user, reel, accounts, submitted):
+    for account in accounts:
+        account.is_active = False
+    db.commit()
+
+    result = _fan_out(db, user, reel.id, [account.id for account in accounts])
+
+    assert result.job_id is None
+    assert result.targets == []
+    assert len(result.skipped) == 3
+    assert submitted == []
+
+
+def test_fan_out_rejects_published_or_reserved_reel(db, user, reel, accounts, submitted):
+    _fan_out(db, user, reel.id, [accounts[0].id])
+
+    with pytest.raises(HTTPException) as reserved:
+        _fan_out(db, user, reel.id, [accounts[1].id])
+    reel.is_used = True
+    db.commit()
+    with pytest.raises(HTTPException) as published:
+        _fan_out(db, user, reel.id, [accounts[1].id])
+
+    assert reserved.value.status_code == published.value.status_code == 409
+
+
+def test_fan_out_progress_is_visible_only_to_owner(db, user, reel, accounts, submitted):
+    job_id = _fan_out(db, user, reel.id, [account.id for account in accounts]).job_id
+    stranger = User(email="stranger@example.com", hashed_password="x")
+    db.add(stranger)
+    db.commit()
+
+    progress = reels_api.get_fan_out(reel.id, job_id, db=db, current_user=user)
+
+    assert progress.total_targets == 3
+    assert {target.status for target in progress.targets} == {"pending"}
+    with pytest.raises(HTTPException) as hidden:
+        reels_api.get_fan_out(reel.id, job_id, db=db, current_user=stranger)
+    assert hidden.value.status_code == 404
+
+
+def test_file_is_kept_until_last_target_is_final(db, user, stored_reel, accounts, storage, graph, submitted):
+    job_id = _fan_out(db, user, stored_reel.id, [accounts[0].id, accounts[1].id]).job_id
+    first, second = db.query(ReelAssignment).filter(ReelAssignment.job_id == job_id).order_by(ReelAssignment.id)
+
+    assert publisher.advance_assignment(db, first) == "published"
+    assert os.path.exists(storage.path(stored_reel.file_path))
+    assert _used(db, user) == 5
+
+    publisher._apply_failure(second, publisher.InstagramPublishError("Invalid parameter"))
+    publisher._commit(db)
+
+    assert not os.path.exists(storage.path(stored_reel.file_path))
+    assert _used(db, user) == 0
+
+
+def test_settle_releases_reel_only_when_no_target_is_in_flight(db, user, stored_reel, account):
+    stored_reel.is_used = True
+    assignment = publisher.create_assignment(db, reel=stored_reel, account=account)
+    db.commit()
+
+    assert settle_reel_files([stored_reel.id]) == []
+    assert _used(db, user) == 5
+
+    assignment = db.get(ReelAssignment, assignment.id)
+    assignment.status = "published"
+    db.commit()
+
+    assert settle_reel_files([stored_reel.id]) == [stored_reel.file_path]
+    assert _used(db, user) == 0
+
+
+def test_gc_keeps_published_reel_file_while_target_in_flight(db, user, stored_reel, account, storage, monkeypatch):
+    monkeypatch.setattr(settings, "media_gc_grace_seconds", 60)
+    old = time.time() - 3600
+    os.utime(storage.path(stored_reel.file_path), (old, old))
+    stored_reel.is_used = True
+    publisher.create_assignment(db, reel=stored_reel, account=account)
+    db.commit()
+
+    assert MediaGarbageCollector().run() == 0
+    assert os.path.exists(storage.path(stored_reel.file_path))
+
+    db.query(ReelAssignment).update({ReelAssignment.status: "published"})
+    db.commit()
+
+    assert MediaGarbageCollector().run() == 1
+    assert not os.path.exists(storage.path(stored_reel.file_path))
@@ -0,0 +1,190 @@
+import json
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.integrations import circuit_breaker, instagram
+from src.integrations.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import CircuitOpenError, GraphRequest, InstagramPublishError
+
+
+def _account(account_id: int, user_id: int = 1, token: str | None = None):
+    return SimpleNamespace(
+        id=account_id,
+        user_id=user_id,
+        external_id=str(17841400000000000 + account_id),
+        access_token=token or f"token-{account_id}",
+    )
+
+
+def _check(account) -> GraphRequest:
+    return GraphRequest("GET", account.external_id, account, {"fields": "id"})
+
+
+def _ok(body: dict) -> dict:
+    return {"code": 200, "body": json.dumps(body)}
+
+
+def _error(status_code: int, code: int) -> dict:
+    return {"code": status_code, "body": json.dumps({"error": {"code": code}})}
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(settings, "graph_retry_base_delay_seconds", 0.0)
+    monkeypatch.setattr(settings, "graph_batch_access_token", None)
+    return circuit_breaker._breakers
+
+
+class FakeBatchGraph:
+    """
+    Ответ на POST /batch — по под-запросу через item_response;
+    одиночные запросы (фолбэк) — через single_response.
+    """
+
+    def __init__(self, monkeypatch, item_response=None, batch_response=None, single_response=None):
+        self.item_response = item_response or (lambda item, attempt: _ok({"id": _object_id(item)}))
+        self.batch_response = batch_response
+        self.single_response = single_response
+        self.batches: list[tuple[str, list[dict]]] = []
+        self.singles: list[str] = []
+        monkeypatch.setattr(instagram, "_graph_request", self)
+
+    def __call__(self, method, url, *, timeout, read_only=None, data=None, params=None):
+        if url == instagram.graph_base_url() + "/":
+            items = json.loads(data["batch"])
+            self.batches.append((data["access_token"], items))
+            if self.batch_response is not None:
+                return self.batch_response
+            return httpx.Response(200, json=[self.item_response(item, len(self.batches)) for item in items])
+        self.singles.append(url)
+        return self.single_response(url, params or data)
+
+
+def _object_id(item: dict) -> str:
+    return item["relative_url"].split("?")[0]
+
+
+def test_chunks_are_split_per_user_without_app_token(monkeypatch):
+    requests = [_check(_account(1, user_id=1)), _check(_account(2, user_id=2)), _check(_account(3, user_id=1))]
+
+    assert instagram._batch_chunks(requests, [0, 1, 2], batch_size=50) == [[0, 2], [1]]
+
+    monkeypatch.setattr(settings, "graph_batch_access_token", "app|secret")
+    assert instagram._batch_chunks(requests, [0, 1, 2], batch_size=2) == [[0, 1], [2]]
+
+
+def test_batch_is_signed_by_its_own_user(monkeypatch):
+    graph = FakeBatchGraph(monkeypatch)
+    accounts = [_account(1, user_id=1), _account(2, user_id=2), _account(3, user_id=1)]
+
+    results = instagram.graph_batch([_check(account) for account in accounts], action="test")
+
+    assert results == [{"id": account.external_id} for account in accounts]
+    signed = {token: [_object_id(item) for item in items] for token, items in graph.batches}
+    assert signed == {
+        "token-1": [accounts[0].external_id, accounts[2].external_id],
+        "token-2": [accounts[1].external_id],
+    }
+    # каждый под-запрос несёт токен своего аккаунта
+    tokens = {
+        _object_id(item): parse_qs(item["relative_url"].split("?")[1])["access_token"]
+        for _, items in graph.batches
+        for item in items
+    }
+    assert tokens == {account.external_id: [account.access_token] for account in accounts}
+
+
+def test_batch_size_limits_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "graph_batch_size", 2)
+    graph = FakeBatchGraph(monkeypatch)
+
+    instagram.graph_batch([_check(_account(index)) for index in range(5)], action="test")
+
+    assert [len(items) for _, items in graph.batches] == [2, 2, 1]
+
+
+def test_item_errors_are_independent_and_transient_items_retried(monkeypatch):
+    def item_response(item, attempt):
+        object_id = _object_id(item)
+        if object_id.endswith("1"):
+            return _error(400, 100)
+        if object_id.endswith("2") and attempt == 1:
+            return _error(500, 2)
+        return _ok({"id": object_id})
+
+    graph = FakeBatchGraph(monkeypatch, item_response=item_response)
+    accounts = [_account(1), _account(2), _account(3)]
+
+    results = instagram.graph_batch([_check(account) for account in accounts], action="test")
+
+    assert isinstance(results[0], InstagramPublishError)
+    assert results[0].kind == GraphErrorKind.PERMANENT
+    assert results[1:] == [{"id": accounts[1].external_id}, {"id": accounts[2].external_id}]
+    # повторно ушёл только элемент с временной ошибкой
+    assert [len(items) for _, items in graph.batches] == [3, 1]
+
+
+def test_rejected_batch_token_falls_back_to_single_calls(monkeypatch):
+    graph = FakeBatchGraph(
+        monkeypatch,
+        batch_response=httpx.Response(400, json={"error": {"code": 190}}),
+        single_response=lambda url, params: httpx.Response(200, json={"id": url.rsplit("/", 1)[1]}),
+    )
+    accounts = [_account(1, token="REVOKED"), _account(2)]
+
+    results = instagram.graph_batch([_check(account) for account in accounts], action="test")
+
+    assert results == [{"id": account.external_id} for account in accounts]
+    assert len(graph.batches) == 1
+    assert len(graph.singles) == 2
+
+
+def test_open_app_breaker_leaves_account_breakers_closed(monkeypatch, breakers):
+    monkeypatch.setattr(settings, "circuit_breaker_min_calls", 1)
+    graph = FakeBatchGraph(monkeypatch)
+    circuit_breaker.get_breaker("app").record_failure()
+    assert breakers["app"].state == OPEN
+    accounts = [_account(1), _account(2)]
+
+    for _ in range(3):
+        results = instagram.graph_batch([_check(account) for account in accounts], action="test")
+
+    assert all(isinstance(result, CircuitOpenError) for result in results)
+    assert graph.batches == []
+    assert breakers["account:1"].state == CLOSED
+    assert breakers["account:2"].snapshot()["failures_in_window"] == 0
+
+
+def test_open_app_breaker_returns_account_probe(monkeypatch, breakers):
+    monkeypatch.setattr(settings, "circuit_breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "circuit_breaker_open_seconds", 0.0)
+    monkeypatch.setattr(settings, "circuit_breaker_half_open_max_calls", 1)
+    FakeBatchGraph(monkeypatch)
+    account_breaker = circuit_breaker.get_breaker("account:1")
+    account_breaker.record_failure()
+    assert account_breaker.state == HALF_OPEN
+    monkeypatch.setattr(settings, "circuit_breaker_open_seconds", 60.0)
+    circuit_breaker.get_breaker("app").record_failure()
+
+    [result] = instagram.graph_batch([_check(_account(1))], action="test", retry=False)
+
+    assert isinstance(result, CircuitOpenError)
+    assert account_breaker.state == HALF_OPEN
+    assert account_breaker.allow()
+
+
+def test_check_account_tokens_against_fake_graph(fake_graph, breakers):
+    accounts = [_account(1), _account(2, token="REVOKED-2"), _account(3, user_id=2)]
+
+    errors = instagram.check_account_tokens(accounts)
+
+    assert errors[0] is None and errors[2] is None
+    assert errors[1].kind == GraphErrorKind.TOKEN_INVALID
+    assert fake_graph.graph.calls["POST /"] == 2
+    assert fake_graph.graph.batched_calls.total() == 3
@@ -0,0 +1,200 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.integrations import circuit_breaker, instagram
+from src.integrations.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.integrations.graph_errors import GraphErrorKind, classify_graph_error
+from src.integrations.instagram import CircuitOpenError, InstagramPublishError
+
+
+def _error(code=None, subcode=None, **extra) -> dict:
+    return {"error": {"code": code, "error_subcode": subcode, **extra}}
+
+
+@pytest.mark.parametrize(
+    ("status_code", "body", "kind"),
+    [
+        (400, _error(2), GraphErrorKind.TRANSIENT),
+        (400, _error(100, is_transient=True), GraphErrorKind.TRANSIENT),
+        (400, _error(9007, 2207027), GraphErrorKind.TRANSIENT),
+        (500, {"raw": "Bad Gateway"}, GraphErrorKind.TRANSIENT),
+        (None, None, GraphErrorKind.TRANSIENT),
+        (400, _error(4), GraphErrorKind.THROTTLED),
+        (400, _error(9, 2207042), GraphErrorKind.THROTTLED),
+        (429, {}, GraphErrorKind.THROTTLED),
+        (400, _error(190), GraphErrorKind.TOKEN_INVALID),
+        (400, _error(100, 463), GraphErrorKind.TOKEN_INVALID),
+        (400, _error(100), GraphErrorKind.PERMANENT),
+    ],
+)
+def test_classify_graph_error(status_code, body, kind):
+    assert classify_graph_error(status_code, body) == kind
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: self.now)
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(failure_ratio=0.5, min_calls=4, window_seconds=60, open_seconds=30, half_open_max_calls=1)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_breaker_opens_after_failure_ratio(monkeypatch):
+    Clock(monkeypatch)
+    breaker = _breaker()
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # мало вызовов в окне
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_forgets_calls_outside_window(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 61
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_probe(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = _breaker(min_calls=1)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # одна проба за раз
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_release_returns_half_open_slot(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = _breaker(min_calls=1)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow()
+    breaker.release()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(settings, "graph_retry_base_delay_seconds", 0.0)
+    monkeypatch.setattr(settings, "graph_retry_max_attempts", 3)
+    return circuit_breaker._breakers
+
+
+class Responses:
+    def __init__(self, monkeypatch, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        monkeypatch.setattr(instagram, "_graph_request", self)
+
+    def __call__(self, method, url, *, timeout, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+ACCOUNT = SimpleNamespace(id=1)
+
+
+def _call(**kwargs):
+    return instagram._graph_call("GET", "https://graph.test/me", action="test", account=ACCOUNT, timeout=1, **kwargs)
+
+
+def test_graph_call_retries_transient_errors(breakers, monkeypatch):
+    responses = Responses(
+        monkeypatch,
+        httpx.ConnectError("reset"),
+        httpx.Response(500, json=_error(2)),
+        httpx.Response(200, json={"id": "1"}),
+    )
+
+    assert _call() == {"id": "1"}
+    assert responses.calls == 3
+
+
+def test_graph_call_does_not_retry_permanent_errors(breakers, monkeypatch):
+    responses = Responses(monkeypatch, httpx.Response(400, json=_error(100)))
+
+    with pytest.raises(InstagramPublishError) as exc_info:
+        _call()
+
+    assert exc_info.value.kind == GraphErrorKind.PERMANENT
+    assert exc_info.value.code == 100
+    assert responses.calls == 1
+    # осмысленный ответ Graph не считается отказом сервиса
+    assert breakers["app"].snapshot()["failures_in_window"] == 0
+
+
+def test_graph_call_without_retry(breakers, monkeypatch):
+    responses = Responses(monkeypatch, httpx.ConnectError("reset"))
+
+    with pytest.raises(InstagramPublishError) as exc_info:
+        _call(retry=False)
+
+    assert exc_info.value.retryable
+    assert responses.calls == 1
+
+
+def test_graph_call_fails_fast_when_open(breakers, monkeypatch):
+    monkeypatch.setattr(settings, "circuit_breaker_min_calls", 1)
+    Responses(monkeypatch, httpx.ConnectError("reset"))
+    with pytest.raises(InstagramPublishError):
+        _call(retry=False)
+
+    responses = Responses(monkeypatch)
+    with pytest.raises(CircuitOpenError):
+        _call()
+    assert responses.calls == 0
+
+
+def test_graph_call_releases_probes_on_unexpected_error(breakers, monkeypatch):
+    clock = Clock(monkeypatch)
+    monkeypatch.setattr(settings, "circuit_breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "circuit_breaker_half_open_max_calls", 1)
+    Responses(monkeypatch, httpx.ConnectError("reset"))
+    with pytest.raises(InstagramPublishError):
+        _call(retry=False)
+    clock.now += settings.circuit_breaker_open_seconds
+
+    Responses(monkeypatch, RuntimeError("boom"))
+    with pytest.raises(RuntimeError):
+        _call()
+
+    responses = Responses(monkeypatch, httpx.Response(200, json={}))
+    assert _call() == {}
+    assert responses.calls == 1
+    assert breakers["app"].state == CLOSED
+    assert breakers["account:1"].state == CLOSED
@@ -0,0 +1,176 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from starlette.responses import JSONResponse
+
+from src.core.config import settings
+from src.core.security import create_access_token
+from src.models import IdempotencyKey
+from src.services import idempotency
+from src.services.idempotency import (
+    IdempotencyMiddleware,
+    claim_key,
+    complete_key,
+    release_key,
+    request_fingerprint,
+    spool_body,
+)
+
+
+def test_first_claim_is_new(db, user):
+    claim = claim_key(user.id, "key-1", "fp")
+
+    assert claim.outcome == "new"
+    assert db.get(IdempotencyKey, claim.record_id).status == "in_progress"
+
+
+def test_repeat_while_running_is_in_progress(db, user):
+    first = claim_key(user.id, "key-1", "fp")
+
+    claim = claim_key(user.id, "key-1", "fp")
+
+    assert claim.outcome == "in_progress"
+    assert claim.record_id == first.record_id
+
+
+def test_key_of_another_request_is_mismatch(db, user):
+    claim_key(user.id, "key-1", "fp")
+
+    assert claim_key(user.id, "key-1", "other-fp").outcome == "mismatch"
+
+
+def test_keys_are_per_user(db, user):
+    claim_key(user.id, "key-1", "fp")
+
+    assert claim_key(user.id + 1, "key-1", "fp").outcome == "new"
+
+
+def test_completed_key_is_replayed(db, user):
+    first = claim_key(user.id, "key-1", "fp")
+    complete_key(first.record_id, 201, "application/json", b'{"id": 1}')
+
+    claim = claim_key(user.id, "key-1", "fp")
+
+    assert claim.outcome == "completed"
+    assert (claim.status_code, claim.content_type, claim.body) == (201, "application/json", b'{"id": 1}')
+
+
+def test_abandoned_key_is_taken_over(db, user):
+    # процесс, занявший ключ, упал: аренда истекла
+    first = claim_key(user.id, "key-1", "fp")
+    record = db.get(IdempotencyKey, first.record_id)
+    record.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+
+    claim = claim_key(user.id, "key-1", "fp")
+
+    assert claim.outcome == "new"
+    assert claim.record_id == first.record_id
+
+
+def test_released_key_runs_again(db, user):
+    first = claim_key(user.id, "key-1", "fp")
+    release_key(first.record_id)
+
+    claim = claim_key(user.id, "key-1", "fp")
+
+    assert claim.outcome == "new"
+    assert db.query(IdempotencyKey).count() == 1
+
+
+def _upload_app(calls: list):
+    async def app(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        calls.append(body)
+        response = JSONResponse({"call": len(calls), "size": len(body)}, status_code=201)
+        await response(scope, receive, send)
+
+    return IdempotencyMiddleware(app, paths=["/api/reels/"])
+
+
+def _upload(client, user, key: str, content: bytes):
+    return client.post(
+        "/api/reels/",
+        headers={
+            "Authorization": f"Bearer {create_access_token(subject=str(user.id))}",
+            "Idempotency-Key": key,
+        },
+        files={"file": ("reel.mp4", content, "video/mp4")},
+    )
+
+
+def test_fingerprint_includes_body_digest():
+    scope = {"method": "POST", "path": "/api/reels/", "query_string": b"b=2&a=1"}
+
+    assert request_fingerprint(scope, "aaa") == request_fingerprint({**scope, "query_string": b"a=1&b=2"}, "aaa")
+    assert request_fingerprint(scope, "aaa") != request_fingerprint(scope, "bbb")
+
+
+def test_repeated_upload_is_replayed_without_running_handler(db, user):
+    calls = []
+    client = TestClient(_upload_app(calls))
+
+    first = _upload(client, user, "upload-1", b"video")
+    repeat = _upload(client, user, "upload-1", b"video")
+
+    assert first.status_code == repeat.status_code == 201
+    assert repeat.json() == first.json()
+    assert repeat.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_same_key_with_another_file_is_rejected(db, user):
+    calls = []
+    client = TestClient(_upload_app(calls))
+
+    _upload(client, user, "upload-1", b"video")
+    response = _upload(client, user, "upload-1", b"another video")
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_spooled_body_reaches_handler_intact(db, user, monkeypatch):
+    # тело больше порога уходит во временный файл и читается ручкой кусками
+    monkeypatch.setattr(settings, "idempotency_body_spool_bytes", 1024)
+    monkeypatch.setattr(idempotency, "_BODY_CHUNK_SIZE", 4096)
+    calls = []
+    client = TestClient(_upload_app(calls))
+    content = bytes(range(256)) * 64
+
+    response = _upload(client, user, "upload-1", content)
+
+    assert response.status_code == 201
+    assert content in calls[0]
+
+
+def _receive(*chunks: bytes):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return receive
+
+
+def _digest(boundary: bytes, *chunks: bytes) -> str:
+    body = asyncio.run(spool_body(_receive(*chunks), boundary))
+    body.file.close()
+    return body.digest
+
+
+def test_body_digest_ignores_boundary_split_between_chunks():
+    first = b"--aaaa\r\nvideo\r\n--aaaa--"
+    second = b"--bbbb\r\nvideo\r\n--bbbb--"
+
+    assert _digest(b"aaaa", first) == _digest(b"bbbb", second[:4], second[4:12], second[12:])
+    assert _digest(b"aaaa", first) != _digest(b"bbbb", second.replace(b"video", b"other"))
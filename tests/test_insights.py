@@ -0,0 +1,214 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import src.services.insights as insights
+from src.api import insights as insights_api
+from src.core.config import settings
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import InstagramPublishError
+from src.models import BusinessAccount, MediaInsight, ReelAssignment, SyncCursor
+from src.services.account_health import UNHEALTHY
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _published(db, user, reel, account, media_id: str | None, *, status: str = "published", age=timedelta(hours=1)):
+    assignment = ReelAssignment(
+        user_id=user.id,
+        reel_id=reel.id,
+        business_account_id=account.id,
+        status=status,
+        instagram_media_id=media_id,
+        published_at=_utcnow() - age if status == "published" else None,
+    )
+    db.add(assignment)
+    db.commit()
+    return assignment
+
+
+def _due_insight(db, assignment) -> MediaInsight:
+    media = insights._new_insight(assignment, _utcnow())
+    media.next_fetch_at = _utcnow() - timedelta(seconds=1)
+    db.add(media)
+    db.commit()
+    return media
+
+
+class FakeInsights:
+    """get_media_insights: метрики по media_id или ошибка для заданных запросов."""
+
+    def __init__(self, monkeypatch, errors=None):
+        self.errors = errors or {}
+        self.requests = []
+        monkeypatch.setattr(insights, "get_media_insights", self)
+
+    def __call__(self, items, metrics):
+        results = []
+        for media_ids, account in items:
+            self.requests.append((tuple(media_ids), account.id))
+            error = self.errors.get(tuple(media_ids))
+            if error is not None:
+                results.append(error)
+            else:
+                results.append({media_id: {"plays": 100, "likes": 7, "unknown": 1} for media_id in media_ids})
+        return results
+
+
+def test_refresh_interval_by_publication_age(monkeypatch):
+    monkeypatch.setattr(settings, "insights_refresh_tiers", [(3600, 60), (86400, 600)])
+    monkeypatch.setattr(settings, "insights_archive_interval_seconds", 86400)
+    now = _utcnow()
+
+    assert insights.refresh_interval(now - timedelta(minutes=5), now) == timedelta(seconds=60)
+    assert insights.refresh_interval(now - timedelta(hours=5), now) == timedelta(seconds=600)
+    assert insights.refresh_interval(now - timedelta(days=3), now) == timedelta(days=1)
+    # время из SQLite без зоны
+    assert insights.refresh_interval((now - timedelta(minutes=5)).replace(tzinfo=None), now) == timedelta(seconds=60)
+
+
+def test_discovery_tracks_published_media_and_resumes_from_cursor(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_discovery_batch_size", 2)
+    first = _published(db, user, reel, account, "media-1")
+    _published(db, user, reel, account, None, status="pending")
+    third = _published(db, user, reel, account, "media-3")
+    _due_insight(db, third)
+
+    assert insights.discover_published_media() == 1
+    assert insights.discover_published_media() == 0
+    assert insights.discover_published_media() == 0
+
+    db.expire_all()
+    assert db.get(SyncCursor, insights.DISCOVERY_CURSOR).value == str(third.id)
+    tracked = {row.assignment_id for row in db.query(MediaInsight)}
+    assert tracked == {first.id, third.id}
+
+
+def test_claim_due_media_leases_rows(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_lease_seconds", 600)
+    due = _due_insight(db, _published(db, user, reel, account, "media-1"))
+    later = insights._new_insight(_published(db, user, reel, account, "media-2"), _utcnow())
+    db.add(later)
+    db.commit()
+
+    assert insights.claim_due_media(db, 10) == [due.id]
+    db.refresh(due)
+    assert _aware(due.next_fetch_at) > _utcnow() + timedelta(seconds=500)
+    assert insights.claim_due_media(db, 10) == []
+
+
+def test_sync_groups_media_per_account_and_applies_metrics(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_ids_per_request", 2)
+    monkeypatch.setattr(settings, "insights_refresh_tiers", [(86400, 3600)])
+    other = BusinessAccount(user_id=user.id, name="second", external_id="17841400000000001", access_token="other")
+    db.add(other)
+    db.commit()
+    media = [_due_insight(db, _published(db, user, reel, account, f"media-{i}")) for i in range(3)]
+    media.append(_due_insight(db, _published(db, user, reel, other, "media-other")))
+    graph = FakeInsights(monkeypatch)
+
+    assert insights.sync_insights() == 4
+
+    assert sorted(graph.requests) == sorted([
+        (("media-0", "media-1"), account.id),
+        (("media-2",), account.id),
+        (("media-other",), other.id),
+    ])
+    db.expire_all()
+    row = db.get(MediaInsight, media[0].id)
+    assert (row.plays, row.likes, row.reach, row.fetch_error) == (100, 7, None, None)
+    assert row.fetched_at is not None
+    assert _aware(row.next_fetch_at) > _utcnow() + timedelta(minutes=50)
+
+
+def test_permanent_multi_id_error_retries_media_one_by_one(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_archive_interval_seconds", 7 * 86400)
+    alive = _due_insight(db, _published(db, user, reel, account, "media-alive"))
+    deleted = _due_insight(db, _published(db, user, reel, account, "media-deleted"))
+    gone = InstagramPublishError("Object does not exist", kind=GraphErrorKind.PERMANENT)
+    graph = FakeInsights(monkeypatch, errors={
+        ("media-alive", "media-deleted"): gone,
+        ("media-deleted",): gone,
+    })
+
+    assert insights.sync_insights() == 1
+
+    assert graph.requests[1:] == [(("media-alive",), account.id), (("media-deleted",), account.id)]
+    db.expire_all()
+    assert db.get(MediaInsight, alive.id).plays == 100
+    failed = db.get(MediaInsight, deleted.id)
+    assert failed.fetch_error == "Object does not exist"
+    assert _aware(failed.next_fetch_at) > _utcnow() + timedelta(days=6)
+
+
+def test_invalid_token_marks_account_unhealthy(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_retry_delay_seconds", 900)
+    media = _due_insight(db, _published(db, user, reel, account, "media-1"))
+    FakeInsights(monkeypatch, errors={
+        ("media-1",): InstagramPublishError("Token expired", kind=GraphErrorKind.TOKEN_INVALID),
+    })
+
+    assert insights.sync_insights() == 0
+
+    db.expire_all()
+    assert db.get(BusinessAccount, account.id).health_status == UNHEALTHY
+    assert db.get(MediaInsight, media.id).fetch_error == "Token expired"
+
+
+def test_unhealthy_account_is_not_queried(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "insights_retry_delay_seconds", 900)
+    media = _due_insight(db, _published(db, user, reel, account, "media-1"))
+    account.health_status = UNHEALTHY
+    db.commit()
+    graph = FakeInsights(monkeypatch)
+
+    assert insights.sync_insights() == 0
+
+    assert graph.requests == []
+    db.expire_all()
+    row = db.get(MediaInsight, media.id)
+    assert row.fetch_error == "Бизнес-аккаунт недоступен"
+    assert _aware(row.next_fetch_at) > _utcnow() + timedelta(minutes=10)
+
+
+def test_sync_against_fake_graph_records_missing_media(db, user, reel, account, fake_graph):
+    # медиа, которого заглушка не знает: multi-id ошибка, затем одиночный запрос
+    media = _due_insight(db, _published(db, user, reel, account, "unknown-media"))
+
+    assert insights.sync_insights() == 0
+
+    db.expire_all()
+    row = db.get(MediaInsight, media.id)
+    assert "does not exist" in row.fetch_error
+    assert row.fetched_at is None
+
+
+def test_insights_pages_are_keyset_paginated(db, user, reel, account):
+    rows = [_due_insight(db, _published(db, user, reel, account, f"media-{i}")) for i in range(3)]
+
+    first = insights_api.list_account_insights(account.id, cursor=None, limit=2, db=db, current_user=user)
+    second = insights_api.list_reel_insights(reel.id, cursor=first.next_cursor, limit=2, db=db, current_user=user)
+
+    assert [item.id for item in first.items] == [rows[2].id, rows[1].id]
+    assert [item.id for item in second.items] == [rows[0].id]
+    assert second.next_cursor is None
+
+
+def test_insights_of_foreign_account_are_hidden(db, user, account):
+    stranger = type(user)(email="stranger@example.com", hashed_password="x")
+    db.add(stranger)
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        insights_api.list_account_insights(account.id, cursor=None, limit=10, db=db, current_user=stranger)
+
+    assert error.value.status_code == 404
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from src.api import reels as reels_api
+from src.db import locks
+from src.db.locks import LockNamespace
+from src.models import ReelAssignment
+from src.services import publisher
+
+
+class RecordingSession:
+    def __init__(self, dialect: str):
+        self.dialect = SimpleNamespace(name=dialect)
+        self.statements = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=self.dialect)
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+
+
+def test_user_reels_lock_on_postgres():
+    db = RecordingSession("postgresql")
+
+    locks.lock_user_reels(db, 42)
+
+    assert db.statements == [
+        ("SELECT pg_advisory_xact_lock(:namespace, :key)", {"namespace": int(LockNamespace.USER_REELS), "key": 42}),
+    ]
+
+
+def test_lock_is_noop_on_other_databases():
+    db = RecordingSession("sqlite")
+
+    locks.lock_user_reels(db, 42)
+
+    assert db.statements == []
+
+
+def test_publish_round_locks_before_reserving(db, user, account, reel, fake_graph, monkeypatch):
+    locked = []
+    monkeypatch.setattr(reels_api, "lock_user_reels", lambda session, user_id: locked.append(user_id))
+
+    result = reels_api.publish_reels(strategy=None, db=db, current_user=user)
+
+    assert locked == [user.id]
+    assert result.total_published == 1
+
+
+def test_reserved_reels_are_skipped_by_next_round(db, user, account, reel, fake_graph):
+    # назначение первого раунда закоммичено, но публикация ещё идёт
+    publisher.create_assignment(db, reel=reel, account=account)
+    db.commit()
+
+    result = reels_api.publish_reels(strategy=None, db=db, current_user=user)
+
+    assert result.total_published == 0
+    assert result.reels_left_unassigned == 0
+    assert db.query(ReelAssignment).count() == 1
+    assert fake_graph.graph.calls == {}
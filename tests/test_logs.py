@@ -0,0 +1,148 @@
+import io
+import json
+import logging
+import queue
+import sys
+
+import httpx
+import pytest
+
+from src.core import logs, tracing
+from src.core.config import settings
+from src.core.logs import LazyLogArg, configure_logging, log_context, shutdown_logging
+from src.core.tracing import span
+from src.integrations import instagram
+
+
+class Spans(list):
+    def submit(self, item) -> None:
+        self.append(item)
+
+
+class Counted(LazyLogArg):
+    __slots__ = ("calls",)
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return "counted"
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    """configure_logging в буфер; корневой логгер и httpx восстанавливаются."""
+    root = logging.getLogger()
+    levels = (root.level, logging.getLogger("httpx").level)
+    monkeypatch.setattr(settings, "log_format", "json")
+    monkeypatch.setattr(settings, "log_level", "INFO")
+    stream = io.StringIO()
+
+    def configure(queue_size: int = 100):
+        monkeypatch.setattr(settings, "log_queue_size", queue_size)
+        return configure_logging(stream)
+
+    yield configure, stream
+    shutdown_logging()
+    root.setLevel(levels[0])
+    logging.getLogger("httpx").setLevel(levels[1])
+
+
+def _records(stream: io.StringIO) -> list[dict]:
+    shutdown_logging()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_record_carries_trace_and_context_fields(configured, monkeypatch):
+    configure, stream = configured
+    monkeypatch.setattr(settings, "tracing_exporter", "file")
+    monkeypatch.setattr(settings, "tracing_sample_ratio", 1.0)
+    monkeypatch.setattr(tracing, "span_exporter", Spans())
+    configure()
+
+    with span("publish") as current, log_context(user_id=7, assignment_id=11):
+        logging.getLogger("test.logs").info("Шаг %s", "готов", extra={"graph_ms": 1.5})
+
+    [record] = [item for item in _records(stream) if item["logger"] == "test.logs"]
+    assert record["message"] == "Шаг готов"
+    assert record["trace_id"] == current.context.trace_id
+    assert record["span_id"] == current.context.span_id
+    assert (record["user_id"], record["assignment_id"], record["graph_ms"]) == (7, 11, 1.5)
+
+
+def test_configure_is_idempotent_and_quiets_httpx(configured):
+    configure, _ = configured
+
+    handler = configure()
+
+    assert configure() is handler
+    assert logging.getLogger().handlers.count(handler) == 1
+    assert logging.getLogger("httpx").getEffectiveLevel() == logging.WARNING
+
+
+def test_lazy_args_are_formatted_only_when_written(configured):
+    configure, stream = configured
+    configure()
+    written, skipped = Counted(), Counted()
+    logger = logging.getLogger("test.logs")
+
+    logger.info("arg=%s", written)
+    logger.debug("arg=%s", skipped)
+
+    assert [item["message"] for item in _records(stream) if item["logger"] == "test.logs"] == ["arg=counted"]
+    # запись ниже уровня не форматируется ни одним обработчиком
+    assert written.calls >= 1
+    assert skipped.calls == 0
+
+
+def test_mutable_args_and_tracebacks_are_rendered_on_caller_thread():
+    handler = logs._QueueHandler(queue.Queue(10))
+    payload = {"state": "before"}
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test.logs").makeRecord(
+            "test.logs", logging.ERROR, __file__, 1, "payload=%s", (payload,), sys.exc_info()
+        )
+
+    prepared = handler.prepare(record)
+    payload["state"] = "after"
+
+    assert prepared.getMessage() == "payload={'state': 'before'}"
+    assert prepared.exc_info is None
+    assert "ValueError: boom" in prepared.exc_text
+
+
+def test_full_queue_drops_instead_of_blocking(configured):
+    configure, _ = configured
+    handler = configure(queue_size=1)
+    logs._listener.stop()
+    logs._listener = None
+    logger = logging.getLogger("test.logs")
+
+    for index in range(5):
+        logger.warning("record %s", index)
+
+    assert handler.dropped >= 4
+
+
+def test_graph_logs_mask_tokens_and_gate_reads(caplog, monkeypatch):
+    monkeypatch.setattr(settings, "graph_log_read_sample_rate", 0.0)
+    request = httpx.Request("GET", "https://graph.example/v21.0/1/")
+    ok = httpx.Response(200, json={"access_token": "EAAB-new-long-lived-token"}, request=request)
+    failed = httpx.Response(400, json={"error": {"code": 100}}, request=request)
+
+    with caplog.at_level(logging.INFO, logger=instagram.logger.name):
+        instagram._log_http_request("GET", str(request.url), read_only=True, params={"access_token": "x" * 20})
+        instagram._log_http_request("POST", str(request.url), read_only=False, data={"access_token": "EAAB-secret-token"})
+        instagram._log_http_response(ok, read_only=True, elapsed_ms=1.0)
+        instagram._log_http_response(ok, read_only=False, elapsed_ms=1.0)
+        instagram._log_http_response(failed, read_only=True, elapsed_ms=2.0)
+
+    messages = [(record.levelname, record.getMessage()) for record in caplog.records]
+    assert [level for level, _ in messages] == ["INFO", "INFO", "WARNING"]
+    assert "secret-token" not in caplog.text
+    assert "new-long-lived" not in caplog.text
+    assert "EAAB-s...oken" in messages[0][1]
+    assert caplog.records[2].graph_status == 400
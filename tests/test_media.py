@@ -0,0 +1,116 @@
+import asyncio
+import io
+import os
+import time
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from src.api import reels as reels_api
+from src.core.config import settings
+from src.models import Reel, User
+from src.services import media
+from src.services.media import MediaGarbageCollector, release_storage, reserve_storage
+from src.storage.local import LocalStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path, "https://api.example.com")
+    monkeypatch.setattr(reels_api, "get_storage", lambda: storage)
+    monkeypatch.setattr(media, "get_storage", lambda: storage)
+    monkeypatch.setattr(media, "REELS_ROOT", tmp_path)
+    return storage
+
+
+def _put(storage: LocalStorage, key: str, content: bytes = b"video", age_seconds: float = 0) -> None:
+    storage.save(key, io.BytesIO(content))
+    if age_seconds:
+        modified = time.time() - age_seconds
+        os.utime(storage.path(key), (modified, modified))
+
+
+def _used(db, user) -> int:
+    db.expire_all()
+    return db.get(User, user.id).storage_used_bytes
+
+
+def test_reserve_storage_respects_quota(db, user):
+    user.storage_quota_bytes = 10
+    db.commit()
+
+    assert reserve_storage(db, user.id, 6)
+    assert not reserve_storage(db, user.id, 6)
+    db.commit()
+    assert _used(db, user) == 6
+
+    release_storage(db, user.id, 100)
+    db.commit()
+    assert _used(db, user) == 0
+
+
+def test_upload_over_quota_is_rejected_and_removed(db, user, storage):
+    user.storage_quota_bytes = 3
+    db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(reels_api.upload_reel(file=UploadFile(io.BytesIO(b"video"), filename="a.mp4"), db=db, current_user=user))
+
+    assert exc_info.value.status_code == 413
+    assert db.query(Reel).count() == 0
+    assert storage.list_objects(start_after=None, limit=10) == []
+    assert _used(db, user) == 0
+
+
+def test_list_objects_uses_byte_order(storage):
+    for key in ("10/c.mp4", "1/a.mp4", "1-b.mp4", "1/B.mp4"):
+        _put(storage, key)
+
+    keys = [obj.key for obj in storage.list_objects(start_after=None, limit=10)]
+
+    assert keys == sorted(keys) == ["1-b.mp4", "1/B.mp4", "1/a.mp4", "10/c.mp4"]
+    assert [obj.key for obj in storage.list_objects(start_after="1/B.mp4", limit=1)] == ["1/a.mp4"]
+
+
+def test_gc_reconciles_storage_with_reels(db, user, storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "media_gc_grace_seconds", 60)
+    monkeypatch.setattr(settings, "media_gc_batch_size", 2)
+    monkeypatch.setattr(settings, "media_gc_batches_per_run", 10)
+    old = 3600
+    _put(storage, "1/a.mp4", b"12345", age_seconds=old)  # рилс без размера
+    _put(storage, "1/b.mp4", age_seconds=old)  # записи нет, старый
+    _put(storage, "1/c.mp4")  # записи нет, но загрузка свежая
+    _put(storage, "1/d.mp4", age_seconds=old)  # рилс уже опубликован
+    _put(storage, "1/e.mp4", age_seconds=old)  # старая запись с полным путём
+    db.add_all([
+        Reel(user_id=user.id, file_path="1/a.mp4", original_filename="a.mp4"),
+        Reel(user_id=user.id, file_path="1/d.mp4", original_filename="d.mp4", is_used=True),
+        Reel(user_id=user.id, file_path=str(tmp_path / "1" / "e.mp4"), original_filename="e.mp4", size_bytes=5),
+    ])
+    db.commit()
+
+    gc = MediaGarbageCollector()
+    assert gc.run() == 2
+
+    remaining = [obj.key for obj in storage.list_objects(start_after=None, limit=10)]
+    assert remaining == ["1/a.mp4", "1/c.mp4", "1/e.mp4"]
+    # проход дошёл до конца хранилища — следующий начнётся сначала
+    assert gc.cursor is None
+    db.expire_all()
+    assert db.query(Reel).filter(Reel.file_path == "1/a.mp4").one().size_bytes == 5
+    assert _used(db, user) == 5
+
+
+def test_gc_resumes_from_cursor(db, user, storage, monkeypatch):
+    monkeypatch.setattr(settings, "media_gc_grace_seconds", 60)
+    monkeypatch.setattr(settings, "media_gc_batch_size", 1)
+    monkeypatch.setattr(settings, "media_gc_batches_per_run", 1)
+    _put(storage, "1/a.mp4", age_seconds=3600)
+    _put(storage, "1/b.mp4", age_seconds=3600)
+
+    gc = MediaGarbageCollector()
+    assert gc.run() == 1
+    assert gc.cursor == "1/a.mp4"
+    assert gc.run() == 1
+
+    assert storage.list_objects(start_after=None, limit=10) == []
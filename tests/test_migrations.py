@@ -0,0 +1,73 @@
+import warnings
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+from src.db import migrate
+from src.db.base import Base
+
+
+@pytest.fixture
+def empty_engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migrations.sqlite")
+    monkeypatch.setattr(migrate, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def _schema_diff(engine) -> list:
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"compare_type": False})
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return compare_metadata(context, Base.metadata)
+
+
+def _revision(engine) -> str:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def _head() -> str:
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(migrate.alembic_config()).get_current_head()
+
+
+def test_migrations_build_the_model_schema(empty_engine):
+    migrate.upgrade_schema()
+
+    assert _schema_diff(empty_engine) == []
+    assert _revision(empty_engine) == _head()
+
+
+def test_migrations_downgrade_to_base(empty_engine):
+    migrate.upgrade_schema()
+    with empty_engine.begin() as connection:
+        command.downgrade(migrate.alembic_config(connection), "base")
+
+    assert set(inspect(empty_engine).get_table_names()) == {"alembic_version"}
+
+
+def test_schema_from_create_all_is_stamped_head(empty_engine):
+    import src.models  # noqa: F401
+
+    Base.metadata.create_all(empty_engine)
+
+    migrate.upgrade_schema()
+
+    assert _revision(empty_engine) == _head()
+
+
+def test_pre_migration_schema_is_upgraded(empty_engine):
+    with empty_engine.begin() as connection:
+        command.upgrade(migrate.alembic_config(connection), migrate.BASELINE_REVISION)
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+
+    migrate.upgrade_schema()
+
+    assert _schema_diff(empty_engine) == []
+    assert _revision(empty_engine) == _head()
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.config import settings
+from src.models import BusinessAccount, ReelAssignment
+from src.services.planner import (
+    STRATEGIES,
+    AccountSlot,
+    get_strategy,
+    load_account_slots,
+    plan_assignments,
+    register_strategy,
+)
+
+
+def _slots(*quotas, **fields) -> list[AccountSlot]:
+    return [
+        AccountSlot(account=SimpleNamespace(id=order + 1), order=order, remaining_quota=quota, **fields)
+        for order, quota in enumerate(quotas)
+    ]
+
+
+def _accounts(plan) -> list[int]:
+    return [account.id for _, account in plan.pairs]
+
+
+def test_round_robin_spreads_reels_within_quota():
+    plan = plan_assignments(range(6), _slots(1, 3, 3), get_strategy("round_robin"))
+
+    assert _accounts(plan) == [1, 2, 3, 2, 3, 2]
+    assert plan.reels_left_unassigned == 0
+
+
+def test_reels_beyond_total_quota_stay_unassigned():
+    plan = plan_assignments(range(5), _slots(1, 0, 2), get_strategy("round_robin"))
+
+    assert sorted(_accounts(plan)) == [1, 3, 3]
+    assert plan.reels_left_unassigned == 2
+
+
+def test_round_robin_prefers_accounts_without_recent_failures():
+    slots = _slots(5, 5)
+    slots[0].recent_failures = 1
+
+    assert _accounts(plan_assignments(range(1), slots, get_strategy("round_robin"))) == [2]
+
+
+def test_least_recent_starts_with_longest_idle_account():
+    now = datetime.now(timezone.utc)
+    slots = _slots(1, 1, 1)
+    slots[0].last_published_at = now
+    slots[1].last_published_at = now - timedelta(hours=5)
+
+    plan = plan_assignments(range(3), slots, get_strategy("least_recent"))
+
+    # ни разу не публиковавший — первым
+    assert _accounts(plan) == [3, 2, 1]
+
+
+def test_weighted_is_proportional_to_remaining_quota():
+    plan = plan_assignments(range(4), _slots(3, 1), get_strategy("weighted"))
+
+    assert sorted(_accounts(plan)) == [1, 1, 1, 2]
+
+
+def test_unknown_strategy(monkeypatch):
+    with pytest.raises(ValueError):
+        get_strategy("random")
+
+    custom = STRATEGIES["round_robin"]
+    monkeypatch.setitem(STRATEGIES, "custom", custom)
+    register_strategy("custom", custom)
+    assert get_strategy("custom") is custom
+
+
+def _assignment(db, reel, account, status, *, created_at=None, published_at=None) -> None:
+    db.add(
+        ReelAssignment(
+            user_id=reel.user_id,
+            reel_id=reel.id,
+            business_account_id=account.id,
+            status=status,
+            created_at=created_at or datetime.now(timezone.utc),
+            published_at=published_at,
+        )
+    )
+
+
+def test_load_account_slots_counts_quota_window(db, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "instagram_daily_publish_limit", 10)
+    now = datetime.now(timezone.utc)
+    week_ago = now - timedelta(days=7)
+    # создано давно, опубликовано сегодня — расходует сегодняшний лимит
+    _assignment(db, reel, account, "published", created_at=week_ago, published_at=now - timedelta(hours=1))
+    _assignment(db, reel, account, "published", created_at=week_ago, published_at=now - timedelta(hours=25))
+    # идущая публикация расходует лимит, даже если начата давно
+    _assignment(db, reel, account, "container_created", created_at=week_ago)
+    _assignment(db, reel, account, "error", created_at=week_ago)
+    db.commit()
+
+    [slot] = load_account_slots(db, [account])
+
+    assert slot.remaining_quota == 8
+    assert slot.recent_failures == 0
+    assert slot.last_published_at.replace(tzinfo=timezone.utc) > now - timedelta(hours=2)
+
+
+def test_load_account_slots_skips_failing_accounts(db, user, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "planner_max_recent_failures", 2)
+    other = BusinessAccount(user_id=user.id, name="other", external_id="2", access_token="token")
+    db.add(other)
+    db.flush()
+    for _ in range(2):
+        _assignment(db, reel, account, "error")
+    _assignment(db, reel, other, "error")
+    db.commit()
+
+    slots = load_account_slots(db, [account, other])
+
+    assert [(slot.account.id, slot.recent_failures, slot.last_published_at) for slot in slots] == [(other.id, 1, None)]
+
+
+def test_due_scheduled_uses_todays_quota(db, reel, account, monkeypatch):
+    monkeypatch.setattr(settings, "instagram_daily_publish_limit", 10)
+    now = datetime.now(timezone.utc)
+    db.add(ReelAssignment(user_id=reel.user_id, reel_id=reel.id, business_account_id=account.id,
+                          status="scheduled", scheduled_at=now - timedelta(minutes=1)))
+    db.add(ReelAssignment(user_id=reel.user_id, reel_id=reel.id, business_account_id=account.id,
+                          status="scheduled", scheduled_at=now + timedelta(days=2)))
+    db.commit()
+
+    [slot] = load_account_slots(db, [account])
+
+    # запланированное на послезавтра сегодняшний лимит не расходует
+    assert slot.remaining_quota == 9
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from src.core import profiling
+from src.core.config import settings
+from src.core.profiling import RequestProfile, StackSampler, save_profile
+from src.core.security import admin_token_matches
+
+
+def _scope(headers: dict[str, str], path: str = "/api/reels/") -> dict:
+    return {
+        "type": "http",
+        "path": path,
+        "headers": [(key.encode(), value.encode()) for key, value in headers.items()],
+    }
+
+
+def test_admin_token_matches(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+
+    assert admin_token_matches("secret")
+    assert not admin_token_matches("secreT")
+    assert not admin_token_matches("")
+    assert not admin_token_matches(None)
+
+
+def test_admin_token_disabled_without_setting(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", None)
+
+    assert not admin_token_matches("")
+    assert not admin_token_matches(None)
+
+
+def test_profile_header_requires_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+
+    assert profiling._should_profile(_scope({"x-profile": "1", "x-admin-token": "secret"}))
+    assert not profiling._should_profile(_scope({"x-profile": "1", "x-admin-token": "wrong"}))
+    assert not profiling._should_profile(_scope({"x-profile": "1"}))
+    assert not profiling._should_profile(_scope({}))
+
+
+def _profile() -> RequestProfile:
+    return RequestProfile(method="GET", path="/api/reels/", started_at=datetime.now(timezone.utc))
+
+
+def _busy_thread(stop: threading.Event) -> threading.Thread:
+    def spin() -> None:
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=spin, name="busy-handler")
+    thread.start()
+    return thread
+
+
+def test_sampler_collects_only_profiled_threads(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_sample_interval_ms", 1.0)
+    sampler = StackSampler()
+    stop = threading.Event()
+    busy = _busy_thread(stop)
+    try:
+        profile = _profile()
+        profile.thread_ids.add(busy.ident)
+        sampler.add(profile)
+        deadline = time.monotonic() + 2
+        while not profile.samples and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sampler.discard(profile)
+    finally:
+        stop.set()
+        busy.join()
+
+    assert set(profile.samples) == {busy.ident}
+    stacks = profile.collapsed()
+    assert stacks and all(line.startswith("busy-handler;") for line in stacks)
+    assert any("spin (test_profiling.py" in line for line in stacks)
+
+
+def test_sampler_uses_one_thread_per_process(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_sample_interval_ms", 1.0)
+    sampler = StackSampler()
+    first, second = _profile(), _profile()
+
+    sampler.add(first)
+    thread = sampler._thread
+    sampler.add(second)
+    sampler.discard(first)
+    sampler.discard(second)
+    sampler.add(first)
+
+    assert sampler._thread is thread
+    assert sum(1 for t in threading.enumerate() if t is thread) == 1
+    sampler.discard(first)
+
+
+def test_save_profile_writes_summary_and_stacks(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "profiling_dir", tmp_path)
+    profile = _profile()
+    profile.record("sql", "SELECT 1", 2.0)
+    profile.record("graph", "GET /me", 5.0)
+    profile.add_sample(1, "worker", "main (app.py:1)")
+    profile.add_sample(1, "worker", "main (app.py:1)")
+
+    data = json.loads(save_profile(profile).read_text(encoding="utf-8"))
+
+    assert data["summary"] == {"sql_count": 1, "sql_ms": 2.0, "graph_count": 1, "graph_ms": 5.0}
+    assert data["stacks"] == ["worker;main (app.py:1) 2"]
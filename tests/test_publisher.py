@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import src.services.publisher as publisher
+from src.core.config import settings
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import ContainerNotReadyError, InstagramPublishError
+from src.models import ReelAssignment
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime | None) -> datetime | None:
+    # SQLite отдаёт DateTime(timezone=True) без зоны
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class FakeGraph:
+    """Ответы Graph для шагов публикации одного назначения."""
+
+    def __init__(self, monkeypatch, *, statuses=("FINISHED",), create_error=None, publish_error=None):
+        self.statuses = list(statuses)
+        self.create_error = create_error
+        self.publish_error = publish_error
+        self.calls = []
+        monkeypatch.setattr(publisher, "create_media_container", self.create_media_container)
+        monkeypatch.setattr(publisher, "wait_for_container", self.wait_for_container)
+        monkeypatch.setattr(publisher, "get_container_status", self.get_container_status)
+        monkeypatch.setattr(publisher, "publish_media_container", self.publish_media_container)
+
+    def create_media_container(self, *, reel, account):
+        self.calls.append("create")
+        if self.create_error is not None:
+            raise self.create_error
+        return "creation-1"
+
+    def wait_for_container(self, *, creation_id, account):
+        self.calls.append("wait")
+        status = self.statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+        return status
+
+    def get_container_status(self, *, creation_id, account):
+        self.calls.append("status")
+        return self.statuses.pop(0)
+
+    def publish_media_container(self, *, creation_id, account):
+        self.calls.append("publish")
+        if self.publish_error is not None:
+            raise self.publish_error
+        return "media-1"
+
+
+@pytest.fixture
+def assignment(db, reel, account):
+    assignment = publisher.create_assignment(db, reel=reel, account=account)
+    db.commit()
+    return assignment
+
+
+def test_advance_publishes_from_pending(db, assignment, monkeypatch):
+    graph = FakeGraph(monkeypatch)
+
+    assert publisher.advance_assignment(db, assignment) == "published"
+
+    assert graph.calls == ["create", "wait", "publish"]
+    db.expire_all()
+    assert assignment.status == "published"
+    assert assignment.creation_id == "creation-1"
+    assert assignment.instagram_media_id == "media-1"
+    assert assignment.container_status == "PUBLISHED"
+    assert assignment.attempt_count == 1
+    assert assignment.next_attempt_at is None
+    assert assignment.reel.is_used
+
+
+def test_advance_defers_unprocessed_container(db, assignment, monkeypatch):
+    FakeGraph(monkeypatch, statuses=[ContainerNotReadyError("still processing")])
+
+    started = _utcnow()
+    assert publisher.advance_assignment(db, assignment) == "container_created"
+
+    db.expire_all()
+    assert assignment.status == "container_created"
+    assert assignment.error_message == "still processing"
+    assert _aware(assignment.next_attempt_at) > started
+
+
+def test_advance_defers_transient_error(db, assignment, monkeypatch):
+    FakeGraph(monkeypatch, create_error=InstagramPublishError("timeout", kind=GraphErrorKind.TRANSIENT))
+
+    started = _utcnow()
+    assert publisher.advance_assignment(db, assignment) == "pending"
+
+    db.expire_all()
+    assert assignment.status == "pending"
+    assert assignment.error_message == "timeout"
+    assert _aware(assignment.next_attempt_at) > started
+
+
+def test_advance_fails_on_permanent_error(db, assignment, monkeypatch):
+    FakeGraph(monkeypatch, create_error=InstagramPublishError("bad video"))
+
+    assert publisher.advance_assignment(db, assignment) == "error"
+
+    db.expire_all()
+    assert assignment.error_message == "bad video"
+    assert assignment.next_attempt_at is None
+    assert not assignment.reel.is_used
+
+
+def test_advance_expired_container_is_recreated(db, assignment, monkeypatch):
+    graph = FakeGraph(monkeypatch, statuses=["EXPIRED", "FINISHED"])
+
+    assert publisher.advance_assignment(db, assignment) == "published"
+    assert graph.calls == ["create", "wait", "create", "wait", "publish"]
+
+
+def test_advance_resumes_already_published_container(db, assignment, monkeypatch):
+    # воркер упал после media_publish: второй раз не публикуем
+    assignment.status = "publishing"
+    assignment.creation_id = "creation-1"
+    db.commit()
+    graph = FakeGraph(monkeypatch, statuses=["PUBLISHED"])
+
+    assert publisher.advance_assignment(db, assignment) == "published"
+
+    assert graph.calls == ["status"]
+    assert assignment.instagram_media_id is None
+
+
+def test_advance_rechecks_container_after_lost_publish_response(db, assignment, monkeypatch):
+    graph = FakeGraph(
+        monkeypatch,
+        statuses=["FINISHED", "PUBLISHED"],
+        publish_error=InstagramPublishError("connection reset", kind=GraphErrorKind.TRANSIENT),
+    )
+
+    assert publisher.advance_assignment(db, assignment) == "published"
+    assert graph.calls == ["create", "wait", "publish", "status"]
+
+
+def test_advance_fails_after_max_attempts(db, assignment, monkeypatch):
+    graph = FakeGraph(monkeypatch)
+    assignment.attempt_count = settings.publish_max_attempts
+    db.commit()
+
+    assert publisher.advance_assignment(db, assignment) == "error"
+
+    assert graph.calls == []
+    assert assignment.attempt_count == settings.publish_max_attempts
+
+
+def test_advance_keeps_final_status(db, assignment, monkeypatch):
+    graph = FakeGraph(monkeypatch)
+    assignment.status = "published"
+    db.commit()
+
+    assert publisher.advance_assignment(db, assignment) == "published"
+    assert graph.calls == []
+    assert assignment.attempt_count == 0
+
+
+def _add_assignment(db, reel, account, *, status="pending", next_attempt_at=None) -> int:
+    assignment = ReelAssignment(
+        user_id=reel.user_id,
+        reel_id=reel.id,
+        business_account_id=account.id,
+        status=status,
+        next_attempt_at=next_attempt_at,
+    )
+    db.add(assignment)
+    db.commit()
+    return assignment.id
+
+
+def test_claim_due_assignments_respects_lease(db, reel, account):
+    now = _utcnow()
+    expired = _add_assignment(db, reel, account, next_attempt_at=now - timedelta(seconds=1))
+    unleased = _add_assignment(db, reel, account, status="container_created")
+    _add_assignment(db, reel, account, next_attempt_at=now + timedelta(minutes=5))
+    _add_assignment(db, reel, account, status="published", next_attempt_at=now - timedelta(seconds=1))
+    _add_assignment(db, reel, account, status="error")
+
+    assert sorted(publisher.claim_due_assignments(db, limit=10)) == sorted([expired, unleased])
+
+    # аренда продлена: повторный проход их не берёт
+    db.expire_all()
+    assignment = db.get(ReelAssignment, expired)
+    assert _aware(assignment.next_attempt_at) > now + timedelta(seconds=settings.publish_lease_seconds - 5)
+    assert publisher.claim_due_assignments(db, limit=10) == []
+
+    # аренда истекла (воркер упал) — назначение снова забирается
+    assignment.next_attempt_at = _utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert publisher.claim_due_assignments(db, limit=10) == [expired]
+
+
+def test_claim_due_assignments_limit(db, reel, account):
+    past = _utcnow() - timedelta(minutes=1)
+    ids = [_add_assignment(db, reel, account, next_attempt_at=past - timedelta(seconds=i)) for i in range(3)]
+
+    # самые давно просроченные — первыми
+    assert publisher.claim_due_assignments(db, limit=2) == [ids[2], ids[1]]
+    assert publisher.claim_due_assignments(db, limit=2) == [ids[0]]
+
+
+def test_invalid_token_marks_account_unhealthy(db, assignment, monkeypatch):
+    FakeGraph(monkeypatch, create_error=InstagramPublishError("token expired", kind=GraphErrorKind.TOKEN_INVALID))
+
+    assert publisher.advance_assignment(db, assignment) == "error"
+
+    db.expire_all()
+    assert assignment.business_account.health_status == "unhealthy"
+    assert assignment.business_account.health_error == "token expired"
@@ -0,0 +1,128 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from starlette.requests import Request
+
+from src.api.deps import get_read_db
+from src.core.config import settings
+from src.core.security import create_access_token
+from src.db import replicas
+from src.db.replicas import (
+    READ_YOUR_WRITES_COOKIE,
+    RecentWrites,
+    Replica,
+    ReplicaSet,
+    ReadYourWritesMiddleware,
+    reads_own_writes,
+)
+from src.db.session import create_db_engine, engine
+
+
+def _engine(url: str = "sqlite://"):
+    return create_db_engine(url, name="replica-test", pool_size=1, max_overflow=0, pool_timeout=1, pool_recycle=60, connect_timeout=1)
+
+
+def _bearer(user_id: int) -> Headers:
+    return Headers({"authorization": f"Bearer {create_access_token(subject=str(user_id))}"})
+
+
+@pytest.fixture
+def replica_set(monkeypatch):
+    replica_set = ReplicaSet([Replica(name="replica-0", engine=_engine(), healthy=True)])
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    monkeypatch.setattr("src.api.deps.replica_set", replica_set)
+    monkeypatch.setattr(replicas, "recent_writes", RecentWrites())
+    return replica_set
+
+
+def test_choose_round_robin_over_healthy_replicas():
+    first, second, down = (Replica(name=str(index), engine=_engine()) for index in range(3))
+    first.healthy = second.healthy = True
+    replica_set = ReplicaSet([first, second, down])
+
+    assert [replica_set.choose() for _ in range(4)] == [first.engine, second.engine] * 2
+
+    first.healthy = second.healthy = False
+    assert replica_set.choose() is None
+
+
+def test_check_marks_unreachable_and_lagging_replicas(tmp_path, monkeypatch):
+    alive = Replica(name="alive", engine=_engine())
+    broken = Replica(name="broken", engine=_engine(f"sqlite:///{tmp_path}/missing/dir/db.sqlite"), healthy=True)
+    replica_set = ReplicaSet([alive, broken])
+
+    replica_set.check()
+
+    assert alive.healthy and alive.lag_seconds == 0.0
+    assert not broken.healthy and broken.last_error
+    assert broken.checked_at is not None
+
+    monkeypatch.setattr(settings, "db_replica_max_lag_seconds", -1)
+    replica_set.check()
+    assert not alive.healthy
+
+
+def test_recent_writes_are_keyed_by_token_user(replica_set):
+    replicas.recent_writes.mark(1)
+
+    assert reads_own_writes(_bearer(1), {})
+    assert not reads_own_writes(_bearer(2), {})
+    assert not reads_own_writes(Headers({"authorization": "Bearer garbage"}), {})
+
+
+def test_cookie_marker_reads_from_primary():
+    assert reads_own_writes(Headers(), {READ_YOUR_WRITES_COOKIE: str(time.time() + 10)})
+    assert not reads_own_writes(Headers(), {READ_YOUR_WRITES_COOKIE: str(time.time() - 1)})
+    assert not reads_own_writes(Headers(), {READ_YOUR_WRITES_COOKIE: "garbage"})
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.post("/ok")
+    def ok():
+        return {}
+
+    @app.post("/fail")
+    def fail():
+        return JSONResponse({}, status_code=400)
+
+    return app
+
+
+def test_middleware_marks_successful_writes(replica_set):
+    client = TestClient(_app())
+
+    response = client.post("/ok", headers=dict(_bearer(7)))
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+    assert replicas.recent_writes.active(7)
+
+    client.cookies.clear()
+    response = client.post("/fail", headers=dict(_bearer(8)))
+    assert READ_YOUR_WRITES_COOKIE not in response.cookies
+    assert not replicas.recent_writes.active(8)
+
+
+def _read_bind(headers: Headers):
+    request = Request({"type": "http", "headers": headers.raw})
+    sessions = get_read_db(request)
+    db = next(sessions)
+    try:
+        return db.get_bind()
+    finally:
+        sessions.close()
+
+
+def test_get_read_db_routes_to_replica_unless_user_wrote(replica_set):
+    [replica] = replica_set.replicas
+
+    assert _read_bind(_bearer(1)) is replica.engine
+
+    replicas.recent_writes.mark(1)
+    assert _read_bind(_bearer(1)) is engine
+    assert _read_bind(_bearer(2)) is replica.engine
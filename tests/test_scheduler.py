@@ -0,0 +1,193 @@
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.api import schedule as schedule_api
+from src.core.config import settings
+from src.models import BusinessAccount, Reel, ReelAssignment
+from src.schemas.schedule import ScheduleCreate
+from src.services import scheduler
+from src.services.events import event_broker, install_event_hooks
+from src.services.scheduler import assign_schedule_times, claim_due_scheduled, schedule_capacity
+
+START = datetime(2026, 3, 1, 20, 0, tzinfo=timezone.utc)
+
+
+def _pairs(*account_ids):
+    accounts = {account_id: SimpleNamespace(id=account_id) for account_id in account_ids}
+    return [(f"reel-{index}", accounts[account_id]) for index, account_id in enumerate(account_ids)]
+
+
+def _times(result) -> list[tuple[int, datetime]]:
+    return [(account.id, scheduled_at) for _, account, scheduled_at in result]
+
+
+def test_accounts_are_spread_within_interval():
+    result = assign_schedule_times(_pairs(1, 2, 1, 2), start_at=START, interval=timedelta(hours=1))
+
+    assert _times(result) == [
+        (1, START),
+        (2, START + timedelta(minutes=30)),
+        (1, START + timedelta(hours=1)),
+        (2, START + timedelta(minutes=90)),
+    ]
+
+
+def test_daily_limit_moves_reels_to_next_day():
+    daily_used = {1: Counter({START.date(): 1})}
+
+    result = assign_schedule_times(
+        _pairs(1, 1, 1, 1),
+        start_at=START,
+        interval=timedelta(hours=1),
+        daily_used=daily_used,
+        daily_limit=2,
+    )
+
+    next_day = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    assert _times(result) == [
+        (1, START),
+        (1, next_day),
+        (1, next_day + timedelta(hours=1)),
+        (1, datetime(2026, 3, 3, tzinfo=timezone.utc)),
+    ]
+    # чужой счётчик не меняется
+    assert daily_used == {1: Counter({START.date(): 1})}
+
+
+def test_pairs_after_end_at_are_dropped():
+    result = assign_schedule_times(
+        _pairs(1, 1, 1),
+        start_at=START,
+        interval=timedelta(hours=1),
+        end_at=START + timedelta(minutes=90),
+    )
+
+    assert [scheduled_at for _, scheduled_at in _times(result)] == [START, START + timedelta(hours=1)]
+
+
+def test_schedule_capacity_sums_days_of_window():
+    used = Counter({date(2026, 3, 1): 2, date(2026, 3, 2): 5})
+
+    capacity = schedule_capacity(used, start_at=START, end_at=START + timedelta(days=2), daily_limit=3)
+
+    # 1 марта — 1 место, 2-го — ни одного, 3-го — 3
+    assert capacity == 4
+
+
+def _scheduled(db, reel, account, scheduled_at) -> int:
+    assignment = ReelAssignment(
+        user_id=reel.user_id,
+        reel_id=reel.id,
+        business_account_id=account.id,
+        status="scheduled",
+        scheduled_at=scheduled_at,
+    )
+    db.add(assignment)
+    db.commit()
+    return assignment.id
+
+
+def test_claim_due_scheduled(db, reel, account):
+    now = datetime.now(timezone.utc)
+    due = _scheduled(db, reel, account, now - timedelta(minutes=1))
+    _scheduled(db, reel, account, now + timedelta(hours=1))
+
+    assert claim_due_scheduled(db, limit=10) == [(due, reel.user_id)]
+
+    db.expire_all()
+    assignment = db.get(ReelAssignment, due)
+    assert assignment.status == "pending"
+    assert assignment.next_attempt_at is not None
+    assert scheduler.next_scheduled_at(db) > now
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    # на SQLite сигнал об изменении расписания доставляется в процессе после коммита
+    calls = []
+    install_event_hooks()
+    monkeypatch.setattr(event_broker, "_schedule_listeners", [lambda: calls.append(1)])
+    return calls
+
+
+def _reels(db, user, count):
+    reels = [Reel(user_id=user.id, file_path=f"{user.id}/{index}.mp4", original_filename="r.mp4") for index in range(count)]
+    db.add_all(reels)
+    db.commit()
+    return reels
+
+
+def test_schedule_respects_quota_of_each_day(db, user, account, notifications, monkeypatch):
+    monkeypatch.setattr(settings, "instagram_daily_publish_limit", 2)
+    other = BusinessAccount(user_id=user.id, name="other", external_id="2", access_token="token")
+    db.add(other)
+    reels = _reels(db, user, 6)
+    now = datetime.now(timezone.utc)
+    # первый аккаунт сегодня уже исчерпал лимит
+    for reel in reels[:2]:
+        reel.is_used = True
+        db.add(
+            ReelAssignment(
+                user_id=user.id,
+                reel_id=reel.id,
+                business_account_id=account.id,
+                status="published",
+                published_at=now,
+            )
+        )
+    db.commit()
+
+    start_at = now + timedelta(minutes=1)
+    created = schedule_api.create_schedule(
+        ScheduleCreate(start_at=start_at, interval_minutes=60),
+        db=db,
+        current_user=user,
+    )
+
+    per_day = Counter((assignment.business_account_id, assignment.scheduled_at.date()) for assignment in created)
+    assert len(created) == 4
+    assert max(per_day.values()) <= 2
+    assert per_day[(account.id, now.date())] == 0
+    assert sum(count for (account_id, _), count in per_day.items() if account_id == account.id) == 2
+    assert notifications
+
+
+def test_schedule_window_limits_total(db, user, account, notifications, monkeypatch):
+    monkeypatch.setattr(settings, "instagram_daily_publish_limit", 2)
+    _reels(db, user, 5)
+    start_at = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    created = schedule_api.create_schedule(
+        ScheduleCreate(start_at=start_at, end_at=start_at + timedelta(days=2)),
+        db=db,
+        current_user=user,
+    )
+
+    assert len(created) == 4
+    assert Counter(assignment.scheduled_at.date() for assignment in created) == {
+        start_at.date(): 2,
+        (start_at + timedelta(days=1)).date(): 2,
+    }
+
+
+def test_cancel_wakes_scheduler(db, reel, account, user, notifications):
+    assignment_id = _scheduled(db, reel, account, datetime.now(timezone.utc) + timedelta(hours=1))
+
+    schedule_api.cancel_scheduled(assignment_id, db=db, current_user=user)
+
+    assert db.get(ReelAssignment, assignment_id) is None
+    assert notifications == [1]
+
+
+def test_rolled_back_change_does_not_wake_scheduler(db, reel, account, user, notifications):
+    assignment_id = _scheduled(db, reel, account, datetime.now(timezone.utc) + timedelta(hours=1))
+    db.delete(db.get(ReelAssignment, assignment_id))
+    schedule_api.announce_schedule_change(db)
+
+    db.rollback()
+    db.commit()
+
+    assert notifications == []
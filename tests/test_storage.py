@@ -0,0 +1,99 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from src.api import reels as reels_api
+from src.core.config import settings
+from src.integrations.instagram import build_video_url_for_reel
+from src.models import Reel
+from src.services import media
+from src.storage import StorageError, get_storage
+from src.storage.local import LocalStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path, "https://api.example.com/")
+    monkeypatch.setattr(reels_api, "get_storage", lambda: storage)
+    monkeypatch.setattr(media, "get_storage", lambda: storage)
+    # удаление после коммита — синхронно, без фонового пула
+    monkeypatch.setattr(reels_api, "schedule_file_deletes", media._delete_stored_files)
+    return storage
+
+
+def test_local_save_and_delete(storage):
+    assert storage.save("1/a.mp4", io.BytesIO(b"video")) == 5
+    assert (storage.root / "1" / "a.mp4").read_bytes() == b"video"
+
+    storage.delete("1/a.mp4")
+    storage.delete("1/a.mp4")  # отсутствующий объект — не ошибка
+
+    assert not (storage.root / "1" / "a.mp4").exists()
+
+
+def test_local_rejects_keys_outside_root(storage):
+    with pytest.raises(StorageError):
+        storage.save("../escape.mp4", io.BytesIO(b"x"))
+
+
+def test_local_understands_legacy_absolute_paths(storage, tmp_path):
+    legacy = tmp_path / "legacy" / "old.mp4"
+
+    assert storage.path(str(legacy)) == legacy
+    assert storage.public_url(str(legacy), user_id=7) == "https://api.example.com/media/reels/7/old.mp4"
+
+
+def test_get_storage_validates_backend(monkeypatch):
+    get_storage.cache_clear()
+    try:
+        monkeypatch.setattr(settings, "media_storage_backend", "ftp")
+        with pytest.raises(RuntimeError, match="MEDIA_STORAGE_BACKEND"):
+            get_storage()
+
+        monkeypatch.setattr(settings, "media_storage_backend", "s3")
+        monkeypatch.setattr(settings, "s3_bucket", None)
+        with pytest.raises(RuntimeError, match="S3_BUCKET"):
+            get_storage()
+    finally:
+        get_storage.cache_clear()
+
+
+def test_video_url_comes_from_storage(reel, monkeypatch):
+    get_storage.cache_clear()
+    monkeypatch.setattr(settings, "media_storage_backend", "local")
+    monkeypatch.setattr(settings, "backend_base_url", "https://api.example.com")
+    try:
+        assert build_video_url_for_reel(reel=reel) == f"https://api.example.com/media/reels/{reel.user_id}/reel.mp4"
+    finally:
+        get_storage.cache_clear()
+
+
+def _upload(name: str, content: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=name)
+
+
+def test_upload_and_delete_go_through_storage(db, user, storage):
+    reel = asyncio.run(reels_api.upload_reel(file=_upload("clip.MOV", b"video"), db=db, current_user=user))
+
+    assert reel.file_path.startswith(f"{user.id}/") and reel.file_path.endswith(".mov")
+    assert storage.path(reel.file_path).read_bytes() == b"video"
+
+    reels_api.delete_reel(reel.id, db=db, current_user=user)
+
+    assert db.query(Reel).count() == 0
+    assert not storage.path(reel.file_path).exists()
+
+
+def test_upload_storage_failure_returns_503(db, user, storage, monkeypatch):
+    def broken(key, fileobj):
+        raise StorageError("disk full")
+
+    monkeypatch.setattr(storage, "save", broken)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(reels_api.upload_reel(file=_upload("clip.mp4", b"video"), db=db, current_user=user))
+
+    assert exc_info.value.status_code == 503
+    assert db.query(Reel).count() == 0
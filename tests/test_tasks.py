@@ -0,0 +1,74 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from src.core.config import settings
+from src.integrations import instagram
+from src.services import background, media, tasks
+from src.services.events import event_broker
+from src.services.scheduler import publish_scheduler
+from src.storage.local import LocalStorage
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(tasks, "_done", set())
+    monkeypatch.setattr(background, "_tasks", [])
+    monkeypatch.setattr(event_broker, "_schedule_listeners", [])
+    return background._tasks
+
+
+def test_worker_tasks_are_registered_once(fresh_registry, monkeypatch):
+    monkeypatch.setattr(settings, "scheduler_enabled", True)
+
+    tasks.register_worker_tasks()
+    registered = list(fresh_registry)
+    tasks.register_worker_tasks()
+    tasks.register_event_broker()
+
+    assert fresh_registry == registered
+    assert publish_scheduler in registered
+    assert registered.count(event_broker) == 1
+    assert event_broker._schedule_listeners == [publish_scheduler.notify]
+
+
+def test_import_starts_no_threads_and_reads_no_graph_url():
+    # импорт модулей воркера не создаёт пулов и не читает адрес Graph API
+    code = (
+        "import threading\n"
+        "import src.worker\n"
+        "from src.integrations import instagram\n"
+        "from src.services import media\n"
+        "assert media._file_deleter is None\n"
+        "assert instagram.graph_base_url.cache_info().currsize == 0\n"
+        "assert not [t for t in threading.enumerate() if t.name.startswith('media-delete')]\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_file_deleter_is_created_on_demand_and_after_shutdown(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path, "https://api.example.com")
+    monkeypatch.setattr(media, "get_storage", lambda: storage)
+    storage.save("1/a.mp4", io.BytesIO(b"a"))
+    storage.save("1/b.mp4", io.BytesIO(b"b"))
+    media.shutdown_file_deleter(wait=True)
+
+    media.schedule_file_deletes(["1/a.mp4"])
+    media.shutdown_file_deleter(wait=True)
+    assert media._file_deleter is None
+    media.schedule_file_deletes(["1/b.mp4"])
+    media.shutdown_file_deleter(wait=True)
+
+    assert not storage.path("1/a.mp4").exists()
+    assert not storage.path("1/b.mp4").exists()
+
+
+def test_graph_base_url_uses_override(monkeypatch):
+    monkeypatch.setattr(settings, "graph_base_url", "http://fake-graph:8080/v21.0/")
+    instagram.graph_base_url.cache_clear()
+    try:
+        assert instagram._graph_url("/me/media") == "http://fake-graph:8080/v21.0/me/media"
+    finally:
+        instagram.graph_base_url.cache_clear()
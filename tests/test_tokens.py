@@ -0,0 +1,170 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import src.services.tokens as tokens
+from src.core.config import settings
+from src.integrations import instagram
+from src.integrations.graph_errors import GraphErrorKind
+from src.integrations.instagram import InstagramPublishError
+from src.models import BusinessAccount
+from src.services.account_health import UNHEALTHY, AccountSnapshot
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@pytest.fixture
+def app_credentials(monkeypatch):
+    monkeypatch.setattr(settings, "token_refresh_enabled", True)
+    monkeypatch.setattr(settings, "instagram_app_id", "app-id")
+    monkeypatch.setattr(settings, "instagram_app_secret", "app-secret-0123456789")
+
+
+def _reload(db, account) -> BusinessAccount:
+    db.expire_all()
+    return db.get(BusinessAccount, account.id)
+
+
+def test_refresh_disabled_without_app_credentials(monkeypatch):
+    monkeypatch.setattr(settings, "token_refresh_enabled", True)
+    monkeypatch.setattr(settings, "instagram_app_id", None)
+    monkeypatch.setattr(settings, "instagram_app_secret", "secret")
+
+    assert tokens.refresh_enabled() is False
+
+
+def test_next_refresh_is_ahead_of_expiry_with_jitter(monkeypatch):
+    monkeypatch.setattr(settings, "token_refresh_lead_seconds", 7 * 86400)
+    monkeypatch.setattr(settings, "token_refresh_jitter_seconds", 86400)
+    monkeypatch.setattr(settings, "token_refresh_recheck_seconds", 3600)
+    monkeypatch.setattr(settings, "token_refresh_interval_seconds", 600)
+    now = _utcnow()
+    expires_at = now + timedelta(days=60)
+
+    planned = tokens.next_refresh_at(expires_at, now)
+    unknown = tokens.next_refresh_at(None, now)
+    soon = tokens.next_refresh_at(now + timedelta(days=1), now)
+
+    assert expires_at - timedelta(days=8) <= planned <= expires_at - timedelta(days=7)
+    assert now + timedelta(hours=1) <= unknown <= now + timedelta(hours=1, days=1)
+    assert now <= soon <= now + timedelta(minutes=10)
+
+
+def test_claim_skips_invalid_and_leases_due_accounts(db, user, account, monkeypatch):
+    monkeypatch.setattr(settings, "token_refresh_lease_seconds", 600)
+    invalid = BusinessAccount(user_id=user.id, name="invalid", access_token="t", token_status=tokens.TOKEN_INVALID)
+    later = BusinessAccount(user_id=user.id, name="later", access_token="t", token_refresh_at=_utcnow() + timedelta(days=1))
+    db.add_all([invalid, later])
+    db.commit()
+
+    assert tokens.claim_due_accounts(db, 10) == [account.id]
+    assert _aware(_reload(db, account).token_refresh_at) > _utcnow() + timedelta(minutes=9)
+    assert tokens.claim_due_accounts(db, 10) == []
+
+
+def test_refresh_against_fake_graph_stores_new_token(db, account, fake_graph, app_credentials):
+    account.access_token = "token:1"
+    db.commit()
+
+    assert tokens.refresh_due_tokens() == 1
+
+    refreshed = _reload(db, account)
+    assert refreshed.access_token.startswith("token:")
+    assert refreshed.access_token != "token:1"
+    assert refreshed.token_status == tokens.TOKEN_VALID
+    assert _aware(refreshed.token_expires_at) > _utcnow() + timedelta(days=59)
+    assert _aware(refreshed.token_refresh_at) < _aware(refreshed.token_expires_at)
+
+
+def test_revoked_token_is_marked_invalid_and_unhealthy(db, account, fake_graph, app_credentials):
+    account.access_token = "REVOKED:1"
+    db.commit()
+
+    assert tokens.refresh_due_tokens() == 0
+
+    revoked = _reload(db, account)
+    assert revoked.token_status == tokens.TOKEN_INVALID
+    assert revoked.token_refresh_at is None
+    assert revoked.health_status == UNHEALTHY
+
+
+def test_transient_failures_back_off_then_flag_account(db, account, app_credentials, monkeypatch):
+    monkeypatch.setattr(settings, "token_refresh_max_failures", 2)
+    monkeypatch.setattr(settings, "token_refresh_retry_seconds", 60)
+
+    def unavailable(account):
+        raise InstagramPublishError("Service unavailable", kind=GraphErrorKind.TRANSIENT)
+
+    monkeypatch.setattr(tokens, "exchange_long_lived_token", unavailable)
+
+    assert tokens.refresh_due_tokens() == 0
+    first = _reload(db, account)
+    assert (first.token_status, first.token_refresh_failures) == (tokens.TOKEN_REFRESH_FAILED, 1)
+    assert _aware(first.token_refresh_at) > _utcnow() + timedelta(seconds=50)
+    assert first.health_status != UNHEALTHY
+
+    first.token_refresh_at = None
+    db.commit()
+    tokens.refresh_due_tokens()
+
+    second = _reload(db, account)
+    assert second.token_refresh_failures == 2
+    assert second.health_status == UNHEALTHY
+
+
+def test_result_is_dropped_if_token_replaced_during_exchange(db, account, app_credentials, monkeypatch):
+    def exchange(snapshot):
+        # пользователь переподключил аккаунт, пока шёл обмен
+        with tokens.SessionLocal() as other:
+            other.get(BusinessAccount, snapshot.id).access_token = "replaced"
+            other.commit()
+        return "exchanged", 3600
+
+    monkeypatch.setattr(tokens, "exchange_long_lived_token", exchange)
+
+    assert tokens.refresh_due_tokens() == 0
+    assert _reload(db, account).access_token == "replaced"
+
+
+def test_expired_token_is_rejected_before_graph_call(account):
+    snapshot = AccountSnapshot.of(account)
+    expired = AccountSnapshot(
+        id=snapshot.id,
+        user_id=snapshot.user_id,
+        external_id=snapshot.external_id,
+        access_token=snapshot.access_token,
+        token_expires_at=_utcnow() - timedelta(minutes=1),
+    )
+
+    with pytest.raises(InstagramPublishError) as error:
+        instagram._ensure_account_ready(expired)
+
+    assert error.value.kind == GraphErrorKind.TOKEN_INVALID
+
+
+def test_client_secret_is_never_logged(caplog):
+    params = {
+        "grant_type": "fb_exchange_token",
+        "client_secret": "app-secret-0123456789",
+        "fb_exchange_token": "EAAB-long-lived-token-value",
+    }
+
+    with caplog.at_level(logging.INFO, logger=instagram.logger.name):
+        instagram._log_http_request(
+            "GET", "https://graph.example/oauth/access_token", read_only=False, params=params
+        )
+
+    assert "app-secret" not in caplog.text
+    assert "0123456789" not in caplog.text
+    assert "'client_secret': '***'" in caplog.text
+    assert "long-lived-token" not in caplog.text
+    assert "EAAB-l...alue" in caplog.text
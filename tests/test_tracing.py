@@ -0,0 +1,193 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from starlette.responses import JSONResponse
+
+import src.services.publisher as publisher
+from src.core import tracing
+from src.core.config import settings
+from src.core.tracing import (
+    KIND_CLIENT,
+    KIND_SERVER,
+    SpanContext,
+    SpanExporter,
+    TracingMiddleware,
+    format_traceparent,
+    install_tracing_hooks,
+    parse_traceparent,
+    span,
+)
+from src.integrations import instagram
+from src.services.executor import PublishExecutor
+
+PARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class Collected(list):
+    def submit(self, item) -> None:
+        self.append(item)
+
+    def named(self, name: str):
+        return next(item for item in self if item.name == name)
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    monkeypatch.setattr(settings, "tracing_exporter", "file")
+    monkeypatch.setattr(settings, "tracing_sample_ratio", 1.0)
+    collected = Collected()
+    monkeypatch.setattr(tracing, "span_exporter", collected)
+    return collected
+
+
+def test_traceparent_round_trip():
+    context = parse_traceparent(PARENT)
+
+    assert context == SpanContext("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", sampled=True)
+    assert format_traceparent(context) == PARENT
+    assert parse_traceparent(PARENT[:-2] + "00").sampled is False
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        "",
+        "garbage",
+        "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331",
+        "00-" + "0" * 32 + "-b7ad6b7169203331-01",
+        "00-0af7651916cd43dd8448eb211c80319c-" + "0" * 16 + "-01",
+        "00-zzf7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+    ],
+)
+def test_invalid_traceparent_is_ignored(value):
+    assert parse_traceparent(value) is None
+
+
+def test_nested_spans_share_trace_and_record_errors(spans):
+    with pytest.raises(ValueError):
+        with span("outer") as outer:
+            with span("inner"):
+                assert tracing.current_trace_id() == outer.context.trace_id
+                raise ValueError("boom")
+
+    inner, recorded_outer = spans
+    assert recorded_outer is outer
+    assert inner.parent_id == outer.context.span_id
+    assert inner.context.trace_id == outer.context.trace_id
+    assert inner.status_message == "boom"
+    assert inner.attributes["exception.type"] == "ValueError"
+    assert tracing.current_context() is None
+
+
+def test_tracing_disabled_creates_no_spans(monkeypatch):
+    monkeypatch.setattr(settings, "tracing_exporter", "none")
+    collected = Collected()
+    monkeypatch.setattr(tracing, "span_exporter", collected)
+
+    with span("outer") as current:
+        assert tracing.current_trace_id() is None
+
+    assert current.context is None
+    assert collected == []
+
+
+def _traced_app() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    def read_item(item_id: int):
+        return {"trace_id": tracing.current_trace_id()}
+
+    async def media(scope, receive, send):
+        # как StaticFiles: смонтированное приложение, без маршрута FastAPI
+        await JSONResponse({"trace_id": tracing.current_trace_id()})(scope, receive, send)
+
+    app.mount("/media/reels", media)
+
+    return TestClient(TracingMiddleware(app))
+
+
+def test_request_continues_incoming_trace_and_uses_route_template(spans):
+    response = _traced_app().get("/api/items/7", headers={"traceparent": PARENT})
+
+    trace_id = PARENT.split("-")[1]
+    assert response.json() == {"trace_id": trace_id}
+    assert response.headers["X-Trace-Id"] == trace_id
+    server = spans.named("GET /api/items/{item_id}")
+    assert server.kind == KIND_SERVER
+    assert server.parent_id == "b7ad6b7169203331"
+    assert server.attributes["http.status_code"] == 200
+
+
+def test_media_fetch_joins_trace_from_query(spans):
+    response = _traced_app().get(f"/media/reels/1/reel.mp4?traceparent={PARENT}")
+
+    assert response.json() == {"trace_id": PARENT.split("-")[1]}
+    assert spans.named("GET /media/reels").attributes["media.key"] == "1/reel.mp4"
+
+
+def test_sql_statements_become_client_spans(spans):
+    engine = create_engine("sqlite://")
+    install_tracing_hooks(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with span("request") as request:
+            connection.execute(text("SELECT 2"))
+
+    query = spans.named("SELECT")
+    assert query.kind == KIND_CLIENT
+    assert query.parent_id == request.context.span_id
+    assert query.attributes["db.statement"] == "SELECT 2"
+    # вне трассы спанов нет
+    assert [item.name for item in spans] == ["SELECT", "request"]
+
+
+def test_local_video_url_carries_traceparent(spans, reel, monkeypatch):
+    monkeypatch.setattr(settings, "media_storage_backend", "local")
+
+    with span("publish") as current:
+        url = instagram.build_video_url_for_reel(reel=reel)
+
+    assert url.endswith("?traceparent=" + format_traceparent(current.context))
+    assert "traceparent" not in instagram.build_video_url_for_reel(reel=reel)
+
+
+def test_queued_publish_keeps_trace_context(spans):
+    executor = PublishExecutor(0, 1)
+
+    with span("POST /api/reels/publish") as request:
+        executor.submit_assignments(1, [10, 11])
+    (job,) = executor.queue.close()
+
+    assert job.trace_context == request.context
+
+
+def test_attempt_records_trace_id(db, reel, account, spans):
+    assignment = publisher.create_assignment(db, reel=reel, account=account)
+
+    with span("publish") as current:
+        publisher._start_attempt(assignment)
+
+    assert assignment.trace_id == current.context.trace_id
+
+
+def test_file_exporter_writes_otlp_batches(spans, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "tracing_file_path", tmp_path / "spans.jsonl")
+    with span("outer", attributes={"count": 2, "ok": True}):
+        pass
+    exporter = SpanExporter()
+    exporter.submit(spans[0])
+
+    exporter._flush()
+
+    payload = json.loads((tmp_path / "spans.jsonl").read_text(encoding="utf-8"))
+    (exported,) = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert exported["name"] == "outer"
+    assert exported["traceId"] == spans[0].context.trace_id
+    assert {"key": "count", "value": {"intValue": "2"}} in exported["attributes"]
+    assert {"key": "ok", "value": {"boolValue": True}} in exported["attributes"]